@@ -4,8 +4,13 @@ from messages import BaseMessage, OpenAIMessage
 from models import ModelManager
 from memories import ChatHistoryMemory
 from retrievers.rag_retriever import RAGRetriever
+from retrievers.semantic_cache import SemanticQueryCache
 from .base import BaseAgent
 import logging
+import time
+
+# 文档截断后至少保留的token数，更少时直接丢弃该文档
+MIN_TRUNCATED_DOC_TOKENS = 64
 
 
 class ChatAgent(BaseAgent):
@@ -22,6 +27,8 @@ class ChatAgent(BaseAgent):
         memory: Optional[ChatHistoryMemory] = None,
         tools: Optional[List[Dict[str, Any]]] = None,
         retriever: Optional[RAGRetriever] = None,
+        semantic_cache: Optional[SemanticQueryCache] = None,
+        cache_answers: bool = False,
     ):
         """Initialize a ChatAgent.
         
@@ -31,6 +38,12 @@ class ChatAgent(BaseAgent):
             memory: Optional memory component for storing chat history
             tools: Optional list of tools available to the agent
             retriever: Optional RAG retriever for document search
+            semantic_cache: Optional cache returning the documents retrieved for a
+                similar earlier query instead of calling the retriever
+            cache_answers: Also reuse the cached answer of a similar query and skip
+                the model call. Only the first question of a conversation is
+                answered from or stored in the cache, since later answers depend
+                on the earlier turns.
         """
         self.system_message = system_message
         self.model_manager = ModelManager()
@@ -38,8 +51,60 @@ class ChatAgent(BaseAgent):
         self.memory = memory or ChatHistoryMemory()
         self.tools = tools or []
         self.retriever = retriever
+        self.semantic_cache = semantic_cache
+        self.cache_answers = cache_answers
         self.logger = logging.getLogger(__name__)
         
+    def _retrieve(self, query: str, reuse_answer: bool = True):
+        """Retrieve documents for a query, through the semantic cache if configured.
+        
+        Args:
+            query: The user's question
+            reuse_answer: Whether a cached answer may be returned
+        
+        Returns:
+            Tuple of (documents, cached answer or None)
+        """
+        dataset_ids = getattr(self.retriever, "dataset_ids", None)
+        if self.semantic_cache is not None:
+            entry = self.semantic_cache.lookup(query, dataset_ids)
+            if entry is not None:
+                self.logger.info(f"Semantic cache hit (similarity {entry['similarity']:.3f}) for: {entry['query']}")
+                return entry["documents"], entry["answer"] if self.cache_answers and reuse_answer else None
+        
+        started = time.perf_counter()
+        documents = self.retriever.search(query)
+        if self.semantic_cache is not None and documents:
+            self.semantic_cache.store(query, documents, dataset_ids, latency=time.perf_counter() - started)
+        return documents, None
+        
+    def _fit_messages(self, messages: List[Dict[str, Any]], budget: int, counter) -> List[Dict[str, Any]]:
+        """Keep the leading messages that fit in a token budget.
+        
+        The first message that does not fit is cut down to the remaining budget
+        when enough of it is left to be useful; it and everything after it are
+        dropped otherwise.
+        
+        Returns:
+            The messages to send, in their original order
+        """
+        fitted = []
+        used = 0
+        for index, msg in enumerate(messages):
+            tokens = counter.count_message(msg)
+            if used + tokens <= budget:
+                fitted.append(msg)
+                used += tokens
+                continue
+            
+            content = str(msg.get("content") or "")
+            room = budget - used - (tokens - counter.count(content))
+            if room >= MIN_TRUNCATED_DOC_TOKENS:
+                fitted.append({**msg, "content": counter.truncate(content, room, keep="start")})
+            self.logger.info(f"Token budget reached: truncated/dropped {len(messages) - index} RAG message(s)")
+            break
+        return fitted
+        
     def reset(self) -> None:
         """Reset the agent's state."""
         self.memory.clear()
@@ -51,57 +116,21 @@ class ChatAgent(BaseAgent):
             if isinstance(user_message, str):
                 user_message = {"role": "user", "content": user_message}
             
+            # 缓存的回答只对对话的第一个问题有效，之后的回答依赖前面的对话
+            first_turn = not self.memory.retrieve()
+            
             # Add user message to memory
             self.memory.add_message(user_message)
             
-            # Build context from memory
-            context = self.memory.get_context()
-            if not isinstance(context, list):
-                context = [context] if context else []
-            
-            # 确保context中的每个消息都是字典格式
-            processed_context = []
-            for msg in context:
-                if isinstance(msg, dict):
-                    processed_context.append(msg)
-                elif isinstance(msg, BaseMessage):
-                    processed_context.append({
-                        "role": msg.role,
-                        "content": msg.content
-                    })
-                elif isinstance(msg, tuple) and len(msg) > 0:
-                    # 处理可能是(message_list, token_count)格式的元组
-                    msg_list = msg[0]
-                    if isinstance(msg_list, list):
-                        for sub_msg in msg_list:
-                            if isinstance(sub_msg, dict):
-                                processed_context.append(sub_msg)
-                            elif isinstance(sub_msg, BaseMessage):
-                                processed_context.append({
-                                    "role": sub_msg.role,
-                                    "content": sub_msg.content
-                                })
-                            elif isinstance(sub_msg, str):
-                                processed_context.append({
-                                    "role": "user",
-                                    "content": sub_msg
-                                })
-                elif isinstance(msg, str):
-                    processed_context.append({
-                        "role": "user",
-                        "content": msg
-                    })
-                else:
-                    self.logger.warning(f"Unknown message type: {type(msg)}")
-                    self.logger.debug(f"Raw message: {str(msg)[:200]}...")
-            
-            # RAG retrieval
+            # RAG retrieval（先检索，系统消息、文档和历史共用同一个token预算）
             retrieved_docs = []
+            rag_messages = []
             rag_info_message = None
+            cached_answer = None
             
             try:
                 self.logger.info(f"Starting RAG retrieval for query: {user_message['content']}")
-                retrieved_docs = self.retriever.search(user_message["content"])
+                retrieved_docs, cached_answer = self._retrieve(user_message["content"], reuse_answer=first_turn)
                 self.logger.info(f"Retrieved {len(retrieved_docs)} documents from RAG")
                 
                 if retrieved_docs:
@@ -118,7 +147,7 @@ class ChatAgent(BaseAgent):
                         "role": "assistant",
                         "content": rag_summary
                     }
-                    processed_context.append(rag_info_message)
+                    rag_messages.append(rag_info_message)
                     self.logger.debug(f"Added RAG summary message: {rag_summary}")
                     
                     # 第二步：添加每个文档的详细内容
@@ -134,7 +163,7 @@ class ChatAgent(BaseAgent):
                                 "role": "system",
                                 "content": f"以下是来自文档 {filename} 的内容 (相关度: {similarity:.2f}):\n\n{content}"
                             }
-                            processed_context.append(doc_message)
+                            rag_messages.append(doc_message)
                             self.logger.debug(f"Added document from {filename} with score: {similarity}")
                 else:
                     # 如果没有检索到文档，添加一个提示消息
@@ -142,7 +171,7 @@ class ChatAgent(BaseAgent):
                         "role": "assistant",
                         "content": "我没有找到与您问题直接相关的文档。我将基于我的通用知识回答您的问题。"
                     }
-                    processed_context.append(rag_info_message)
+                    rag_messages.append(rag_info_message)
                     self.logger.warning("No documents retrieved from RAG")
                     
             except Exception as e:
@@ -152,8 +181,61 @@ class ChatAgent(BaseAgent):
                     "role": "assistant",
                     "content": "检索相关文档时出现错误，我将尝试直接回答您的问题。"
                 }
-                processed_context.append(rag_info_message)
+                rag_messages.append(rag_info_message)
                 
+            # 按token预算分配提示：先为系统消息和当前问题预留，文档放不下时截断或丢弃，
+            # 剩余的预算留给历史消息
+            creator = self.memory.get_context_creator()
+            counter = creator.token_counter
+            budget = creator.message_budget
+            system_tokens = counter.count_message({"role": "system", "content": self.system_message})
+            user_tokens = counter.count_message(user_message)
+            rag_messages = self._fit_messages(rag_messages, budget - system_tokens - user_tokens, counter)
+            rag_tokens = sum(counter.count_message(msg) for msg in rag_messages)
+            
+            # Build context from memory
+            context, _ = creator.create_context(self.memory.retrieve(), budget=budget - system_tokens - rag_tokens)
+            if not isinstance(context, list):
+                context = [context] if context else []
+            
+            # 确保context中的每个消息都是字典格式
+            processed_context = []
+            for msg in context:
+                if isinstance(msg, dict):
+                    processed_context.append(msg)
+                elif isinstance(msg, BaseMessage):
+                    processed_context.append({
+                        "role": msg.role,
+                        "content": msg.content
+                    })
+                elif isinstance(msg, tuple) and len(msg) > 0:
+                    # 处理可能是(message_list, token_count)格式的元组
+                    msg_list = msg[0]
+                    if isinstance(msg_list, list):
+                        for sub_msg in msg_list:
+                            if isinstance(sub_msg, dict):
+                                processed_context.append(sub_msg)
+                            elif isinstance(sub_msg, BaseMessage):
+                                processed_context.append({
+                                    "role": sub_msg.role,
+                                    "content": sub_msg.content
+                                })
+                            elif isinstance(sub_msg, str):
+                                processed_context.append({
+                                    "role": "user",
+                                    "content": sub_msg
+                                })
+                elif isinstance(msg, str):
+                    processed_context.append({
+                        "role": "user",
+                        "content": msg
+                    })
+                else:
+                    self.logger.warning(f"Unknown message type: {type(msg)}")
+                    self.logger.debug(f"Raw message: {str(msg)[:200]}...")
+            
+            processed_context.extend(rag_messages)
+            
             # 添加系统消息（如果不存在）
             if not any(msg.get("role") == "system" for msg in processed_context):
                 processed_context.insert(0, {
@@ -181,11 +263,16 @@ class ChatAgent(BaseAgent):
             # Call model with enhanced context
             try:
                 # 确保传递给模型的是列表而不是元组
-                self.logger.debug("Calling model generate function with processed context")
-                response = self.model.generate(
-                    messages=processed_context,
-                    tools=self.tools,
-                )
+                if cached_answer:
+                    # 相似问题的回答已缓存，跳过模型调用
+                    self.logger.info("Answering from semantic cache")
+                    response = {"choices": [{"message": {"content": cached_answer}}]}
+                else:
+                    self.logger.debug("Calling model generate function with processed context")
+                    response = self.model.generate(
+                        messages=processed_context,
+                        tools=self.tools,
+                    )
                 
                 # 记录模型原始响应
                 self.logger.debug(f"Model raw response type: {type(response)}")
@@ -198,6 +285,10 @@ class ChatAgent(BaseAgent):
                         assistant_content = "Sorry, I could not generate a valid response."
                         self.logger.warning("Model response structure might be invalid or content is empty.")
                         self.logger.debug(f"Raw response: {response}")
+                    elif self.cache_answers and first_turn and self.semantic_cache is not None and not cached_answer:
+                        self.semantic_cache.store_answer(
+                            user_message["content"], assistant_content, getattr(self.retriever, "dataset_ids", None)
+                        )
 
                     # 记录完整的助手响应内容
                     self.logger.debug(f"Full assistant response: {assistant_content}")
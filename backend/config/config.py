@@ -16,11 +16,46 @@ class Config:
         self.db_password = os.getenv('DB_PASSWORD', '')
         self.db_name = os.getenv('DB_NAME', 'mcdp')
         
+        # 数据库连接池配置
+        self.db_pool_size = int(os.getenv('DB_POOL_SIZE', '10'))
+        self.db_pool_max_lifetime = int(os.getenv('DB_POOL_MAX_LIFETIME', '3600'))  # 连接最大存活秒数
+        self.db_pool_timeout = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # 借出连接的等待秒数
+        self.db_connect_timeout = int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+        
+        # 多区域云资源查询配置
+        self.cloud_query_workers = int(os.getenv('CLOUD_QUERY_WORKERS', '4'))  # 同时查询的区域数
+        self.cloud_query_region_timeout = int(os.getenv('CLOUD_QUERY_REGION_TIMEOUT', '600'))  # 单个区域查询超时秒数
+        
+        # RAG检索语义缓存配置（相似问题直接复用检索结果）
+        self.semantic_cache_embedding_model = os.getenv('SEMANTIC_CACHE_EMBEDDING_MODEL', '')  # OpenAI兼容接口的向量模型，如 text-embedding-3-small
+        # 只有配置了向量模型才默认开启；字符n-gram只比较字面相似度，不能区分 "端口22" 和 "端口443"
+        self.semantic_cache_enabled = os.getenv(
+            'SEMANTIC_CACHE_ENABLED', 'true' if self.semantic_cache_embedding_model else 'false'
+        ).lower() == 'true'
+        self.semantic_cache_threshold = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9'))  # 命中所需的最小余弦相似度
+        self.semantic_cache_ttl = float(os.getenv('SEMANTIC_CACHE_TTL', '3600'))  # 条目有效期秒数
+        self.semantic_cache_max_entries = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '1024'))
+        self.semantic_cache_answers = os.getenv('SEMANTIC_CACHE_ANSWERS', 'false').lower() == 'true'  # 是否复用缓存的回答
+        
+        # 对话上下文配置
+        self.chat_context_token_limit = int(os.getenv('CHAT_CONTEXT_TOKEN_LIMIT', '4000'))  # 发送给模型的历史消息 token 上限
+        
+        # 聊天记录异步批量写入配置
+        self.chat_write_batch_size = int(os.getenv('CHAT_WRITE_BATCH_SIZE', '100'))  # 每批写入的最大行数
+        self.chat_write_flush_interval = float(os.getenv('CHAT_WRITE_FLUSH_INTERVAL', '0.5'))  # 最长等待秒数
+        self.chat_write_max_backlog = int(os.getenv('CHAT_WRITE_MAX_BACKLOG', '10000'))  # 内存中待写入的最大行数
+        
+        # 聊天历史分页配置
+        self.chat_history_page_size = int(os.getenv('CHAT_HISTORY_PAGE_SIZE', '100'))  # 每页默认返回的消息数
+        self.chat_history_max_page_size = int(os.getenv('CHAT_HISTORY_MAX_PAGE_SIZE', '500'))  # 每页最多返回的消息数
+        
         # JWT配置
         self.jwt_secret = os.getenv('JWT_SECRET', 'mcdp-jwt-secret-key')
         self.jwt_token_expires = int(os.getenv('JWT_TOKEN_EXPIRES', '86400'))  # 默认一天
         # 添加jwt_expires引用同一个值，以兼容现有代码
         self.jwt_expires = self.jwt_token_expires
+        # 管理员用户名（逗号分隔），可以调用清除缓存等管理接口
+        self.admin_usernames = [name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()]
         
         # 项目路径配置
         self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -37,6 +72,16 @@ class Config:
                 except Exception as e:
                     logging.error(f"创建目录失败: {dir_path}, 错误: {e}")
         
+        # Terraform provider插件缓存配置（共享插件缓存 + 按provider集合预初始化的工作目录模板）
+        self.terraform_plugin_cache_enabled = os.getenv('TERRAFORM_PLUGIN_CACHE', 'true').lower() == 'true'
+        self.terraform_plugin_cache_dir = (os.getenv('TERRAFORM_PLUGIN_CACHE_DIR') or
+                                           os.path.join(self.base_dir, 'cache', 'terraform_plugins'))
+        
+        # Terraform部署任务执行器配置
+        self.terraform_job_workers = int(os.getenv('TERRAFORM_JOB_WORKERS', '4'))  # 同时运行的部署任务数
+        self.terraform_job_per_user = int(os.getenv('TERRAFORM_JOB_PER_USER', '2'))  # 单个用户同时运行的部署任务数
+        self.terraform_job_queue_size = int(os.getenv('TERRAFORM_JOB_QUEUE_SIZE', '100'))  # 排队任务上限
+        
         # 设置应用密钥
         self.secret_key = os.getenv('SECRET_KEY', 'mcdp-secret-key')
         
@@ -11,13 +11,24 @@ from agents.chat_agent import ChatAgent
 from memories.chat_history_memory import ChatHistoryMemory
 from messages.base import BaseMessage # 用于类型检查
 from retrievers.rag_retriever import RAGRetriever
+from retrievers.semantic_cache import SemanticQueryCache
 from controllers.cloud_controller import CloudController  # 新增导入
 from utils.auth import get_current_user  # 添加 get_current_user 导入
+from utils.write_behind import get_chat_history_writer
+import base64
 import json
 import traceback
+from datetime import datetime
 
 class ChatController:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, embedding_fn=None):
+        """初始化聊天控制器
+
+        Args:
+            config: 应用配置
+            embedding_fn: 可选的查询向量函数（文本 -> 向量），供语义缓存使用；
+                未提供时按 SEMANTIC_CACHE_EMBEDDING_MODEL 创建
+        """
         self.config = config
         self.logger = logging.getLogger(__name__)
         
@@ -43,15 +54,34 @@ class ChatController:
         )
         self.logger.info(f"RAGRetriever initialized with {len(dataset_ids)} datasets")
         
+        # 语义缓存：相似问题直接复用检索结果（可选复用回答）
+        self.semantic_cache = None
+        if config.semantic_cache_enabled:
+            if embedding_fn is None:
+                embedding_fn = self._create_semantic_cache_embedding_fn()
+            if embedding_fn is None:
+                self.logger.warning("语义缓存未配置向量模型，将按字符n-gram的字面相似度匹配，可能把不同问题判为命中")
+            self.semantic_cache = SemanticQueryCache(
+                embedding_fn=embedding_fn,
+                threshold=config.semantic_cache_threshold,
+                max_entries=config.semantic_cache_max_entries,
+                ttl=config.semantic_cache_ttl
+            )
+        
+        # 聊天记录由后台写入器批量写入数据库
+        self.chat_history_writer = get_chat_history_writer()
+        
         # 初始化 ChatAgent (使用单例模式简化，后续可改为会话管理)
         # TODO: 考虑内存管理策略（例如，基于用户会话）
-        self.memory = ChatHistoryMemory()
+        self.memory = ChatHistoryMemory(token_limit=config.chat_context_token_limit, model_name=model_name)
         try:
             self.chat_agent = ChatAgent(
                 system_message=system_message,
                 model_name=model_name, 
                 memory=self.memory,
-                retriever=self.retriever
+                retriever=self.retriever,
+                semantic_cache=self.semantic_cache,
+                cache_answers=config.semantic_cache_answers
             )
             self.logger.info(f"ChatAgent initialized successfully with model: {model_name}")
         except Exception as e:
@@ -701,6 +731,10 @@ tips:执行前需要先添加你的云账号的「api-key」噢~ ：）"""
     def save_chat_message(self, user_id, username, message, message_type='user', session_id=None, metadata=None):
         """保存聊天消息到数据库
         
+        消息交给后台写入器批量写入，不在请求线程中等待数据库往返。
+        created_at 使用提交时的 UTC 时间，写入时由数据库转换为会话时区，
+        保证批量写入后的消息顺序和时间与同步写入 NOW() 一致。
+        
         Args:
             user_id: 用户ID
             username: 用户名
@@ -710,11 +744,6 @@ tips:执行前需要先添加你的云账号的「api-key」噢~ ：）"""
             metadata: 元数据（可选）
         """
         try:
-            from utils.database import get_db_connection
-            
-            connection = get_db_connection()
-            cursor = connection.cursor()
-            
             # 根据消息类型设置question和answer字段
             # 确保question字段不为空（数据库要求NOT NULL）
             if message_type == 'user':
@@ -724,28 +753,47 @@ tips:执行前需要先添加你的云账号的「api-key」噢~ ：）"""
                 question = ""  # 系统消息的question设为空字符串
                 answer = message
             
-            # 插入聊天记录
-            self.logger.info(f"准备保存聊天消息: 用户ID={user_id}, 用户名={username}, 消息类型={message_type}")
-            self.logger.info(f"消息内容预览: question='{question[:50] if question else 'None'}...', answer='{answer[:50] if answer else 'None'}...'")
-            
-            cursor.execute("""
-                INSERT INTO chat_history 
-                (user_id, username, question, answer, message_type, session_id, metadata, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-            """, (user_id, username, question, answer, message_type, session_id, 
-                  json.dumps(metadata) if metadata else None))
-            
-            connection.commit()
-            cursor.close()
-            connection.close()
+            # 放入写入队列
+            self.logger.debug(f"提交聊天消息: 用户ID={user_id}, 用户名={username}, 消息类型={message_type}")
             
-            self.logger.info(f"保存聊天消息成功: 用户={username}, 类型={message_type}")
+            queued = self.chat_history_writer.submit(
+                (user_id, username, question, answer, message_type, session_id,
+                 json.dumps(metadata) if metadata else None, datetime.utcnow())
+            )
+            if not queued:
+                self.logger.error(f"保存聊天消息失败: 写入队列不可用, 用户={username}, 类型={message_type}")
             
         except Exception as e:
             self.logger.error(f"保存聊天消息失败: {str(e)}", exc_info=True)
 
+    @staticmethod
+    def _encode_history_cursor(created_at, id_val) -> str:
+        """把 (created_at, id) 编码为不透明的分页游标"""
+        raw = f"{created_at.strftime('%Y-%m-%d %H:%M:%S.%f')}|{id_val}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_history_cursor(cursor_value: str):
+        """解析分页游标，返回 (created_at 字符串, id)，格式错误时抛出 ValueError"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor_value.encode('ascii')).decode('utf-8')
+            created_at, id_val = raw.rsplit('|', 1)
+            datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S.%f')
+            return created_at, int(id_val)
+        except Exception:
+            raise ValueError("无效的分页游标")
+
     def get_chat_history(self):
-        """获取用户的聊天历史记录"""
+        """获取用户的聊天历史记录（按 (created_at, id) 游标分页）
+
+        查询参数:
+            limit: 每页消息数，默认 Config.chat_history_page_size，上限 Config.chat_history_max_page_size
+            before: 上一页返回的 next_cursor，用于继续加载更早的消息
+            clear_time: 清屏时间点（可选），只返回该时间之后的记录
+            include_metadata: 为 true 时每条消息额外返回 session_id 和 metadata，默认不返回（与原有响应格式一致）
+
+        每页取最新的 limit 条，按时间正序返回；has_more 为 true 时用 next_cursor 加载更早的消息。
+        """
         try:
             # 获取当前用户信息
             user_id = request.current_user.get('user_id')
@@ -754,122 +802,154 @@ tips:执行前需要先添加你的云账号的「api-key」噢~ ：）"""
             if not user_id or not username:
                 return jsonify({"error": "用户信息无效"}), 401
                 
+            # 解析分页参数
+            try:
+                limit = int(request.args.get('limit', self.config.chat_history_page_size))
+            except ValueError:
+                return jsonify({"error": "limit 必须是整数"}), 400
+            limit = max(1, min(limit, self.config.chat_history_max_page_size))
+            before = request.args.get('before')
+            include_metadata = request.args.get('include_metadata', '').lower() in ('1', 'true', 'yes')
+            
             # 获取清屏时间点参数（可选）
             clear_time = request.args.get('clear_time')
-            self.logger.info(f"🔍 获取聊天历史请求，用户: {username}, 清屏时间: {clear_time}")
-            
-            from utils.database import get_db_connection
-            
-            connection = get_db_connection()
-            cursor = connection.cursor()
+            self.logger.info(f"🔍 获取聊天历史请求，用户: {username}, 清屏时间: {clear_time}, limit: {limit}, 游标: {before}")
             
-            # 先检查表中总共有多少条记录
-            cursor.execute("SELECT COUNT(*) as total FROM chat_history")
-            result = cursor.fetchone()
-            total_count = result.get('total', 0) if isinstance(result, dict) else result[0]
-            self.logger.info(f"chat_history表中总共有 {total_count} 条记录")
-            
-            # 查询该用户的所有记录数量
-            cursor.execute("SELECT COUNT(*) as user_total FROM chat_history WHERE username = %s", (username,))
-            result = cursor.fetchone()
-            user_count = result.get('user_total', 0) if isinstance(result, dict) else result[0]
-            self.logger.info(f"用户 {username} 在chat_history表中有 {user_count} 条记录")
-            
-            # 构建查询SQL和参数
+            # 构建查询条件：走 (username, created_at, id) 复合索引，不再统计全表和用户记录总数
+            conditions = ["username = %s"]
+            params = [username]
             if clear_time:
-                # 将UTC时间转换为本地时间进行比较
-                from datetime import datetime
-                try:
-                    # 解析ISO时间字符串并转换为本地时间
-                    utc_time = datetime.fromisoformat(clear_time.replace('Z', '+00:00'))
-                    # 转换为本地时间字符串用于数据库查询
-                    local_time_str = utc_time.strftime('%Y-%m-%d %H:%M:%S')
-                    self.logger.info(f"🔍 时间转换：UTC {clear_time} -> 本地 {local_time_str}")
-                except Exception as time_error:
-                    self.logger.error(f"时间转换失败: {time_error}, 使用原始时间")
-                    local_time_str = clear_time
-                
                 # 如果有清屏时间点，只查询该时间之后的记录
-                self.logger.info(f"🔍 使用清屏时间过滤，用户名: {username}，清屏时间: {local_time_str}")
-                # 使用MySQL的CONVERT_TZ函数确保时间比较正确
-                sql = """
-                    SELECT id, question, answer, message_type, session_id, metadata, created_at
-                    FROM chat_history 
-                    WHERE username = %s AND created_at > CONVERT_TZ(%s, '+00:00', @@session.time_zone)
-                    ORDER BY created_at ASC
-                """
-                params = (username, clear_time)  # 直接使用UTC时间，让MySQL进行转换
-            else:
-                # 查询用户的聊天历史，按时间顺序排列
-                self.logger.info(f"🔍 查询所有历史，用户名: {username}")
-                sql = """
-                    SELECT id, question, answer, message_type, session_id, metadata, created_at
-                    FROM chat_history 
-                    WHERE username = %s 
-                    ORDER BY created_at ASC
-                """
-                params = (username,)
-            
-            cursor.execute(sql, params)
-            
-            records = cursor.fetchall()
-            self.logger.info(f"🔍 数据库查询结果: {len(records)} 条记录")
-            if clear_time and len(records) > 0:
-                self.logger.info(f"🔍 过滤后的第一条记录时间: {records[0]}")
-            elif clear_time and len(records) == 0:
-                self.logger.info(f"🔍 清屏时间 {clear_time} 之后没有新的聊天记录")
-            if records:
-                self.logger.info(f"第一条记录示例: {records[0]}")
+                # 使用MySQL的CONVERT_TZ函数确保时间比较正确，直接使用UTC时间，让MySQL进行转换
+                conditions.append("created_at > CONVERT_TZ(%s, '+00:00', @@session.time_zone)")
+                params.append(clear_time)
+            if before:
+                try:
+                    cursor_created_at, cursor_id = self._decode_history_cursor(before)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                conditions.append("(created_at < %s OR (created_at = %s AND id < %s))")
+                params.extend([cursor_created_at, cursor_created_at, cursor_id])
+            
+            # 只有显式请求时才读取 session_id 和 metadata 列
+            columns = "id, question, answer, message_type, created_at, session_id, metadata" if include_metadata else \
+                "id, question, answer, message_type, created_at"
+            # 多取一条用于判断是否还有更早的消息
+            sql = f"""
+                SELECT {columns}
+                FROM chat_history
+                WHERE {' AND '.join(conditions)}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            """
+            params.append(limit + 1)
             
-            cursor.close()
-            connection.close()
+            from utils.database import get_db_connection
+            
+            # 该用户有尚未落库的消息时先写入，保证刚发送的消息出现在历史中
+            if not before and self.chat_history_writer.has_pending(lambda row: row[1] == username) \
+                    and not self.chat_history_writer.flush(timeout=2):
+                self.logger.warning(f"聊天记录写入队列未能及时写完: {self.chat_history_writer.metrics()}")
             
-            # 转换为前端需要的格式
+            connection = get_db_connection()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(sql, tuple(params))
+                records = list(cursor.fetchall())
+                cursor.close()
+            finally:
+                connection.close()
+            
+            has_more = len(records) > limit
+            records = records[:limit]
+            
+            # 兼容字典和元组两种格式，元组顺序与 columns 一致
+            keys = [column.strip() for column in columns.split(',')]
+            records = [record if isinstance(record, dict) else dict(zip(keys, record)) for record in records]
+            
+            # 游标指向本页最早的一条记录
+            next_cursor = None
+            if has_more and records and records[-1].get('created_at'):
+                next_cursor = self._encode_history_cursor(records[-1]['created_at'], records[-1]['id'])
+            
+            # 转换为前端需要的格式，按时间正序
             messages = []
-            for record in records:
-                # 兼容字典和元组两种格式
-                if isinstance(record, dict):
-                    # 字典格式
-                    id_val = record.get('id')
-                    question = record.get('question')
-                    answer = record.get('answer')
-                    message_type = record.get('message_type')
-                    session_id = record.get('session_id')
-                    metadata = record.get('metadata')
-                    created_at = record.get('created_at')
-                else:
-                    # 元组格式: (id, question, answer, message_type, session_id, metadata, created_at)
-                    id_val, question, answer, message_type, session_id, metadata, created_at = record
-                
-                if message_type == 'user' and question:
+            for record in reversed(records):
+                message_type = record.get('message_type')
+                created_at = record.get('created_at')
+                if message_type == 'user' and record.get('question'):
                     # 用户消息
-                    messages.append({
-                        'type': 'user',
-                        'content': question,
-                        'timestamp': created_at.isoformat() if created_at else None,
-                        'id': id_val
-                    })
-                elif message_type == 'system' and answer:
+                    message = {'type': 'user', 'content': record.get('question')}
+                elif message_type == 'system' and record.get('answer'):
                     # 系统消息
-                    messages.append({
-                        'type': 'system', 
-                        'content': answer,
-                        'timestamp': created_at.isoformat() if created_at else None,
-                        'id': id_val
-                    })
+                    message = {'type': 'system', 'content': record.get('answer')}
+                else:
+                    continue
+                message['timestamp'] = created_at.isoformat() if created_at else None
+                message['id'] = record.get('id')
+                if include_metadata:
+                    metadata = record.get('metadata')
+                    if isinstance(metadata, (str, bytes)):
+                        try:
+                            metadata = json.loads(metadata)
+                        except ValueError:
+                            pass
+                    message['session_id'] = record.get('session_id')
+                    message['metadata'] = metadata
+                messages.append(message)
             
-            self.logger.info(f"获取聊天历史成功: 用户={username}, 消息数量={len(messages)}")
+            self.logger.info(f"获取聊天历史成功: 用户={username}, 消息数量={len(messages)}, 还有更早消息={has_more}")
             
             return jsonify({
                 "success": True,
                 "messages": messages,
-                "total": len(messages)
+                "total": len(messages),
+                "has_more": has_more,
+                "next_cursor": next_cursor
             })
             
         except Exception as e:
             self.logger.error(f"获取聊天历史失败: {str(e)}", exc_info=True)
             return jsonify({"error": f"获取聊天历史失败: {str(e)}"}), 500
 
+    def get_chat_persistence_stats(self):
+        """获取聊天记录异步写入统计（待写入行数、最早等待时间、失败和丢弃行数）"""
+        return jsonify({"success": True, "stats": self.chat_history_writer.metrics()})
+
+    def _create_semantic_cache_embedding_fn(self):
+        """按 SEMANTIC_CACHE_EMBEDDING_MODEL 创建查询向量函数，未配置或创建失败时返回 None"""
+        model = self.config.semantic_cache_embedding_model
+        if not model:
+            return None
+        try:
+            import openai
+            client = openai.OpenAI(
+                api_key=self.config.openai_api_key,
+                base_url=self.config.openai_api_base_url
+            )
+        except Exception as e:
+            self.logger.error(f"创建语义缓存向量模型客户端失败: {str(e)}")
+            return None
+
+        def embed(text):
+            return client.embeddings.create(model=model, input=text).data[0].embedding
+        return embed
+
+    def get_semantic_cache_stats(self):
+        """获取RAG检索语义缓存统计信息（命中率、节省的检索耗时）"""
+        if self.semantic_cache is None:
+            return jsonify({"success": True, "enabled": False, "stats": {}})
+        return jsonify({"success": True, "enabled": True, "stats": self.semantic_cache.metrics()})
+
+    def invalidate_semantic_cache(self):
+        """使语义缓存失效，指定 dataset_id 时只清除依赖该数据集的条目"""
+        if self.semantic_cache is None:
+            return jsonify({"success": True, "invalidated": 0})
+        dataset_id = request.args.get('dataset_id') or None
+        invalidated = self.semantic_cache.invalidate(dataset_id)
+        self.logger.info(f"语义缓存失效: dataset_id={dataset_id}, 清除 {invalidated} 条")
+        return jsonify({"success": True, "invalidated": invalidated})
+
     def check_faq_query(self, message):
         """检查是否是FAQ查询并返回对应的问题和答案
         
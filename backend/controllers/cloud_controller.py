@@ -573,150 +573,29 @@ class CloudController:
                         "reply": f"多区域查询失败: {error_msg}"
                     }), 500
                 
-                all_results = {}
-                combined_table = ""
-                success_count = 0
-                error_messages = []
-                
-                # 用于存储全局资源
-                global_resources = {}
+                query_kwargs = {
+                    'generator': generator,
+                    'original_config': original_config,
+                    'db_config': db_config,
+                    'deploy_id': deploy_id,
+                    'user_id': user_id,
+                    'project': project,
+                    'cloud': cloud,
+                    'selected_products': selected_products
+                }
                 
-                for single_region in actual_regions:
-                    try:
-                        self.logger.info(f"正在查询区域: {single_region}")
-                        
-                        # 检查deploy_id是否有效
-                        if not deploy_id:
-                            error_msg = f"查询ID为空或无效"
-                            self.logger.error(error_msg)
-                            error_messages.append(f"{single_region}: {error_msg}")
-                            continue
-                        
-                        # 临时修改配置中的region
-                        temp_config = original_config.copy()
-                        temp_config['region'] = single_region
-                        
-                        # 手动生成该区域的Terraform配置内容，传递selected_products参数
-                        terraform_content = generator._generate_aws_terraform_content(temp_config, selected_products)
-                        
-                        # 创建临时配置文件
-                        
-                        # 获取backend目录路径
-                        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                        query_dir = os.path.join(backend_dir, "query")
-                        os.makedirs(query_dir, exist_ok=True)
-                        
-                        # 为每个区域创建单独的目录
-                        region_deploy_dir = os.path.join(query_dir, f"{deploy_id}_{single_region}")
-                        os.makedirs(region_deploy_dir, exist_ok=True)
-                        
-                        # 写入配置文件
-                        tf_file_path = os.path.join(region_deploy_dir, "main.tf")
-                        with open(tf_file_path, 'w') as f:
-                            f.write(terraform_content)
-                        
-                        self.logger.info(f"为区域 {single_region} 生成配置文件: {tf_file_path}")
-                        
-                        # 创建执行器并执行Terraform
-                        executor = TerraformExecutor(db_config)
-                        result = executor.run_terraform(
-                            uid=user_id,
-                            project=project,
-                            cloud=cloud,
-                            region=single_region,  # 使用具体的区域
-                            terraform_content=terraform_content,
-                            deploy_id=deploy_id,  # 使用原始deploy_id，不添加区域后缀
-                            ak=temp_config.get('ak'),
-                            sk=temp_config.get('sk'),
-                            skip_save=True  # 多区域查询时跳过数据库保存
-                        )
-                        
-                        if result.get('success', False):
-                            success_count += 1
-                            region_results = result.get('results', {})
-                            
-                            # 将terraform原始输出转换为解析后的格式
-                            parsed_region_results = executor._parse_terraform_outputs(region_results)
-                            
-                            # 检查是否为us-east-1区域（全局查询区域）
-                            if single_region == 'us-east-1':
-                                # 从us-east-1结果中提取全局资源
-                                if 'iam_user_details' in region_results:
-                                    global_resources['iam_user_details'] = region_results['iam_user_details']
-                                    self.logger.info(f"从 {single_region} 提取IAM用户全局资源")
-                                
-                                if 's3_details' in region_results:
-                                    global_resources['s3_details'] = region_results['s3_details'] 
-                                    self.logger.info(f"从 {single_region} 提取S3存储桶全局资源")
-                                
-                                # 从us-east-1解析结果中移除全局资源，只保留区域性资源
-                                parsed_results_filtered = {k: v for k, v in parsed_region_results.items() 
-                                                         if k not in ['iam_resources', 's3_resources']}
-                                all_results[single_region] = parsed_results_filtered
-                                
-                                # 为us-east-1生成表格（不包含全局资源）
-                                if any(v for v in parsed_results_filtered.values() if isinstance(v, list) and v):
-                                    region_table = executor.format_results_as_table(parsed_results_filtered, region_prefix=single_region)
-                                    combined_table += f"<h3>区域: {single_region}</h3>\n{region_table}\n<br/>\n"
-                            else:
-                                # 其他区域的解析结果直接添加
-                                all_results[single_region] = parsed_region_results
-                                
-                                # 为其他区域生成表格
-                                if any(v for v in parsed_region_results.values() if isinstance(v, list) and v):
-                                    region_table = executor.format_results_as_table(parsed_region_results, region_prefix=single_region)
-                                    combined_table += f"<h3>区域: {single_region}</h3>\n{region_table}\n<br/>\n"
-                            
-                            self.logger.info(f"区域 {single_region} 查询成功")
-                        else:
-                            error_msg = result.get('error', '未知错误')
-                            self.logger.error(f"区域 {single_region} 查询失败: {error_msg}")
-                            error_messages.append(f"{single_region}: {error_msg}")
-                            
-                    except Exception as e:
-                        error_msg = f"查询区域 {single_region} 时发生异常: {str(e)}"
-                        self.logger.error(error_msg, exc_info=True)
-                        error_messages.append(error_msg)
+                # 流式返回：每个区域完成后立即推送该区域的结果
+                if data.get('stream'):
+                    return self._stream_multi_region_query(actual_regions, db_config, query_kwargs)
                 
-                # 如果有全局资源，在最前面添加GLOBAL区域显示
-                if global_resources:
-                    self.logger.info(f"生成全局资源表格，包含: {list(global_resources.keys())}")
-                    # 将全局资源转换为解析后的格式
-                    parsed_global_resources = executor._parse_terraform_outputs(global_resources)
-                    # 只保留全局资源（IAM和S3）
-                    global_resources_filtered = {
-                        'iam_resources': parsed_global_resources.get('iam_resources', []),
-                        's3_resources': parsed_global_resources.get('s3_resources', [])
-                    }
-                    global_table = executor.format_results_as_table(global_resources_filtered, region_prefix="GLOBAL")
-                    combined_table = f"<h3>区域: GLOBAL (全局资源)</h3>\n{global_table}\n<br/>\n" + combined_table
-                    all_results['GLOBAL'] = global_resources_filtered
+                state = self._new_multi_region_state(db_config)
+                for region_result in self._iter_region_queries(actual_regions, query_kwargs):
+                    self._merge_region_result(state, region_result)
                 
-                # 构建最终响应
-                if success_count > 0:
-                    success_msg = f"多区域查询完成！成功查询了 {success_count}/{len(actual_regions)} 个区域的资源"
-                    if error_messages:
-                        success_msg += f"\n\n失败的区域:\n" + "\n".join(error_messages)
-                    
-                    return jsonify({
-                        "success": True,
-                        "message": success_msg,
-                        "reply": f"<div class='query-result'>{success_msg}：<br/><br/>{combined_table}</div>",
-                        "data": {
-                            "table": combined_table,
-                            "results": all_results,
-                            "success_count": success_count,
-                            "total_regions": len(actual_regions),
-                            "errors": error_messages
-                        }
-                    })
-                else:
-                    error_msg = f"所有区域查询都失败了:\n" + "\n".join(error_messages)
-                    return jsonify({
-                        "success": False,
-                        "error": error_msg,
-                        "reply": f"多区域查询失败: {error_msg}"
-                    }), 500
+                response_data = self._build_multi_region_response(state, actual_regions)
+                if response_data['success']:
+                    return jsonify(response_data)
+                return jsonify(response_data), 500
                     
             else:
                 # 单区域查询（原有逻辑）
@@ -816,6 +695,251 @@ class CloudController:
                 "success": False
             }), 500
             
+    def _query_single_region(self, single_region, generator, original_config, db_config, deploy_id,
+                             user_id, project, cloud, selected_products):
+        """查询单个区域的资源，在线程池中执行
+        
+        Returns:
+            {"region": 区域, "success": 是否成功, "results": terraform原始输出, "error": 错误信息}
+        """
+        from toolkits.terraform_executor import TerraformExecutor
+        
+        try:
+            self.logger.info(f"正在查询区域: {single_region}")
+            
+            # 临时修改配置中的region
+            temp_config = original_config.copy()
+            temp_config['region'] = single_region
+            
+            # 手动生成该区域的Terraform配置内容，传递selected_products参数
+            terraform_content = generator._generate_aws_terraform_content(temp_config, selected_products)
+            
+            # 获取backend目录路径
+            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            query_dir = os.path.join(backend_dir, "query")
+            
+            # 为每个区域创建单独的目录，并发执行时各区域的terraform状态互不干扰
+            region_dir_name = f"{deploy_id}_{single_region}"
+            region_deploy_dir = os.path.join(query_dir, region_dir_name)
+            os.makedirs(region_deploy_dir, exist_ok=True)
+            
+            # 写入配置文件
+            tf_file_path = os.path.join(region_deploy_dir, "main.tf")
+            with open(tf_file_path, 'w') as f:
+                f.write(terraform_content)
+            
+            self.logger.info(f"为区域 {single_region} 生成配置文件: {tf_file_path}")
+            
+            # 创建执行器并执行Terraform
+            executor = TerraformExecutor(db_config)
+            result = executor.run_terraform(
+                uid=user_id,
+                project=project,
+                cloud=cloud,
+                region=single_region,  # 使用具体的区域
+                terraform_content=terraform_content,
+                deploy_id=deploy_id,  # 使用原始deploy_id，不添加区域后缀
+                ak=temp_config.get('ak'),
+                sk=temp_config.get('sk'),
+                skip_save=True,  # 多区域查询时跳过数据库保存
+                work_dir_name=region_dir_name,
+                timeout=self.config.cloud_query_region_timeout
+            )
+            
+            if result.get('success', False):
+                self.logger.info(f"区域 {single_region} 查询成功")
+                return {"region": single_region, "success": True, "results": result.get('results', {}), "error": None}
+            
+            error_msg = result.get('error') or result.get('message') or '未知错误'
+            self.logger.error(f"区域 {single_region} 查询失败: {error_msg}")
+            return {"region": single_region, "success": False, "results": {}, "error": f"{single_region}: {error_msg}"}
+            
+        except Exception as e:
+            error_msg = f"查询区域 {single_region} 时发生异常: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            return {"region": single_region, "success": False, "results": {}, "error": error_msg}
+    
+    def _iter_region_queries(self, actual_regions, query_kwargs):
+        """并发查询多个区域，按完成顺序逐个返回区域结果
+        
+        并发数由 CLOUD_QUERY_WORKERS 控制，单个区域的超时由 CLOUD_QUERY_REGION_TIMEOUT 控制
+        （超时后terraform进程会被终止，该区域记为失败）。
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        regions = list(dict.fromkeys(actual_regions))
+        max_workers = max(1, min(self.config.cloud_query_workers, len(regions)))
+        self.logger.info(f"并发查询 {len(regions)} 个区域，并发数: {max_workers}")
+        
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cloud-query")
+        try:
+            futures = [pool.submit(self._query_single_region, single_region, **query_kwargs)
+                       for single_region in regions]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # 客户端中途断开时取消尚未开始的区域
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _new_multi_region_state(self, db_config):
+        """创建多区域查询的合并状态"""
+        from toolkits.terraform_executor import TerraformExecutor
+        
+        return {
+            "executor": TerraformExecutor(db_config),  # 仅用于解析输出和生成表格
+            "results": {},
+            "tables": {},
+            "global_resources": {},  # 用于存储全局资源
+            "success_count": 0,
+            "errors": []
+        }
+    
+    def _merge_region_result(self, state, region_result):
+        """把单个区域的结果合并到多区域状态中
+        
+        Returns:
+            该区域的HTML表格（无资源或失败时为空字符串）
+        """
+        single_region = region_result['region']
+        if not region_result['success']:
+            state['errors'].append(region_result['error'])
+            return ""
+        
+        executor = state['executor']
+        state['success_count'] += 1
+        region_results = region_result['results']
+        
+        # 将terraform原始输出转换为解析后的格式
+        parsed_region_results = executor._parse_terraform_outputs(region_results)
+        
+        # 检查是否为us-east-1区域（全局查询区域）
+        if single_region == 'us-east-1':
+            # 从us-east-1结果中提取全局资源
+            if 'iam_user_details' in region_results:
+                state['global_resources']['iam_user_details'] = region_results['iam_user_details']
+                self.logger.info(f"从 {single_region} 提取IAM用户全局资源")
+            
+            if 's3_details' in region_results:
+                state['global_resources']['s3_details'] = region_results['s3_details']
+                self.logger.info(f"从 {single_region} 提取S3存储桶全局资源")
+            
+            # 从us-east-1解析结果中移除全局资源，只保留区域性资源
+            parsed_region_results = {k: v for k, v in parsed_region_results.items()
+                                     if k not in ['iam_resources', 's3_resources']}
+        
+        state['results'][single_region] = parsed_region_results
+        
+        # 为该区域生成表格
+        if any(v for v in parsed_region_results.values() if isinstance(v, list) and v):
+            region_table = executor.format_results_as_table(parsed_region_results, region_prefix=single_region)
+            state['tables'][single_region] = f"<h3>区域: {single_region}</h3>\n{region_table}\n<br/>\n"
+        return state['tables'].get(single_region, "")
+    
+    def _build_global_table(self, state):
+        """根据us-east-1提取的全局资源生成GLOBAL区域表格"""
+        global_resources = state['global_resources']
+        if not global_resources:
+            return ""
+        
+        executor = state['executor']
+        self.logger.info(f"生成全局资源表格，包含: {list(global_resources.keys())}")
+        # 将全局资源转换为解析后的格式
+        parsed_global_resources = executor._parse_terraform_outputs(global_resources)
+        # 只保留全局资源（IAM和S3）
+        global_resources_filtered = {
+            'iam_resources': parsed_global_resources.get('iam_resources', []),
+            's3_resources': parsed_global_resources.get('s3_resources', [])
+        }
+        state['results']['GLOBAL'] = global_resources_filtered
+        global_table = executor.format_results_as_table(global_resources_filtered, region_prefix="GLOBAL")
+        return f"<h3>区域: GLOBAL (全局资源)</h3>\n{global_table}\n<br/>\n"
+    
+    def _build_multi_region_response(self, state, actual_regions):
+        """汇总所有区域结果，生成最终响应数据
+        
+        表格按请求中的区域顺序拼接，GLOBAL区域始终排在最前面。
+        """
+        success_count = state['success_count']
+        error_messages = state['errors']
+        
+        if success_count == 0:
+            error_msg = f"所有区域查询都失败了:\n" + "\n".join(error_messages)
+            return {
+                "success": False,
+                "error": error_msg,
+                "reply": f"多区域查询失败: {error_msg}"
+            }
+        
+        # 如果有全局资源，在最前面添加GLOBAL区域显示
+        combined_table = self._build_global_table(state)
+        combined_table += "".join(state['tables'].get(single_region, "") for single_region in actual_regions)
+        
+        success_msg = f"多区域查询完成！成功查询了 {success_count}/{len(actual_regions)} 个区域的资源"
+        if error_messages:
+            success_msg += f"\n\n失败的区域:\n" + "\n".join(error_messages)
+        
+        return {
+            "success": True,
+            "message": success_msg,
+            "reply": f"<div class='query-result'>{success_msg}：<br/><br/>{combined_table}</div>",
+            "data": {
+                "table": combined_table,
+                "results": state['results'],
+                "success_count": success_count,
+                "total_regions": len(actual_regions),
+                "errors": error_messages
+            }
+        }
+    
+    def _stream_multi_region_query(self, actual_regions, db_config, query_kwargs):
+        """以SSE流式返回多区域查询结果
+        
+        每个区域完成后推送一条 {"region", "success", "table", "error", "completed", "total", "done": false}，
+        全部完成后推送与非流式接口相同的汇总数据并附带 "done": true。
+        """
+        from flask import Response
+        
+        def stream_generator():
+            try:
+                state = self._new_multi_region_state(db_config)
+                completed = 0
+                for region_result in self._iter_region_queries(actual_regions, query_kwargs):
+                    completed += 1
+                    region_table = self._merge_region_result(state, region_result)
+                    event = {
+                        "region": region_result['region'],
+                        "success": region_result['success'],
+                        "table": region_table,
+                        "error": region_result['error'],
+                        "completed": completed,
+                        "total": len(actual_regions),
+                        "done": False
+                    }
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8')
+                
+                final_data = self._build_multi_region_response(state, actual_regions)
+                final_data['done'] = True
+                yield f"data: {json.dumps(final_data, ensure_ascii=False)}\n\n".encode('utf-8')
+            except Exception as e:
+                self.logger.error(f"流式多区域查询时出错: {str(e)}", exc_info=True)
+                yield f"data: {json.dumps({'success': False, 'error': f'多区域查询时发生错误: {str(e)}', 'done': True}, ensure_ascii=False)}\n\n".encode('utf-8')
+        
+        response = Response(
+            stream_generator(),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache, no-store, must-revalidate',
+                'Pragma': 'no-cache',
+                'Expires': '0',
+                'Connection': 'keep-alive',
+                'Content-Type': 'text/event-stream; charset=utf-8',
+                'X-Accel-Buffering': 'no'  # 禁用Nginx缓冲
+            }
+        )
+        # 设置直接输出模式
+        response.direct_passthrough = True
+        return response
+            
     def _get_cloud_resources(self, cloud, region, project):
         """获取指定云服务商和区域的资源信息（模拟）"""
         # 基于云服务商和区域的资源信息
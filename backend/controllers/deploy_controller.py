@@ -3,6 +3,11 @@ from typing import Dict, Any, Optional
 from flask import request, jsonify, session
 from models.deploy_model import DeployModel
 from config.config import Config
+from utils.terraform_plugin_cache import get_plugin_cache
+from utils.terraform_job_runner import (get_job_runner, track_process, JobQueueFullError, DuplicateJobError,
+                                        PRIORITY_NORMAL, PRIORITY_HIGH)
+from utils.deployment_events import get_event_bus, stream_process_output
+from utils.deployment_status import get_status_store, read_status_file, status_response
 import json
 import re
 import random
@@ -11,7 +16,6 @@ import time
 import os
 import datetime
 import subprocess
-import threading
 import traceback
 
 class DeployController:
@@ -36,6 +40,9 @@ class DeployController:
         # 确保clouddeploy表存在
         self.deploy_model.init_table()
         
+        # 部署状态注册表，部署线程写入，状态查询直接读取内存
+        self.status_store = get_status_store('deploy')
+        
     def generate_deploy_id(self) -> str:
         """生成18位部署ID
         
@@ -1135,7 +1142,7 @@ output "vpc_cidr" {{
                     self.logger.error(f"创建部署日志文件失败: {e}")
                     
                 # 更新部署状态为进行中
-                self.deploy_model.update_deployment_status(
+                self.status_store.persist(self.deploy_model.update_deployment_status,
                     deploy_id=deploy_id,
                     status="in_progress",
                     user_id=current_user_id
@@ -1148,13 +1155,12 @@ output "vpc_cidr" {{
                 # 创建部署状态文件，用于前端轮询检查状态
                 status_file = os.path.join(tf_dir, "status.json")
                 try:
-                    with open(status_file, 'w') as f:
-                        json.dump({
-                            'status': 'in_progress',
-                            'deploy_id': deploy_id,
-                            'message': '部署已开始',
-                            'updated_at': datetime.datetime.now().isoformat()
-                        }, f)
+                    self.status_store.write_file(deploy_id, status_file, {
+                        'status': 'in_progress',
+                        'deploy_id': deploy_id,
+                        'message': '部署已开始',
+                        'updated_at': datetime.datetime.now().isoformat()
+                    })
                 except Exception as e:
                     self.logger.error(f"创建状态文件失败: {e}")
                 
@@ -1176,6 +1182,10 @@ output "vpc_cidr" {{
                             controller_ref.logger.info(f"执行命令: {' '.join(init_cmd)}")
                             f.write(f"执行: {' '.join(init_cmd)}\n")
                             
+                            # 从共享插件缓存链接provider，避免每次init重新下载
+                            plugin_cache = get_plugin_cache()
+                            init_mode = plugin_cache.prepare_workdir(deploy_dir)
+                            init_start_time = time.time()
                             init_process = subprocess.Popen(
                                 init_cmd,
                                 cwd=deploy_dir,
@@ -1183,8 +1193,10 @@ output "vpc_cidr" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(init_process)
                             
-                            stdout, stderr = init_process.communicate()
+                            stdout, stderr = stream_process_output(init_process, deploy_id, 'init')
+                            plugin_cache.record_init(init_mode, time.time() - init_start_time, init_process.returncode == 0)
                             f.write(f"--- 初始化输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -1195,21 +1207,20 @@ output "vpc_cidr" {{
                                 f.write(f"初始化失败，返回代码: {init_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform初始化失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"VPC部署失败: Terraform初始化错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"VPC部署失败: Terraform初始化错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -1227,8 +1238,9 @@ output "vpc_cidr" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(plan_process)
                             
-                            stdout, stderr = plan_process.communicate()
+                            stdout, stderr = stream_process_output(plan_process, deploy_id, 'plan')
                             f.write(f"--- 计划输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -1242,21 +1254,20 @@ output "vpc_cidr" {{
                                 f.write(f"ERROR: Terraform计划失败: {stderr}\n")
                                 
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"VPC部署失败: Terraform计划错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"VPC部署失败: Terraform计划错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -1282,8 +1293,9 @@ output "vpc_cidr" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(apply_process)
                             
-                            stdout, stderr = apply_process.communicate()
+                            stdout, stderr = stream_process_output(apply_process, deploy_id, 'apply')
                             f.write(f"--- 应用输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -1297,21 +1309,20 @@ output "vpc_cidr" {{
                                 f.write(f"ERROR: Terraform应用失败: {stderr}\n")
                                 
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"VPC部署失败: Terraform应用错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"VPC部署失败: Terraform应用错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -1337,8 +1348,9 @@ output "vpc_cidr" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(output_process)
                             
-                            stdout, stderr = output_process.communicate()
+                            stdout, stderr = stream_process_output(output_process, deploy_id, 'output')
                             f.write(f"--- 输出结果 ---\n")
                             f.write(stdout)
                             
@@ -1378,17 +1390,16 @@ output "vpc_cidr" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'completed',
-                                            'deploy_id': deploy_id,
-                                            'vpc_id': vpc_id,
-                                            'vpc_name': vpc_name_output,
-                                            'vpc_cidr': vpc_cidr_output,
-                                            'message': f"VPC部署成功 - ID: {vpc_id}",
-                                            'output': f"VPC名称: {vpc_name_output}\nVPC ID: {vpc_id}\nCIDR: {vpc_cidr_output}",
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'completed',
+                                        'deploy_id': deploy_id,
+                                        'vpc_id': vpc_id,
+                                        'vpc_name': vpc_name_output,
+                                        'vpc_cidr': vpc_cidr_output,
+                                        'message': f"VPC部署成功 - ID: {vpc_id}",
+                                        'output': f"VPC名称: {vpc_name_output}\nVPC ID: {vpc_id}\nCIDR: {vpc_cidr_output}",
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                     controller_ref.logger.info(f"状态文件已更新: {status_file} - VPC信息已写入")
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
@@ -1399,19 +1410,18 @@ output "vpc_cidr" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"解析输出失败: {str(e)}",
-                                            'error': str(e),
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"解析输出失败: {str(e)}",
+                                        'error': str(e),
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as write_err:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(write_err)}")
                             
                             # 更新部署状态为已完成
-                            controller_ref.deploy_model.update_deployment_status(
+                            controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                 deploy_id=deploy_id,
                                 status="completed",
                             )
@@ -1420,7 +1430,7 @@ output "vpc_cidr" {{
                             controller_ref.logger.info(f"Terraform部署完成: {deploy_dir}")
                             
                             # 部署成功后更新部署状态
-                            controller_ref.deploy_model.update_deployment_status(
+                            controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                 deploy_id=deploy_id,
                                 status="completed",
                             )
@@ -1442,6 +1452,7 @@ output "vpc_cidr" {{
                                         stdout=subprocess.PIPE,
                                         stderr=subprocess.PIPE
                                     )
+                                    track_process(graph_process)
                                     
                                     dot_process = subprocess.Popen(
                                         dot_cmd,
@@ -1450,6 +1461,7 @@ output "vpc_cidr" {{
                                         stdout=subprocess.PIPE,
                                         stderr=subprocess.PIPE
                                     )
+                                    track_process(dot_process)
                                     
                                     # 确保第一个进程的输出被第二个进程完全读取
                                     graph_process.stdout.close()
@@ -1469,8 +1481,7 @@ output "vpc_cidr" {{
                                             # 添加拓扑图路径
                                             status_data['topology_graph'] = f"/api/files/deployments/{deploy_id}/graph.png"
                                             
-                                            with open(status_file, 'w') as sf:
-                                                json.dump(status_data, sf)
+                                            controller_ref.status_store.write_file(deploy_id, status_file, status_data)
                                                 
                                             controller_ref.logger.info(f"✅ 已更新状态文件: 添加拓扑图路径")
                                         except Exception as e:
@@ -1490,21 +1501,20 @@ output "vpc_cidr" {{
                             pass
                         
                         # 更新状态为失败
-                        controller_ref.deploy_model.update_deployment_status(
+                        controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                             deploy_id=deploy_id,
                             status="failed",
                         )
                         
                         # 更新状态文件
                         try:
-                            with open(status_file, 'w') as sf:
-                                json.dump({
-                                    'status': 'failed',
-                                    'deploy_id': deploy_id,
-                                    'message': f"VPC部署失败: {str(e)}",
-                                    'error': str(e),
-                                    'updated_at': datetime.datetime.now().isoformat()
-                                }, sf)
+                            controller_ref.status_store.write_file(deploy_id, status_file, {
+                                'status': 'failed',
+                                'deploy_id': deploy_id,
+                                'message': f"VPC部署失败: {str(e)}",
+                                'error': str(e),
+                                'updated_at': datetime.datetime.now().isoformat()
+                            })
                         except Exception as write_err:
                             controller_ref.logger.error(f"无法写入状态文件: {str(write_err)}")
                         
@@ -1516,14 +1526,15 @@ output "vpc_cidr" {{
                         except Exception as err:
                             controller_ref.logger.error(f"写入错误文件失败: {str(err)}")
                 
-                # 启动部署线程
-                terraform_thread = threading.Thread(
-                    target=run_terraform_deployment,
-                    args=(tf_dir, log_file, status_file, deploy_id, current_user_id, project, cloud, region, vpc_name, vpc_cidr),
-                    daemon=True  # 作为守护线程运行，当主进程退出时自动终止
+                # 提交到部署任务执行器
+                job_error = self._submit_deployment_job(
+                    deploy_id, run_terraform_deployment,
+                    (tf_dir, log_file, status_file, deploy_id, current_user_id, project, cloud, region, vpc_name, vpc_cidr),
+                    user_id=current_user_id, kind='vpc', status_file=status_file
                 )
-                terraform_thread.start()
-                self.logger.info(f"已启动Terraform部署线程: {tf_dir}")
+                if job_error:
+                    return job_error
+                self.logger.info(f"已提交Terraform部署任务: {tf_dir}")
                 
                 # 添加用于获取部署状态的路由信息
                 status_route = f"/api/deploy/status?deploy_id={deploy_id}"
@@ -1744,13 +1755,12 @@ output "subnet_vpc" {{
                 # 创建状态文件，用于前端轮询检查状态
                 status_file = os.path.join(deploy_dir, "status.json")
                 try:
-                    with open(status_file, 'w') as f:
-                        json.dump({
-                            'status': 'in_progress',
-                            'deploy_id': deploy_id,
-                            'message': '子网部署已开始',
-                            'updated_at': datetime.datetime.now().isoformat()
-                        }, f)
+                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                        'status': 'in_progress',
+                        'deploy_id': deploy_id,
+                        'message': '子网部署已开始',
+                        'updated_at': datetime.datetime.now().isoformat()
+                    })
                 except Exception as e:
                     self.logger.error(f"创建状态文件失败: {e}")
                 
@@ -1787,6 +1797,10 @@ output "subnet_vpc" {{
                             controller_ref.logger.info(f"执行命令: {' '.join(init_cmd)}")
                             f.write(f"执行: {' '.join(init_cmd)}\n")
                             
+                            # 从共享插件缓存链接provider，避免每次init重新下载
+                            plugin_cache = get_plugin_cache()
+                            init_mode = plugin_cache.prepare_workdir(deploy_dir)
+                            init_start_time = time.time()
                             init_process = subprocess.Popen(
                                 init_cmd,
                                 cwd=deploy_dir,
@@ -1794,8 +1808,10 @@ output "subnet_vpc" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(init_process)
                             
-                            stdout, stderr = init_process.communicate()
+                            stdout, stderr = stream_process_output(init_process, deploy_id, 'init')
+                            plugin_cache.record_init(init_mode, time.time() - init_start_time, init_process.returncode == 0)
                             f.write(f"--- 初始化输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -1806,21 +1822,20 @@ output "subnet_vpc" {{
                                 f.write(f"初始化失败，返回代码: {init_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform初始化失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"子网部署失败: Terraform初始化错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"子网部署失败: Terraform初始化错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -1838,8 +1853,9 @@ output "subnet_vpc" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(plan_process)
                             
-                            stdout, stderr = plan_process.communicate()
+                            stdout, stderr = stream_process_output(plan_process, deploy_id, 'plan')
                             f.write(f"--- 计划输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -1850,21 +1866,20 @@ output "subnet_vpc" {{
                                 f.write(f"计划失败，返回代码: {plan_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform计划失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"子网部署失败: Terraform计划错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"子网部署失败: Terraform计划错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -1882,8 +1897,9 @@ output "subnet_vpc" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(apply_process)
                             
-                            stdout, stderr = apply_process.communicate()
+                            stdout, stderr = stream_process_output(apply_process, deploy_id, 'apply')
                             f.write(f"--- 应用输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -1894,21 +1910,20 @@ output "subnet_vpc" {{
                                 f.write(f"应用失败，返回代码: {apply_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform应用失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"子网部署失败: Terraform应用错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"子网部署失败: Terraform应用错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -1926,8 +1941,9 @@ output "subnet_vpc" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(output_process)
                             
-                            stdout, stderr = output_process.communicate()
+                            stdout, stderr = stream_process_output(output_process, deploy_id, 'output')
                             f.write(f"--- 输出结果 ---\n")
                             f.write(stdout)
                             
@@ -1970,23 +1986,22 @@ output "subnet_vpc" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'completed',
-                                            'deploy_id': deploy_id,
-                                            'subnet_id': subnet_id,
-                                            'subnet_name': subnet_name_output,
-                                            'subnet_cidr': subnet_cidr_output,
-                                            'subnet_vpc': subnet_vpc_output,
-                                            'message': f"子网部署成功 - ID: {subnet_id}",
-                                            'output': f"子网名称: {subnet_name_output}\n子网ID: {subnet_id}\nCIDR: {subnet_cidr_output}\nVPC ID: {subnet_vpc_output}",
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'completed',
+                                        'deploy_id': deploy_id,
+                                        'subnet_id': subnet_id,
+                                        'subnet_name': subnet_name_output,
+                                        'subnet_cidr': subnet_cidr_output,
+                                        'subnet_vpc': subnet_vpc_output,
+                                        'message': f"子网部署成功 - ID: {subnet_id}",
+                                        'output': f"子网名称: {subnet_name_output}\n子网ID: {subnet_id}\nCIDR: {subnet_cidr_output}\nVPC ID: {subnet_vpc_output}",
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                     
                                 # 部署成功后更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="completed",
                                 )
@@ -1997,19 +2012,18 @@ output "subnet_vpc" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"子网部署失败: 无法解析输出",
-                                            'error': str(e),
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"子网部署失败: 无法解析输出",
+                                        'error': str(e),
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e2:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e2)}")
                                 
                                 # 更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
@@ -2025,27 +2039,26 @@ output "subnet_vpc" {{
                         
                         # 更新状态文件
                         try:
-                            with open(status_file, 'w') as sf:
-                                json.dump({
-                                    'status': 'failed',
-                                    'deploy_id': deploy_id,
-                                    'message': f"子网部署失败: {str(e)}",
-                                    'error': str(e),
-                                    'updated_at': datetime.datetime.now().isoformat()
-                                }, sf)
+                            controller_ref.status_store.write_file(deploy_id, status_file, {
+                                'status': 'failed',
+                                'deploy_id': deploy_id,
+                                'message': f"子网部署失败: {str(e)}",
+                                'error': str(e),
+                                'updated_at': datetime.datetime.now().isoformat()
+                            })
                         except Exception:
                             pass
                         
                         # 更新部署状态
-                        controller_ref.deploy_model.update_deployment_status(
+                        controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                             deploy_id=deploy_id,
                             status="failed",
                         )
                 
-                # 在新线程中启动部署
-                deploy_thread = threading.Thread(
-                    target=run_subnet_deployment,
-                    args=(
+                # 提交到部署任务执行器
+                job_error = self._submit_deployment_job(
+                    deploy_id, run_subnet_deployment,
+                    (
                         deploy_dir, 
                         log_file, 
                         status_file, 
@@ -2057,11 +2070,11 @@ output "subnet_vpc" {{
                         subnet_name, 
                         subnet_cidr, 
                         subnet_vpc
-                    )
+                    ),
+                    user_id=current_user_id, kind='subnet', status_file=status_file
                 )
-                # 设置为守护线程，这样主程序退出时不会等待它
-                deploy_thread.daemon = True
-                deploy_thread.start()
+                if job_error:
+                    return job_error
                 
                 # 返回部署成功消息
                 return jsonify({
@@ -2310,13 +2323,12 @@ output "iam_user_console_password" {{
                 # 创建状态文件，用于前端轮询检查状态
                 status_file = os.path.join(deploy_dir, "status.json")
                 try:
-                    with open(status_file, 'w') as f:
-                        json.dump({
-                            'status': 'in_progress',
-                            'deploy_id': deploy_id,
-                            'message': 'IAM用户创建已开始',
-                            'updated_at': datetime.datetime.now().isoformat()
-                        }, f)
+                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                        'status': 'in_progress',
+                        'deploy_id': deploy_id,
+                        'message': 'IAM用户创建已开始',
+                        'updated_at': datetime.datetime.now().isoformat()
+                    })
                 except Exception as e:
                     self.logger.error(f"创建状态文件失败: {e}")
                 
@@ -2353,6 +2365,10 @@ output "iam_user_console_password" {{
                             controller_ref.logger.info(f"执行命令: {' '.join(init_cmd)}")
                             f.write(f"执行: {' '.join(init_cmd)}\n")
                             
+                            # 从共享插件缓存链接provider，避免每次init重新下载
+                            plugin_cache = get_plugin_cache()
+                            init_mode = plugin_cache.prepare_workdir(deploy_dir)
+                            init_start_time = time.time()
                             init_process = subprocess.Popen(
                                 init_cmd,
                                 cwd=deploy_dir,
@@ -2360,8 +2376,10 @@ output "iam_user_console_password" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(init_process)
                             
-                            stdout, stderr = init_process.communicate()
+                            stdout, stderr = stream_process_output(init_process, deploy_id, 'init')
+                            plugin_cache.record_init(init_mode, time.time() - init_start_time, init_process.returncode == 0)
                             f.write(f"--- 初始化输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -2372,21 +2390,20 @@ output "iam_user_console_password" {{
                                 f.write(f"初始化失败，返回代码: {init_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform初始化失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户创建失败: Terraform初始化错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户创建失败: Terraform初始化错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -2404,8 +2421,9 @@ output "iam_user_console_password" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(plan_process)
                             
-                            stdout, stderr = plan_process.communicate()
+                            stdout, stderr = stream_process_output(plan_process, deploy_id, 'plan')
                             f.write(f"--- 计划输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -2416,21 +2434,20 @@ output "iam_user_console_password" {{
                                 f.write(f"计划失败，返回代码: {plan_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform计划失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户创建失败: Terraform计划错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户创建失败: Terraform计划错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -2448,8 +2465,9 @@ output "iam_user_console_password" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(apply_process)
                             
-                            stdout, stderr = apply_process.communicate()
+                            stdout, stderr = stream_process_output(apply_process, deploy_id, 'apply')
                             f.write(f"--- 应用输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -2460,21 +2478,20 @@ output "iam_user_console_password" {{
                                 f.write(f"应用失败，返回代码: {apply_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform应用失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户创建失败: Terraform应用错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户创建失败: Terraform应用错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -2492,8 +2509,9 @@ output "iam_user_console_password" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(output_process)
                             
-                            stdout, stderr = output_process.communicate()
+                            stdout, stderr = stream_process_output(output_process, deploy_id, 'output')
                             f.write(f"--- 输出结果 ---\n")
                             f.write(stdout)
                             
@@ -2546,26 +2564,25 @@ output "iam_user_console_password" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'completed',
-                                            'deploy_id': deploy_id,
-                                            'iam_user_id': iam_user_id,
-                                            'iam_user_name': iam_user_name_output,
-                                            'iam_user_arn': iam_user_arn,
-                                            'iam_access_key_id': iam_access_key_id,
-                                            'iam_access_key_secret': iam_access_key_secret,
-                                            'iam_console_password': iam_console_password,
-                                            'iam_user_policy': iam_policies_str,
-                                            'message': f"IAM用户创建成功 - ID: {iam_user_id}",
-                                            'output': f"用户名: {iam_user_name_output}\n用户ID: {iam_user_id}\n用户ARN: {iam_user_arn}\n访问密钥ID: {iam_access_key_id}\n访问密钥Secret: {iam_access_key_secret}\n控制台密码: {iam_console_password}\n用户策略: {iam_policies_str}",
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'completed',
+                                        'deploy_id': deploy_id,
+                                        'iam_user_id': iam_user_id,
+                                        'iam_user_name': iam_user_name_output,
+                                        'iam_user_arn': iam_user_arn,
+                                        'iam_access_key_id': iam_access_key_id,
+                                        'iam_access_key_secret': iam_access_key_secret,
+                                        'iam_console_password': iam_console_password,
+                                        'iam_user_policy': iam_policies_str,
+                                        'message': f"IAM用户创建成功 - ID: {iam_user_id}",
+                                        'output': f"用户名: {iam_user_name_output}\n用户ID: {iam_user_id}\n用户ARN: {iam_user_arn}\n访问密钥ID: {iam_access_key_id}\n访问密钥Secret: {iam_access_key_secret}\n控制台密码: {iam_console_password}\n用户策略: {iam_policies_str}",
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                     
                                 # 部署成功后更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="completed",
                                 )
@@ -2576,19 +2593,18 @@ output "iam_user_console_password" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户创建失败: 无法解析输出",
-                                            'error': str(e),
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户创建失败: 无法解析输出",
+                                        'error': str(e),
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e2:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e2)}")
                                 
                                 # 更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
@@ -2597,7 +2613,7 @@ output "iam_user_console_password" {{
                         
                         # 更新部署状态
                         try:
-                            controller_ref.deploy_model.update_deployment_status(
+                            controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                 deploy_id=deploy_id,
                                 status="failed",
                             )
@@ -2606,21 +2622,20 @@ output "iam_user_console_password" {{
                         
                         # 更新状态文件
                         try:
-                            with open(status_file, 'w') as sf:
-                                json.dump({
-                                    'status': 'failed',
-                                    'deploy_id': deploy_id,
-                                    'message': f"IAM用户部署失败: {str(e)}",
-                                    'error': str(e),
-                                    'updated_at': datetime.datetime.now().isoformat()
-                                }, sf)
+                            controller_ref.status_store.write_file(deploy_id, status_file, {
+                                'status': 'failed',
+                                'deploy_id': deploy_id,
+                                'message': f"IAM用户部署失败: {str(e)}",
+                                'error': str(e),
+                                'updated_at': datetime.datetime.now().isoformat()
+                            })
                         except Exception as file_err:
                             controller_ref.logger.error(f"更新状态文件失败: {str(file_err)}")
                 
-                # 启动部署线程
-                deployment_thread = threading.Thread(
-                    target=run_iam_user_deployment,
-                    args=(
+                # 提交到部署任务执行器（IAM资源创建较快，优先执行）
+                job_error = self._submit_deployment_job(
+                    deploy_id, run_iam_user_deployment,
+                    (
                         deploy_dir, 
                         log_file, 
                         status_file, 
@@ -2630,11 +2645,12 @@ output "iam_user_console_password" {{
                         cloud, 
                         region, 
                         iam_user_name
-                    )
+                    ),
+                    user_id=current_user_id, kind='iam_user', priority=PRIORITY_HIGH, status_file=status_file
                 )
-                deployment_thread.daemon = True
-                deployment_thread.start()
-                self.logger.info(f"已启动IAM用户部署线程: {deploy_dir}")
+                if job_error:
+                    return job_error
+                self.logger.info(f"已提交IAM用户部署任务: {deploy_dir}")
                 
                 # 返回部署开始消息（添加status_api字段）
                 return jsonify({
@@ -2799,13 +2815,12 @@ output "iam_group_arn" {{
                 # 创建状态文件，用于前端轮询检查状态
                 status_file = os.path.join(deploy_dir, "status.json")
                 try:
-                    with open(status_file, 'w') as f:
-                        json.dump({
-                            'status': 'in_progress',
-                            'deploy_id': deploy_id,
-                            'message': 'IAM用户组创建已开始',
-                            'updated_at': datetime.datetime.now().isoformat()
-                        }, f)
+                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                        'status': 'in_progress',
+                        'deploy_id': deploy_id,
+                        'message': 'IAM用户组创建已开始',
+                        'updated_at': datetime.datetime.now().isoformat()
+                    })
                 except Exception as e:
                     self.logger.error(f"创建状态文件失败: {e}")
                 
@@ -2842,6 +2857,10 @@ output "iam_group_arn" {{
                             controller_ref.logger.info(f"执行命令: {' '.join(init_cmd)}")
                             f.write(f"执行: {' '.join(init_cmd)}\n")
                             
+                            # 从共享插件缓存链接provider，避免每次init重新下载
+                            plugin_cache = get_plugin_cache()
+                            init_mode = plugin_cache.prepare_workdir(deploy_dir)
+                            init_start_time = time.time()
                             init_process = subprocess.Popen(
                                 init_cmd,
                                 cwd=deploy_dir,
@@ -2849,8 +2868,10 @@ output "iam_group_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(init_process)
                             
-                            stdout, stderr = init_process.communicate()
+                            stdout, stderr = stream_process_output(init_process, deploy_id, 'init')
+                            plugin_cache.record_init(init_mode, time.time() - init_start_time, init_process.returncode == 0)
                             f.write(f"--- 初始化输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -2861,21 +2882,20 @@ output "iam_group_arn" {{
                                 f.write(f"初始化失败，返回代码: {init_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform初始化失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户组创建失败: Terraform初始化错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户组创建失败: Terraform初始化错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -2893,8 +2913,9 @@ output "iam_group_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(plan_process)
                             
-                            stdout, stderr = plan_process.communicate()
+                            stdout, stderr = stream_process_output(plan_process, deploy_id, 'plan')
                             f.write(f"--- 计划输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -2905,21 +2926,20 @@ output "iam_group_arn" {{
                                 f.write(f"计划失败，返回代码: {plan_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform计划失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户组创建失败: Terraform计划错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户组创建失败: Terraform计划错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -2937,8 +2957,9 @@ output "iam_group_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(apply_process)
                             
-                            stdout, stderr = apply_process.communicate()
+                            stdout, stderr = stream_process_output(apply_process, deploy_id, 'apply')
                             f.write(f"--- 应用输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -2949,21 +2970,20 @@ output "iam_group_arn" {{
                                 f.write(f"应用失败，返回代码: {apply_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform应用失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户组创建失败: Terraform应用错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户组创建失败: Terraform应用错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -2981,8 +3001,9 @@ output "iam_group_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(output_process)
                             
-                            stdout, stderr = output_process.communicate()
+                            stdout, stderr = stream_process_output(output_process, deploy_id, 'output')
                             f.write(f"--- 输出结果 ---\n")
                             f.write(stdout)
                             
@@ -3027,23 +3048,22 @@ output "iam_group_arn" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'completed',
-                                            'deploy_id': deploy_id,
-                                            'iam_group_id': iam_group_id,
-                                            'iam_group_name': iam_group_name_output,
-                                            'iam_group_arn': iam_group_arn,
-                                            'iam_group_policy': iam_policies_str,
-                                            'message': f"IAM用户组创建成功 - ID: {iam_group_id}",
-                                            'output': f"用户组名: {iam_group_name_output}\n用户组ID: {iam_group_id}\n用户组ARN: {iam_group_arn}\n用户策略: {iam_policies_str}",
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'completed',
+                                        'deploy_id': deploy_id,
+                                        'iam_group_id': iam_group_id,
+                                        'iam_group_name': iam_group_name_output,
+                                        'iam_group_arn': iam_group_arn,
+                                        'iam_group_policy': iam_policies_str,
+                                        'message': f"IAM用户组创建成功 - ID: {iam_group_id}",
+                                        'output': f"用户组名: {iam_group_name_output}\n用户组ID: {iam_group_id}\n用户组ARN: {iam_group_arn}\n用户策略: {iam_policies_str}",
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                     
                                 # 部署成功后更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="completed",
                                 )
@@ -3054,19 +3074,18 @@ output "iam_group_arn" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM用户组创建失败: 无法解析输出",
-                                            'error': str(e),
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM用户组创建失败: 无法解析输出",
+                                        'error': str(e),
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e2:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e2)}")
                                 
                                 # 更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
@@ -3075,7 +3094,7 @@ output "iam_group_arn" {{
                         
                         # 更新部署状态
                         try:
-                            controller_ref.deploy_model.update_deployment_status(
+                            controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                 deploy_id=deploy_id,
                                 status="failed",
                             )
@@ -3084,21 +3103,20 @@ output "iam_group_arn" {{
                         
                         # 更新状态文件
                         try:
-                            with open(status_file, 'w') as sf:
-                                json.dump({
-                                    'status': 'failed',
-                                    'deploy_id': deploy_id,
-                                    'message': f"IAM用户组部署失败: {str(e)}",
-                                    'error': str(e),
-                                    'updated_at': datetime.datetime.now().isoformat()
-                                }, sf)
+                            controller_ref.status_store.write_file(deploy_id, status_file, {
+                                'status': 'failed',
+                                'deploy_id': deploy_id,
+                                'message': f"IAM用户组部署失败: {str(e)}",
+                                'error': str(e),
+                                'updated_at': datetime.datetime.now().isoformat()
+                            })
                         except Exception as file_err:
                             controller_ref.logger.error(f"更新状态文件失败: {str(file_err)}")
                 
-                # 启动部署线程
-                deployment_thread = threading.Thread(
-                    target=run_iam_group_deployment,
-                    args=(
+                # 提交到部署任务执行器（IAM资源创建较快，优先执行）
+                job_error = self._submit_deployment_job(
+                    deploy_id, run_iam_group_deployment,
+                    (
                         deploy_dir, 
                         log_file, 
                         status_file, 
@@ -3108,11 +3126,12 @@ output "iam_group_arn" {{
                         cloud, 
                         region, 
                         iam_group_name
-                    )
+                    ),
+                    user_id=current_user_id, kind='iam_group', priority=PRIORITY_HIGH, status_file=status_file
                 )
-                deployment_thread.daemon = True
-                deployment_thread.start()
-                self.logger.info(f"已启动IAM用户组部署线程: {deploy_dir}")
+                if job_error:
+                    return job_error
+                self.logger.info(f"已提交IAM用户组部署任务: {deploy_dir}")
                 
                 # 返回部署开始消息（添加status_api字段）
                 return jsonify({
@@ -3295,13 +3314,12 @@ output "iam_policy_arn" {{
                 # 创建状态文件，用于前端轮询检查状态
                 status_file = os.path.join(deploy_dir, "status.json")
                 try:
-                    with open(status_file, 'w') as f:
-                        json.dump({
-                            'status': 'in_progress',
-                            'deploy_id': deploy_id,
-                            'message': 'IAM策略创建已开始',
-                            'updated_at': datetime.datetime.now().isoformat()
-                        }, f)
+                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                        'status': 'in_progress',
+                        'deploy_id': deploy_id,
+                        'message': 'IAM策略创建已开始',
+                        'updated_at': datetime.datetime.now().isoformat()
+                    })
                 except Exception as e:
                     self.logger.error(f"创建状态文件失败: {e}")
                 
@@ -3338,6 +3356,10 @@ output "iam_policy_arn" {{
                             controller_ref.logger.info(f"执行命令: {' '.join(init_cmd)}")
                             f.write(f"执行: {' '.join(init_cmd)}\n")
                             
+                            # 从共享插件缓存链接provider，避免每次init重新下载
+                            plugin_cache = get_plugin_cache()
+                            init_mode = plugin_cache.prepare_workdir(deploy_dir)
+                            init_start_time = time.time()
                             init_process = subprocess.Popen(
                                 init_cmd,
                                 cwd=deploy_dir,
@@ -3345,8 +3367,10 @@ output "iam_policy_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(init_process)
                             
-                            stdout, stderr = init_process.communicate()
+                            stdout, stderr = stream_process_output(init_process, deploy_id, 'init')
+                            plugin_cache.record_init(init_mode, time.time() - init_start_time, init_process.returncode == 0)
                             f.write(f"--- 初始化输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -3357,21 +3381,20 @@ output "iam_policy_arn" {{
                                 f.write(f"初始化失败，返回代码: {init_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform初始化失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM策略创建失败: Terraform初始化错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM策略创建失败: Terraform初始化错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -3389,8 +3412,9 @@ output "iam_policy_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(plan_process)
                             
-                            stdout, stderr = plan_process.communicate()
+                            stdout, stderr = stream_process_output(plan_process, deploy_id, 'plan')
                             f.write(f"--- 计划输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -3401,21 +3425,20 @@ output "iam_policy_arn" {{
                                 f.write(f"计划失败，返回代码: {plan_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform计划失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM策略创建失败: Terraform计划错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM策略创建失败: Terraform计划错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -3433,8 +3456,9 @@ output "iam_policy_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(apply_process)
                             
-                            stdout, stderr = apply_process.communicate()
+                            stdout, stderr = stream_process_output(apply_process, deploy_id, 'apply')
                             f.write(f"--- 应用输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -3445,21 +3469,20 @@ output "iam_policy_arn" {{
                                 f.write(f"应用失败，返回代码: {apply_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform应用失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM策略创建失败: Terraform应用错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM策略创建失败: Terraform应用错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -3477,8 +3500,9 @@ output "iam_policy_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(output_process)
                             
-                            stdout, stderr = output_process.communicate()
+                            stdout, stderr = stream_process_output(output_process, deploy_id, 'output')
                             f.write(f"--- 输出结果 ---\n")
                             f.write(stdout)
                             
@@ -3523,23 +3547,22 @@ output "iam_policy_arn" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'completed',
-                                            'deploy_id': deploy_id,
-                                            'iam_policy_id': iam_policy_id,
-                                            'iam_policy_name': iam_policy_name_output,
-                                            'iam_policy_arn': iam_policy_arn,
-                                            'iam_policy': iam_policies_str,
-                                            'message': f"IAM策略创建成功 - ID: {iam_policy_id}",
-                                            'output': f"策略名: {iam_policy_name_output}\n策略ID: {iam_policy_id}\n策略ARN: {iam_policy_arn}\n策略内容: {iam_policy_content}\n用户策略: {iam_policies_str}",
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'completed',
+                                        'deploy_id': deploy_id,
+                                        'iam_policy_id': iam_policy_id,
+                                        'iam_policy_name': iam_policy_name_output,
+                                        'iam_policy_arn': iam_policy_arn,
+                                        'iam_policy': iam_policies_str,
+                                        'message': f"IAM策略创建成功 - ID: {iam_policy_id}",
+                                        'output': f"策略名: {iam_policy_name_output}\n策略ID: {iam_policy_id}\n策略ARN: {iam_policy_arn}\n策略内容: {iam_policy_content}\n用户策略: {iam_policies_str}",
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                     
                                 # 部署成功后更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="completed",
                                 )
@@ -3550,19 +3573,18 @@ output "iam_policy_arn" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"IAM策略创建失败: 无法解析输出",
-                                            'error': str(e),
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"IAM策略创建失败: 无法解析输出",
+                                        'error': str(e),
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e2:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e2)}")
                                 
                                 # 更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
@@ -3571,7 +3593,7 @@ output "iam_policy_arn" {{
                         
                         # 更新部署状态
                         try:
-                            controller_ref.deploy_model.update_deployment_status(
+                            controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                 deploy_id=deploy_id,
                                 status="failed",
                             )
@@ -3580,21 +3602,20 @@ output "iam_policy_arn" {{
                         
                         # 更新状态文件
                         try:
-                            with open(status_file, 'w') as sf:
-                                json.dump({
-                                    'status': 'failed',
-                                    'deploy_id': deploy_id,
-                                    'message': f"IAM策略部署失败: {str(e)}",
-                                    'error': str(e),
-                                    'updated_at': datetime.datetime.now().isoformat()
-                                }, sf)
+                            controller_ref.status_store.write_file(deploy_id, status_file, {
+                                'status': 'failed',
+                                'deploy_id': deploy_id,
+                                'message': f"IAM策略部署失败: {str(e)}",
+                                'error': str(e),
+                                'updated_at': datetime.datetime.now().isoformat()
+                            })
                         except Exception as file_err:
                             controller_ref.logger.error(f"更新状态文件失败: {str(file_err)}")
                 
-                # 启动部署线程
-                deployment_thread = threading.Thread(
-                    target=run_iam_policy_deployment,
-                    args=(
+                # 提交到部署任务执行器（IAM资源创建较快，优先执行）
+                job_error = self._submit_deployment_job(
+                    deploy_id, run_iam_policy_deployment,
+                    (
                         deploy_dir, 
                         log_file, 
                         status_file, 
@@ -3606,11 +3627,12 @@ output "iam_policy_arn" {{
                         iam_policy_name, 
                         iam_policy_description, 
                         iam_policy_content
-                    )
+                    ),
+                    user_id=current_user_id, kind='iam_policy', priority=PRIORITY_HIGH, status_file=status_file
                 )
-                deployment_thread.daemon = True
-                deployment_thread.start()
-                self.logger.info(f"已启动IAM策略部署线程: {deploy_dir}")
+                if job_error:
+                    return job_error
+                self.logger.info(f"已提交IAM策略部署任务: {deploy_dir}")
                 
                 # 返回部署开始消息（添加status_api字段）
                 return jsonify({
@@ -3849,13 +3871,12 @@ output "s3_bucket_arn" {{
                 # 创建状态文件，用于前端轮询检查状态
                 status_file = os.path.join(deploy_dir, "status.json")
                 try:
-                    with open(status_file, 'w') as f:
-                        json.dump({
-                            'status': 'in_progress',
-                            'deploy_id': deploy_id,
-                            'message': 'S3存储桶部署已开始',
-                            'updated_at': datetime.datetime.now().isoformat()
-                        }, f)
+                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                        'status': 'in_progress',
+                        'deploy_id': deploy_id,
+                        'message': 'S3存储桶部署已开始',
+                        'updated_at': datetime.datetime.now().isoformat()
+                    })
                 except Exception as e:
                     self.logger.error(f"创建状态文件失败: {e}")
                 
@@ -3892,6 +3913,10 @@ output "s3_bucket_arn" {{
                             controller_ref.logger.info(f"执行命令: {' '.join(init_cmd)}")
                             f.write(f"执行: {' '.join(init_cmd)}\n")
                             
+                            # 从共享插件缓存链接provider，避免每次init重新下载
+                            plugin_cache = get_plugin_cache()
+                            init_mode = plugin_cache.prepare_workdir(deploy_dir)
+                            init_start_time = time.time()
                             init_process = subprocess.Popen(
                                 init_cmd,
                                 cwd=deploy_dir,
@@ -3899,8 +3924,10 @@ output "s3_bucket_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(init_process)
                             
-                            stdout, stderr = init_process.communicate()
+                            stdout, stderr = stream_process_output(init_process, deploy_id, 'init')
+                            plugin_cache.record_init(init_mode, time.time() - init_start_time, init_process.returncode == 0)
                             f.write(f"--- 初始化输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -3911,21 +3938,20 @@ output "s3_bucket_arn" {{
                                 f.write(f"初始化失败，返回代码: {init_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform初始化失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"S3存储桶部署失败: Terraform初始化错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"S3存储桶部署失败: Terraform初始化错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -3943,8 +3969,9 @@ output "s3_bucket_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(plan_process)
                             
-                            stdout, stderr = plan_process.communicate()
+                            stdout, stderr = stream_process_output(plan_process, deploy_id, 'plan')
                             f.write(f"--- 计划输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -3955,21 +3982,20 @@ output "s3_bucket_arn" {{
                                 f.write(f"计划失败，返回代码: {plan_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform计划失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"S3存储桶部署失败: Terraform计划错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"S3存储桶部署失败: Terraform计划错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -3987,8 +4013,9 @@ output "s3_bucket_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(apply_process)
                             
-                            stdout, stderr = apply_process.communicate()
+                            stdout, stderr = stream_process_output(apply_process, deploy_id, 'apply')
                             f.write(f"--- 应用输出 ---\n")
                             f.write(stdout)
                             if stderr:
@@ -3999,21 +4026,20 @@ output "s3_bucket_arn" {{
                                 f.write(f"应用失败，返回代码: {apply_process.returncode}\n")
                                 controller_ref.logger.error(f"Terraform应用失败: {stderr}")
                                 # 更新状态为失败
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"S3存储桶部署失败: Terraform应用错误",
-                                            'error': stderr,
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"S3存储桶部署失败: Terraform应用错误",
+                                        'error': stderr,
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                 
@@ -4031,8 +4057,9 @@ output "s3_bucket_arn" {{
                                 stderr=subprocess.PIPE,
                                 text=True
                             )
+                            track_process(output_process)
                             
-                            stdout, stderr = output_process.communicate()
+                            stdout, stderr = stream_process_output(output_process, deploy_id, 'output')
                             f.write(f"--- 输出结果 ---\n")
                             f.write(stdout)
                             
@@ -4072,22 +4099,21 @@ output "s3_bucket_arn" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'completed',
-                                            'deploy_id': deploy_id,
-                                            's3_bucket_id': s3_bucket_id,
-                                            's3_bucket_name': s3_bucket_name_output,
-                                            's3_bucket_arn': s3_bucket_arn,
-                                            'message': f"S3存储桶部署成功 - ID: {s3_bucket_id}",
-                                            'output': f"存储桶名称: {s3_bucket_name_output}\n存储桶ID: {s3_bucket_id}\n存储桶ARN: {s3_bucket_arn}",
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'completed',
+                                        'deploy_id': deploy_id,
+                                        's3_bucket_id': s3_bucket_id,
+                                        's3_bucket_name': s3_bucket_name_output,
+                                        's3_bucket_arn': s3_bucket_arn,
+                                        'message': f"S3存储桶部署成功 - ID: {s3_bucket_id}",
+                                        'output': f"存储桶名称: {s3_bucket_name_output}\n存储桶ID: {s3_bucket_id}\n存储桶ARN: {s3_bucket_arn}",
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e)}")
                                     
                                 # 部署成功后更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="completed",
                                 )
@@ -4098,19 +4124,18 @@ output "s3_bucket_arn" {{
                                 
                                 # 更新状态文件
                                 try:
-                                    with open(status_file, 'w') as sf:
-                                        json.dump({
-                                            'status': 'failed',
-                                            'deploy_id': deploy_id,
-                                            'message': f"S3存储桶部署失败: 无法解析输出",
-                                            'error': str(e),
-                                            'updated_at': datetime.datetime.now().isoformat()
-                                        }, sf)
+                                    controller_ref.status_store.write_file(deploy_id, status_file, {
+                                        'status': 'failed',
+                                        'deploy_id': deploy_id,
+                                        'message': f"S3存储桶部署失败: 无法解析输出",
+                                        'error': str(e),
+                                        'updated_at': datetime.datetime.now().isoformat()
+                                    })
                                 except Exception as e2:
                                     controller_ref.logger.error(f"更新状态文件失败: {str(e2)}")
                                 
                                 # 更新部署状态
-                                controller_ref.deploy_model.update_deployment_status(
+                                controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="failed",
                                 )
@@ -4126,27 +4151,26 @@ output "s3_bucket_arn" {{
                         
                         # 更新状态文件
                         try:
-                            with open(status_file, 'w') as sf:
-                                json.dump({
-                                    'status': 'failed',
-                                    'deploy_id': deploy_id,
-                                    'message': f"S3存储桶部署失败: {str(e)}",
-                                    'error': str(e),
-                                    'updated_at': datetime.datetime.now().isoformat()
-                                }, sf)
+                            controller_ref.status_store.write_file(deploy_id, status_file, {
+                                'status': 'failed',
+                                'deploy_id': deploy_id,
+                                'message': f"S3存储桶部署失败: {str(e)}",
+                                'error': str(e),
+                                'updated_at': datetime.datetime.now().isoformat()
+                            })
                         except Exception:
                             pass
                         
                         # 更新部署状态
-                        controller_ref.deploy_model.update_deployment_status(
+                        controller_ref.status_store.persist(controller_ref.deploy_model.update_deployment_status,
                             deploy_id=deploy_id,
                             status="failed",
                         )
                 
-                # 在新线程中启动部署
-                deploy_thread = threading.Thread(
-                    target=run_s3_deployment,
-                    args=(
+                # 提交到部署任务执行器
+                job_error = self._submit_deployment_job(
+                    deploy_id, run_s3_deployment,
+                    (
                         deploy_dir, 
                         log_file, 
                         status_file, 
@@ -4156,11 +4180,11 @@ output "s3_bucket_arn" {{
                         cloud, 
                         region, 
                         s3_bucket_name
-                    )
+                    ),
+                    user_id=current_user_id, kind='s3', status_file=status_file
                 )
-                # 设置为守护线程，这样主程序退出时不会等待它
-                deploy_thread.daemon = True
-                deploy_thread.start()
+                if job_error:
+                    return job_error
                 
                 # 返回部署成功消息
                 return jsonify({
@@ -4182,32 +4206,98 @@ output "s3_bucket_arn" {{
             self.logger.error(f"处理资源配置表单时出错: {str(e)}", exc_info=True)
             return jsonify({"error": f"处理资源配置表单时发生错误: {str(e)}"}), 500
 
+    def _submit_deployment_job(self, deploy_id, runner, args, user_id=None, kind='',
+                               priority=PRIORITY_NORMAL, status_file=None):
+        """把部署函数提交到共享的Terraform任务执行器
+        
+        执行器限制同时运行的terraform进程数和每个用户的并发数，超出的任务排队执行。
+        
+        Returns:
+            提交失败时返回错误响应，成功时返回 None
+        """
+        try:
+            get_job_runner().submit(deploy_id, runner, *args, user_id=user_id, kind=kind, priority=priority)
+            return None
+        except (JobQueueFullError, DuplicateJobError) as e:
+            self.logger.warning(f"提交部署任务 {deploy_id} 失败: {str(e)}")
+            self.status_store.persist(self.deploy_model.update_deployment_status, deploy_id=deploy_id, status="failed")
+            if status_file:
+                try:
+                    self.status_store.write_file(deploy_id, status_file, {
+                        'status': 'failed',
+                        'error': str(e),
+                        'updated_at': datetime.datetime.now().isoformat()
+                    })
+                except Exception as file_err:
+                    self.logger.error(f"更新状态文件失败: {str(file_err)}")
+            return jsonify({
+                "error": str(e),
+                "reply": f"<div class='deployment-message'>部署任务提交失败: {str(e)}</div>",
+                "deploy_status": "failed"
+            }), 503
+
+    def _deployment_access_error(self, deploy_id):
+        """校验当前用户是否为部署的所有者
+        
+        所有者取自任务执行器中的任务，任务已被清理时取自clouddeploy表的部署记录。
+        
+        Returns:
+            无权访问时返回错误响应，否则返回 None
+        """
+        current_user = getattr(request, 'current_user', None) or {}
+        job = get_job_runner().get_job(deploy_id)
+        owner = job.user_id if job is not None else None
+        if owner is None:
+            deployment = self.deploy_model.get_deployment_by_id(deploy_id)
+            owner = deployment.get('user_id') if deployment else None
+        if owner is not None and str(owner) != str(current_user.get('user_id')):
+            self.logger.warning(f"用户 {current_user.get('user_id')} 无权访问部署 {deploy_id}")
+            return jsonify({"error": "无权访问该部署"}), 403
+        return None
+    
     def get_deployment_status(self):
-        """获取指定部署ID的状态"""
+        """获取指定部署ID的状态
+        
+        状态来自内存中的部署状态注册表，支持 If-None-Match 条件请求（未变化时返回304），
+        带 wait 参数时长轮询等待状态变化
+        """
         try:
             # 获取部署ID
             deploy_id = request.args.get('deploy_id')
             if not deploy_id:
                 return jsonify({"error": "缺少部署ID参数"}), 400
             
+            access_error = self._deployment_access_error(deploy_id)
+            if access_error:
+                return access_error
+            
             self.logger.info(f"获取部署ID {deploy_id} 的状态")
             
             # 构建状态文件路径(使用绝对路径)
             status_file = os.path.join(self.base_dir, "deploy", deploy_id, "status.json")
             
-            # 检查状态文件是否存在
-            if not os.path.exists(status_file):
-                return jsonify({
-                    "status": "unknown",
-                    "deploy_id": deploy_id,
-                    "message": "找不到部署状态信息"
-                })
+            def render(status_data):
+                # 附带任务执行器中的排队/运行信息
+                job = get_job_runner().get_job(deploy_id)
+                if job is not None:
+                    status_data['job'] = job.to_dict()
+                return status_data
+            
+            def job_state():
+                job = get_job_runner().get_job(deploy_id)
+                return job.state if job is not None else 'none'
             
-            # 读取状态文件
+            # 注册表中没有时（如进程重启后）从状态文件加载一次
             try:
-                with open(status_file, 'r') as f:
-                    status_data = json.load(f)
-                    return jsonify(status_data)
+                response = status_response(self.status_store, deploy_id, lambda: read_status_file(status_file),
+                                           render=render, variant=job_state)
+                if response is None:
+                    return jsonify({
+                        "status": "unknown",
+                        "deploy_id": deploy_id,
+                        "message": "找不到部署状态信息"
+                    })
+                return response
             except Exception as e:
                 self.logger.error(f"读取状态文件出错: {str(e)}")
                 return jsonify({
@@ -4220,6 +4310,80 @@ output "s3_bucket_arn" {{
             self.logger.error(f"获取部署状态出错: {str(e)}", exc_info=True)
             return jsonify({"error": f"获取部署状态失败: {str(e)}"}), 500
 
+    def stream_deployment_events(self):
+        """以SSE实时推送部署进度（terraform输出逐行推送），替代轮询部署状态
+        
+        事件格式: data: {"id", "type", "time", "data", "done"}，type 为 job（任务状态）、
+        phase（阶段开始/结束）、log（一行输出）或 done（部署结束，附带最终状态）。
+        支持 Last-Event-ID 请求头或 last_event_id 参数断线续传。
+        """
+        from flask import Response
+        
+        deploy_id = request.args.get('deploy_id')
+        if not deploy_id:
+            return jsonify({"error": "缺少部署ID参数"}), 400
+        access_error = self._deployment_access_error(deploy_id)
+        if access_error:
+            return access_error
+        try:
+            last_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+        except ValueError:
+            last_id = 0
+        status_file = os.path.join(self.base_dir, "deploy", deploy_id, "status.json")
+        
+        def read_final_status():
+            """部署结束时读取一次最终状态"""
+            try:
+                entry = self.status_store.load(deploy_id, lambda: read_status_file(status_file))
+                return entry.data if entry is not None else None
+            except Exception:
+                return None
+        
+        def format_event(event, done=False):
+            payload = dict(event, done=done)
+            return f"id: {event['id']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8')
+        
+        def stream_generator():
+            channel = get_event_bus().get_channel(deploy_id, create=False)
+            if channel is None:
+                # 没有进行中的部署（已结束较久或不存在），直接返回当前状态
+                final = {'id': 0, 'type': 'done', 'time': time.time(), 'data': {'status': read_final_status()}}
+                yield format_event(final, done=True)
+                return
+            
+            nonlocal last_id
+            while True:
+                events, closed = channel.wait_events(last_id, timeout=15)
+                if not events and not closed:
+                    # 心跳，防止代理断开空闲连接
+                    yield ": keep-alive\n\n".encode('utf-8')
+                    continue
+                for event in events:
+                    last_id = event['id']
+                    if event['type'] == 'done':
+                        event = dict(event, data=dict(event['data'], status=read_final_status()))
+                        yield format_event(event, done=True)
+                        return
+                    yield format_event(event)
+                if closed and not events:
+                    return
+        
+        response = Response(
+            stream_generator(),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache, no-store, must-revalidate',
+                'Pragma': 'no-cache',
+                'Expires': '0',
+                'Connection': 'keep-alive',
+                'Content-Type': 'text/event-stream; charset=utf-8',
+                'X-Accel-Buffering': 'no'  # 禁用Nginx缓冲
+            }
+        )
+        # 设置直接输出模式
+        response.direct_passthrough = True
+        return response
+
     def handle_execute_deploy(self) -> Dict[str, Any]:
         """处理同步执行部署的请求，类似于查询但直接返回结果
         
@@ -4292,11 +4456,10 @@ output "s3_bucket_arn" {{
                                 # 更新状态文件
                                 status_data['status'] = status
                                 status_data['message'] = message
-                                with open(status_file, 'w') as sf:
-                                    json.dump(status_data, sf)
+                                self.status_store.write_file(deploy_id, status_file, status_data)
                                 
                                 # 确保数据库中的状态也更新
-                                self.deploy_model.update_deployment_status(
+                                self.status_store.persist(self.deploy_model.update_deployment_status,
                                     deploy_id=deploy_id,
                                     status="completed"
                                 )
@@ -4383,7 +4546,7 @@ output "s3_bucket_arn" {{
                 self.logger.info(f"成功部署: ID={deploy_id}, 资源类型={resource_type}, VPC ID={resources.get('vpc_id')}")
                 
                 # 确保数据库中的部署状态已更新
-                self.deploy_model.update_deployment_status(
+                self.status_store.persist(self.deploy_model.update_deployment_status,
                     deploy_id=deploy_id,
                     status="completed"
                 )
@@ -4494,7 +4657,7 @@ output "s3_bucket_arn" {{
                 
                 # 更新部署状态为进行中（如果之前是未开始）
                 if status == 'unknown':
-                    self.deploy_model.update_deployment_status(
+                    self.status_store.persist(self.deploy_model.update_deployment_status,
                         deploy_id=deploy_id,
                         status="in_progress"
                     )
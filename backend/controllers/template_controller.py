@@ -2,10 +2,15 @@ import os
 import uuid
 import json
 import logging
+import time
 import traceback
 from datetime import datetime
-from flask import jsonify, request, send_file
+from flask import has_request_context, jsonify, request, send_file
 from werkzeug.utils import secure_filename
+from utils.terraform_plugin_cache import get_plugin_cache
+from utils.terraform_job_runner import get_job_runner, track_process
+from utils.deployment_events import stream_process_output
+from utils.deployment_status import get_status_store, read_status_file, status_response
 
 # 基础路径配置
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -32,6 +37,9 @@ class TemplateController:
         # 初始化部署执行器
         from controllers.deploy_controller import DeployController
         self.deploy_controller = DeployController(config)
+        
+        # 模板部署状态注册表，部署线程写入，状态查询直接读取内存
+        self.status_store = get_status_store('template')
     
     def _get_user_id(self):
         """获取当前用户ID的辅助方法"""
@@ -587,6 +595,8 @@ class TemplateController:
             
             # 获取用户信息
             user_id = self._get_user_id()
+            if not user_id:
+                return jsonify({"error": "未获取到用户ID", "success": False}), 401
             username = self._get_username()
             
             self.logger.info(f"开始模板部署: 模板ID={template_id}, 用户ID={user_id}")
@@ -682,6 +692,13 @@ class TemplateController:
             deploy_id = deploy_request['deploy_id']
             terraform_content = deploy_request['terraform_content']
             
+            # 部署归属于当前登录用户，请求上下文之外才使用调用方传入的用户ID
+            user_id = self._get_user_id() if has_request_context() else deploy_request.get('user_id')
+            if not user_id:
+                self.logger.error(f"无法获取用户ID，拒绝部署: {deploy_id}")
+                return {'success': False, 'error': '未获取到用户ID'}
+            deploy_request = dict(deploy_request, user_id=user_id)
+            
             self.logger.info(f"开始执行Terraform部署，部署ID: {deploy_id}")
             
             # 创建部署目录
@@ -695,31 +712,25 @@ class TemplateController:
                 
             # 创建状态文件，记录初始状态
             status_file = os.path.join(deploy_dir, 'status.json')
-            with open(status_file, 'w') as f:
-                json.dump({
-                    'status': 'in_progress',
-                    'deploy_id': deploy_id,
-                    'message': 'Terraform部署已开始',
-                    'updated_at': datetime.now().isoformat(),
-                    'resources': self._parse_resources_from_terraform(terraform_content),
-                    'template_id': deploy_request.get('template_id', ''),
-                    'user_id': deploy_request.get('user_id', '1'),
-                    'username': deploy_request.get('username', 'admin'),
-                    'project': deploy_request.get('project', '默认项目'),
-                    'cloud': deploy_request.get('cloud', 'AWS'),
-                    'region': deploy_request.get('region', '未指定')
-                }, f, indent=2)
+            self.status_store.write_file(deploy_id, status_file, {
+                'status': 'in_progress',
+                'deploy_id': deploy_id,
+                'message': 'Terraform部署已开始',
+                'updated_at': datetime.now().isoformat(),
+                'resources': self._parse_resources_from_terraform(terraform_content),
+                'template_id': deploy_request.get('template_id', ''),
+                'user_id': user_id,
+                'username': deploy_request.get('username', 'admin'),
+                'project': deploy_request.get('project', '默认项目'),
+                'cloud': deploy_request.get('cloud', 'AWS'),
+                'region': deploy_request.get('region', '未指定')
+            }, indent=2)
                 
-            # 启动异步部署任务
-            import threading
-            deploy_thread = threading.Thread(
-                target=self._run_terraform_deployment,
-                args=(deploy_id, deploy_dir, deploy_request)
-            )
-            deploy_thread.daemon = True
-            deploy_thread.start()
+            # 提交到部署任务执行器，超出并发上限时排队执行
+            get_job_runner().submit(deploy_id, self._run_terraform_deployment, deploy_id, deploy_dir, deploy_request,
+                                    user_id=user_id, kind='template')
             
-            self.logger.info(f"Terraform部署任务已启动，部署ID: {deploy_id}")
+            self.logger.info(f"Terraform部署任务已提交，部署ID: {deploy_id}")
             return {'success': True, 'deploy_id': deploy_id}
             
         except Exception as e:
@@ -804,7 +815,7 @@ class TemplateController:
                 'updated_at': datetime.now().isoformat(),
                 'resources': resources_status,
                 'template_id': deploy_request.get('template_id', ''),
-                'user_id': deploy_request.get('user_id', '1'),
+                'user_id': deploy_request['user_id'],
                 'username': deploy_request.get('username', 'admin'),
                 'project': deploy_request.get('project', '默认项目'),
                 'cloud': deploy_request.get('cloud', 'AWS'),
@@ -813,8 +824,7 @@ class TemplateController:
             
             # 更新状态文件
             status_file = os.path.join(deploy_dir, 'status.json')
-            with open(status_file, 'w') as f:
-                json.dump(initial_status, f, indent=2)
+            self.status_store.write_file(deploy_id, status_file, initial_status, indent=2)
                 
             # 写入Terraform脚本内容到日志
             log_message("Terraform脚本内容:")
@@ -830,7 +840,12 @@ class TemplateController:
             # 执行Terraform初始化
             log_message("开始执行Terraform初始化...")
             self._update_deployment_status(deploy_id, 'in_progress', 'Terraform初始化中')
-            init_result = self._execute_command(tf_init_cmd)
+            # 从共享插件缓存链接provider，避免每次init重新下载
+            plugin_cache = get_plugin_cache()
+            init_mode = plugin_cache.prepare_workdir(deploy_dir)
+            init_start_time = time.time()
+            init_result = self._execute_command(tf_init_cmd, phase='init')
+            plugin_cache.record_init(init_mode, time.time() - init_start_time, init_result['exit_code'] == 0)
             
             # 记录初始化结果
             log_message(f"Terraform初始化执行结果: 退出代码 {init_result['exit_code']}")
@@ -849,7 +864,7 @@ class TemplateController:
             log_message("开始执行Terraform计划...")
             self._update_deployment_status(deploy_id, 'in_progress', 'Terraform计划中')
             tf_plan_cmd = f'cd {deploy_dir} && terraform plan -out=tfplan'
-            plan_result = self._execute_command(tf_plan_cmd)
+            plan_result = self._execute_command(tf_plan_cmd, phase='plan')
             
             # 记录计划结果
             log_message(f"Terraform计划执行结果: 退出代码 {plan_result['exit_code']}")
@@ -878,7 +893,7 @@ class TemplateController:
             log_message("开始执行Terraform应用...")
             self._update_deployment_status(deploy_id, 'in_progress', 'Terraform应用中')
             tf_apply_cmd = f'cd {deploy_dir} && terraform apply -auto-approve tfplan'
-            apply_result = self._execute_command(tf_apply_cmd)
+            apply_result = self._execute_command(tf_apply_cmd, phase='apply')
             
             # 记录应用结果
             log_message(f"Terraform应用执行结果: 退出代码 {apply_result['exit_code']}")
@@ -976,8 +991,8 @@ class TemplateController:
             # 保存输出结果到状态文件
             self._update_deployment_status(deploy_id, 'completed', '部署成功完成', output_data)
             
-            # 更新数据库中的部署状态
-            self._update_deployment_in_db(deploy_id, 'completed')
+            # 异步更新数据库中的部署状态
+            self.status_store.persist(self._update_deployment_in_db, deploy_id, 'completed')
             
             log_message(f"Terraform部署完成，部署ID: {deploy_id}")
             log_message(f"总计部署资源: {len(resources_status)} 个")
@@ -1009,11 +1024,16 @@ class TemplateController:
             # 更新状态为失败
             self._update_deployment_status(deploy_id, 'failed', f"部署执行出错: {str(e)}")
             
-            # 更新数据库中的部署状态
-            self._update_deployment_in_db(deploy_id, 'failed')
+            # 异步更新数据库中的部署状态
+            self.status_store.persist(self._update_deployment_in_db, deploy_id, 'failed')
     
-    def _execute_command(self, command):
-        """执行系统命令并返回结果"""
+    def _execute_command(self, command, phase=None):
+        """执行系统命令并返回结果
+        
+        Args:
+            command: 要执行的shell命令
+            phase: terraform阶段名（init/plan/apply），指定时逐行发布输出到部署事件通道
+        """
         import subprocess
         
         try:
@@ -1024,11 +1044,18 @@ class TemplateController:
                 command,
                 shell=True,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+                stderr=subprocess.PIPE,
+                # 独立进程组：取消任务时连同 shell 启动的 terraform 进程一起终止
+                start_new_session=True
             )
+            # 在部署任务中执行时登记进程，取消任务时终止
+            track_process(process)
             
-            # 获取输出
-            stdout, stderr = process.communicate()
+            # 获取输出（指定阶段时逐行发布到部署事件通道）
+            if phase:
+                stdout, stderr = stream_process_output(process, phase=phase)
+            else:
+                stdout, stderr = process.communicate()
             
             # 转换为文本
             stdout_text = stdout.decode('utf-8', errors='replace')
@@ -1058,10 +1085,8 @@ class TemplateController:
             status_file = os.path.join(deploy_dir, 'status.json')
             
             # 读取现有状态
-            current_status = {}
-            if os.path.exists(status_file):
-                with open(status_file, 'r') as f:
-                    current_status = json.load(f)
+            entry = self.status_store.load(deploy_id, lambda: read_status_file(status_file) or {})
+            current_status = dict(entry.data)
                     
             # 更新状态
             current_status.update({
@@ -1075,8 +1100,7 @@ class TemplateController:
                 current_status['output'] = output
                 
             # 保存更新后的状态
-            with open(status_file, 'w') as f:
-                json.dump(current_status, f, indent=2)
+            self.status_store.write_file(deploy_id, status_file, current_status, indent=2)
                 
             self.logger.info(f"部署状态已更新，部署ID: {deploy_id}, 状态: {status}, 消息: {message}")
             
@@ -1091,10 +1115,8 @@ class TemplateController:
             status_file = os.path.join(deploy_dir, 'status.json')
             
             # 读取现有状态
-            current_status = {}
-            if os.path.exists(status_file):
-                with open(status_file, 'r') as f:
-                    current_status = json.load(f)
+            entry = self.status_store.load(deploy_id, lambda: read_status_file(status_file) or {})
+            current_status = dict(entry.data)
                     
             # 更新资源状态
             current_status['resources'] = resources_status
@@ -1140,8 +1162,7 @@ class TemplateController:
             current_status['updated_at'] = datetime.now().isoformat()
             
             # 保存更新后的状态
-            with open(status_file, 'w') as f:
-                json.dump(current_status, f, indent=2)
+            self.status_store.write_file(deploy_id, status_file, current_status, indent=2)
                 
             self.logger.info(f"资源状态已更新，部署ID: {deploy_id}, 进度: {progress}%")
             
@@ -1214,144 +1235,178 @@ class TemplateController:
             self.logger.error(traceback.format_exc())
     
     def get_deploy_status(self):
-        """获取模板部署状态"""
+        """获取模板部署状态
+        
+        状态来自内存中的部署状态注册表，支持 If-None-Match 条件请求（未变化时返回304），
+        带 wait 参数时长轮询等待状态变化
+        """
         try:
             deploy_id = request.args.get('deploy_id')
             
             if not deploy_id:
                 return jsonify({"error": "未提供部署ID", "success": False}), 400
             
-            # 查询部署状态
-            query = "SELECT * FROM deployments WHERE deployid = %s"
-            deployment = self.db.query_one(query, (deploy_id,))
-            
-            if not deployment:
-                return jsonify({"error": "未找到部署记录", "success": False}), 404
-            
-            # 获取部署目录和状态文件
+            # 获取部署目录和日志文件
             deploy_dir = os.path.join(BASE_DIR, 'deployments', deploy_id)
-            status_file = os.path.join(deploy_dir, 'status.json')
+            deployment_log_file = os.path.join(deploy_dir, 'deployment.log')
             
-            # 读取状态文件
-            status_data = {}
-            if os.path.exists(status_file):
+            def log_size():
+                # 日志追加不会更新状态版本，以日志大小区分响应内容
                 try:
-                    with open(status_file, 'r') as f:
-                        status_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    self.logger.error(f"解析状态文件JSON失败: {str(e)}")
-                    status_data = {
-                        "status": "in_progress", 
-                        "message": "状态文件解析错误",
-                        "updated_at": datetime.now().isoformat()
-                    }
-            else:
-                # 如果状态文件不存在，创建一个初始状态
+                    return str(os.path.getsize(deployment_log_file))
+                except OSError:
+                    return '0'
+            
+            response = status_response(self.status_store, deploy_id, lambda: self._load_deploy_status(deploy_id),
+                                       render=lambda status_data: self._render_deploy_status(deploy_id, status_data),
+                                       variant=log_size)
+            if response is None:
+                return jsonify({"error": "未找到部署记录", "success": False}), 404
+            return response
+        except Exception as e:
+            self.logger.error(f"获取部署状态失败: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            return jsonify({"error": str(e), "success": False}), 500
+    
+    def _load_deploy_status(self, deploy_id):
+        """注册表中没有该部署时（如进程重启后）从数据库和状态文件加载状态"""
+        # 查询部署状态
+        query = "SELECT * FROM deployments WHERE deployid = %s"
+        deployment = self.db.query_one(query, (deploy_id,))
+        
+        if not deployment:
+            return None
+        
+        # 获取部署目录和状态文件
+        deploy_dir = os.path.join(BASE_DIR, 'deployments', deploy_id)
+        status_file = os.path.join(deploy_dir, 'status.json')
+        
+        # 读取状态文件
+        status_data = {}
+        if os.path.exists(status_file):
+            try:
+                with open(status_file, 'r') as f:
+                    status_data = json.load(f)
+            except json.JSONDecodeError as e:
+                self.logger.error(f"解析状态文件JSON失败: {str(e)}")
                 status_data = {
-                    "status": "in_progress",
-                    "message": "等待部署开始...",
+                    "status": "in_progress", 
+                    "message": "状态文件解析错误",
                     "updated_at": datetime.now().isoformat()
                 }
-                
-                # 尝试从部署记录创建初始资源列表
-                try:
-                    if deployment.get('template_id'):
-                        template_id = deployment['template_id']
-                        terraform_path = os.path.join(TERRAFORM_SCRIPTS_DIR, f"{template_id}.tf")
-                        
-                        if os.path.exists(terraform_path):
-                            with open(terraform_path, 'r') as f:
-                                terraform_content = f.read()
-                            
-                            status_data['resources'] = self._parse_resources_from_terraform(terraform_content)
-                except Exception as resource_err:
-                    self.logger.error(f"创建初始资源列表失败: {str(resource_err)}")
-            
-            # 获取部署日志（如果存在）
-            deployment_log_file = os.path.join(deploy_dir, 'deployment.log')
-            log_content = ""
-            if os.path.exists(deployment_log_file):
-                try:
-                    with open(deployment_log_file, 'r') as f:
-                        # 获取最后50行日志
-                        log_lines = f.readlines()
-                        log_content = ''.join(log_lines[-50:])
-                except Exception as log_err:
-                    self.logger.error(f"读取部署日志失败: {str(log_err)}")
-                    log_content = f"读取日志失败: {str(log_err)}"
-            
-            # 构建资源状态信息
-            resources_status = status_data.get('resources', [])
+        else:
+            # 如果状态文件不存在，创建一个初始状态
+            status_data = {
+                "status": "in_progress",
+                "message": "等待部署开始...",
+                "updated_at": datetime.now().isoformat()
+            }
             
-            # 计算进度
-            total_resources = len(resources_status)
+            # 尝试从部署记录创建初始资源列表
+            try:
+                if deployment.get('template_id'):
+                    template_id = deployment['template_id']
+                    terraform_path = os.path.join(TERRAFORM_SCRIPTS_DIR, f"{template_id}.tf")
+                    
+                    if os.path.exists(terraform_path):
+                        with open(terraform_path, 'r') as f:
+                            terraform_content = f.read()
+                        
+                        status_data['resources'] = self._parse_resources_from_terraform(terraform_content)
+            except Exception as resource_err:
+                self.logger.error(f"创建初始资源列表失败: {str(resource_err)}")
+        
+        # 状态数据缺少的字段使用数据库记录
+        status_data.setdefault('status', deployment.get('status', 'in_progress'))
+        if not status_data.get('updated_at') and deployment.get('updated_at'):
+            status_data['updated_at'] = str(deployment['updated_at'])
+        return status_data
+    
+    def _render_deploy_status(self, deploy_id, status_data):
+        """由部署状态生成状态查询响应"""
+        deploy_dir = os.path.join(BASE_DIR, 'deployments', deploy_id)
+        
+        # 获取部署日志（如果存在）
+        deployment_log_file = os.path.join(deploy_dir, 'deployment.log')
+        log_content = ""
+        if os.path.exists(deployment_log_file):
+            try:
+                with open(deployment_log_file, 'r') as f:
+                    # 获取最后50行日志
+                    log_lines = f.readlines()
+                    log_content = ''.join(log_lines[-50:])
+            except Exception as log_err:
+                self.logger.error(f"读取部署日志失败: {str(log_err)}")
+                log_content = f"读取日志失败: {str(log_err)}"
+        
+        # 构建资源状态信息
+        resources_status = status_data.get('resources', [])
+        
+        # 计算进度
+        total_resources = len(resources_status)
+        if total_resources > 0:
+            # 计算每个状态的资源数量
+            completed = sum(1 for r in resources_status if r.get('status') == 'completed')
+            failed = sum(1 for r in resources_status if r.get('status') == 'failed')
+            planned = sum(1 for r in resources_status if r.get('status') == 'planned')
+            
+            # 计算进度，考虑不同状态的权重
+            progress = int(((completed + failed) * 100 + planned * 40) / total_resources)
+            progress = min(progress, 100)  # 确保不超过100%
+        else:
+            progress = status_data.get('progress', 0)
+        
+        # 使用状态消息或创建一个
+        status_message = status_data.get('status_message', '')
+        if not status_message:
             if total_resources > 0:
-                # 计算每个状态的资源数量
                 completed = sum(1 for r in resources_status if r.get('status') == 'completed')
                 failed = sum(1 for r in resources_status if r.get('status') == 'failed')
-                planned = sum(1 for r in resources_status if r.get('status') == 'planned')
-                
-                # 计算进度，考虑不同状态的权重
-                progress = int(((completed + failed) * 100 + planned * 40) / total_resources)
-                progress = min(progress, 100)  # 确保不超过100%
+                status_message = f"已完成: {completed}/{total_resources} 资源"
+                if failed > 0:
+                    status_message += f", {failed} 个失败"
             else:
-                progress = status_data.get('progress', 0)
-            
-            # 使用状态消息或创建一个
-            status_message = status_data.get('status_message', '')
-            if not status_message:
-                if total_resources > 0:
-                    completed = sum(1 for r in resources_status if r.get('status') == 'completed')
-                    failed = sum(1 for r in resources_status if r.get('status') == 'failed')
-                    status_message = f"已完成: {completed}/{total_resources} 资源"
-                    if failed > 0:
-                        status_message += f", {failed} 个失败"
+                status_message = status_data.get('message', "处理中...")
+        
+        # 确定部署状态
+        current_status = status_data.get('status', 'in_progress')
+        
+        # 如果状态数据中没有明确的状态，但所有资源都已完成或失败，则自动更新状态
+        if current_status == 'in_progress' and total_resources > 0:
+            completed_count = sum(1 for r in resources_status if r.get('status') in ['completed', 'failed'])
+            if completed_count == total_resources:
+                # 如果有失败的资源，状态为失败
+                if failed > 0:
+                    current_status = 'failed'
                 else:
-                    status_message = status_data.get('message', "处理中...")
-            
-            # 确定部署状态
-            current_status = status_data.get('status', deployment.get('status', 'in_progress'))
-            
-            # 如果状态数据中没有明确的状态，但所有资源都已完成或失败，则自动更新状态
-            if current_status == 'in_progress' and total_resources > 0:
-                completed_count = sum(1 for r in resources_status if r.get('status') in ['completed', 'failed'])
-                if completed_count == total_resources:
-                    # 如果有失败的资源，状态为失败
-                    if failed > 0:
-                        current_status = 'failed'
-                    else:
-                        current_status = 'completed'
-            
-            # 创建部署状态响应
-            response_data = {
-                "success": True,
-                "deploy_id": deploy_id,
-                "status": current_status,
-                "resources_status": resources_status,
-                "deploy_status": {
-                    "progress": progress,
-                    "message": status_message
-                },
-                "updated_at": status_data.get('updated_at', deployment.get('updated_at'))
-            }
-            
-            # 添加输出信息（如果有）
-            if status_data.get('output'):
-                response_data['output'] = status_data.get('output')
-            
-            # 添加错误信息（如果有）
-            if status_data.get('error'):
-                response_data['error'] = status_data.get('error')
-            
-            # 添加日志信息（如果有）
-            if log_content:
-                response_data['log'] = log_content
-            
-            return jsonify(response_data)
-        except Exception as e:
-            self.logger.error(f"获取部署状态失败: {str(e)}")
-            self.logger.error(traceback.format_exc())
-            return jsonify({"error": str(e), "success": False}), 500
+                    current_status = 'completed'
+        
+        # 创建部署状态响应
+        response_data = {
+            "success": True,
+            "deploy_id": deploy_id,
+            "status": current_status,
+            "resources_status": resources_status,
+            "deploy_status": {
+                "progress": progress,
+                "message": status_message
+            },
+            "updated_at": status_data.get('updated_at')
+        }
+        
+        # 添加输出信息（如果有）
+        if status_data.get('output'):
+            response_data['output'] = status_data.get('output')
+        
+        # 添加错误信息（如果有）
+        if status_data.get('error'):
+            response_data['error'] = status_data.get('error')
+        
+        # 添加日志信息（如果有）
+        if log_content:
+            response_data['log'] = log_content
+        
+        return response_data
     
     def _parse_resources_from_terraform(self, terraform_content):
         """从Terraform内容解析资源列表"""
@@ -9,6 +9,7 @@ import uuid
 import threading
 import subprocess
 import time
+from concurrent.futures import wait, FIRST_COMPLETED
 from datetime import datetime
 from flask import request, jsonify, current_app, send_file, Response
 from werkzeug.utils import safe_join
@@ -19,6 +20,12 @@ from db.db import get_db
 import docker
 from typing import Optional
 from prompts.cloud_terraform_prompts import CloudTerraformPrompts
+from utils.terraform_mcp_client import get_terraform_mcp_client, get_mcp_doc_executor
+from utils.mcp_doc_cache import get_mcp_doc_cache
+from utils.terraform_plugin_cache import get_plugin_cache
+from utils.terraform_job_runner import get_job_runner, JobState, JobQueueFullError, DuplicateJobError
+from utils.deployment_events import run_streaming
+from utils.deployment_status import get_status_store, status_response
 
 # 获取当前目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -30,6 +37,21 @@ DEPLOYMENTS_DIR = os.path.join(current_dir, '..', 'aideployments')
 if not os.path.exists(DEPLOYMENTS_DIR):
     os.makedirs(DEPLOYMENTS_DIR)
 
+# MCP文档磁盘缓存目录
+MCP_DOC_CACHE_DIR = os.path.join(current_dir, '..', 'cache', 'mcp_docs')
+
+# 启动预热时加载的常用资源文档
+MCP_CACHE_WARMUP_RESOURCES = {
+    "aws": ["vpc", "subnet", "security_group", "instance", "db_instance", "s3_bucket"],
+    "alicloud": ["vpc", "vswitch", "security_group", "instance", "db_instance", "oss_bucket"],
+    "huaweicloud": ["vpc", "vpc_subnet", "vpc_security_group", "compute_instance", "rds_instance", "obs_bucket"],
+    "tencentcloud": ["vpc", "subnet", "security_group", "instance", "mysql_instance", "cos_bucket"]
+}
+
+# 启动预热每个进程只执行一次（控制器会按请求创建）
+_mcp_cache_warmup_started = False
+_mcp_cache_warmup_lock = threading.Lock()
+
 # 定义部署状态
 DEPLOYMENT_STATUS = {
     'PENDING': 'pending',
@@ -46,6 +68,9 @@ class TerraformController:
         self.deployments_dir = DEPLOYMENTS_DIR
         self.deployment_model = AIDeploymentModel()  # 移除config参数
         
+        # AI部署状态注册表，部署线程写入并异步写回数据库，状态查询直接读取内存
+        self.status_store = get_status_store('terraform')
+        
         # 记录正在运行的部署进程，用于支持停止部署功能
         self.active_deployments = {}  # deploy_id -> {"process": process, "thread": thread}
         
@@ -70,12 +95,35 @@ class TerraformController:
         self.mcp_container_name = "terraform-mcp-server"
         self.mcp_server_path = "/bin/terraform-mcp-server"  # 默认路径
         
+        # 常驻stdio会话配置：会话数与单次调用超时
+        self.mcp_pool_size = int(os.environ.get('TERRAFORM_MCP_POOL_SIZE', '2'))
+        self.mcp_call_timeout = float(os.environ.get('TERRAFORM_MCP_CALL_TIMEOUT', '30'))
+        self._mcp_client_lock = threading.Lock()
+        self._mcp_diagnosed = False
+        
+        # 文档查询并发配置：工作线程数与单次生成的整体截止时间
+        self.mcp_doc_workers = int(os.environ.get('TERRAFORM_MCP_DOC_WORKERS', '6'))
+        self.mcp_doc_deadline = float(os.environ.get('TERRAFORM_MCP_DOC_DEADLINE', '90'))
+        
+        # MCP文档两级缓存（内存LRU + 磁盘），键包含server版本，进程内共享
+        self.mcp_doc_cache = get_mcp_doc_cache(
+            os.environ.get('TERRAFORM_MCP_CACHE_DIR', MCP_DOC_CACHE_DIR),
+            server_version=self.mcp_server_version,
+            ttl=float(os.environ.get('TERRAFORM_MCP_CACHE_TTL', str(7 * 86400))),
+            max_entries=int(os.environ.get('TERRAFORM_MCP_CACHE_MAX_ENTRIES', '512')),
+            max_disk_bytes=int(os.environ.get('TERRAFORM_MCP_CACHE_MAX_DISK_MB', '512')) * 1024 * 1024
+        )
+        
         # Initialize Docker client for MCP server if enabled
         if self.enable_mcp:
             try:
                 self.docker_client = docker.from_env()
                 self._ensure_mcp_server()
                 self.logger.info("MCP server with Docker client initialized successfully")
+                
+                # 启动时在后台预热常用资源文档
+                if os.environ.get('TERRAFORM_MCP_CACHE_WARMUP', 'false').lower() == 'true':
+                    self._start_mcp_cache_warmup()
             except Exception as e:
                 self.logger.warning(f"MCP功能不可用 - Docker client初始化失败: {str(e)}")
                 self.logger.info("MCP功能已禁用，将使用传统Terraform生成模式")
@@ -350,6 +398,87 @@ class TerraformController:
             self.logger.error(f"MCP server连接测试出错: {str(e)}")
             return False
 
+    def _get_mcp_client(self):
+        """获取常驻的MCP stdio客户端（进程内共享，每个请求新建的控制器复用同一组会话）"""
+        return get_terraform_mcp_client(
+            ["docker", "exec", "-i", self.mcp_container_name, self.mcp_server_path, "stdio"],
+            pool_size=self.mcp_pool_size,
+            call_timeout=self.mcp_call_timeout
+        )
+
+    def _call_mcp_tool(self, tool_name, arguments, cache_key=None):
+        """通过常驻stdio会话调用MCP工具，返回原始JSON-RPC响应行，失败返回None
+        
+        Args:
+            tool_name: MCP工具名称
+            arguments: 工具参数
+            cache_key: 可选的 (provider, service_slug, doc_id)，提供时先查文档缓存，成功的响应写回缓存
+        """
+        if cache_key:
+            cached = self.mcp_doc_cache.get(*cache_key)
+            if cached is not None:
+                self.logger.info(f"📦 MCP文档缓存命中: {tool_name} {cache_key}")
+                return cached
+        
+        try:
+            response = self._get_mcp_client().call_tool(tool_name, arguments)
+        except Exception as e:
+            self.logger.warning(f"❌ MCP工具 {tool_name} 调用失败: {str(e)}")
+            return None
+        
+        if cache_key and response and self._is_mcp_success_response(response):
+            self.mcp_doc_cache.set(*cache_key, response)
+        return response
+
+    def _is_mcp_success_response(self, response):
+        """判断JSON-RPC响应是否为成功结果（错误结果不写入缓存）"""
+        try:
+            message = json.loads(response)
+        except (TypeError, json.JSONDecodeError):
+            return False
+        result = message.get("result")
+        return "error" not in message and isinstance(result, dict) and not result.get("isError")
+
+    def _start_mcp_cache_warmup(self):
+        """在后台线程中预热文档缓存，每个进程只启动一次"""
+        global _mcp_cache_warmup_started
+        with _mcp_cache_warmup_lock:
+            if _mcp_cache_warmup_started:
+                return
+            _mcp_cache_warmup_started = True
+        threading.Thread(target=self.warm_mcp_doc_cache, name="mcp-cache-warmup", daemon=True).start()
+
+    def warm_mcp_doc_cache(self, providers=None):
+        """预热常用资源的MCP文档缓存
+        
+        Args:
+            providers: 需要预热的provider列表，默认预热aws/alicloud/huaweicloud/tencentcloud
+            
+        Returns:
+            dict: 缓存统计信息
+        """
+        providers = providers or list(MCP_CACHE_WARMUP_RESOURCES.keys())
+        start_time = time.time()
+        self.logger.info(f"开始预热MCP文档缓存: {providers}")
+        for provider in providers:
+            resource_types = MCP_CACHE_WARMUP_RESOURCES.get(provider, ["vpc"])
+            try:
+                docs = self._query_mcp_docs_concurrently(provider, resource_types)
+                self.logger.info(f"{provider} 预热完成: {len(docs)}/{len(resource_types)} 个资源文档")
+            except Exception as e:
+                self.logger.error(f"{provider} 预热MCP文档缓存失败: {str(e)}")
+        stats = self.mcp_doc_cache.stats()
+        self.logger.info(f"MCP文档缓存预热完成，耗时 {time.time() - start_time:.1f} 秒，统计: {stats}")
+        return stats
+
+    def get_mcp_cache_stats(self):
+        """获取MCP文档缓存统计信息"""
+        return jsonify({"success": True, "stats": self.mcp_doc_cache.stats()})
+
+    def get_plugin_cache_stats(self):
+        """获取Terraform provider插件缓存统计信息（模板命中、init耗时对比）"""
+        return jsonify({"success": True, "stats": get_plugin_cache().metrics()})
+
     def _diagnose_mcp_server(self):
         """诊断MCP server支持的工具和providers"""
         try:
@@ -358,68 +487,28 @@ class TerraformController:
             # 先检查容器内的文件和进程
             self._check_mcp_container_status()
             
-            # 修复：MCP server必须运行在stdio模式下
-            mcp_command = [
-                "docker", "exec", "-i", self.mcp_container_name,
-                self.mcp_server_path, "stdio"  # 明确指定stdio模式
-            ]
-            
-            # 查询支持的工具列表
-            tools_request = {
-                "jsonrpc": "2.0",
-                "id": 99,
-                "method": "tools/list"
-            }
+            # 通过常驻stdio会话查询支持的工具列表
+            try:
+                tools_response = self._get_mcp_client().request("tools/list")["raw"]
+            except Exception as tools_error:
+                self.logger.error(f"❌ MCP server工具列表查询失败: {str(tools_error)}")
+                return
             
-            # 添加换行符，MCP协议需要
-            request_data = json.dumps(tools_request) + "\n"
+            self.logger.info(f"📋 MCP server工具列表响应: {tools_response}")
             
-            result = subprocess.run(
-                mcp_command,
-                input=request_data,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            # 尝试一个简单的AWS查询作为基准测试
+            aws_response = self._call_mcp_tool("resolveProviderDocID", {
+                "providerName": "aws",
+                "providerNamespace": "hashicorp",
+                "serviceSlug": "vpc",
+                "providerDataType": "resources",
+                "providerVersion": "latest"
+            })
             
-            if result.returncode == 0:
-                self.logger.info(f"📋 MCP server工具列表响应: {result.stdout}")
-                
-                # 尝试一个简单的AWS查询作为基准测试
-                aws_test = {
-                    "jsonrpc": "2.0",
-                    "id": 98,
-                    "method": "tools/call",
-                    "params": {
-                        "name": "resolveProviderDocID",
-                        "arguments": {
-                            "providerName": "aws",
-                            "providerNamespace": "hashicorp",
-                            "serviceSlug": "vpc",
-                            "providerDataType": "resources",
-                            "providerVersion": "latest"
-                        }
-                    }
-                }
-                
-                # AWS测试查询也要使用相同的命令，添加换行符
-                aws_request_data = json.dumps(aws_test) + "\n"
-                
-                aws_result = subprocess.run(
-                    mcp_command,  # 使用相同的修复后命令
-                    input=aws_request_data,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if aws_result.returncode == 0:
-                    self.logger.info(f"✅ AWS测试查询成功: {aws_result.stdout[:300]}...")
-                else:
-                    self.logger.warning(f"❌ AWS测试查询失败: {aws_result.stderr}")
-                    
+            if aws_response:
+                self.logger.info(f"✅ AWS测试查询成功: {aws_response[:300]}...")
             else:
-                self.logger.error(f"❌ MCP server工具列表查询失败: {result.stderr}")
+                self.logger.warning("❌ AWS测试查询失败")
                 
         except Exception as e:
             self.logger.error(f"MCP server诊断失败: {str(e)}")
@@ -519,8 +608,10 @@ class TerraformController:
         try:
             self.logger.info("开始使用MCP server查询模块信息")
             
-            # 先进行诊断
-            self._diagnose_mcp_server()
+            # 首次使用时进行诊断，之后复用常驻会话，不再重复诊断
+            if not self._mcp_diagnosed:
+                self._mcp_diagnosed = True
+                self._diagnose_mcp_server()
             
             # 智能检测云平台
             detected_cloud = CloudTerraformPrompts.detect_cloud_from_description(user_description)
@@ -551,28 +642,21 @@ class TerraformController:
                 self.logger.warning("未识别到具体资源类型，使用默认VPC资源")
                 resource_types = ["vpc"]
             
-            # 分别查询每个资源类型的文档
+            # 并发查询所有资源类型的文档，结果按resource_types顺序排列
             all_docs = []
+            docs_by_type = self._query_mcp_docs_concurrently(mcp_provider, resource_types)
             for resource_type in resource_types:
-                self.logger.info(f"开始查询 {mcp_provider}_{resource_type} 的文档")
-                
-                try:
-                    service_slug = f"{mcp_provider}_{resource_type}"
-                    docs = self._query_mcp_resource_docs(mcp_provider, service_slug, resource_type)
-                    
-                    if docs:
-                        all_docs.append({
-                            "resource_type": resource_type,
-                            "service_slug": service_slug,
-                            "docs": docs
-                        })
-                        self.logger.info(f"成功获取 {service_slug} 的文档，长度: {len(docs)} 字符")
-                    else:
-                        self.logger.warning(f"未获取到 {service_slug} 的文档")
-                        
-                except Exception as resource_error:
-                    self.logger.error(f"查询 {service_slug} 文档时出错: {str(resource_error)}")
-                    continue
+                service_slug = f"{mcp_provider}_{resource_type}"
+                docs = docs_by_type.get(resource_type)
+                if docs:
+                    all_docs.append({
+                        "resource_type": resource_type,
+                        "service_slug": service_slug,
+                        "docs": docs
+                    })
+                    self.logger.info(f"成功获取 {service_slug} 的文档，长度: {len(docs)} 字符")
+                else:
+                    self.logger.warning(f"未获取到 {service_slug} 的文档")
             
             # 合并所有文档
             if all_docs:
@@ -717,39 +801,115 @@ class TerraformController:
         """查询指定资源的MCP文档 - 使用混合查询策略"""
         try:
             self.logger.info(f"开始查询 {service_slug} 的文档 (混合策略)")
-            
-            # 策略1：优先使用模块查询
-            module_docs = self._query_mcp_via_modules(provider, resource_type)
-            if module_docs:
-                self.logger.info(f"✅ 通过模块查询成功获取 {resource_type} 文档")
-                return module_docs
-            
-            # 策略2：fallback到provider查询，尝试不同的namespace
-            provider_docs = self._query_mcp_via_providers(provider, service_slug, resource_type)
-            if provider_docs:
-                self.logger.info(f"✅ 通过provider查询成功获取 {resource_type} 文档")
-                return provider_docs
-            
-            # 策略3：尝试通用模块搜索
-            generic_docs = self._query_mcp_generic_modules(provider, resource_type)
-            if generic_docs:
-                self.logger.info(f"✅ 通过通用模块查询成功获取 {resource_type} 文档")
-                return generic_docs
-            
-            self.logger.warning(f"❌ 所有查询策略都失败，未获取到 {resource_type} 文档")
-            return None
-            
+            return self._query_mcp_docs_concurrently(provider, [resource_type]).get(resource_type)
         except Exception as e:
             self.logger.error(f"查询 {service_slug} 文档时出错: {str(e)}")
             return None
 
-    def _query_mcp_via_modules(self, provider, resource_type):
+    def _mcp_doc_strategies(self, provider, resource_type, cancel_event):
+        """按优先级返回资源文档的查询策略：模块查询 > provider查询 > 通用模块查询"""
+        service_slug = f"{provider}_{resource_type}"
+        return [
+            ("模块查询", lambda: self._query_mcp_via_modules(provider, resource_type, cancel_event)),
+            ("provider查询", lambda: self._query_mcp_via_providers(provider, service_slug, resource_type, cancel_event)),
+            ("通用模块查询", lambda: self._query_mcp_generic_modules(provider, resource_type, cancel_event)),
+        ]
+
+    def _query_mcp_docs_concurrently(self, provider, resource_types):
+        """并发查询多个资源类型的文档
+        
+        每个资源类型的三种查询策略同时提交到有界线程池执行。某个策略拿到文档、
+        且优先级更高的策略都已失败时，即采用该文档并通知同一资源的其余策略停止。
+        超过整体截止时间后不再等待，使用已经拿到的最佳结果。
+        
+        Returns:
+            dict: resource_type -> 文档内容（未获取到的资源不在结果中）
+        """
+        # 线程池在进程内共享，控制器按请求创建也不会为每个请求新建线程
+        executor = get_mcp_doc_executor(self.mcp_doc_workers)
+        
+        deadline = time.monotonic() + self.mcp_doc_deadline
+        states = {}
+        future_map = {}
+        for resource_type in dict.fromkeys(resource_types):
+            cancel_event = threading.Event()
+            strategies = self._mcp_doc_strategies(provider, resource_type, cancel_event)
+            states[resource_type] = {
+                "cancel_event": cancel_event,
+                "names": [strategy_name for strategy_name, _ in strategies],
+                "results": [None] * len(strategies),
+                "finished": [False] * len(strategies),
+                "doc": None,
+                "resolved": False
+            }
+            self.logger.info(f"开始查询 {provider}_{resource_type} 的文档")
+            for index, (strategy_name, strategy) in enumerate(strategies):
+                future = executor.submit(strategy)
+                future_map[future] = (resource_type, index, strategy_name)
+        
+        pending = set(future_map)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.warning(f"⏰ MCP文档查询超过截止时间 {self.mcp_doc_deadline} 秒，使用已获取的结果")
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                resource_type, index, strategy_name = future_map[future]
+                state = states[resource_type]
+                try:
+                    state["results"][index] = future.result()
+                except Exception as strategy_error:
+                    self.logger.error(f"{resource_type} {strategy_name}出错: {str(strategy_error)}")
+                state["finished"][index] = True
+                self._resolve_mcp_doc_state(resource_type, state)
+            
+            # 已经有结论的资源，其余策略不再等待
+            for future in list(pending):
+                if states[future_map[future][0]]["resolved"]:
+                    future.cancel()
+                    pending.discard(future)
+        
+        docs_by_type = {}
+        for resource_type, state in states.items():
+            if not state["resolved"]:
+                # 截止时间已到：按优先级取已完成策略中的第一个结果
+                state["doc"] = next((doc for doc in state["results"] if doc), None)
+                state["resolved"] = True
+            state["cancel_event"].set()
+            if state["doc"]:
+                docs_by_type[resource_type] = state["doc"]
+            else:
+                self.logger.warning(f"❌ 所有查询策略都失败，未获取到 {resource_type} 文档")
+        
+        for future in pending:
+            future.cancel()
+        return docs_by_type
+
+    def _resolve_mcp_doc_state(self, resource_type, state):
+        """按策略优先级判断资源文档是否已有结论"""
+        for index, finished in enumerate(state["finished"]):
+            if not finished:
+                return
+            if state["results"][index]:
+                state["doc"] = state["results"][index]
+                state["resolved"] = True
+                state["cancel_event"].set()
+                self.logger.info(f"✅ 通过{state['names'][index]}成功获取 {resource_type} 文档")
+                return
+        state["resolved"] = True
+        state["cancel_event"].set()
+
+    def _query_mcp_via_modules(self, provider, resource_type, cancel_event=None):
         """策略1：通过模块查询获取文档"""
         try:
             # 构建模块搜索关键词
             module_queries = self._build_module_search_queries(provider, resource_type)
             
             for query in module_queries:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                
                 self.logger.info(f"🔍 模块搜索: '{query}'")
                 
                 # 搜索模块
@@ -827,43 +987,18 @@ class TerraformController:
     def _search_modules(self, query):
         """执行模块搜索"""
         try:
-            # 修复：MCP server必须运行在stdio模式下
-            mcp_command = [
-                "docker", "exec", "-i", self.mcp_container_name,
-                self.mcp_server_path, "stdio"  # 明确指定stdio模式
-            ]
+            response = self._call_mcp_tool("searchModules", {
+                "moduleQuery": query,
+                "currentOffset": 0
+            }, cache_key=("modules", "searchModules", query))
             
-            search_request = {
-                "jsonrpc": "2.0",
-                "id": 10,
-                "method": "tools/call",
-                "params": {
-                    "name": "searchModules",
-                    "arguments": {
-                        "moduleQuery": query,
-                        "currentOffset": 0
-                    }
-                }
-            }
-            
-            # 添加换行符，MCP协议需要
-            request_data = json.dumps(search_request) + "\n"
-            
-            result = subprocess.run(
-                mcp_command,
-                input=request_data,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
+            if response:
                 # 添加详细的响应日志
-                response_preview = result.stdout[:300] + "..." if len(result.stdout) > 300 else result.stdout
+                response_preview = response[:300] + "..." if len(response) > 300 else response
                 self.logger.info(f"📋 模块搜索'{query}'响应预览: {response_preview}")
-                return result.stdout
+                return response
             else:
-                self.logger.warning(f"❌ 模块搜索'{query}'失败: {result.stderr}")
+                self.logger.warning(f"❌ 模块搜索'{query}'失败")
                 return None
                 
         except Exception as e:
@@ -1041,38 +1176,13 @@ class TerraformController:
     def _get_module_details(self, module_id):
         """获取模块详细信息"""
         try:
-            # 修复：MCP server必须运行在stdio模式下
-            mcp_command = [
-                "docker", "exec", "-i", self.mcp_container_name,
-                self.mcp_server_path, "stdio"  # 明确指定stdio模式
-            ]
-            
-            detail_request = {
-                "jsonrpc": "2.0",
-                "id": 11,
-                "method": "tools/call",
-                "params": {
-                    "name": "moduleDetails",
-                    "arguments": {
-                        "moduleID": module_id
-                    }
-                }
-            }
-            
-            # 添加换行符，MCP协议需要
-            request_data = json.dumps(detail_request) + "\n"
-            
-            result = subprocess.run(
-                mcp_command,
-                input=request_data,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            response = self._call_mcp_tool("moduleDetails", {
+                "moduleID": module_id
+            }, cache_key=("modules", "moduleDetails", module_id))
             
-            if result.returncode == 0:
+            if response:
                 # 解析模块详情响应
-                lines = result.stdout.strip().split('\n')
+                lines = response.strip().split('\n')
                 for line in lines:
                     if line.startswith('{"jsonrpc"'):
                         try:
@@ -1090,14 +1200,14 @@ class TerraformController:
                 self.logger.warning("模块详情响应中未找到有效内容")
                 return None
             else:
-                self.logger.error(f"获取模块详情失败: {result.stderr}")
+                self.logger.error(f"获取模块详情失败: {module_id}")
                 return None
                 
         except Exception as e:
             self.logger.error(f"获取模块详情时出错: {str(e)}")
             return None
 
-    def _query_mcp_via_providers(self, provider, service_slug, resource_type):
+    def _query_mcp_via_providers(self, provider, service_slug, resource_type, cancel_event=None):
         """策略2：通过provider查询获取文档（尝试不同namespace）"""
         try:
             # 根据官方文档，调整华为云的namespace优先级
@@ -1117,6 +1227,9 @@ class TerraformController:
                 ]
             
             for namespace in namespaces_to_try:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                
                 self.logger.info(f"🔍 尝试provider查询: {namespace}/{provider}")
                 
                 # 第一步：查询文档列表
@@ -1130,7 +1243,7 @@ class TerraformController:
                     continue
                 
                 # 第二步：查询详细文档
-                detailed_docs = self._query_mcp_detailed_docs(doc_id)
+                detailed_docs = self._query_mcp_detailed_docs(doc_id, provider, service_slug)
                 if detailed_docs:
                     return detailed_docs
             
@@ -1146,55 +1259,30 @@ class TerraformController:
             # 根据官方文档，serviceSlug应该是简单的资源名，不包含provider前缀
             simple_service_slug = service_slug.replace(f"{provider}_", "") if service_slug.startswith(f"{provider}_") else service_slug
             
-            # 修复：MCP server必须运行在stdio模式下
-            mcp_command = [
-                "docker", "exec", "-i", self.mcp_container_name,
-                self.mcp_server_path, "stdio"  # 明确指定stdio模式
-            ]
-            
-            query_request = {
-                "jsonrpc": "2.0",
-                "id": 2,
-                "method": "tools/call",
-                "params": {
-                    "name": "resolveProviderDocID",
-                    "arguments": {
-                        "providerName": provider,
-                        "providerNamespace": namespace,
-                        "serviceSlug": simple_service_slug,  # 使用简化的serviceSlug
-                        "providerDataType": "resources",
-                        "providerVersion": "latest"
-                    }
-                }
-            }
-            
             self.logger.info(f"🔍 Provider查询详情: {namespace}/{provider}, serviceSlug='{simple_service_slug}'")
             
-            # 添加换行符，MCP协议需要
-            request_data = json.dumps(query_request) + "\n"
+            response = self._call_mcp_tool("resolveProviderDocID", {
+                "providerName": provider,
+                "providerNamespace": namespace,
+                "serviceSlug": simple_service_slug,  # 使用简化的serviceSlug
+                "providerDataType": "resources",
+                "providerVersion": "latest"
+            }, cache_key=(provider, simple_service_slug, f"resolveProviderDocID:{namespace}"))
             
-            result = subprocess.run(
-                mcp_command,
-                input=request_data,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
+            if response:
                 # 添加详细的响应日志
-                response_preview = result.stdout[:500] + "..." if len(result.stdout) > 500 else result.stdout
+                response_preview = response[:500] + "..." if len(response) > 500 else response
                 self.logger.info(f"📋 MCP响应预览: {response_preview}")
-                return result.stdout
+                return response
             else:
-                self.logger.warning(f"❌ Provider查询失败: {result.stderr}")
+                self.logger.warning(f"❌ Provider查询失败: {namespace}/{provider}")
                 return None
                 
         except Exception as e:
             self.logger.error(f"查询MCP文档列表时出错: {str(e)}")
             return None
 
-    def _query_mcp_generic_modules(self, provider, resource_type):
+    def _query_mcp_generic_modules(self, provider, resource_type, cancel_event=None):
         """策略3：通用模块搜索（不限定云平台）"""
         try:
             # 使用通用资源术语搜索
@@ -1211,6 +1299,9 @@ class TerraformController:
             terms = generic_terms.get(resource_type, [resource_type])
             
             for term in terms:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                
                 self.logger.info(f"🔍 通用模块搜索: '{term}'")
                 
                 modules_response = self._search_modules(term)
@@ -1308,47 +1399,21 @@ class TerraformController:
             self.logger.error(f"解析文档列表响应时出错: {str(e)}")
             return None
 
-    def _query_mcp_detailed_docs(self, doc_id):
+    def _query_mcp_detailed_docs(self, doc_id, provider=None, service_slug=None):
         """查询指定文档ID的详细文档（用于provider查询）"""
         try:
-            # 修复：MCP server必须运行在stdio模式下
-            mcp_command = [
-                "docker", "exec", "-i", self.mcp_container_name,
-                self.mcp_server_path, "stdio"  # 明确指定stdio模式
-            ]
-            
-            # 构建详细文档查询请求
-            detail_request = {
-                "jsonrpc": "2.0", 
-                "id": 3,
-                "method": "tools/call",
-                "params": {
-                    "name": "getProviderDocs",
-                    "arguments": {
-                        "providerDocID": doc_id
-                    }
-                }
-            }
-            
             self.logger.info(f"查询providerDocID '{doc_id}' 的详细文档")
             
-            # 添加换行符，MCP协议需要
-            request_data = json.dumps(detail_request) + "\n"
-            
             # 执行详细文档查询
-            result = subprocess.run(
-                mcp_command,
-                input=request_data,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            response = self._call_mcp_tool("getProviderDocs", {
+                "providerDocID": doc_id
+            }, cache_key=(provider, service_slug, doc_id))
             
-            if result.returncode == 0:
-                self.logger.info(f"MCP server详细文档响应长度: {len(result.stdout)} 字符")
+            if response:
+                self.logger.info(f"MCP server详细文档响应长度: {len(response)} 字符")
                 
                 # 解析详细文档响应
-                lines = result.stdout.strip().split('\n')
+                lines = response.strip().split('\n')
                 for line in lines:
                     if line.startswith('{"jsonrpc"'):
                         try:
@@ -1367,7 +1432,7 @@ class TerraformController:
                 self.logger.warning("详细文档响应中未找到有效内容")
                 return None
             else:
-                self.logger.error(f"MCP server详细文档查询失败: {result.stderr}")
+                self.logger.error(f"MCP server详细文档查询失败: {doc_id}")
                 return None
                 
         except Exception as e:
@@ -2081,20 +2146,10 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
             self.deployment_model.create_deployment(deploy_data)
             self.logger.info(f"部署记录已创建并写入数据库: {deploy_id}")
             
-            # 启动后台任务
-            deployment_thread = threading.Thread(
-                target=self._run_terraform_deployment,
-                args=(deploy_id, deploy_dir, user_id)
-            )
-            deployment_thread.start()
-            
-            # 记录活跃的部署信息
-            self.active_deployments[deploy_id] = {
-                'thread': deployment_thread,
-                'process': None,  # 稍后在_run_terraform_deployment中设置
-                'deploy_dir': deploy_dir,
-                'user_id': user_id
-            }
+            # 提交到部署任务执行器，超出并发上限时排队执行
+            job_error = self._submit_deployment_job(deploy_id, deploy_dir, user_id)
+            if job_error:
+                return job_error
             
             return jsonify({
                 "success": True,
@@ -2323,6 +2378,31 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
         
         return '\n'.join(lines)
     
+    def _submit_deployment_job(self, deploy_id, deploy_dir, user_id):
+        """把部署提交到共享的Terraform任务执行器并登记为活跃部署
+        
+        Returns:
+            提交失败时返回错误响应，成功时返回 None
+        """
+        # 先登记活跃部署，任务开始执行时 should_stop_deployment 才不会误判为已停止
+        self.active_deployments[deploy_id] = {
+            'job': None,
+            'deploy_dir': deploy_dir,
+            'user_id': user_id
+        }
+        try:
+            job = get_job_runner().submit(deploy_id, self._run_terraform_deployment, deploy_id, deploy_dir, user_id,
+                                          user_id=user_id, kind='ai_deployment')
+        except (JobQueueFullError, DuplicateJobError) as e:
+            self.active_deployments.pop(deploy_id, None)
+            self.logger.warning(f"提交部署任务 {deploy_id} 失败: {str(e)}")
+            self._set_deployment_status(deploy_id, 'failed', error_message=str(e))
+            return jsonify({"success": False, "message": str(e)}), 503
+        
+        if deploy_id in self.active_deployments:
+            self.active_deployments[deploy_id]['job'] = job
+        return None
+    
     def _run_terraform_deployment(self, deploy_id, deploy_dir, user_id):
         """在后台运行Terraform部署过程"""
         
@@ -2330,7 +2410,8 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
         def should_stop_deployment():
             """检查是否应该停止部署"""
             stop_file = os.path.join(deploy_dir, '.stop_deployment')
-            return os.path.exists(stop_file) or deploy_id not in self.active_deployments
+            return (os.path.exists(stop_file) or deploy_id not in self.active_deployments
+                    or get_job_runner().is_cancelled(deploy_id))
         
         # 记录执行过程中的所有重要信息，用于创建摘要日志
         deployment_logs = {
@@ -2424,7 +2505,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 deployment_logs['error_message'] = error_msg
                 deployment_logs['status'] = 'failed'
                 create_deployment_summary(is_success=False)
-                self.deployment_model.update_deployment_status(
+                self._set_deployment_status(
                     deploy_id, 
                     'failed', 
                     error_message=error_msg
@@ -2438,7 +2519,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 deployment_logs['error_message'] = error_msg
                 deployment_logs['status'] = 'failed'
                 create_deployment_summary(is_success=False)
-                self.deployment_model.update_deployment_status(
+                self._set_deployment_status(
                     deploy_id, 
                     'failed', 
                     error_message=error_msg
@@ -2453,7 +2534,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 deployment_logs['error_message'] = error_msg
                 deployment_logs['status'] = 'failed'
                 create_deployment_summary(is_success=False)
-                self.deployment_model.update_deployment_status(
+                self._set_deployment_status(
                     deploy_id, 
                     'failed', 
                     error_message=error_msg
@@ -2472,7 +2553,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                     deployment_logs['error_message'] = '用户手动停止部署'
                     deployment_logs['status'] = 'stopped'
                     create_deployment_summary(is_success=False)
-                    self.deployment_model.update_deployment_status(
+                    self._set_deployment_status(
                         deploy_id, 
                         'failed', 
                         error_message='用户手动停止部署'
@@ -2482,7 +2563,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 # 如果不是第一次尝试，更新状态为重试中
                 if retry_count > 0:
                     self.logger.info(f"第{retry_count}次重试部署: {deploy_id}")
-                    self.deployment_model.update_deployment_status(
+                    self._set_deployment_status(
                         deploy_id, 
                         'planning', 
                         error_message=f"第{retry_count}次重试，正在重新生成Terraform代码"
@@ -2491,17 +2572,17 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 
                 # 更新部署状态为"initializing"
                 self.logger.info(f"更新部署状态为initializing: {deploy_id}")
-                self.deployment_model.update_deployment_status(deploy_id, 'initializing')
+                self._set_deployment_status(deploy_id, 'initializing')
                 
                 # 运行terraform init
                 self.logger.info(f"开始初始化Terraform: {deploy_id}")
                 try:
-                    init_result = subprocess.run(
-                        ['terraform', 'init'],
-                        cwd=deploy_dir,
-                        capture_output=True,
-                        text=True
-                    )
+                    # 从共享插件缓存链接provider（重试时代码可能已修改，每次都重新准备）
+                    plugin_cache = get_plugin_cache()
+                    init_mode = plugin_cache.prepare_workdir(deploy_dir)
+                    init_start_time = time.time()
+                    init_result = run_streaming(['terraform', 'init'], cwd=deploy_dir, deploy_id=deploy_id, phase='init')
+                    plugin_cache.record_init(init_mode, time.time() - init_start_time, init_result.returncode == 0)
                     
                     # 记录输出
                     deployment_logs['init_output'] = init_result.stdout
@@ -2516,7 +2597,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                                 self.logger.info(f"执行terraform destroy清理之前可能存在的资源: {deploy_id}")
                                 try:
                                     # 更新部署状态
-                                    self.deployment_model.update_deployment_status(
+                                    self._set_deployment_status(
                                         deploy_id, 
                                         'cleaning', 
                                         error_message=f"清理之前可能部署的资源，准备重新部署"
@@ -2568,7 +2649,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                                 
                                 retry_count += 1
                                 # 更新部署状态，告知用户正在修复
-                                self.deployment_model.update_deployment_status(
+                                self._set_deployment_status(
                                     deploy_id, 
                                     'planning', 
                                     error_message=f"检测到Terraform初始化错误，已自动修复并重试 ({retry_count}/{max_retries})"
@@ -2586,7 +2667,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                             self.logger.info(f"达到最大重试次数({max_retries})，尝试清理可能存在的资源")
                             try:
                                 # 更新状态为清理中
-                                self.deployment_model.update_deployment_status(
+                                self._set_deployment_status(
                                     deploy_id, 
                                     'cleaning', 
                                     error_message=f"达到最大重试次数，正在清理已部署资源"
@@ -2625,7 +2706,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                         deployment_logs['error_message'] = error_msg
                         deployment_logs['status'] = 'failed'
                         create_deployment_summary(is_success=False)
-                        self.deployment_model.update_deployment_status(
+                        self._set_deployment_status(
                             deploy_id, 
                             'failed', 
                             error_message=error_msg
@@ -2639,7 +2720,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                     deployment_logs['error_message'] = error_msg
                     deployment_logs['status'] = 'failed'
                     create_deployment_summary(is_success=False)
-                    self.deployment_model.update_deployment_status(
+                    self._set_deployment_status(
                         deploy_id, 
                         'failed', 
                         error_message=error_msg
@@ -2648,17 +2729,13 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 
                 # 更新部署状态为"planning"
                 self.logger.info(f"更新部署状态为planning: {deploy_id}")
-                self.deployment_model.update_deployment_status(deploy_id, 'planning')
+                self._set_deployment_status(deploy_id, 'planning')
                 
                 # 运行terraform plan
                 self.logger.info(f"开始Terraform规划: {deploy_id}")
                 try:
-                    plan_result = subprocess.run(
-                        ['terraform', 'plan', '-out=tfplan'],
-                        cwd=deploy_dir,
-                        capture_output=True,
-                        text=True
-                    )
+                    plan_result = run_streaming(['terraform', 'plan', '-out=tfplan'], cwd=deploy_dir,
+                                                deploy_id=deploy_id, phase='plan')
                     
                     # 记录输出
                     deployment_logs['plan_output'] = plan_result.stdout
@@ -2673,7 +2750,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                                 self.logger.info(f"执行terraform destroy清理之前可能存在的资源: {deploy_id}")
                                 try:
                                     # 更新部署状态
-                                    self.deployment_model.update_deployment_status(
+                                    self._set_deployment_status(
                                         deploy_id, 
                                         'cleaning', 
                                         error_message=f"清理之前可能部署的资源，准备重新部署"
@@ -2725,7 +2802,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                                 
                                 retry_count += 1
                                 # 更新部署状态，告知用户正在修复
-                                self.deployment_model.update_deployment_status(
+                                self._set_deployment_status(
                                     deploy_id, 
                                     'planning', 
                                     error_message=f"检测到Terraform规划错误，已自动修复并重试 ({retry_count}/{max_retries})"
@@ -2743,7 +2820,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                             self.logger.info(f"达到最大重试次数({max_retries})，尝试清理可能存在的资源")
                             try:
                                 # 更新状态为清理中
-                                self.deployment_model.update_deployment_status(
+                                self._set_deployment_status(
                                     deploy_id, 
                                     'cleaning', 
                                     error_message=f"达到最大重试次数，正在清理已部署资源"
@@ -2782,7 +2859,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                         deployment_logs['error_message'] = error_msg
                         deployment_logs['status'] = 'failed'
                         create_deployment_summary(is_success=False)
-                        self.deployment_model.update_deployment_status(
+                        self._set_deployment_status(
                             deploy_id, 
                             'failed', 
                             error_message=error_msg
@@ -2796,7 +2873,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                     deployment_logs['error_message'] = error_msg
                     deployment_logs['status'] = 'failed'
                     create_deployment_summary(is_success=False)
-                    self.deployment_model.update_deployment_status(
+                    self._set_deployment_status(
                         deploy_id, 
                         'failed', 
                         error_message=error_msg
@@ -2805,17 +2882,13 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 
                 # 更新部署状态为"applying"
                 self.logger.info(f"更新部署状态为applying: {deploy_id}")
-                self.deployment_model.update_deployment_status(deploy_id, 'applying')
+                self._set_deployment_status(deploy_id, 'applying')
                 
                 # 运行terraform apply
                 self.logger.info(f"开始应用Terraform配置: {deploy_id}")
                 try:
-                    apply_result = subprocess.run(
-                        ['terraform', 'apply', '-auto-approve', 'tfplan'],
-                        cwd=deploy_dir,
-                        capture_output=True,
-                        text=True
-                    )
+                    apply_result = run_streaming(['terraform', 'apply', '-auto-approve', 'tfplan'], cwd=deploy_dir,
+                                                 deploy_id=deploy_id, phase='apply')
                     
                     # 记录输出
                     deployment_logs['apply_output'] = apply_result.stdout
@@ -2832,7 +2905,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                             self.logger.info(f"执行terraform destroy清理之前的部署资源: {deploy_id}")
                             try:
                                 # 更新部署状态，告知用户正在清理资源
-                                self.deployment_model.update_deployment_status(
+                                self._set_deployment_status(
                                     deploy_id, 
                                     'cleaning', 
                                     error_message=f"清理之前部署的资源，准备重新部署"
@@ -2893,7 +2966,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                                 
                                 retry_count += 1
                                 # 更新部署状态，告知用户正在修复
-                                self.deployment_model.update_deployment_status(
+                                self._set_deployment_status(
                                     deploy_id, 
                                     'planning', 
                                     error_message=f"检测到Terraform应用错误，已自动修复并重试 ({retry_count}/{max_retries})"
@@ -2911,7 +2984,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                             self.logger.info(f"达到最大重试次数({max_retries})，清理已部署资源")
                             try:
                                 # 更新状态为清理中
-                                self.deployment_model.update_deployment_status(
+                                self._set_deployment_status(
                                     deploy_id, 
                                     'cleaning', 
                                     error_message=f"达到最大重试次数，正在清理已部署资源"
@@ -2950,7 +3023,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                         deployment_logs['error_message'] = error_msg
                         deployment_logs['status'] = 'failed'
                         create_deployment_summary(is_success=False)
-                        self.deployment_model.update_deployment_status(
+                        self._set_deployment_status(
                             deploy_id, 
                             'failed', 
                             error_message=error_msg
@@ -2967,7 +3040,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                     deployment_logs['error_message'] = error_msg
                     deployment_logs['status'] = 'failed'
                     create_deployment_summary(is_success=False)
-                    self.deployment_model.update_deployment_status(
+                    self._set_deployment_status(
                         deploy_id, 
                         'failed', 
                         error_message=error_msg
@@ -3005,7 +3078,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                     'auto_fixed': retry_count > 0
                 }
                 self.logger.info(f"更新部署状态为completed: {deploy_id}")
-                self.deployment_model.update_deployment_status(
+                self._set_deployment_status(
                     deploy_id, 
                     'completed',
                     deployment_summary=json.dumps(deployment_summary)
@@ -3020,7 +3093,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 deployment_logs['error_message'] = error_msg
                 deployment_logs['status'] = 'failed'
                 create_deployment_summary(is_success=False)
-                self.deployment_model.update_deployment_status(
+                self._set_deployment_status(
                     deploy_id, 
                     'failed', 
                     error_message=error_msg
@@ -3037,7 +3110,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
             deployment_logs['status'] = 'failed'
             create_deployment_summary(is_success=False)
             
-            self.deployment_model.update_deployment_status(
+            self._set_deployment_status(
                 deploy_id, 
                 'failed', 
                 error_message=error_msg
@@ -3348,20 +3421,42 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 log_file.write("\n")
             return None
     
+    def _set_deployment_status(self, deploy_id, status, error_message=None, deployment_summary=None):
+        """更新部署状态：立即更新状态注册表，数据库写入交给后台线程异步执行"""
+        if self.status_store.get(deploy_id) is None:
+            # 首次更新前从数据库加载完整的部署记录，此时还没有待写入的状态
+            self.status_store.load(deploy_id, lambda: self.deployment_model.get_deployment(deploy_id) or {})
+        
+        fields = {'status': status, 'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        if error_message is not None:
+            fields['error_message'] = error_message
+        if deployment_summary is not None:
+            try:
+                fields['deployment_summary'] = json.loads(deployment_summary)
+            except (TypeError, ValueError):
+                fields['deployment_summary'] = deployment_summary
+        self.status_store.update(deploy_id, fields)
+        
+        self.status_store.persist(self.deployment_model.update_deployment_status, deploy_id, status,
+                                  error_message=error_message, deployment_summary=deployment_summary)
+    
     def get_deployment_status(self, deploy_id):
-        """获取部署状态"""
+        """获取部署状态
+        
+        状态来自内存中的部署状态注册表，支持 If-None-Match 条件请求（未变化时返回304），
+        带 wait 参数时长轮询等待状态变化
+        """
         try:
             if not deploy_id:
                 return jsonify({"success": False, "message": "部署ID为空"}), 400
                 
-            deployment = self.deployment_model.get_deployment(deploy_id)
-            if not deployment:
+            response = status_response(self.status_store, deploy_id,
+                                       lambda: self.deployment_model.get_deployment(deploy_id),
+                                       render=lambda deployment: {"success": True, "deployment": deployment})
+            if response is None:
                 return jsonify({"success": False, "message": "未找到部署信息"}), 404
                 
-            return jsonify({
-                "success": True,
-                "deployment": deployment
-            })
+            return response
             
         except Exception as e:
             self.logger.error(f"获取部署状态时出错: {str(e)}")
@@ -3685,7 +3780,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 
             # 更新部署记录
             try:
-                self.deployment_model.update_deployment_status(
+                self._set_deployment_status(
                     deploy_id, 
                     'pending',
                     error_message=None,
@@ -3705,6 +3800,7 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                     conn.commit()
                     cursor.close()
                     conn.close()
+                    self.status_store.update(deploy_id, {'terraform_code': terraform_code})
             except Exception as update_error:
                 self.logger.error(f"更新部署记录时出错: {str(update_error)}")
                 return jsonify({"success": False, "message": f"更新部署记录时出错: {str(update_error)}"}), 500
@@ -3715,15 +3811,11 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 current_user = get_current_user(request)
                 user_id = current_user.get('user_id') if current_user else None
                 
-                # 启动后台部署任务
-                self.logger.info(f"启动后台部署任务: {deploy_id}")
-                import threading
-                deploy_thread = threading.Thread(
-                    target=self._run_terraform_deployment,
-                    args=(deploy_id, deploy_dir, user_id)
-                )
-                deploy_thread.daemon = True
-                deploy_thread.start()
+                # 提交到部署任务执行器
+                self.logger.info(f"提交后台部署任务: {deploy_id}")
+                job_error = self._submit_deployment_job(deploy_id, deploy_dir, user_id)
+                if job_error:
+                    return job_error
                 
                 return jsonify({
                     "success": True,
@@ -4321,6 +4413,17 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
             deployment_info = self.active_deployments[deploy_id]
             deploy_dir = deployment_info.get('deploy_dir')
             
+            # 取消执行器中的任务：排队中的任务不会再执行，运行中的任务在下个检查点停止
+            job = get_job_runner().get_job(deploy_id)
+            was_queued = job is not None and job.state == JobState.QUEUED
+            get_job_runner().cancel(deploy_id)
+            if was_queued:
+                self._set_deployment_status(
+                    deploy_id,
+                    'failed',
+                    error_message='用户手动停止部署'
+                )
+            
             # 创建停止信号文件
             if deploy_dir and os.path.exists(deploy_dir):
                 stop_file = os.path.join(deploy_dir, '.stop_deployment')
@@ -4346,6 +4449,34 @@ system_volume_type = "ESSD_PL0"   # Recommended system volume type
                 'message': f'停止部署时出错: {str(e)}'
             }
 
+    def get_deployment_jobs(self):
+        """获取部署任务执行器状态以及当前用户的任务列表"""
+        current_user = getattr(request, 'current_user', None) or {}
+        runner = get_job_runner()
+        return jsonify({
+            "success": True,
+            "stats": runner.metrics(),
+            "jobs": runner.list_jobs(user_id=current_user.get('user_id'))
+        })
+
+    def cancel_deployment_job(self, job_id):
+        """取消部署任务（包括DeployController、TemplateController提交的任务）"""
+        current_user = getattr(request, 'current_user', None) or {}
+        job = get_job_runner().get_job(job_id)
+        if job is None:
+            return jsonify({"success": False, "message": "没有找到部署任务"}), 404
+        if job.user_id is not None and str(job.user_id) != str(current_user.get('user_id')):
+            return jsonify({"success": False, "message": "无权取消该部署任务"}), 403
+        
+        # AI部署还需要写停止信号文件并更新部署记录
+        if job_id in self.active_deployments:
+            result = self.stop_deployment(job_id)
+            return jsonify(result), (200 if result['success'] else 400)
+        
+        if not get_job_runner().cancel(job_id):
+            return jsonify({"success": False, "message": f"部署任务已结束: {job.state}"}), 400
+        return jsonify({"success": True, "message": "部署任务已取消", "job": job.to_dict()})
+
     def _add_cloud_credentials_to_code(self, terraform_code, ak, sk):
         """智能检测云平台并添加相应凭证"""
         # 检测Terraform代码中的云平台类型
@@ -1,6 +1,5 @@
 import os
 import sys
-import pymysql
 import logging
 import traceback
 import time
@@ -12,6 +11,7 @@ project_dir = os.path.dirname(backend_dir)
 sys.path.append(project_dir)
 
 from config.config import Config
+from db.pool import get_pool
 
 class Database:
     def __init__(self, config=None):
@@ -47,24 +47,16 @@ class Database:
                     # 这样在运行时可能会恢复连接
     
     def _get_connection(self, test_connection=False):
-        """获取数据库连接"""
+        """从连接池借出数据库连接，使用完毕后调用 close() 归还"""
         try:
-            connection = pymysql.connect(
-                host=self.config.db_host,
-                user=self.config.db_user,
-                password=self.config.db_password,
-                database=self.config.db_name,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor,
-                connect_timeout=5  # 设置连接超时时间
-            )
-            
-            # 如果是测试连接，执行一个简单查询
-            if test_connection:
-                with connection.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-            
-            return connection
+            pool = get_pool({
+                'host': self.config.db_host,
+                'user': self.config.db_user,
+                'password': self.config.db_password,
+                'database': self.config.db_name
+            })
+            # 借出时连接池会做健康检查，失效连接会自动重建
+            return pool.get_connection()
         except Exception as e:
             self.logger.error(f"数据库连接失败: {e}")
             self.logger.error(traceback.format_exc())
@@ -1,57 +1,45 @@
-import pymysql
 import logging
 
 # 使用相对导入 (从 backend 包的根目录开始)
 from config.config import Config
+from db.pool import get_pool, close_all_pools
 
-db_connection = None
+db_pool = None
 
 def init_db(config: Config):
-    """初始化数据库连接"""
-    global db_connection
+    """初始化数据库连接池"""
+    global db_pool
     try:
-        db_connection = pymysql.connect(
-            host=config.db_host,
-            user=config.db_user,
-            password=config.db_password,
-            database=config.db_name,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        db_pool = get_pool({
+            'host': config.db_host,
+            'user': config.db_user,
+            'password': config.db_password,
+            'database': config.db_name
+        })
+        # 借出一个连接验证数据库可用
+        conn = db_pool.get_connection()
+        conn.close()
         logging.info("数据库连接成功")
         return None
-    except pymysql.MySQLError as e:
+    except Exception as e:
         logging.error(f"数据库连接失败: {e}")
-        db_connection = None
         return str(e)
 
 def get_db():
-    """获取数据库连接"""
-    global db_connection
-    if db_connection is None:
+    """从连接池借出数据库连接
+
+    借出时连接池会做健康检查并自动重建失效连接。调用 close() 将连接归还连接池，
+    未显式关闭的连接会在对象回收时自动归还。
+    """
+    if db_pool is None:
         logging.error("数据库未连接")
         raise Exception("数据库未连接")
-    try:
-        # 检查连接是否仍然有效
-        db_connection.ping(reconnect=True)
-    except pymysql.MySQLError:
-        logging.warning("数据库连接丢失，尝试重新连接...")
-        # 尝试重新加载配置并重新连接（这部分可能需要更健壮的实现）
-        # 使用相对导入
-        from ..config.config import load_config
-        config = load_config()
-        init_db(config)
-        if db_connection is None:
-            logging.error("重新连接数据库失败")
-            raise Exception("重新连接数据库失败")
-        logging.info("数据库重新连接成功")
-        
-    return db_connection
+    return db_pool.get_connection()
 
 def close_db():
-    """关闭数据库连接"""
-    global db_connection
-    if db_connection:
-        db_connection.close()
-        db_connection = None
+    """关闭数据库连接池"""
+    global db_pool
+    if db_pool:
+        close_all_pools()
+        db_pool = None
         logging.info("数据库连接已关闭")
-
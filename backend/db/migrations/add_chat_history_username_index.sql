@@ -0,0 +1,24 @@
+-- 数据库优化脚本
+-- 为chat_history表添加 (username, created_at, id) 复合索引，支持聊天历史按游标分页
+
+-- 检查索引是否已存在
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'chat_history'
+    AND INDEX_NAME = 'idx_chat_history_username_created_id'
+);
+
+-- 如果不存在，则在线添加索引（不锁表写入）
+SET @query = IF(@index_exists = 0,
+    'ALTER TABLE chat_history ADD INDEX idx_chat_history_username_created_id (username, created_at, id), ALGORITHM=INPLACE, LOCK=NONE',
+    'SELECT "idx_chat_history_username_created_id already exists on chat_history table"'
+);
+
+PREPARE stmt FROM @query;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- 查看索引
+SHOW INDEX FROM chat_history;
@@ -0,0 +1,347 @@
+import threading
+import time
+import logging
+
+from config.config import Config
+
+
+class PoolExhaustedError(Exception):
+    """在借出超时时间内连接池没有可用连接"""
+    pass
+
+
+class PooledConnection:
+    """连接池借出的连接代理
+
+    除 close/上下文管理外，所有属性都透传给底层驱动连接，因此现有的
+    ``conn.cursor()``、``conn.commit()`` 等代码无需修改。``close()`` 不会真正
+    断开连接，而是把连接归还给连接池。
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        """归还连接到连接池"""
+        if not self._released:
+            self._released = True
+            self._pool._release(self._raw, self._created_at)
+
+    def is_connected(self):
+        """连接已归还后视为断开，兼容 mysql.connector 的调用方式"""
+        return not self._released
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            try:
+                self._raw.rollback()
+            except Exception:
+                pass
+        self.close()
+        return False
+
+    def __del__(self):
+        # 调用方忘记 close() 时，在对象回收时把连接还给连接池，避免连接泄漏
+        try:
+            if not self._released:
+                self._released = True
+                self._pool._release(self._raw, self._created_at, reclaimed=True)
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """线程安全的数据库连接池
+
+    - 固定上限的连接数，借出时超过上限则等待，超时抛出 PoolExhaustedError
+    - 借出时做健康检查（ping），失效连接会被丢弃并重建
+    - 连接存活超过 max_lifetime 秒后回收重建，避免被 MySQL wait_timeout 断开
+    - 统计借出等待时间、使用中连接数、连接耗尽次数等指标
+    """
+
+    def __init__(self, connect_func, size=10, max_lifetime=3600, timeout=10, name='default'):
+        """初始化连接池
+
+        Args:
+            connect_func: 创建底层连接的无参函数
+            size: 连接池最大连接数
+            max_lifetime: 单个连接的最大存活秒数，<=0 表示不限制
+            timeout: 借出连接的默认等待秒数
+            name: 连接池名称，用于日志和指标
+        """
+        self._connect_func = connect_func
+        self.size = max(1, int(size))
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+
+        # 使用可重入锁：__del__ 回收连接可能发生在持锁期间的垃圾回收中
+        self._cond = threading.Condition(threading.RLock())
+        # 空闲连接栈，元素为 (原始连接, 创建时间)；后进先出以优先复用热连接
+        self._idle = []
+        self._in_use = 0
+        self._closed = False
+
+        # 指标
+        self._borrow_count = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._exhausted_events = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._health_check_failures = 0
+        self._reclaimed = 0
+
+    def get_connection(self, timeout=None):
+        """从连接池借出一个连接
+
+        Args:
+            timeout: 等待秒数，默认使用连接池配置
+
+        Returns:
+            PooledConnection: 使用完毕后调用 close() 归还
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        raw = None
+        created_at = None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolExhaustedError(f"连接池 {self.name} 已关闭")
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._in_use < self.size:
+                    # 预占一个名额，连接在锁外创建
+                    break
+                if not waited:
+                    waited = True
+                    self._exhausted_events += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhaustedError(
+                        f"连接池 {self.name} 已耗尽: {self._in_use}/{self.size} 个连接正在使用，等待 {timeout} 秒超时"
+                    )
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        recycled = unhealthy = created = False
+        try:
+            if raw is not None and self._is_expired(created_at):
+                recycled = True
+                self._close_raw(raw)
+                raw = None
+            if raw is not None and not self._health_check(raw):
+                unhealthy = True
+                self._close_raw(raw)
+                raw = None
+            if raw is None:
+                raw = self._connect_func()
+                created_at = time.monotonic()
+                created = True
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        wait_time = time.monotonic() - start
+        with self._cond:
+            self._borrow_count += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+            self._recycled += recycled
+            self._health_check_failures += unhealthy
+            self._created += created
+
+        return PooledConnection(self, raw, created_at)
+
+    def _release(self, raw, created_at, reclaimed=False):
+        """归还连接，结束未提交的事务，过期或失效的连接直接关闭"""
+        discard = self._closed or self._is_expired(created_at)
+        if not discard:
+            try:
+                # 回滚未提交的事务，避免下一个借用者读到旧快照或继承锁
+                raw.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if reclaimed:
+                self._reclaimed += 1
+            if not discard:
+                self._idle.append((raw, created_at))
+            self._cond.notify()
+
+        if discard:
+            self._close_raw(raw)
+        if reclaimed:
+            self.logger.debug(f"连接池 {self.name} 回收了一个未显式关闭的连接")
+
+    def _is_expired(self, created_at):
+        if not self.max_lifetime or self.max_lifetime <= 0:
+            return False
+        return time.monotonic() - created_at > self.max_lifetime
+
+    def _health_check(self, raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception as e:
+            self.logger.warning(f"连接池 {self.name} 健康检查失败，重建连接: {e}")
+            return False
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def metrics(self):
+        """返回连接池指标"""
+        with self._cond:
+            return {
+                'name': self.name,
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'borrow_count': self._borrow_count,
+                'borrow_wait_avg_ms': round(self._wait_time_total / self._borrow_count * 1000, 3) if self._borrow_count else 0.0,
+                'borrow_wait_max_ms': round(self._wait_time_max * 1000, 3),
+                'exhausted_events': self._exhausted_events,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'health_check_failures': self._health_check_failures,
+                'reclaimed': self._reclaimed,
+            }
+
+    def close_all(self):
+        """关闭连接池中的所有空闲连接，使用中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._close_raw(raw)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pymysql_connect_func(db_config, connect_timeout):
+    import pymysql
+
+    def connect():
+        return pymysql.connect(
+            host=db_config['host'],
+            user=db_config['user'],
+            password=db_config['password'],
+            database=db_config['database'],
+            port=int(db_config.get('port', 3306)),
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            connect_timeout=connect_timeout
+        )
+    return connect
+
+
+def _mysql_connector_connect_func(db_config, connect_timeout):
+    import mysql.connector
+
+    def connect():
+        kwargs = dict(db_config)
+        kwargs.setdefault('connection_timeout', connect_timeout)
+        return mysql.connector.connect(**kwargs)
+    return connect
+
+
+_DRIVERS = {
+    'pymysql': _pymysql_connect_func,
+    'mysql.connector': _mysql_connector_connect_func,
+}
+
+
+def get_pool(db_config=None, driver='pymysql'):
+    """获取（必要时创建）共享连接池
+
+    相同驱动和数据库地址的调用方共享同一个连接池。
+
+    Args:
+        db_config: 数据库配置，包含host, user, password, database等参数；
+            为空时使用 Config 中的数据库配置
+        driver: 'pymysql'（返回字典游标）或 'mysql.connector'
+
+    Returns:
+        ConnectionPool
+    """
+    if driver not in _DRIVERS:
+        raise ValueError(f"不支持的数据库驱动: {driver}")
+
+    config = None
+    if db_config is None:
+        config = Config()
+        db_config = {
+            'host': config.db_host,
+            'user': config.db_user,
+            'password': config.db_password,
+            'database': config.db_name
+        }
+
+    key = (driver, db_config.get('host'), db_config.get('port', 3306),
+           db_config.get('user'), db_config.get('database'))
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            config = config or Config()
+            pool = ConnectionPool(
+                _DRIVERS[driver](db_config, config.db_connect_timeout),
+                size=config.db_pool_size,
+                max_lifetime=config.db_pool_max_lifetime,
+                timeout=config.db_pool_timeout,
+                name=f"{driver}://{db_config.get('host')}/{db_config.get('database')}"
+            )
+            _pools[key] = pool
+            logging.getLogger(__name__).info(
+                f"创建数据库连接池 {pool.name}，大小: {pool.size}，最大存活: {pool.max_lifetime}秒"
+            )
+    return pool
+
+
+def get_pool_metrics():
+    """返回所有连接池的指标"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.metrics() for pool in pools]
+
+
+def close_all_pools():
+    """关闭所有连接池"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
@@ -1,92 +1,132 @@
+from collections import deque
 from typing import Dict, List, Optional, Tuple, Any, Union
-import mysql.connector
 from datetime import datetime
+import threading
 
+from db.pool import get_pool
 from messages import BaseMessage, OpenAIMessage
+from utils.write_behind import get_write_behind_writer
 from .base import AgentMemory, BaseContextCreator
 from .records import MemoryRecord, ContextRecord
+from .token_counter import TOKENS_PER_REPLY, TokenCounter, get_token_counter
+
+
+def _to_message_dict(message: Any) -> Dict[str, Any]:
+    """Convert a stored message to OpenAI message format."""
+    # 处理 BaseMessage 对象
+    if hasattr(message, 'role_type') and hasattr(message, 'content'):
+        # 将 BaseMessage 转换为 OpenAI 消息格式
+        return {"role": message.role_type.lower(), "content": message.content}
+    
+    # 处理字典格式的消息，保留原始消息
+    if isinstance(message, dict):
+        return message
+    
+    # 尝试其他可能的格式
+    try:
+        if hasattr(message, "get"):
+            content = message.get("content", "")
+        elif hasattr(message, "content"):
+            content = message.content
+        else:
+            content = str(message)
+    except Exception:
+        content = str(message)
+    return {"role": getattr(message, "role", "user"), "content": content}
 
 
 class SimpleContextCreator(BaseContextCreator):
     """A simple context creator that selects messages based on token limit.
     
-    This class implements a basic strategy for creating context from memory records.
+    This class implements a basic strategy for creating context from memory records:
+    it keeps the most recent records whose tokens fit within the token limit.
+    Token counts come from the model's tiktoken encoding and are cached on each
+    record under ``token_count``, so every record is tokenized only once.
     """
     
-    def __init__(self, token_limit_value: int = 4000):
+    def __init__(self, token_limit_value: int = 4000, token_counter: Optional[TokenCounter] = None):
         """Initialize the SimpleContextCreator.
         
         Args:
             token_limit_value (int): Maximum number of tokens allowed in context.
+            token_counter (Optional[TokenCounter]): Counter used to measure messages.
         """
         self._token_limit = token_limit_value
+        self.token_counter = token_counter or get_token_counter()
         
     @property
     def token_limit(self) -> int:
         """Returns the maximum number of tokens allowed in the generated context."""
         return self._token_limit
+    
+    @property
+    def message_budget(self) -> int:
+        """Tokens available for messages once the reply priming is reserved."""
+        return self._token_limit - TOKENS_PER_REPLY
+    
+    def record_tokens(self, record: Dict[str, Any]) -> int:
+        """Returns the token count of a record, computing and caching it on first use.
+        
+        Args:
+            record (Dict[str, Any]): A context record.
+            
+        Returns:
+            int: Number of prompt tokens the record's message takes up.
+        """
+        tokens = record.get("token_count")
+        if tokens is None:
+            tokens = self.token_counter.count_message(_to_message_dict(record.get("message", {})))
+            record["token_count"] = tokens
+        return tokens
         
     def create_context(
         self,
         records: List[Dict[str, Any]],
+        budget: Optional[int] = None,
     ) -> Tuple[List[OpenAIMessage], int]:
         """Creates conversational context from the provided records.
         
-        This implementation simply takes the most recent records that fit within
-        the token limit. A more sophisticated implementation would use token counting.
+        Records are taken from the most recent backwards until the token limit
+        is reached, then returned in chronological order. If the most recent
+        message alone exceeds the limit, its content is trimmed to fit,
+        keeping the end of the message.
         
         Args:
             records (List[Dict[str, Any]]): A list of context records.
+            budget (Optional[int]): Tokens the messages may use. Defaults to
+                ``message_budget``; callers that add their own messages to the
+                prompt pass what is left of it.
             
         Returns:
             Tuple[List[OpenAIMessage], int]: A tuple containing the constructed
-                context in OpenAIMessage format and the estimated token count.
+                context in OpenAIMessage format and the total token count.
         """
+        if budget is None:
+            budget = self.message_budget
+        budget = max(0, min(budget, self.message_budget))
         messages = []
         total_tokens = 0
         
-        # Simple token estimation (very rough)
-        for record in records:
-            # 从记录中获取消息对象
-            message = record.get("message", {})
-            
-            # 处理 BaseMessage 对象
-            if hasattr(message, 'role_type') and hasattr(message, 'content'):
-                # 如果是 BaseMessage 对象，转换为字典格式
-                role = message.role_type.lower()
-                content = message.content
-                # 将 BaseMessage 转换为 OpenAI 消息格式
-                message_dict = {"role": role, "content": content}
-                # 使用字典格式进行估算
-                estimated_tokens = len(content) // 4
-            else:
-                # 处理字典格式的消息
-                content = ""
-                if isinstance(message, dict) and "content" in message:
-                    content = message.get("content", "")
-                else:
-                    # 尝试其他可能的格式
-                    try:
-                        if hasattr(message, "get"):
-                            content = message.get("content", "")
-                        elif hasattr(message, "content"):
-                            content = message.content
-                        else:
-                            content = str(message)
-                    except:
-                        content = str(message)
-                
-                message_dict = message  # 保留原始消息
-                # 估算 tokens
-                estimated_tokens = len(content) // 4
+        for record in reversed(records):
+            tokens = self.record_tokens(record)
+            if total_tokens + tokens <= budget:
+                messages.append(_to_message_dict(record.get("message", {})))
+                total_tokens += tokens
+                continue
             
-            if total_tokens + estimated_tokens <= self.token_limit:
-                messages.append(message_dict)
-                total_tokens += estimated_tokens
-            else:
-                break
-                
-        return messages, total_tokens
+            if not messages:
+                # 最新的一条消息本身就超出预算：截断内容而不是发送超长的提示
+                message = dict(_to_message_dict(record.get("message", {})))
+                overhead = tokens - self.token_counter.count(str(message.get("content") or ""))
+                message["content"] = self.token_counter.truncate(
+                    str(message.get("content") or ""), budget - overhead
+                )
+                messages.append(message)
+                total_tokens += self.token_counter.count_message(message)
+            break
+        
+        messages.reverse()
+        return messages, total_tokens + (TOKENS_PER_REPLY if messages else 0)
 
 
 class ChatHistoryMemory(AgentMemory):
@@ -94,13 +134,23 @@ class ChatHistoryMemory(AgentMemory):
     
     This class implements the AgentMemory interface for chat history storage.
     It can store messages in memory or in a MySQL database.
+    
+    Besides the full history, the memory maintains a window of the most recent
+    records that fit within the token limit. The window is updated as messages
+    are written, so building context only touches the records in the window.
+    With a database, the window is filled once from the newest stored messages
+    instead of reading the whole history on every retrieval.
     """
     
+    # Rows fetched per query when filling the window from the database
+    DB_PAGE_SIZE = 50
+    
     def __init__(
         self, 
         agent_id_value: Optional[str] = None,
         db_config: Optional[Dict[str, Any]] = None,
-        token_limit: int = 4000
+        token_limit: int = 4000,
+        model_name: Optional[str] = None
     ):
         """Initialize the ChatHistoryMemory.
         
@@ -108,23 +158,33 @@ class ChatHistoryMemory(AgentMemory):
             agent_id_value (Optional[str]): ID of the agent using this memory.
             db_config (Optional[Dict[str, Any]]): MySQL database configuration.
             token_limit (int): Maximum token limit for context creation.
+            model_name (Optional[str]): Model whose tokenizer is used to count tokens.
         """
         self._agent_id = agent_id_value
         self._db_config = db_config
         self._token_limit = token_limit
         self._messages = []
-        self._context_creator = SimpleContextCreator(token_limit)
+        self._context_creator = SimpleContextCreator(token_limit, get_token_counter(model_name))
         
-        # Initialize database connection if config is provided
-        self._db_connection = None
+        # 按 token 预算增量维护的最近消息窗口
+        self._lock = threading.RLock()
+        self._window = deque()
+        self._window_tokens = 0
+        self._db_loaded = False
+        
+        # Initialize the shared connection pool if config is provided
+        self._db_pool = None
+        self._db_writer = None
         if db_config:
             self._init_db_connection()
             
     def _init_db_connection(self):
-        """Initialize the database connection and create tables if needed."""
+        """Initialize the database connection pool and create tables if needed."""
+        conn = None
         try:
-            self._db_connection = mysql.connector.connect(**self._db_config)
-            cursor = self._db_connection.cursor()
+            self._db_pool = get_pool(self._db_config, driver='mysql.connector')
+            conn = self._db_pool.get_connection()
+            cursor = conn.cursor()
             
             # Create chat_history table if it doesn't exist
             cursor.execute("""
@@ -137,11 +197,25 @@ class ChatHistoryMemory(AgentMemory):
                     metadata TEXT
                 )
             """)
-            self._db_connection.commit()
+            conn.commit()
             cursor.close()
+            
+            # Shared by every memory on this pool; timestamps are UTC and converted by MySQL
+            self._db_writer = get_write_behind_writer(
+                "chat-memory",
+                """
+                INSERT INTO chat_history 
+                (agent_id, role, content, timestamp, metadata)
+                VALUES (%s, %s, %s, CONVERT_TZ(%s, '+00:00', @@session.time_zone), %s)
+                """,
+                connection_factory=self._db_pool.get_connection
+            )
         except Exception as e:
             print(f"Database connection error: {str(e)}")
-            self._db_connection = None
+            self._db_pool = None
+        finally:
+            if conn:
+                conn.close()
     
     @property
     def agent_id(self) -> Optional[str]:
@@ -153,6 +227,80 @@ class ChatHistoryMemory(AgentMemory):
         """Sets the agent ID associated with this memory."""
         self._agent_id = val
     
+    def _append_to_window(self, record: Dict[str, Any]) -> None:
+        """Adds a record to the context window and evicts the oldest records over budget."""
+        self._window.append(record)
+        self._window_tokens += self._context_creator.record_tokens(record)
+        
+        # 始终保留最新的一条记录，超长时由 create_context 截断
+        while self._window_tokens > self._context_creator.message_budget and len(self._window) > 1:
+            evicted = self._window.popleft()
+            self._window_tokens -= evicted["token_count"]
+    
+    def _load_window_from_db(self) -> None:
+        """Fills the context window with the newest stored messages, once."""
+        if self._db_loaded:
+            return
+        self._db_loaded = True
+        if not (self._db_pool and self._agent_id):
+            return
+        
+        conn = None
+        try:
+            conn = self._db_pool.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            # 从最新的消息往前分页读取，直到填满 token 预算
+            records = []
+            tokens = 0
+            offset = 0
+            while tokens < self._context_creator.message_budget:
+                cursor.execute(
+                    """
+                    SELECT role, content, timestamp, metadata 
+                    FROM chat_history 
+                    WHERE agent_id = %s
+                    ORDER BY id DESC
+                    LIMIT %s OFFSET %s
+                    """,
+                    (self._agent_id, self.DB_PAGE_SIZE, offset)
+                )
+                rows = cursor.fetchall()
+                for row in rows:
+                    record = self._row_to_record(row)
+                    records.append(record)
+                    tokens += self._context_creator.record_tokens(record)
+                if len(rows) < self.DB_PAGE_SIZE:
+                    break
+                offset += len(rows)
+            cursor.close()
+            
+            # 写入窗口前已有的记录比数据库中的记录更新
+            pending = list(self._window)
+            self._window.clear()
+            self._window_tokens = 0
+            for record in reversed(records):
+                self._append_to_window(record)
+            for record in pending:
+                self._append_to_window(record)
+        except Exception as e:
+            print(f"Database retrieve error: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+    
+    @staticmethod
+    def _row_to_record(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts a chat_history row to a record."""
+        return {
+            "message": {
+                "role": row["role"],
+                "content": row["content"]
+            },
+            "timestamp": row["timestamp"].isoformat(),
+            "metadata": row["metadata"]
+        }
+    
     def write_records(self, records: List[Dict[str, Any]]) -> None:
         """Writes records to the memory.
         
@@ -160,33 +308,23 @@ class ChatHistoryMemory(AgentMemory):
             records (List[Dict[str, Any]]): Records to be added to the memory.
         """
         # Store in memory
-        self._messages.extend(records)
+        with self._lock:
+            self._load_window_from_db()
+            self._messages.extend(records)
+            for record in records:
+                self._append_to_window(record)
         
-        # Store in database if available
-        if self._db_connection:
-            try:
-                cursor = self._db_connection.cursor()
-                for record in records:
-                    message = record.get("message", {})
-                    role = message.get("role", "")
-                    content = message.get("content", "")
-                    metadata = str(record.get("metadata", {}))
-                    
-                    cursor.execute("""
-                        INSERT INTO chat_history 
-                        (agent_id, role, content, timestamp, metadata)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (
-                        self._agent_id,
-                        role,
-                        content,
-                        datetime.now(),
-                        metadata
-                    ))
-                self._db_connection.commit()
-                cursor.close()
-            except Exception as e:
-                print(f"Database write error: {str(e)}")
+        # Store in database if available; rows are written in batches by a background writer
+        if self._db_writer:
+            for record in records:
+                message = _to_message_dict(record.get("message", {}))
+                self._db_writer.submit((
+                    self._agent_id,
+                    message.get("role", ""),
+                    message.get("content", ""),
+                    datetime.utcnow(),
+                    str(record.get("metadata", {}))
+                ))
     
     def add_message(self, message: Union[BaseMessage, Dict[str, Any]]) -> None:
         """Add a message to the chat history.
@@ -237,63 +375,43 @@ class ChatHistoryMemory(AgentMemory):
     
     def clear(self) -> None:
         """Clears all messages from the memory."""
-        self._messages = []
+        with self._lock:
+            self._messages = []
+            self._window.clear()
+            self._window_tokens = 0
+            self._db_loaded = True
         
         # Clear from database if available
-        if self._db_connection and self._agent_id:
+        if self._db_pool and self._agent_id:
+            # 先写完该 agent 在队列中的消息，避免删除后再被写入
+            if self._db_writer.has_pending(lambda row: row[0] == self._agent_id):
+                self._db_writer.flush()
+            conn = None
             try:
-                cursor = self._db_connection.cursor()
+                conn = self._db_pool.get_connection()
+                cursor = conn.cursor()
                 cursor.execute(
                     "DELETE FROM chat_history WHERE agent_id = %s",
                     (self._agent_id,)
                 )
-                self._db_connection.commit()
+                conn.commit()
                 cursor.close()
             except Exception as e:
                 print(f"Database clear error: {str(e)}")
+            finally:
+                if conn:
+                    conn.close()
     
     def retrieve(self) -> List[Dict[str, Any]]:
         """Get a record list from the memory for creating model context.
         
         Returns:
-            List[Dict[str, Any]]: A record list for creating model context.
+            List[Dict[str, Any]]: The most recent records that fit within the
+                token limit, oldest first.
         """
-        # If we have in-memory messages, return those
-        if self._messages:
-            return self._messages
-            
-        # Otherwise try to retrieve from database
-        if self._db_connection and self._agent_id:
-            try:
-                cursor = self._db_connection.cursor(dictionary=True)
-                cursor.execute(
-                    """
-                    SELECT role, content, timestamp, metadata 
-                    FROM chat_history 
-                    WHERE agent_id = %s
-                    ORDER BY timestamp ASC
-                    """,
-                    (self._agent_id,)
-                )
-                
-                records = []
-                for row in cursor.fetchall():
-                    record = {
-                        "message": {
-                            "role": row["role"],
-                            "content": row["content"]
-                        },
-                        "timestamp": row["timestamp"].isoformat(),
-                        "metadata": row["metadata"]
-                    }
-                    records.append(record)
-                
-                cursor.close()
-                return records
-            except Exception as e:
-                print(f"Database retrieve error: {str(e)}")
-                
-        return []
+        with self._lock:
+            self._load_window_from_db()
+            return list(self._window)
     
     def get_context_creator(self) -> BaseContextCreator:
         """Gets context creator.
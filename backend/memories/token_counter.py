@@ -0,0 +1,128 @@
+import logging
+import re
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# CJK ideographs, kana and hangul are roughly one token per character
+_WIDE_CHARS = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+
+# Every chat message carries a few formatting tokens besides its content
+# (see OpenAI's "How to count tokens with tiktoken")
+TOKENS_PER_MESSAGE = 3
+# The reply is primed with <|start|>assistant<|message|>
+TOKENS_PER_REPLY = 3
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, falling back to a character estimate.
+    
+    The encoding is chosen from the model name and loaded lazily. If tiktoken
+    is not installed or its encoding files cannot be loaded (for example on
+    an offline host), counts are estimated as one token per CJK character
+    plus one token per four other characters.
+    
+    Args:
+        model_name: Optional model name used to pick the encoding.
+        encoding_name: Encoding used when the model is unknown to tiktoken.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None, encoding_name: str = "cl100k_base"):
+        """Initialize a TokenCounter."""
+        self.model_name = model_name
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    @property
+    def encoding(self):
+        """The tiktoken encoding, or None when falling back to estimates."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._encoding = self._load_encoding()
+                    self._loaded = True
+        return self._encoding
+    
+    def _load_encoding(self):
+        try:
+            import tiktoken
+        except ImportError:
+            logger.warning("tiktoken is not installed, token counts are estimated")
+            return None
+        
+        try:
+            if self.model_name:
+                try:
+                    return tiktoken.encoding_for_model(self.model_name)
+                except KeyError:
+                    pass
+            return tiktoken.get_encoding(self.encoding_name)
+        except Exception as e:
+            logger.warning(f"Failed to load tiktoken encoding, token counts are estimated: {str(e)}")
+            return None
+    
+    def count(self, text: str) -> int:
+        """Count the tokens of a text."""
+        if not text:
+            return 0
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        wide = len(_WIDE_CHARS.findall(text))
+        return wide + (len(text) - wide + 3) // 4
+    
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """Count the tokens a chat message takes up in a prompt."""
+        return TOKENS_PER_MESSAGE + self.count(str(message.get("role", ""))) + self.count(str(message.get("content") or ""))
+    
+    def truncate(self, text: str, max_tokens: int, keep: str = "end") -> str:
+        """Trim a text to at most ``max_tokens`` tokens.
+        
+        Args:
+            text: Text to trim.
+            max_tokens: Token budget.
+            keep: "end" keeps the last tokens, "start" keeps the first ones.
+        
+        Returns:
+            str: The trimmed text.
+        """
+        if max_tokens <= 0:
+            return ""
+        encoding = self.encoding
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            tokens = tokens[-max_tokens:] if keep == "end" else tokens[:max_tokens]
+            return encoding.decode(tokens)
+        
+        # Estimated counts: binary search the longest slice that fits
+        if self.count(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            part = text[-middle:] if keep == "end" else text[:middle]
+            if self.count(part) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        if low == 0:
+            return ""
+        return text[-low:] if keep == "end" else text[:low]
+
+
+_counters: Dict[Optional[str], TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(model_name: Optional[str] = None) -> TokenCounter:
+    """Get the shared TokenCounter for a model."""
+    with _counters_lock:
+        counter = _counters.get(model_name)
+        if counter is None:
+            counter = _counters[model_name] = TokenCounter(model_name)
+        return counter
@@ -17,6 +17,7 @@ class AIDeploymentModel:
     
     def _ensure_table_exists(self):
         """确保部署表存在"""
+        conn = None
         try:
             conn = get_db()
             cursor = conn.cursor()
@@ -57,6 +58,9 @@ class AIDeploymentModel:
         except Exception as e:
             self.logger.error(f"确保{self.table_name}表存在时出错: {str(e)}")
             raise
+        finally:
+            if conn:
+                conn.close()
     
     def _add_missing_columns(self, cursor):
         """添加缺失的列"""
@@ -100,6 +104,7 @@ class AIDeploymentModel:
         Returns:
             bool: 是否成功
         """
+        conn = None
         try:
             conn = get_db()
             cursor = conn.cursor()
@@ -123,6 +128,9 @@ class AIDeploymentModel:
         except Exception as e:
             self.logger.error(f"创建部署记录时出错: {str(e)}")
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def update_deployment_status(self, deploy_id, status, error_message=None, deployment_summary=None):
         """更新部署状态
@@ -136,6 +144,7 @@ class AIDeploymentModel:
         Returns:
             bool: 是否成功
         """
+        conn = None
         try:
             conn = get_db()
             cursor = conn.cursor()
@@ -168,6 +177,9 @@ class AIDeploymentModel:
         except Exception as e:
             self.logger.error(f"更新部署状态时出错: {str(e)}")
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def get_deployment(self, deploy_id):
         """获取部署详情
@@ -178,6 +190,7 @@ class AIDeploymentModel:
         Returns:
             dict: 部署详情，如果不存在则返回None
         """
+        conn = None
         try:
             conn = get_db()
             cursor = conn.cursor()
@@ -206,6 +219,9 @@ class AIDeploymentModel:
         except Exception as e:
             self.logger.error(f"获取部署详情时出错: {str(e)}")
             return None
+        finally:
+            if conn:
+                conn.close()
     
     def list_deployments(self, user_id=None, status=None, page=1, page_size=10):
         """列出部署
@@ -219,6 +235,7 @@ class AIDeploymentModel:
         Returns:
             tuple: (deployments, total) 部署列表和总数
         """
+        conn = None
         try:
             conn = get_db()
             cursor = conn.cursor()
@@ -275,4 +292,7 @@ class AIDeploymentModel:
             return deployments, total
         except Exception as e:
             self.logger.error(f"列出部署时出错: {str(e)}")
-            return [], 0 
\ No newline at end of file
+            return [], 0 
+        finally:
+            if conn:
+                conn.close()
\ No newline at end of file
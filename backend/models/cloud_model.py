@@ -1,4 +1,4 @@
-import mysql.connector
+from db.pool import get_pool
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 import time
@@ -17,26 +17,23 @@ class CloudModel:
             db_config: 数据库连接配置，包含host, user, password, database等参数
         """
         self.db_config = db_config
-        self._conn = None
         
     def _get_connection(self, max_retries=5, retry_interval=1):
-        """获取数据库连接，带重试机制"""
-        if self._conn is None or not self._conn.is_connected():
-            for attempt in range(1, max_retries + 1):
-                try:
-                    self._conn = mysql.connector.connect(**self.db_config)
-                    if attempt > 1:
-                        print(f"数据库重连成功（第{attempt}次尝试）")
-                    return self._conn
-                except mysql.connector.Error as e:
-                    if attempt < max_retries:
-                        print(f"数据库连接失败（第{attempt}次尝试）: {e}，{retry_interval}秒后重试...")
-                        import time
-                        time.sleep(retry_interval)
-                    else:
-                        print(f"数据库连接失败，已达到最大重试次数({max_retries}): {e}")
-                        raise
-        return self._conn
+        """从共享连接池借出数据库连接，带重试机制，调用 close() 时归还"""
+        pool = get_pool(self.db_config, driver='mysql.connector')
+        for attempt in range(1, max_retries + 1):
+            try:
+                conn = pool.get_connection()
+                if attempt > 1:
+                    print(f"数据库重连成功（第{attempt}次尝试）")
+                return conn
+            except Exception as e:
+                if attempt < max_retries:
+                    print(f"数据库连接失败（第{attempt}次尝试）: {e}，{retry_interval}秒后重试...")
+                    time.sleep(retry_interval)
+                else:
+                    print(f"数据库连接失败，已达到最大重试次数({max_retries}): {e}")
+                    raise
     
     def init_table(self):
         """初始化cloud表，如果不存在则创建"""
@@ -207,8 +204,7 @@ class CloudModel:
         conn = None
         cursor = None
         try:
-            # 创建新连接
-            conn = mysql.connector.connect(**self.db_config)
+            conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
             
             query = "SELECT * FROM cloud WHERE user_id = %s"
@@ -259,6 +255,9 @@ class CloudModel:
                     except:
                         pass
             return []
+        finally:
+            if conn:
+                conn.close()
     
     def update_cloud_resources(self, user_id: int, project: str, cloud: str,
                               resources: Dict[str, str]) -> bool:
@@ -273,6 +272,7 @@ class CloudModel:
         Returns:
             操作是否成功
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -303,6 +303,9 @@ class CloudModel:
             if conn:
                 conn.rollback()
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def get_regions_by_cloud(self, cloud: str) -> List[str]:
         """获取指定云服务商的所有区域列表
@@ -313,6 +316,7 @@ class CloudModel:
         Returns:
             区域列表
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -359,6 +363,9 @@ class CloudModel:
             print(f"Error getting regions for cloud {cloud}: {str(e)}")
             # 出错时返回默认区域列表
             return self._get_default_regions_for_cloud(cloud)
+        finally:
+            if conn:
+                conn.close()
     
     def _get_default_regions_for_cloud(self, cloud: str) -> List[str]:
         """获取云服务商的默认区域列表
@@ -401,8 +408,7 @@ class CloudModel:
         conn = None
         cursor = None
         try:
-            # 创建新连接
-            conn = mysql.connector.connect(**self.db_config)
+            conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
             
             # 查询用户的所有部署，按部署ID分组
@@ -429,6 +435,9 @@ class CloudModel:
             if conn:
                 conn.close()
             return []
+        finally:
+            if conn:
+                conn.close()
             
     def get_deployment_details(self, deploy_id: str) -> Dict[str, List[Dict[str, Any]]]:
         """获取指定部署ID的资源详情
@@ -442,8 +451,7 @@ class CloudModel:
         conn = None
         cursor = None
         try:
-            # 创建新连接
-            conn = mysql.connector.connect(**self.db_config)
+            conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
             
             # 查询部署ID的所有资源
@@ -641,4 +649,7 @@ class CloudModel:
                 'lambda_resources': [],
                 'other_resources': [],
                 'deployment_info': None
-            } 
\ No newline at end of file
+            } 
+        finally:
+            if conn:
+                conn.close()
\ No newline at end of file
@@ -1,4 +1,4 @@
-import mysql.connector
+from db.pool import get_pool
 import json
 from typing import Dict, Any, List, Optional
 import logging
@@ -13,17 +13,15 @@ class CloudsModel:
             db_config: 数据库连接配置，包含host, user, password, database等参数
         """
         self.db_config = db_config
-        self._conn = None
         self.logger = logging.getLogger(__name__)
         
     def _get_connection(self):
-        """获取数据库连接"""
-        if self._conn is None or not self._conn.is_connected():
-            self._conn = mysql.connector.connect(**self.db_config)
-        return self._conn
+        """从共享连接池借出数据库连接，调用 close() 时归还"""
+        return get_pool(self.db_config, driver='mysql.connector').get_connection()
     
     def init_table(self):
         """初始化clouds表，如果不存在则创建"""
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -46,6 +44,9 @@ class CloudsModel:
             if conn:
                 conn.rollback()
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def get_all_clouds(self) -> List[Dict[str, Any]]:
         """获取所有云服务提供商列表
@@ -53,6 +54,7 @@ class CloudsModel:
         Returns:
             云服务提供商列表
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
@@ -75,6 +77,9 @@ class CloudsModel:
         except Exception as e:
             self.logger.error(f"获取云服务提供商列表出错: {str(e)}")
             return []
+        finally:
+            if conn:
+                conn.close()
     
     def get_cloud_by_id(self, cloud_id: int) -> Optional[Dict[str, Any]]:
         """根据ID获取云服务提供商信息
@@ -85,6 +90,7 @@ class CloudsModel:
         Returns:
             云服务提供商信息，如果不存在则返回None
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
@@ -106,6 +112,9 @@ class CloudsModel:
         except Exception as e:
             self.logger.error(f"根据ID获取云服务提供商出错: {str(e)}")
             return None
+        finally:
+            if conn:
+                conn.close()
     
     def get_cloud_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """根据名称获取云服务提供商信息
@@ -116,6 +125,7 @@ class CloudsModel:
         Returns:
             云服务提供商信息，如果不存在则返回None
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
@@ -137,6 +147,9 @@ class CloudsModel:
         except Exception as e:
             self.logger.error(f"根据名称获取云服务提供商出错: {str(e)}")
             return None
+        finally:
+            if conn:
+                conn.close()
     
     def add_cloud(self, name: str, logo: str = None, provider: str = None, 
                  regions: List[str] = None, is_active: bool = True) -> bool:
@@ -152,6 +165,7 @@ class CloudsModel:
         Returns:
             是否添加成功
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -175,6 +189,9 @@ class CloudsModel:
             if conn:
                 conn.rollback()
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def update_cloud(self, cloud_id: int, data: Dict[str, Any]) -> bool:
         """更新云服务提供商信息
@@ -186,6 +203,7 @@ class CloudsModel:
         Returns:
             是否更新成功
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -219,6 +237,9 @@ class CloudsModel:
             if conn:
                 conn.rollback()
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def delete_cloud(self, cloud_id: int) -> bool:
         """删除云服务提供商
@@ -229,6 +250,7 @@ class CloudsModel:
         Returns:
             是否删除成功
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -244,4 +266,7 @@ class CloudsModel:
             self.logger.error(f"删除云服务提供商出错: {str(e)}")
             if conn:
                 conn.rollback()
-            return False 
\ No newline at end of file
+            return False 
+        finally:
+            if conn:
+                conn.close()
\ No newline at end of file
@@ -1,4 +1,4 @@
-import mysql.connector
+from db.pool import get_pool
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 import time
@@ -16,17 +16,15 @@ class DeployModel:
             db_config: 数据库连接配置，包含host, user, password, database等参数
         """
         self.db_config = db_config
-        self.db = None
         self.logger = logging.getLogger('deploy_model')
         
     def _get_connection(self):
-        """获取数据库连接"""
-        if self.db is None or not self.db.is_connected():
-            self.db = mysql.connector.connect(**self.db_config)
-        return self.db
+        """从共享连接池借出数据库连接，调用 close() 时归还"""
+        return get_pool(self.db_config, driver='mysql.connector').get_connection()
     
     def init_table(self):
         """初始化clouddeploy表，如果不存在则创建"""
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -48,6 +46,9 @@ class DeployModel:
             if conn:
                 conn.rollback()
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def save_cloud_config(self, user_id, username, project, cloud, ak, sk, region=None, deployid=None, force_insert=False):
         """保存云配置信息
@@ -188,8 +189,7 @@ class DeployModel:
         conn = None
         cursor = None
         try:
-            # 创建新连接
-            conn = mysql.connector.connect(**self.db_config)
+            conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
             
             query = "SELECT * FROM clouddeploy WHERE user_id = %s"
@@ -240,6 +240,9 @@ class DeployModel:
                     except:
                         pass
             return []
+        finally:
+            if conn:
+                conn.close()
     
     def update_cloud_resources(self, user_id: int, project: str, cloud: str,
                               resources: Dict[str, str], deployid: str = None) -> bool:
@@ -255,6 +258,7 @@ class DeployModel:
         Returns:
             更新是否成功
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -334,6 +338,9 @@ class DeployModel:
             if conn:
                 conn.rollback()
             return False
+        finally:
+            if conn:
+                conn.close()
     
     def get_regions_by_cloud(self, cloud: str) -> List[str]:
         """获取云服务商支持的区域列表
@@ -348,6 +355,7 @@ class DeployModel:
         default_regions = self._get_default_regions_for_cloud(cloud)
         
         # 再从数据库中获取已有的区域信息
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -370,6 +378,9 @@ class DeployModel:
             self.logger.error(f"获取云区域时出错: {str(e)}")
             self.logger.info(f"使用默认区域列表: {default_regions}")
             return default_regions
+        finally:
+            if conn:
+                conn.close()
     
     def _get_default_regions_for_cloud(self, cloud: str) -> List[str]:
         """获取云服务商的默认区域列表
@@ -401,6 +412,7 @@ class DeployModel:
         Returns:
             部署历史记录列表
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
@@ -427,6 +439,9 @@ class DeployModel:
         except Exception as e:
             self.logger.error(f"获取用户部署历史时出错: {str(e)}")
             return []
+        finally:
+            if conn:
+                conn.close()
     
     def get_deployment_details(self, deploy_id: str) -> Dict[str, List[Dict[str, Any]]]:
         """获取指定部署ID的资源详情
@@ -437,6 +452,7 @@ class DeployModel:
         Returns:
             包含部署信息和资源列表的字典
         """
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
@@ -481,6 +497,9 @@ class DeployModel:
         except Exception as e:
             self.logger.error(f"获取部署详情时出错: {str(e)}")
             return {"deployment_info": {}, "resources": []}
+        finally:
+            if conn:
+                conn.close()
     
     def _get_resource_details(self, deployment_info: Dict[str, Any], resource_type: str) -> Dict[str, Any]:
         """获取资源详细信息
@@ -662,6 +681,7 @@ class DeployModel:
             self.logger.error("获取部署信息失败：部署ID为空")
             return None
             
+        conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor(dictionary=True)
@@ -688,4 +708,7 @@ class DeployModel:
             return result
         except Exception as e:
             self.logger.error(f"获取部署信息时出错: {str(e)}")
-            return None 
\ No newline at end of file
+            return None 
+        finally:
+            if conn:
+                conn.close()
\ No newline at end of file
@@ -0,0 +1,173 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+from collections import Counter
+import math
+
+import numpy as np
+
+
+class BM25Index:
+    """Incremental inverted index with Okapi BM25 scoring.
+    
+    Each term keeps a postings map of document slot -> term frequency, and
+    per-document lengths are tracked so documents can be added and removed
+    without rebuilding the index. A query only visits the postings of its
+    terms: contributions are computed per posting with NumPy, summed per
+    document and the top-k picked with ``argpartition``, so query time scales
+    with the postings of the query terms rather than the corpus size.
+    
+    Scores match ``rank_bm25.BM25Okapi``: negative IDFs (terms in more than
+    half of the documents) are floored at ``epsilon`` times the average IDF.
+    
+    Args:
+        k1: Term frequency saturation parameter.
+        b: Document length normalization parameter.
+        epsilon: Floor for negative IDF values, as a fraction of the average IDF.
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        """Initialize a BM25Index."""
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # Cached, rebuilt on change
+        
+        self._slot_of: Dict[Hashable, int] = {}
+        self._doc_ids: List[Optional[Hashable]] = []
+        self._doc_terms: List[Optional[Counter]] = []
+        self._doc_len = np.zeros(1024, dtype=np.float64)
+        self._free_slots: List[int] = []
+        self._total_len = 0
+        
+        # Average IDF over the vocabulary, only needed for negative IDFs
+        self._average_idf: Optional[float] = None
+    
+    def __len__(self) -> int:
+        return len(self._slot_of)
+    
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._slot_of
+    
+    def add(self, doc_id: Hashable, tokens: List[str]) -> None:
+        """Index a document, replacing any document with the same ID.
+        
+        Args:
+            doc_id: Document identifier returned by ``search``.
+            tokens: Tokens of the document.
+        """
+        if doc_id in self._slot_of:
+            self.remove(doc_id)
+        
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._doc_ids)
+            self._doc_ids.append(None)
+            self._doc_terms.append(None)
+            if slot >= self._doc_len.shape[0]:
+                doc_len = np.zeros(self._doc_len.shape[0] * 2, dtype=np.float64)
+                doc_len[:slot] = self._doc_len[:slot]
+                self._doc_len = doc_len
+        
+        terms = Counter(tokens)
+        self._slot_of[doc_id] = slot
+        self._doc_ids[slot] = doc_id
+        self._doc_terms[slot] = terms
+        self._doc_len[slot] = len(tokens)
+        self._total_len += len(tokens)
+        
+        for term, freq in terms.items():
+            self._postings.setdefault(term, {})[slot] = freq
+            self._posting_arrays.pop(term, None)
+        self._average_idf = None
+    
+    def remove(self, doc_id: Hashable) -> bool:
+        """Remove a document from the index.
+        
+        Args:
+            doc_id: ID of the document to remove.
+        
+        Returns:
+            bool: True if the document was indexed, False otherwise.
+        """
+        slot = self._slot_of.pop(doc_id, None)
+        if slot is None:
+            return False
+        
+        for term in self._doc_terms[slot]:
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+            self._posting_arrays.pop(term, None)
+        
+        self._total_len -= int(self._doc_len[slot])
+        self._doc_len[slot] = 0
+        self._doc_ids[slot] = None
+        self._doc_terms[slot] = None
+        self._free_slots.append(slot)
+        self._average_idf = None
+        return True
+    
+    def _idf(self, term: str) -> float:
+        n = len(self._slot_of)
+        df = len(self._postings.get(term, ()))
+        idf = math.log(n - df + 0.5) - math.log(df + 0.5)
+        if idf < 0:
+            if self._average_idf is None:
+                total = sum(
+                    math.log(n - len(postings) + 0.5) - math.log(len(postings) + 0.5)
+                    for postings in self._postings.values()
+                )
+                self._average_idf = total / len(self._postings)
+            idf = self.epsilon * self._average_idf
+        return idf
+    
+    def _term_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._posting_arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+        return arrays
+    
+    def search(self, query_tokens: List[str], top_k: int = 5) -> List[Tuple[Hashable, float]]:
+        """Return the ``top_k`` documents with the highest BM25 score.
+        
+        Only documents containing at least one query term are scored.
+        
+        Args:
+            query_tokens: Tokens of the query; repeated tokens count repeatedly.
+            top_k: Number of results to return.
+        
+        Returns:
+            List[Tuple[Hashable, float]]: ``(doc_id, score)`` pairs, best first.
+        """
+        if not self._slot_of or top_k <= 0:
+            return []
+        
+        avgdl = self._total_len / len(self._slot_of)
+        slots = []
+        contributions = []
+        for term, query_freq in Counter(query_tokens).items():
+            if term not in self._postings:
+                continue
+            docs, freqs = self._term_postings(term)
+            norm = self.k1 * (1 - self.b + self.b * self._doc_len[docs] / avgdl) if avgdl else self.k1
+            slots.append(docs)
+            contributions.append(query_freq * self._idf(term) * freqs * (self.k1 + 1) / (freqs + norm))
+        
+        if not slots:
+            return []
+        
+        # Sum contributions per document
+        docs, inverse = np.unique(np.concatenate(slots), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[0] else np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self._doc_ids[int(docs[i])], float(scores[i])) for i in top]
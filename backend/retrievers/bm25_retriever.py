@@ -1,34 +1,43 @@
-from typing import List, Dict, Any, Optional
-import numpy as np
-from rank_bm25 import BM25Okapi
+from typing import List, Dict, Any, Optional, Tuple
+from collections import Counter
+import hashlib
 import re
 
 from .base import BaseRetriever
+from .bm25_index import BM25Index
 
 
 class BM25Retriever(BaseRetriever):
     """Retriever using BM25 algorithm for document retrieval.
     
     This class implements the BaseRetriever interface using the BM25 algorithm
-    to retrieve relevant documents based on keyword matching.
+    to retrieve relevant documents based on keyword matching. Documents are
+    kept in an incremental inverted index, so re-processing a corpus only
+    re-indexes documents that were added or changed.
     
     Args:
         tokenizer: Optional custom tokenizer function.
         collection_name: Optional name for the document collection.
+        k1: BM25 term frequency saturation parameter.
+        b: BM25 document length normalization parameter.
     """
     
     def __init__(
         self,
         tokenizer: Optional[Any] = None,
-        collection_name: str = "default"
+        collection_name: str = "default",
+        k1: float = 1.5,
+        b: float = 0.75
     ):
         """Initialize a BM25Retriever."""
         super().__init__()
         self.tokenizer = tokenizer or self._default_tokenizer
         self.collection_name = collection_name
         self.documents = []
-        self.bm25 = None
-        self.corpus = []
+        self.text_field = "text"
+        self.index = BM25Index(k1=k1, b=b)
+        self._docs: Dict[Tuple, Dict[str, Any]] = {}  # Index key -> document
+        self._key_counts: Counter = Counter()  # (id, text hash) -> occurrences seen
         
     def _default_tokenizer(self, text: str) -> List[str]:
         """Default tokenization function.
@@ -44,30 +53,86 @@ class BM25Retriever(BaseRetriever):
         text = re.sub(r'[^\w\s]', ' ', text)
         return text.split()
         
+    def _document_key(self, doc: Dict[str, Any], text_field: str, counts: Counter) -> Tuple:
+        """Build the index key of a document.
+        
+        The key combines the document ID (if any), a hash of its text and an
+        occurrence number, so identical documents are indexed separately and
+        a changed text yields a new key.
+        """
+        text = doc.get(text_field, "") or ""
+        base = (doc.get("id"), hashlib.sha1(text.encode("utf-8")).hexdigest())
+        occurrence = counts[base]
+        counts[base] += 1
+        return base + (occurrence,)
+    
     def process(
         self,
         documents: List[Dict[str, Any]],
         text_field: str = "text",
         **kwargs
     ) -> None:
-        """Process documents and build BM25 index.
+        """Process documents and update the BM25 index.
+        
+        The index is updated incrementally: documents no longer present are
+        removed and only new or changed documents are tokenized and indexed.
         
         Args:
             documents: List of documents to process.
             text_field: Field in documents to use for indexing.
             **kwargs: Additional arguments.
         """
+        if text_field != self.text_field:
+            # Keys depend on the indexed text, start over
+            self.index = BM25Index(k1=self.index.k1, b=self.index.b)
+            self._docs = {}
+            self.text_field = text_field
+        
+        counts = Counter()
+        keys = [self._document_key(doc, text_field, counts) for doc in documents]
+        
+        new_keys = set(keys)
+        for key in list(self._docs):
+            if key not in new_keys:
+                self.index.remove(key)
+        
+        for key, doc in zip(keys, documents):
+            if key not in self.index:
+                self.index.add(key, self.tokenizer(doc.get(text_field, "") or ""))
+        
         self.documents = documents
+        self._docs = dict(zip(keys, documents))
+        self._key_counts = counts
+    
+    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Add documents to the index without re-processing the corpus.
         
-        # Extract and tokenize text
-        self.corpus = []
+        Args:
+            documents: List of documents to add.
+        """
         for doc in documents:
-            text = doc.get(text_field, "")
-            tokens = self.tokenizer(text)
-            self.corpus.append(tokens)
+            key = self._document_key(doc, self.text_field, self._key_counts)
+            self.index.add(key, self.tokenizer(doc.get(self.text_field, "") or ""))
+            self._docs[key] = doc
+        self.documents = self.documents + list(documents)
+    
+    def remove_documents(self, ids: List[Any]) -> int:
+        """Remove documents by their ``id`` field.
+        
+        Args:
+            ids: IDs of the documents to remove.
             
-        # Create BM25 index
-        self.bm25 = BM25Okapi(self.corpus)
+        Returns:
+            int: Number of documents removed.
+        """
+        ids = set(ids)
+        removed = [key for key in self._docs if key[0] in ids]
+        for key in removed:
+            self.index.remove(key)
+            del self._docs[key]
+        if removed:
+            self.documents = [doc for doc in self.documents if doc.get("id") not in ids]
+        return len(removed)
     
     def query(
         self,
@@ -77,6 +142,8 @@ class BM25Retriever(BaseRetriever):
     ) -> List[Dict[str, Any]]:
         """Query for relevant documents using BM25.
         
+        Only documents sharing at least one term with the query are scored.
+        
         Args:
             query: Query string.
             top_k: Number of top results to return.
@@ -85,26 +152,21 @@ class BM25Retriever(BaseRetriever):
         Returns:
             List[Dict[str, Any]]: List of relevant documents with scores.
         """
-        if not self.documents or not self.bm25:
+        if not len(self.index):
             return []
             
         # Tokenize query
         query_tokens = self.tokenizer(query)
         
-        # Get BM25 scores
-        scores = self.bm25.get_scores(query_tokens)
-        
-        # Get top-k results
+        # Get top-k results from the inverted index
         results = []
-        for i, score in sorted(
-            enumerate(scores), key=lambda x: x[1], reverse=True
-        )[:top_k]:
+        for key, score in self.index.search(query_tokens, top_k):
             if score <= 0:
                 continue
                 
             # Add document with score
-            doc = self.documents[i].copy()
-            doc["score"] = float(score)
+            doc = self._docs[key].copy()
+            doc["score"] = score
             results.append(doc)
             
         return results
@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Content-addressed cache of text embeddings.
+
+    Embeddings are keyed by a SHA-256 hash of the text (and an optional
+    namespace, e.g. the model name), so a document is only embedded again
+    when its content changes. Entries are kept in an in-memory LRU and,
+    when ``cache_dir`` is given, also written to disk as ``.npy`` files so
+    they survive restarts.
+
+    Args:
+        max_entries: Maximum number of embeddings kept in memory.
+        cache_dir: Optional directory for the on-disk cache.
+        namespace: Optional prefix mixed into the keys, to keep embeddings of
+            different models apart.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        cache_dir: Optional[str] = None,
+        namespace: str = ""
+    ):
+        """Initialize an EmbeddingCache."""
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, text: str) -> str:
+        """Return the cache key of a text."""
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for ``key``, or None."""
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        if self.cache_dir:
+            try:
+                embedding = np.load(self._path(key))
+            except (OSError, ValueError):
+                embedding = None
+            if embedding is not None:
+                self._remember(key, embedding)
+                with self._lock:
+                    self.hits += 1
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, embedding) -> np.ndarray:
+        """Store an embedding and return it as a float32 array."""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        self._remember(key, embedding)
+
+        if self.cache_dir:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.save(f, embedding)
+                os.replace(tmp_path, path)
+            except OSError:
+                # The disk cache is best effort; the in-memory entry is enough
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return embedding
+
+    def get_many(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Look up several texts; returns ``{position: embedding}`` for the hits."""
+        found = {}
+        for i, text in enumerate(texts):
+            embedding = self.get(self.key(text))
+            if embedding is not None:
+                found[i] = embedding
+        return found
+
+    def clear(self) -> None:
+        """Drop the in-memory entries (the on-disk cache is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,9 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import logging
+import threading
+import time
 import numpy as np
-from collections import defaultdict
 
 from .base import BaseRetriever
 from .vector_retriever import VectorRetriever
@@ -13,41 +16,111 @@ class HybridRetriever(BaseRetriever):
     This class implements the BaseRetriever interface by combining results
     from multiple retrievers, such as vector-based and keyword-based methods.
     
+    Sub-retrievers are queried concurrently, so a slow remote retriever does
+    not add its latency to the local ones. A retriever that misses its
+    deadline or raises is left out of the fusion and the query returns the
+    (degraded) results of the others. Timings of the last query are kept in
+    ``last_timings``.
+    
+    Each retriever runs on its own thread pool of ``max_workers`` threads, so
+    calls that hang in one retriever never hold threads the others need. A
+    call that missed its deadline cannot be interrupted and keeps its thread
+    until it returns; while a retriever has ``max_workers`` calls in flight it
+    is skipped instead of queued.
+    
+    Retrievers without a ``query`` method but with ``search(query, top_k)``
+    (e.g. RAGRetriever) are supported as well.
+    
     Args:
         retrievers: List of retrievers to combine.
         weights: Optional weights for each retriever.
         collection_name: Optional name for the document collection.
+        timeout: Default per-retriever deadline in seconds; None waits forever.
+        timeouts: Optional per-retriever deadlines overriding ``timeout``.
+        max_workers: Maximum number of in-flight calls per retriever.
     """
     
     def __init__(
         self,
         retrievers: Optional[List[BaseRetriever]] = None,
         weights: Optional[List[float]] = None,
-        collection_name: str = "default"
+        collection_name: str = "default",
+        timeout: Optional[float] = None,
+        timeouts: Optional[List[Optional[float]]] = None,
+        max_workers: int = 8
     ):
         """Initialize a HybridRetriever."""
         super().__init__()
         self.retrievers = retrievers or []
         self.weights = weights or [1.0] * len(self.retrievers)
         self.collection_name = collection_name
+        self.timeout = timeout
+        self.timeouts = timeouts or [None] * len(self.retrievers)
+        self.max_workers = max(1, max_workers)
+        self.last_timings: Dict[str, Any] = {}
+        self.logger = logging.getLogger(__name__)
+        # id(retriever) -> its own thread pool and number of unfinished calls
+        self._executors: Dict[int, ThreadPoolExecutor] = {}
+        self._in_flight: Dict[int, int] = {}
+        self._executor_lock = threading.Lock()
         
         # Ensure weights match retrievers
         if len(self.weights) != len(self.retrievers):
             self.weights = [1.0] * len(self.retrievers)
+        if len(self.timeouts) != len(self.retrievers):
+            self.timeouts = [None] * len(self.retrievers)
             
     def add_retriever(
         self, 
         retriever: BaseRetriever, 
-        weight: float = 1.0
+        weight: float = 1.0,
+        timeout: Optional[float] = None
     ) -> None:
         """Add a retriever to the hybrid retriever.
         
         Args:
             retriever: Retriever to add.
             weight: Weight for the retriever.
+            timeout: Optional deadline in seconds for this retriever.
         """
         self.retrievers.append(retriever)
         self.weights.append(weight)
+        self.timeouts.append(timeout)
+        
+    def _submit(self, i: int, query: str, top_k: int, **kwargs) -> Optional[Future]:
+        """Query retriever ``i`` on its own thread pool; None if it is saturated with unfinished calls."""
+        retriever = self.retrievers[i]
+        key = id(retriever)
+        with self._executor_lock:
+            if self._in_flight.get(key, 0) >= self.max_workers:
+                return None
+            executor = self._executors.get(key)
+            if executor is None:
+                executor = self._executors[key] = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=f"hybrid-retriever-{i}"
+                )
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        
+        def release(_future):
+            with self._executor_lock:
+                self._in_flight[key] -= 1
+        
+        future = executor.submit(self._query_retriever, retriever, query, top_k, **kwargs)
+        future.add_done_callback(release)
+        return future
+        
+    @staticmethod
+    def _query_retriever(retriever: Any, query: str, top_k: int, **kwargs) -> Tuple[List[Dict[str, Any]], float]:
+        """Query a single retriever and measure its latency."""
+        start = time.perf_counter()
+        if hasattr(retriever, "query"):
+            results = retriever.query(query, top_k=top_k, **kwargs)
+        else:
+            results = retriever.search(query, top_k=top_k)
+        return results or [], time.perf_counter() - start
+        
+    def _retriever_name(self, i: int) -> str:
+        return f"{i}:{type(self.retrievers[i]).__name__}"
         
     def process(
         self,
@@ -85,71 +158,128 @@ class HybridRetriever(BaseRetriever):
         if not self.retrievers:
             return []
             
-        # Get results from each retriever
-        all_results = []
-        for i, retriever in enumerate(self.retrievers):
-            results = retriever.query(query, top_k=top_k*2, **kwargs)  # Get more results for better fusion
-            weight = self.weights[i]
-            all_results.append((results, weight))
+        start = time.perf_counter()
+        timings = {"retrievers": {}, "timed_out": [], "failed": [], "skipped": []}
+        
+        # Query all retrievers concurrently; get more results for better fusion
+        futures = [self._submit(i, query, top_k * 2, **kwargs) for i in range(len(self.retrievers))]
+        
+        # Collect results in deadline order, each retriever has its own deadline
+        deadlines = []
+        for i in range(len(self.retrievers)):
+            timeout = self.timeouts[i] if self.timeouts[i] is not None else self.timeout
+            deadlines.append(start + timeout if timeout is not None else None)
+        order = sorted(range(len(futures)), key=lambda i: (deadlines[i] is None, deadlines[i] or 0))
+        
+        collected = {}
+        for i in order:
+            name = self._retriever_name(i)
+            if futures[i] is None:
+                # Still busy with calls that missed earlier deadlines
+                timings["skipped"].append(name)
+                timings["retrievers"][name] = None
+                self.logger.warning(f"Retriever {name} has {self.max_workers} unfinished calls, skipping it")
+                continue
+            remaining = None if deadlines[i] is None else max(0.0, deadlines[i] - time.perf_counter())
+            try:
+                results, elapsed = futures[i].result(timeout=remaining)
+            except FutureTimeoutError:
+                # The call cannot be interrupted; it keeps its thread until it returns
+                timings["timed_out"].append(name)
+                timings["retrievers"][name] = None
+                self.logger.warning(f"Retriever {name} missed its deadline, returning degraded results")
+                continue
+            except Exception as e:
+                timings["failed"].append(name)
+                timings["retrievers"][name] = None
+                self.logger.warning(f"Retriever {name} failed, returning degraded results: {str(e)}")
+                continue
+            timings["retrievers"][name] = elapsed
+            collected[i] = results
+        all_results = [(collected[i], self.weights[i]) for i in sorted(collected)]
+        timings["retrieve"] = time.perf_counter() - start
             
         # Combine results using the specified fusion method
-        if fusion_method == "reciprocal_rank":
-            return self._reciprocal_rank_fusion(all_results, top_k)
-        elif fusion_method == "weighted_score":
-            return self._weighted_score_fusion(all_results, top_k)
+        fusion_start = time.perf_counter()
+        if fusion_method == "weighted_score":
+            results = self._weighted_score_fusion(all_results, top_k)
         elif fusion_method == "round_robin":
-            return self._round_robin_fusion(all_results, top_k)
+            results = self._round_robin_fusion(all_results, top_k)
         else:
             # Default to reciprocal rank fusion
-            return self._reciprocal_rank_fusion(all_results, top_k)
+            results = self._reciprocal_rank_fusion(all_results, top_k)
             
-    def _reciprocal_rank_fusion(
-        self,
+        timings["fusion"] = time.perf_counter() - fusion_start
+        timings["total"] = time.perf_counter() - start
+        timings["degraded"] = bool(timings["timed_out"] or timings["failed"] or timings["skipped"])
+        self.last_timings = timings
+        return results
+    
+    @staticmethod
+    def _fuse_scores(
         all_results: List[tuple],
-        top_k: int
+        top_k: int,
+        contribution
     ) -> List[Dict[str, Any]]:
-        """Combine results using reciprocal rank fusion.
+        """Sum per-document contributions with NumPy and return the top-k.
         
         Args:
             all_results: List of (results, weight) tuples.
             top_k: Number of top results to return.
+            contribution: Function mapping (ranks, scores, weight) arrays of one
+                retriever to the contribution of each result.
             
         Returns:
             List[Dict[str, Any]]: Combined results.
         """
-        # Track document scores by ID
-        doc_scores = defaultdict(float)
-        doc_map = {}
-        
-        # Constant for RRF formula
-        k = 60
-        
-        # Calculate RRF scores
+        # Map document IDs to dense positions, in first-seen order
+        positions = {}
+        doc_map = []
+        indices = []
+        contributions = []
         for results, weight in all_results:
+            if not results:
+                continue
+            index = np.empty(len(results), dtype=np.int64)
+            scores = np.empty(len(results), dtype=np.float64)
             for rank, doc in enumerate(results):
                 doc_id = doc.get("id", str(hash(str(doc))))
-                # RRF formula: 1 / (rank + k)
-                doc_scores[doc_id] += weight * (1.0 / (rank + k))
-                doc_map[doc_id] = doc
-                
-        # Sort by score and return top-k
-        top_ids = sorted(doc_scores.keys(), key=lambda x: doc_scores[x], reverse=True)[:top_k]
+                position = positions.get(doc_id)
+                if position is None:
+                    position = positions[doc_id] = len(doc_map)
+                    doc_map.append(doc)
+                else:
+                    doc_map[position] = doc
+                index[rank] = position
+                scores[rank] = doc.get("score", 0.0) or 0.0
+            indices.append(index)
+            contributions.append(contribution(np.arange(len(results)), scores, weight))
+            
+        if not doc_map:
+            return []
+            
+        fused = np.bincount(
+            np.concatenate(indices), weights=np.concatenate(contributions), minlength=len(doc_map)
+        )
+        
+        # Sort by score and return top-k; ties keep first-seen order
+        top = np.argsort(-fused, kind="stable")[:max(top_k, 0)]
         
         # Create result list
         results = []
-        for doc_id in top_ids:
-            doc = doc_map[doc_id].copy()
-            doc["score"] = doc_scores[doc_id]
+        for position in top:
+            doc = doc_map[position].copy()
+            doc["score"] = float(fused[position])
             results.append(doc)
             
         return results
-        
-    def _weighted_score_fusion(
+            
+    def _reciprocal_rank_fusion(
         self,
         all_results: List[tuple],
         top_k: int
     ) -> List[Dict[str, Any]]:
-        """Combine results using weighted score fusion.
+        """Combine results using reciprocal rank fusion.
         
         Args:
             all_results: List of (results, weight) tuples.
@@ -158,29 +288,32 @@ class HybridRetriever(BaseRetriever):
         Returns:
             List[Dict[str, Any]]: Combined results.
         """
-        # Track document scores by ID
-        doc_scores = defaultdict(float)
-        doc_map = {}
+        # Constant for RRF formula
+        k = 60
         
-        # Calculate weighted scores
-        for results, weight in all_results:
-            for doc in results:
-                doc_id = doc.get("id", str(hash(str(doc))))
-                # Weighted score
-                doc_scores[doc_id] += weight * doc.get("score", 0.0)
-                doc_map[doc_id] = doc
-                
-        # Sort by score and return top-k
-        top_ids = sorted(doc_scores.keys(), key=lambda x: doc_scores[x], reverse=True)[:top_k]
+        # RRF formula: 1 / (rank + k)
+        return self._fuse_scores(
+            all_results, top_k, lambda ranks, scores, weight: weight / (ranks + k)
+        )
         
-        # Create result list
-        results = []
-        for doc_id in top_ids:
-            doc = doc_map[doc_id].copy()
-            doc["score"] = doc_scores[doc_id]
-            results.append(doc)
+    def _weighted_score_fusion(
+        self,
+        all_results: List[tuple],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Combine results using weighted score fusion.
+        
+        Args:
+            all_results: List of (results, weight) tuples.
+            top_k: Number of top results to return.
             
-        return results
+        Returns:
+            List[Dict[str, Any]]: Combined results.
+        """
+        # Weighted score
+        return self._fuse_scores(
+            all_results, top_k, lambda ranks, scores, weight: weight * scores
+        )
         
     def _round_robin_fusion(
         self,
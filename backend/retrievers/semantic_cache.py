@@ -0,0 +1,221 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import copy
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticQueryCache:
+    """Cache of retrieval results keyed by query similarity.
+    
+    Each stored query is embedded into a fixed-size ring buffer of unit
+    vectors. A lookup embeds the incoming query, scores it against all cached
+    queries retrieved from the same datasets with one matrix-vector product,
+    and returns the best entry if its cosine similarity reaches
+    ``threshold``. Entries expire after ``ttl`` seconds and can be
+    invalidated per dataset when a knowledge base changes.
+    
+    Without an embedding function, queries are embedded with hashed character
+    n-grams (scikit-learn's HashingVectorizer). That only measures lexical
+    overlap: it catches near-verbatim repeats, but questions differing in one
+    detail (a port number, a region) can still score above the threshold, so
+    pass a real embedding model wherever answers must not be mixed up.
+    
+    Args:
+        embedding_fn: Optional function mapping a query to a vector.
+        threshold: Minimum cosine similarity for a hit.
+        max_entries: Number of recent queries kept; the oldest is replaced.
+        ttl: Lifetime of an entry in seconds; 0 disables expiry.
+        dimension: Vector size of the default hashed embedding.
+    """
+    
+    def __init__(
+        self,
+        embedding_fn: Optional[Callable[[str], Any]] = None,
+        threshold: float = 0.9,
+        max_entries: int = 1024,
+        ttl: float = 3600,
+        dimension: int = 4096
+    ):
+        """Initialize a SemanticQueryCache."""
+        if embedding_fn is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            
+            vectorizer = HashingVectorizer(
+                analyzer="char_wb", ngram_range=(3, 4), n_features=dimension,
+                alternate_sign=False, norm="l2"
+            )
+            
+            def embedding_fn(text: str) -> np.ndarray:
+                return vectorizer.transform([text]).toarray()[0]
+        self.embedding_fn = embedding_fn
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # Allocated on first store, once the dimension is known
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._next = 0
+        self._stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "invalidated": 0,
+            "saved_seconds": 0.0,
+        }
+    
+    @staticmethod
+    def _dataset_key(dataset_ids: Optional[Iterable[str]]) -> frozenset:
+        return frozenset(dataset_ids or ())
+    
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embedding_fn(query), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl > 0 and now - entry["created_at"] > self.ttl
+    
+    def lookup(self, query: str, dataset_ids: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Find a cached entry for a query similar enough to ``query``.
+        
+        Args:
+            query: Incoming query.
+            dataset_ids: Datasets the query is answered from; only entries for
+                the same datasets match.
+        
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the entry with ``query``,
+            ``documents``, ``answer`` and ``similarity``, or None on a miss.
+        """
+        vector = self._embed(query)
+        datasets = self._dataset_key(dataset_ids)
+        now = time.time()
+        
+        with self._lock:
+            self._stats["lookups"] += 1
+            entry = None
+            if self._matrix is not None and vector.shape[0] == self._matrix.shape[1]:
+                similarities = self._matrix @ vector
+                rows = np.flatnonzero(similarities >= self.threshold)
+                for row in rows[np.argsort(-similarities[rows])]:
+                    candidate = self._entries[row]
+                    if candidate is None or candidate["datasets"] != datasets:
+                        continue
+                    if self._expired(candidate, now):
+                        self._drop(row)
+                        continue
+                    entry = dict(candidate, similarity=float(similarities[row]))
+                    break
+            
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["saved_seconds"] += entry["latency"]
+        
+        return {
+            "query": entry["query"],
+            "documents": copy.deepcopy(entry["documents"]),
+            "answer": entry["answer"],
+            "similarity": entry["similarity"],
+        }
+    
+    def store(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        dataset_ids: Optional[Iterable[str]] = None,
+        latency: float = 0.0,
+        answer: Optional[str] = None
+    ) -> None:
+        """Cache the retrieved documents for a query.
+        
+        Args:
+            query: Query the documents were retrieved for.
+            documents: Retrieved documents.
+            dataset_ids: Datasets the documents were retrieved from.
+            latency: Time the retrieval took, counted as saved on each hit.
+            answer: Optional generated answer to cache with the documents.
+        """
+        vector = self._embed(query)
+        entry = {
+            "query": query,
+            "datasets": self._dataset_key(dataset_ids),
+            "documents": copy.deepcopy(documents),
+            "answer": answer,
+            "latency": latency,
+            "created_at": time.time(),
+        }
+        
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._entries = [None] * self.max_entries
+                self._next = 0
+            
+            # Replace an existing entry for the same query instead of duplicating it
+            row = self._find_exact(query, entry["datasets"])
+            if row is None:
+                row = self._next
+                self._next = (self._next + 1) % self.max_entries
+            self._matrix[row] = vector
+            self._entries[row] = entry
+            self._stats["stores"] += 1
+    
+    def store_answer(self, query: str, answer: str, dataset_ids: Optional[Iterable[str]] = None) -> bool:
+        """Attach a generated answer to the cached entry of ``query``.
+        
+        Returns:
+            bool: True if the query was cached.
+        """
+        with self._lock:
+            row = self._find_exact(query, self._dataset_key(dataset_ids))
+            if row is None:
+                return False
+            self._entries[row]["answer"] = answer
+            return True
+    
+    def _find_exact(self, query: str, datasets: frozenset) -> Optional[int]:
+        """Row of the entry for exactly this query (caller holds the lock)."""
+        for row, entry in enumerate(self._entries):
+            if entry is not None and entry["query"] == query and entry["datasets"] == datasets:
+                return row
+        return None
+    
+    def _drop(self, row: int) -> None:
+        """Remove an entry (caller holds the lock)."""
+        self._entries[row] = None
+        self._matrix[row] = 0
+    
+    def invalidate(self, dataset_id: Optional[str] = None) -> int:
+        """Drop cached entries that depend on a dataset.
+        
+        Args:
+            dataset_id: Dataset whose entries are dropped; None drops everything.
+        
+        Returns:
+            int: Number of entries dropped.
+        """
+        dropped = 0
+        with self._lock:
+            for row, entry in enumerate(self._entries):
+                if entry is None:
+                    continue
+                if dataset_id is None or dataset_id in entry["datasets"]:
+                    self._drop(row)
+                    dropped += 1
+            self._stats["invalidated"] += dropped
+        return dropped
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Hit rate, saved retrieval time and entry count."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = sum(1 for entry in self._entries if entry is not None)
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        return stats
@@ -1,9 +1,10 @@
 from typing import List, Dict, Any, Optional, Union
 import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 from .base import BaseRetriever
+from .embedding_cache import EmbeddingCache
 
 
 class VectorRetriever(BaseRetriever):
@@ -12,22 +13,104 @@ class VectorRetriever(BaseRetriever):
     This class implements the BaseRetriever interface using vector embeddings
     to retrieve relevant documents based on semantic similarity.
     
+    With an embedding model, documents are embedded in batches and the
+    embeddings are cached by content hash, so re-processing a corpus only
+    embeds new or changed documents. Without one, TF-IDF vectors are kept
+    as a sparse CSR matrix and scored with a sparse product.
+    
     Args:
-        embedding_model: Optional embedding model or function.
+        embedding_model: Optional embedding model or function. A model with an
+            ``embed_documents(texts)`` or ``encode(texts)`` method is called
+            once per batch; a plain callable is called once per text.
         collection_name: Optional name for the document collection.
+        index_type: "exact" for a brute-force cosine scan, or "ivf" for an
+            approximate IVF index (see IVFVectorStorage).
+        index_params: Optional arguments for the approximate index, e.g.
+            ``{"nprobe": 8, "n_lists": 256}``.
+        batch_size: Number of texts per embedding call.
+        cache_size: Number of embeddings kept in the in-memory cache; 0
+            disables caching.
+        cache_dir: Optional directory for an on-disk embedding cache.
     """
     
     def __init__(
         self,
         embedding_model: Optional[Any] = None,
-        collection_name: str = "default"
+        collection_name: str = "default",
+        index_type: str = "exact",
+        index_params: Optional[Dict[str, Any]] = None,
+        batch_size: int = 32,
+        cache_size: int = 10000,
+        cache_dir: Optional[str] = None
     ):
         """Initialize a VectorRetriever."""
         super().__init__()
+        if index_type not in ("exact", "ivf"):
+            raise ValueError(f"Unsupported index type: {index_type}")
         self.embedding_model = embedding_model
         self.collection_name = collection_name
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.batch_size = max(1, batch_size)
+        self.index = None
         self.documents = []
-        self.document_embeddings = []
+        self.document_embeddings = np.zeros((0, 0), dtype=np.float32)
+        self._normalized_embeddings = None  # Dense embeddings scaled to unit length
+        self.vectorizer = None
+        
+        self.embedding_cache = None
+        if embedding_model and (cache_size > 0 or cache_dir):
+            namespace = getattr(embedding_model, "model_name", None) or getattr(
+                embedding_model, "__name__", type(embedding_model).__name__
+            )
+            self.embedding_cache = EmbeddingCache(
+                max_entries=cache_size, cache_dir=cache_dir, namespace=str(namespace)
+            )
+        
+    def _embed_batch(self, texts: List[str]) -> List[Any]:
+        """Embed a batch of texts with the embedding model."""
+        if hasattr(self.embedding_model, "embed_documents"):
+            return list(self.embedding_model.embed_documents(texts))
+        if hasattr(self.embedding_model, "encode"):
+            return list(self.embedding_model.encode(texts))
+        return [self.embedding_model(text) for text in texts]
+        
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in batches, reusing cached embeddings.
+        
+        Args:
+            texts: Texts to embed.
+            
+        Returns:
+            np.ndarray: Matrix of embeddings, one row per text.
+        """
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        keys = None
+        if self.embedding_cache is not None:
+            keys = [self.embedding_cache.key(text) for text in texts]
+            for i, key in enumerate(keys):
+                embeddings[i] = self.embedding_cache.get(key)
+        
+        # Embed each distinct missing text once
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if embeddings[i] is None:
+                missing.setdefault(text, []).append(i)
+        pending = list(missing)
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            for text, embedding in zip(batch, self._embed_batch(batch)):
+                positions = missing[text]
+                if keys is not None:
+                    embedding = self.embedding_cache.put(keys[positions[0]], embedding)
+                else:
+                    embedding = np.asarray(embedding, dtype=np.float32)
+                for i in positions:
+                    embeddings[i] = embedding
+        
+        if not embeddings:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(embeddings).astype(np.float32, copy=False)
         
     def process(
         self,
@@ -48,17 +131,33 @@ class VectorRetriever(BaseRetriever):
         texts = [doc.get(embedding_field, "") for doc in documents]
         
         # Compute embeddings
+        self._normalized_embeddings = None
         if self.embedding_model:
-            # Use provided embedding model
-            self.document_embeddings = [
-                self.embedding_model(text) for text in texts
-            ]
-        else:
-            # Use simple TF-IDF as fallback
+            # Use provided embedding model, in batches and through the cache
+            self.document_embeddings = self.embed_texts(texts)
+            norms = np.linalg.norm(self.document_embeddings, axis=1, keepdims=True)
+            self._normalized_embeddings = self.document_embeddings / np.where(norms > 0, norms, 1.0)
+        elif texts:
+            # Use simple TF-IDF as fallback, kept sparse (rows are L2-normalized)
             vectorizer = TfidfVectorizer()
-            self.document_embeddings = vectorizer.fit_transform(texts).toarray()
+            self.document_embeddings = vectorizer.fit_transform(texts).tocsr()
             # Save vectorizer for query embedding
             self.vectorizer = vectorizer
+        else:
+            self.document_embeddings = np.zeros((0, 0), dtype=np.float32)
+        
+        # Build the approximate index if requested
+        self.index = None
+        if self.index_type == "ivf" and self.document_embeddings.shape[0] > 0:
+            from storages.vector_storages import IVFVectorStorage
+            
+            # The IVF index is dense; TF-IDF vectors are densified only here
+            embeddings = self.document_embeddings
+            if sparse.issparse(embeddings):
+                embeddings = embeddings.toarray()
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            self.index = IVFVectorStorage(dimension=embeddings.shape[1], **self.index_params)
+            self.index.add(embeddings, ids=[str(i) for i in range(len(embeddings))])
     
     def query(
         self,
@@ -78,36 +177,64 @@ class VectorRetriever(BaseRetriever):
         Returns:
             List[Dict[str, Any]]: List of relevant documents with scores.
         """
-        if not self.documents or not self.document_embeddings:
+        if not self.documents or self.document_embeddings.shape[0] == 0:
             return []
             
         # Compute query embedding
         if self.embedding_model:
-            query_embedding = self.embedding_model(query)
+            if hasattr(self.embedding_model, "embed_query"):
+                query_embedding = self.embedding_model.embed_query(query)
+            else:
+                query_embedding = self._embed_batch([query])[0]
+            query_embedding = np.asarray(query_embedding, dtype=np.float32).ravel()
         else:
             # Use TF-IDF vectorizer
-            query_embedding = self.vectorizer.transform([query]).toarray()[0]
+            query_embedding = self.vectorizer.transform([query])
             
-        # Convert embeddings to numpy arrays if they aren't already
-        query_embedding = np.array(query_embedding).reshape(1, -1)
-        document_embeddings = np.array(self.document_embeddings)
+        # Approximate search through the IVF index
+        if self.index is not None:
+            if sparse.issparse(query_embedding):
+                query_embedding = query_embedding.toarray()[0]
+            results = []
+            for match in self.index.search(np.asarray(query_embedding, dtype=np.float32), top_k):
+                if match["score"] < threshold:
+                    break
+                doc = self.documents[int(match["id"])].copy()
+                doc["score"] = match["score"]
+                results.append(doc)
+            return results
         
-        # Compute similarities
-        similarities = cosine_similarity(
-            query_embedding, document_embeddings
-        )[0]
+        # Compute cosine similarities against unit-length document vectors
+        if sparse.issparse(query_embedding):
+            # TF-IDF rows and the query are already L2-normalized
+            similarities = np.asarray(
+                (self.document_embeddings @ query_embedding.T).todense()
+            ).ravel()
+        else:
+            norm = np.linalg.norm(query_embedding)
+            if norm > 0:
+                query_embedding = query_embedding / norm
+            similarities = self._normalized_embeddings @ query_embedding
         
         # Get top-k results above threshold
+        k = min(top_k, similarities.shape[0])
+        if k <= 0:
+            return []
+        if k < similarities.shape[0]:
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(similarities.shape[0])
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        
         results = []
-        for i, score in sorted(
-            enumerate(similarities), key=lambda x: x[1], reverse=True
-        ):
-            if score < threshold or len(results) >= top_k:
+        for i in top:
+            score = float(similarities[i])
+            if score < threshold:
                 break
                 
             # Add document with score
-            doc = self.documents[i].copy()
-            doc["score"] = float(score)
+            doc = self.documents[int(i)].copy()
+            doc["score"] = score
             results.append(doc)
             
         return results
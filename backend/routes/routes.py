@@ -13,7 +13,7 @@ from controllers.deploy_controller import DeployController
 from controllers.apikey_controller import ApiKeyController
 from controllers.diagram_controller import DiagramController  # 添加图表控制器导入
 from middlewares.middlewares import setup_middlewares
-from utils.auth import require_login, token_required, get_current_user
+from utils.auth import require_login, token_required, admin_required, get_current_user
 from middlewares.auth import jwt_required
 from controllers.topology_controller import TopologyController
 from controllers.files_controller import FilesController
@@ -22,6 +22,7 @@ from controllers.template_controller import TemplateController
 from controllers.terraform_controller import TerraformController  # 添加Terraform控制器导入
 # 添加云服务提供商控制器导入
 from controllers.clouds_controller import CloudsController
+from db.pool import get_pool_metrics
 from datetime import datetime
 
 def setup_routes(app: Flask, config: Config):
@@ -72,6 +73,14 @@ def setup_routes(app: Flask, config: Config):
             "timestamp": datetime.now().isoformat()
         }), 200
     
+    @app.route("/api/health/db-pool", methods=["GET"])
+    def db_pool_metrics():
+        """数据库连接池指标（借出等待时间、使用中连接数、耗尽次数等）"""
+        return jsonify({
+            "pools": get_pool_metrics(),
+            "timestamp": datetime.now().isoformat()
+        }), 200
+    
     @app.route("/api/register", methods=["POST"])
     def register():
         return auth_controller.register()
@@ -223,6 +232,24 @@ def setup_routes(app: Flask, config: Config):
         request.current_user = get_current_user(request)
         return chat_controller.get_chat_history()
 
+    @app.route("/api/chat/persistence-stats", methods=["GET"])
+    @token_required
+    def get_chat_persistence_stats():
+        logging.info("路由: 获取聊天记录写入统计")
+        return chat_controller.get_chat_persistence_stats()
+    
+    @app.route("/api/chat/semantic-cache", methods=["GET"])
+    @token_required
+    def get_chat_semantic_cache_stats():
+        logging.info("路由: 获取RAG语义缓存统计")
+        return chat_controller.get_semantic_cache_stats()
+    
+    @app.route("/api/chat/semantic-cache", methods=["DELETE"])
+    @admin_required
+    def invalidate_chat_semantic_cache():
+        logging.info("路由: 清除RAG语义缓存")
+        return chat_controller.invalidate_semantic_cache()
+    
     # 添加一个额外的路由，直接处理/chat路径
     @app.route("/chat", methods=["POST"])
     @token_required
@@ -413,6 +440,14 @@ def setup_routes(app: Flask, config: Config):
         request.current_user = get_current_user(request)
         return deploy_controller.get_deployment_status()
     
+    # 部署进度SSE流（实时推送terraform输出）
+    @app.route('/api/deploy/events', methods=['GET'])
+    @token_required
+    def stream_deployment_events():
+        logging.info("路由: 订阅部署进度事件")
+        request.current_user = get_current_user(request)
+        return deploy_controller.stream_deployment_events()
+    
     @app.route('/api/deploy/execute', methods=['POST'])
     @token_required
     def execute_deploy():
@@ -821,6 +856,32 @@ def setup_routes(app: Flask, config: Config):
         request.current_user = get_current_user(request)
         return terraform_controller.get_ai_deployment_details()
     
+    @app.route('/api/terraform/mcp-cache', methods=['GET'])
+    @token_required
+    def get_terraform_mcp_cache_stats():
+        logging.info("路由: 获取MCP文档缓存统计")
+        return terraform_controller.get_mcp_cache_stats()
+    
+    @app.route('/api/terraform/plugin-cache', methods=['GET'])
+    @token_required
+    def get_terraform_plugin_cache_stats():
+        logging.info("路由: 获取Terraform插件缓存统计")
+        return terraform_controller.get_plugin_cache_stats()
+    
+    @app.route('/api/terraform/jobs', methods=['GET'])
+    @token_required
+    def get_terraform_jobs():
+        logging.info("路由: 获取部署任务执行器状态")
+        request.current_user = get_current_user(request)
+        return terraform_controller.get_deployment_jobs()
+    
+    @app.route('/api/terraform/jobs/<string:job_id>/cancel', methods=['POST'])
+    @token_required
+    def cancel_terraform_job(job_id):
+        logging.info(f"路由: 取消部署任务 {job_id}")
+        request.current_user = get_current_user(request)
+        return terraform_controller.cancel_deployment_job(job_id)
+    
     @app.route('/api/terraform/file', methods=['GET'])
     def get_ai_deployment_file():
         logging.info("路由: 获取AI部署文件")
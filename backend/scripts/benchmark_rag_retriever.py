@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+RAG 检索 MCP 会话池基准测试脚本
+对比每次查询都新建 SSE 连接并 initialize（旧方式）、复用常驻会话池、会话池加结果缓存三种方式的
+查询延迟与吞吐。默认在本地启动模拟的 RAGFlow MCP SSE 服务（scripts/fake_mcp_sse_server.py），
+也可以用 --endpoint 指向真实服务
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加backend路径到sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anyio import run
+from mcp.client.session import ClientSession
+from mcp.client.sse import sse_client
+
+from retrievers.rag_retriever import RAGRetriever
+
+
+def start_fake_server(port, latency, init_latency):
+    """启动模拟服务并等待端口可连接"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_mcp_sse_server.py')
+    process = subprocess.Popen(
+        [sys.executable, script, '--port', str(port), '--latency', str(latency),
+         '--init-latency', str(init_latency)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"模拟服务未能在端口 {port} 启动")
+
+
+def query_without_pool(endpoint, dataset_ids, question):
+    """旧方式：每次查询新建事件循环、SSE 连接和 MCP 会话"""
+    async def _query():
+        async with sse_client(endpoint) as streams:
+            async with ClientSession(streams[0], streams[1]) as session:
+                await session.initialize()
+                return await session.call_tool(
+                    name='ragflow_retrieval',
+                    arguments={'dataset_ids': dataset_ids, 'document_ids': [], 'question': question}
+                )
+    return run(_query)
+
+
+def time_queries(func, questions, concurrency):
+    """并发执行查询，返回 (每个查询的耗时毫秒, 总耗时秒)"""
+    def timed(question):
+        started = time.perf_counter()
+        func(question)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, questions))
+    return latencies, time.perf_counter() - started
+
+
+def summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'p50_ms': round(ordered[len(ordered) // 2], 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'qps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RAG 检索 MCP 会话池基准测试')
+    parser.add_argument('--endpoint', help='MCP SSE 服务地址，不指定时启动本地模拟服务')
+    parser.add_argument('--port', type=int, default=9390, help='本地模拟服务端口')
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟服务每次工具调用的延迟（秒）')
+    parser.add_argument('--init-latency', type=float, default=0.05, help='模拟服务建立SSE连接的延迟（秒）')
+    parser.add_argument('--queries', type=int, default=100, help='查询次数')
+    parser.add_argument('--distinct', type=int, default=20, help='不同问题的数量（用于衡量缓存命中）')
+    parser.add_argument('--concurrency', type=int, default=4, help='并发查询数')
+    parser.add_argument('--pool-size', type=int, default=2, help='会话池大小')
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        server = start_fake_server(args.port, args.latency, args.init_latency)
+        endpoint = f"http://127.0.0.1:{args.port}/sse"
+
+    dataset_ids = ['bench-dataset']
+    questions = [f"question {i % args.distinct}" for i in range(args.queries)]
+    report = {'endpoint': endpoint, 'queries': args.queries, 'concurrency': args.concurrency}
+    try:
+        latencies, elapsed = time_queries(
+            lambda q: query_without_pool(endpoint, dataset_ids, q), questions, args.concurrency
+        )
+        report['per_query_connection'] = summarize(latencies, elapsed)
+
+        pooled = RAGRetriever(endpoint=endpoint, dataset_ids=dataset_ids, pool_size=args.pool_size, cache_ttl=0)
+        pooled.search('warmup')
+        latencies, elapsed = time_queries(lambda q: pooled.search(q), questions, args.concurrency)
+        report['session_pool'] = summarize(latencies, elapsed)
+
+        cached = RAGRetriever(endpoint=endpoint, dataset_ids=dataset_ids, pool_size=args.pool_size, cache_ttl=300)
+        latencies, elapsed = time_queries(lambda q: cached.search(q), questions, args.concurrency)
+        report['session_pool_with_cache'] = dict(summarize(latencies, elapsed), **cached.cache.metrics())
+        report['pool_metrics'] = pooled.pool.metrics()
+    finally:
+        if server is not None:
+            server.terminate()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
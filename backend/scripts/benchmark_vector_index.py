@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+向量索引基准测试脚本
+在合成的聚类数据上对比精确检索(SimpleVectorStorage)与IVF近似检索(IVFVectorStorage)，
+输出不同 nprobe 下的召回率与查询延迟，用于选择召回/延迟的平衡点
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# 添加backend路径到sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_dataset(n, dimension, n_clusters, n_queries, seed):
+    """生成带聚类结构的向量（接近真实embedding分布），查询向量取自同一分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n + n_queries)
+    data = centers[labels] + 0.5 * rng.normal(size=(n + n_queries, dimension)).astype(np.float32)
+    return data[:n], data[n:]
+
+
+def time_queries(storage, queries, top_k, **kwargs):
+    """返回 (每个查询的结果ID列表, 每个查询的耗时毫秒)"""
+    results = []
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        matches = storage.search(query, top_k, **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([match['id'] for match in matches])
+    return results, latencies
+
+
+def summarize(latencies):
+    return {
+        'mean_ms': round(float(np.mean(latencies)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='对比精确向量检索与IVF近似检索的召回率和延迟')
+    parser.add_argument('--size', type=int, default=50000, help='向量数量')
+    parser.add_argument('--dimension', type=int, default=128, help='向量维度')
+    parser.add_argument('--clusters', type=int, default=100, help='合成数据的聚类数')
+    parser.add_argument('--queries', type=int, default=200, help='查询数量')
+    parser.add_argument('--top-k', type=int, default=10, help='每个查询返回的结果数')
+    parser.add_argument('--n-lists', type=int, default=None, help='IVF聚类数（默认约为sqrt(size)）')
+    parser.add_argument('--nprobe', type=int, nargs='*', default=[1, 2, 4, 8, 16, 32],
+                        help='需要测试的 nprobe 取值')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
+    args = parser.parse_args()
+
+    from storages.vector_storages.simple_storage import SimpleVectorStorage
+    from storages.vector_storages.ivf_storage import IVFVectorStorage
+
+    data, queries = make_dataset(args.size, args.dimension, args.clusters, args.queries, args.seed)
+    ids = [str(i) for i in range(args.size)]
+
+    exact = SimpleVectorStorage(dimension=args.dimension, initial_capacity=args.size)
+    exact.add(data, ids=ids)
+
+    started = time.perf_counter()
+    ivf = IVFVectorStorage(dimension=args.dimension, n_lists=args.n_lists, initial_capacity=args.size,
+                           seed=args.seed)
+    ivf.add(data, ids=ids)
+    build_seconds = time.perf_counter() - started
+
+    truth, exact_latencies = time_queries(exact, queries, args.top_k)
+
+    report = {
+        'size': args.size,
+        'dimension': args.dimension,
+        'top_k': args.top_k,
+        'n_lists': int(ivf._centroids.shape[0]) if ivf.is_trained else 0,
+        'ivf_build_seconds': round(build_seconds, 3),
+        'exact': summarize(exact_latencies),
+        'ivf': [],
+    }
+    for nprobe in args.nprobe:
+        approx, latencies = time_queries(ivf, queries, args.top_k, nprobe=nprobe)
+        recall = np.mean([len(set(a) & set(t)) / max(len(t), 1) for a, t in zip(approx, truth)])
+        report['ivf'].append(dict(nprobe=nprobe, recall=round(float(recall), 4), **summarize(latencies)))
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
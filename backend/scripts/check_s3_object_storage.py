@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+S3 对象存储检查脚本
+在 moto 模拟的 S3 上验证 S3ObjectStorage 的分片上传、并行分段下载、字节范围读取、
+批量删除和并行列举的结果是否正确，并输出各操作耗时。不需要真实的 AWS 账号，
+依赖 requirements-dev.txt 中的 moto
+"""
+
+import json
+import os
+import sys
+import time
+
+# 添加backend路径到sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# S3 要求除最后一片外每个分片至少 5MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def timed(report, name, func, *args, **kwargs):
+    """执行一次操作并把耗时（毫秒）记入报告"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    report['timings_ms'][name] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def run_checks(storage, args):
+    """依次检查各项操作，返回 (失败项列表, 报告)"""
+    failures = []
+    report = {'timings_ms': {}}
+
+    def check(name, ok):
+        if not ok:
+            failures.append(name)
+
+    large = os.urandom(args.large_mb * 1024 * 1024 + 12345)
+    small = b'hello s3 object storage'
+
+    # 上传：超过阈值的对象走分片上传，空对象和小对象走单次PUT
+    check('put_large', timed(report, 'put_large', storage.put, 'data/large.bin', large, {'kind': 'large'}))
+    check('put_small', timed(report, 'put_small', storage.put, 'data/small.txt', small))
+    check('put_empty', storage.put('data/empty.bin', b''))
+
+    # 下载：大对象按分段并行下载后拼接
+    check('get_large', timed(report, 'get_large', storage.get, 'data/large.bin') == large)
+    check('get_small', storage.get('data/small.txt') == small)
+    check('get_empty', storage.get('data/empty.bin') == b'')
+    check('get_missing', storage.get('data/missing.bin') is None)
+    check('get_metadata', storage.get_metadata('data/large.bin') == {'kind': 'large'})
+
+    # 字节范围读取，包括长度为0和读到结尾的情况
+    check('get_range', storage.get_range('data/large.bin', 1000, 500) == large[1000:1500])
+    check('get_range_to_end', storage.get_range('data/large.bin', len(large) - 10) == large[-10:])
+    check('get_range_zero_length', storage.get_range('data/large.bin', 1000, 0) == b'')
+    check('get_range_negative_length', storage.get_range('data/large.bin', 1000, -1) == b'')
+
+    # 批量删除：超过1000个键时拆成多个 DeleteObjects 请求
+    keys = [f"batch/{i % 7}/{i}.txt" for i in range(args.keys)]
+    for key in keys:
+        storage.put(key, key)
+    listed = timed(report, 'list', storage.list)
+    check('list', set(keys) <= set(listed) and 'data/large.bin' in listed)
+    check('list_prefix', sorted(storage.list('batch/3/')) == sorted(k for k in keys if k.startswith('batch/3/')))
+    check('delete_many', timed(report, 'delete_many', storage.delete_many, keys))
+    check('delete_many_listed', not storage.list('batch/'))
+    check('delete', storage.delete('data/small.txt') and storage.get('data/small.txt') is None)
+
+    report['large_object_bytes'] = len(large)
+    report['batch_keys'] = len(keys)
+    return failures, report
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='在moto模拟的S3上检查S3ObjectStorage')
+    parser.add_argument('--large-mb', type=int, default=12, help='分片上传/分段下载测试对象的大小（MB）')
+    parser.add_argument('--keys', type=int, default=1500, help='批量删除测试的对象数量')
+    parser.add_argument('--concurrency', type=int, default=4, help='分片/分段请求的并发数')
+
+    args = parser.parse_args()
+
+    try:
+        from moto import mock_aws
+    except ImportError:
+        print("需要安装moto: pip install -r requirements-dev.txt")
+        sys.exit(2)
+
+    import boto3
+    from storages.object_storages.s3_storage import S3ObjectStorage
+
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    with mock_aws():
+        # 使用独立的客户端，避免共享客户端在moto启用前已创建
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='check-bucket')
+        storage = S3ObjectStorage(
+            'check-bucket',
+            prefix='check',
+            multipart_threshold=MIN_PART_SIZE,
+            chunk_size=MIN_PART_SIZE,
+            max_concurrency=args.concurrency,
+            client=client
+        )
+        failures, report = run_checks(storage, args)
+
+    report['failures'] = failures
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
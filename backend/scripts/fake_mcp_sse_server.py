@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+本地模拟的 RAGFlow MCP SSE 服务
+提供与 RAGFlow 相同的 ragflow_retrieval 工具（返回按行分隔的 JSON 文档），可设置每次调用的
+延迟和会话建立延迟，用于在没有真实 RAGFlow 服务时测试 RAGRetriever / MCPClient 以及
+MCP SSE 会话池的基准测试
+
+用法:
+    python scripts/fake_mcp_sse_server.py --port 9382 --latency 0.05
+    然后把 endpoint 指向 http://127.0.0.1:9382/sse
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+
+# 添加backend路径到sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp.server.fastmcp import FastMCP
+
+
+def make_documents(question, dataset_ids, count):
+    """按问题生成确定性的模拟文档，相同问题返回相同结果"""
+    seed = int(hashlib.sha1(question.encode('utf-8')).hexdigest()[:8], 16)
+    documents = []
+    for i in range(count):
+        dataset_id = dataset_ids[i % len(dataset_ids)] if dataset_ids else 'fake-dataset'
+        documents.append({
+            'content': f"[{dataset_id}] 与“{question}”相关的模拟文档片段 #{i}",
+            'dataset_id': dataset_id,
+            'document_id': f"doc-{seed % 10000}-{i}",
+            'document_keyword': f"fake-{i}.md",
+            'similarity': round(1.0 - i / (count + 1), 4)
+        })
+    return documents
+
+
+def create_server(host, port, latency, docs, init_latency):
+    """创建模拟的 MCP SSE 服务"""
+    server = FastMCP('fake-ragflow', host=host, port=port)
+    stats = {'calls': 0, 'sessions': 0}
+
+    if init_latency > 0:
+        # 模拟真实服务建立会话的开销：在 SSE 连接建立时等待
+        original_sse_app = server.sse_app
+
+        def sse_app(*args, **kwargs):
+            app = original_sse_app(*args, **kwargs)
+
+            async def delayed_app(scope, receive, send):
+                if scope['type'] == 'http' and scope['path'].endswith('/sse'):
+                    stats['sessions'] += 1
+                    await asyncio.sleep(init_latency)
+                await app(scope, receive, send)
+            return delayed_app
+        server.sse_app = sse_app
+
+    @server.tool()
+    async def ragflow_retrieval(dataset_ids: list, document_ids: list, question: str) -> str:
+        """Retrieve relevant chunks from the given datasets."""
+        stats['calls'] += 1
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return '\n'.join(json.dumps(doc, ensure_ascii=False) for doc in make_documents(question, dataset_ids, docs))
+
+    @server.tool()
+    async def fake_stats() -> str:
+        """Return call and session counters of the fake server."""
+        return json.dumps(stats)
+
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟的 RAGFlow MCP SSE 服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=9382, help='监听端口')
+    parser.add_argument('--latency', type=float, default=0.0, help='每次工具调用的模拟延迟（秒）')
+    parser.add_argument('--init-latency', type=float, default=0.0, help='每次建立SSE连接的模拟延迟（秒）')
+    parser.add_argument('--docs', type=int, default=5, help='每次检索返回的文档数')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    server = create_server(args.host, args.port, args.latency, args.docs, args.init_latency)
+    print(f"模拟 RAGFlow MCP SSE 服务: http://{args.host}:{args.port}/sse", flush=True)
+    server.run(transport='sse')
+
+
+if __name__ == '__main__':
+    main()
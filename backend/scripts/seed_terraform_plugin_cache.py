@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Terraform provider插件缓存预热脚本
+为常用的provider集合生成预初始化的工作目录模板，预热后terraform init
+直接从本地缓存链接provider，可在离线环境中运行
+"""
+
+import json
+import logging
+import os
+import sys
+
+# 添加backend路径到sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 项目中查询/部署模板使用的provider集合
+DEFAULT_PROVIDER_SETS = [
+    # 资源查询 (toolkits/terraform_generator.py)
+    '''terraform {
+  required_providers {
+    aws = { source = "hashicorp/aws", version = "~> 5.84.0" }
+    external = { source = "hashicorp/external", version = "~> 2.3.5" }
+  }
+}''',
+    # AWS 部署
+    '''terraform {
+  required_providers {
+    aws = { source = "hashicorp/aws", version = "~> 5.84.0" }
+  }
+}''',
+    # Azure 部署/查询
+    '''terraform {
+  required_providers {
+    azurerm = { source = "hashicorp/azurerm", version = "~> 4.0" }
+  }
+}''',
+    # 阿里云查询
+    '''terraform {
+  required_providers {
+    alicloud = { source = "aliyun/alicloud", version = "~> 1.160.0" }
+  }
+}''',
+]
+
+
+def collect_configs(paths):
+    """收集配置：.tf 文件按单个配置处理，目录下每个包含 .tf 文件的子目录作为一个配置"""
+    from utils.terraform_plugin_cache import TerraformPluginCache
+
+    configs = []
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                configs.append((path, f.read()))
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if d != '.terraform']
+            if any(name.endswith('.tf') for name in files):
+                configs.append((root, TerraformPluginCache.read_workdir_content(root)))
+    return configs
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='预热Terraform provider插件缓存')
+    parser.add_argument('--paths', nargs='*', default=[],
+                        help='额外扫描的 .tf 文件或目录（如 query/ 下已有的工作目录）')
+    parser.add_argument('--no-defaults', action='store_true', help='不预热内置的provider集合')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    from utils.terraform_plugin_cache import get_plugin_cache, parse_provider_requirements
+
+    plugin_cache = get_plugin_cache()
+    if not plugin_cache.enabled:
+        print("TERRAFORM_PLUGIN_CACHE 未启用，无需预热")
+        sys.exit(1)
+
+    configs = [] if args.no_defaults else [(f"default-{i}", c) for i, c in enumerate(DEFAULT_PROVIDER_SETS)]
+    configs.extend(collect_configs(args.paths))
+
+    seeded = {}
+    failed = []
+    for origin, content in configs:
+        requirements = parse_provider_requirements(content)
+        if not requirements:
+            continue
+        key = plugin_cache.provider_set_key(requirements)
+        if key in seeded:
+            continue
+        if plugin_cache.seed(requirements):
+            seeded[key] = [f"{source} {version}".strip() for _, source, version in requirements]
+        else:
+            failed.append(origin)
+
+    print(json.dumps({
+        "seeded": seeded,
+        "failed": failed,
+        "metrics": plugin_cache.metrics()
+    }, indent=2, ensure_ascii=False))
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+MCP文档缓存预热脚本
+预先查询常用云资源的Terraform MCP文档并写入磁盘缓存，
+使后续的 @ai 代码生成直接命中缓存
+"""
+
+import json
+import logging
+import os
+import sys
+
+# 添加backend路径到sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='预热Terraform MCP文档缓存')
+    parser.add_argument('--providers', nargs='*',
+                        help='需要预热的provider (默认: aws alicloud huaweicloud tencentcloud)')
+    parser.add_argument('--clear', action='store_true', help='预热前清空已有缓存')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    # 预热脚本始终启用MCP，且不在控制器初始化时重复触发后台预热
+    os.environ['ENABLE_TERRAFORM_MCP'] = 'true'
+    os.environ['TERRAFORM_MCP_CACHE_WARMUP'] = 'false'
+
+    from config.config import Config
+    from controllers.terraform_controller import TerraformController
+
+    controller = TerraformController(Config())
+    if not controller.enable_mcp:
+        print("MCP server不可用，无法预热缓存")
+        sys.exit(1)
+
+    if args.clear:
+        controller.mcp_doc_cache.clear()
+        print("已清空MCP文档缓存")
+
+    stats = controller.warm_mcp_doc_cache(args.providers)
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -114,6 +114,7 @@ CREATE TABLE `chat_history` (
   KEY `idx_username` (`username`),
   KEY `idx_created_at` (`created_at`),
   KEY `idx_session_id` (`session_id`),
+  KEY `idx_chat_history_username_created_id` (`username`,`created_at`,`id`),
   CONSTRAINT `chat_history_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=275 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='聊天历史记录表';
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -9,7 +9,7 @@ This module provides storage capabilities for various data types, including:
 """
 
 from .key_value_storages import KeyValueStorage, FileKeyValueStorage, SQLiteKeyValueStorage
-from .vector_storages import VectorStorage, SimpleVectorStorage, ChromaVectorStorage
+from .vector_storages import VectorStorage, SimpleVectorStorage, IVFVectorStorage, ChromaVectorStorage
 from .object_storages import ObjectStorage, FileObjectStorage, S3ObjectStorage
 from .graph_storages import GraphStorage, NetworkXGraphStorage
 
@@ -19,6 +19,7 @@ __all__ = [
     'SQLiteKeyValueStorage',
     'VectorStorage',
     'SimpleVectorStorage',
+    'IVFVectorStorage',
     'ChromaVectorStorage',
     'ObjectStorage',
     'FileObjectStorage',
@@ -107,3 +107,11 @@ class GraphStorage(ABC):
             bool: True if successful, False otherwise.
         """
         pass
+
+# Import implementations after defining the base class to avoid circular imports
+from .networkx_storage import NetworkXGraphStorage
+
+__all__ = [
+    'GraphStorage',
+    'NetworkXGraphStorage',
+]
@@ -1,91 +1,276 @@
 import networkx as nx
-from typing import Any, Dict, List, Optional, Union, Tuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union, Tuple
 import json
+import logging
 import os
+import pickle
+import tempfile
+import threading
 
 from . import GraphStorage
 
+logger = logging.getLogger(__name__)
+
 class NetworkXGraphStorage(GraphStorage):
     """Graph storage implementation using NetworkX.
     
     This class implements the GraphStorage interface using NetworkX
     for storing and manipulating graph data structures.
     
+    When a storage path is given, the graph is persisted as a binary snapshot
+    at ``storage_path`` plus an append-only mutation log at
+    ``storage_path + ".log"``. Each mutation appends one JSON line to the
+    log instead of rewriting the whole graph; once the log holds
+    ``compact_threshold`` records it is compacted into a new snapshot.
+    Loading reads the snapshot and replays the log. Snapshots written as
+    node-link JSON by earlier versions are still loaded.
+    
+    Use ``transaction()`` or the bulk ``add_nodes``/``add_edges`` methods to
+    write many mutations with a single flush.
+    
     Args:
         storage_path: Optional path to save the graph to disk.
         directed: Whether the graph is directed.
+        compact_threshold: Number of log records that triggers a compaction.
+        fsync: Whether to fsync the log after each flush.
     """
     
+    SNAPSHOT_VERSION = 1
+    
     def __init__(
         self,
         storage_path: Optional[str] = None,
-        directed: bool = True
+        directed: bool = True,
+        compact_threshold: int = 10000,
+        fsync: bool = False
     ):
         """Initialize a NetworkXGraphStorage."""
         self.storage_path = storage_path
         self.directed = directed
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.log_path = f"{storage_path}.log" if storage_path else None
+        
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._log_records = 0
+        self._pending: List[str] = []
+        self._transaction_depth = 0
         
         # Create graph
         if directed:
             self.graph = nx.DiGraph()
         else:
             self.graph = nx.Graph()
-            
+        
         # Load from disk if storage path is provided and file exists
-        if storage_path and os.path.exists(storage_path):
+        if storage_path and (os.path.exists(storage_path) or os.path.exists(self.log_path)):
             self.load()
-        
+    
     def save(self) -> bool:
         """Save the graph to disk.
         
+        Writes a new snapshot and truncates the mutation log.
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         if not self.storage_path:
             return False
-            
-        try:
-            # Create parent directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
-            
-            # Convert graph to serializable format
-            data = nx.node_link_data(self.graph)
-            
-            # Save to file
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f)
+        
+        with self._lock:
+            try:
+                self._flush()
                 
-            return True
-        except Exception:
-            return False
-            
+                # Create parent directory if it doesn't exist
+                directory = os.path.dirname(self.storage_path) or "."
+                os.makedirs(directory, exist_ok=True)
+                
+                # The snapshot carries a generation number; a log left behind by an
+                # interrupted compaction has an older generation and is ignored on load
+                generation = self._generation + 1
+                snapshot = {
+                    "version": self.SNAPSHOT_VERSION,
+                    "generation": generation,
+                    "graph": self.graph,
+                }
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-graph-")
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.storage_path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+                
+                self._generation = generation
+                self._reset_log()
+                return True
+            except Exception:
+                return False
+    
     def load(self) -> bool:
         """Load the graph from disk.
         
         Returns:
             bool: True if successful, False otherwise.
         """
-        if not self.storage_path or not os.path.exists(self.storage_path):
+        if not self.storage_path:
             return False
-            
-        try:
-            # Load from file
-            with open(self.storage_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        
+        with self._lock:
+            try:
+                graph = nx.DiGraph() if self.directed else nx.Graph()
+                generation = 0
                 
-            # Convert to NetworkX graph
-            if self.directed:
-                self.graph = nx.node_link_graph(data, directed=True)
-            else:
-                self.graph = nx.node_link_graph(data, directed=False)
+                if os.path.exists(self.storage_path):
+                    with open(self.storage_path, 'rb') as f:
+                        data = f.read()
+                    if data.lstrip()[:1] == b'{':
+                        # Node-link JSON snapshot written by earlier versions
+                        graph = nx.node_link_graph(json.loads(data.decode('utf-8')), directed=self.directed)
+                    else:
+                        snapshot = pickle.loads(data)
+                        graph = snapshot["graph"]
+                        generation = snapshot["generation"]
                 
-            return True
-        except Exception:
-            return False
+                self._pending = []
+                self._log_records = self._replay_log(graph, generation)
+                self.graph = graph
+                self._generation = generation
+                return True
+            except Exception:
+                return False
+    
+    def _replay_log(self, graph: nx.Graph, generation: int) -> int:
+        """Apply the mutations logged since the snapshot; returns the number of records.
+        
+        Replay stops at the first record that is cut off or cannot be applied,
+        and the log is truncated there so later appends stay readable. A log
+        whose header is unreadable or predates the snapshot is started afresh.
+        """
+        if not os.path.exists(self.log_path):
+            return 0
+        
+        records = 0
+        with open(self.log_path, 'rb') as f:
+            header = f.readline()
+            try:
+                current = header.endswith(b'\n') and json.loads(header).get("generation") == generation
+            except ValueError:
+                current = False
+            if not current:
+                # The log predates the snapshot or its header was cut off
+                self._reset_log(generation)
+                return 0
+            
+            valid_end = f.tell()
+            for line in f:
+                if not line.endswith(b'\n'):
+                    logger.warning(f"Dropping truncated record at byte {valid_end} of {self.log_path}")
+                    break
+                try:
+                    self._apply(graph, json.loads(line))
+                except Exception as e:
+                    logger.error(f"Stopping replay at byte {valid_end} of {self.log_path}: {str(e)}")
+                    break
+                records += 1
+                valid_end += len(line)
+            else:
+                return records
+        
+        # Cut the log back to the last applied record
+        with open(self.log_path, 'r+b') as f:
+            f.truncate(valid_end)
+            f.flush()
+            os.fsync(f.fileno())
+        return records
+    
+    @staticmethod
+    def _apply(graph: nx.Graph, record: Dict[str, Any]):
+        """Apply a logged mutation to a graph."""
+        op = record["op"]
+        if op == "add_node":
+            graph.add_node(record["id"], **record["properties"])
+        elif op == "add_edge":
+            graph.add_edge(record["source"], record["target"], **record["properties"])
+        elif op == "delete_node":
+            if record["id"] in graph:
+                graph.remove_node(record["id"])
+        elif op == "delete_edge":
+            if graph.has_edge(record["source"], record["target"]):
+                graph.remove_edge(record["source"], record["target"])
+    
+    def _reset_log(self, generation: Optional[int] = None):
+        """Start an empty log for a generation, by default the current one (caller holds the lock)."""
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"generation": self._generation if generation is None else generation}) + '\n')
+        os.replace(tmp_path, self.log_path)
+        self._log_records = 0
+    
+    def _encode(self, record: Dict[str, Any]) -> Optional[str]:
+        """Serialize a mutation before applying it, so unserializable data fails early."""
+        return json.dumps(record) if self.storage_path else None
+    
+    def _record(self, entry: Optional[str]):
+        """Queue a mutation for the log and flush unless inside a transaction."""
+        if entry is None:
+            return
+        self._pending.append(entry)
+        if self._transaction_depth == 0:
+            self._flush()
+            self._maybe_compact()
+    
+    def _flush(self):
+        """Append queued mutations to the log (caller holds the lock)."""
+        if not self._pending:
+            return
+        if not os.path.exists(self.log_path):
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            self._reset_log()
+        
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(self._pending) + '\n')
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._log_records += len(self._pending)
+        self._pending = []
+    
+    def _maybe_compact(self):
+        if self.compact_threshold > 0 and self._log_records >= self.compact_threshold:
+            self.save()
+    
+    @contextmanager
+    def transaction(self) -> Iterator["NetworkXGraphStorage"]:
+        """Defer writing mutations to disk until the block exits.
+        
+        Mutations inside the block are applied to the in-memory graph
+        immediately and written to the log in a single append when the
+        outermost block exits, even if it raises. Transactions do not roll
+        back in-memory changes.
+        
+        Yields:
+            NetworkXGraphStorage: This storage.
+        """
+        with self._lock:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0 and self.storage_path:
+                    self._flush()
+                    self._maybe_compact()
     
     def add_node(
-        self, 
-        node_id: str, 
+        self,
+        node_id: str,
         properties: Optional[Dict[str, Any]] = None
     ) -> bool:
         """Add a node to the graph.
@@ -93,24 +278,45 @@ class NetworkXGraphStorage(GraphStorage):
         Args:
             node_id: Unique identifier for the node.
             properties: Optional properties for the node.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         try:
-            self.graph.add_node(node_id, **(properties or {}))
+            with self._lock:
+                entry = self._encode({"op": "add_node", "id": node_id, "properties": properties or {}})
+                self.graph.add_node(node_id, **(properties or {}))
+                self._record(entry)
             
-            # Save to disk if storage path is provided
-            if self.storage_path:
-                self.save()
-                
             return True
         except Exception:
             return False
     
+    def add_nodes(
+        self,
+        nodes: Iterable[Union[str, Tuple[str, Dict[str, Any]]]]
+    ) -> bool:
+        """Add several nodes with a single flush.
+        
+        Args:
+            nodes: Node IDs or ``(node_id, properties)`` tuples.
+        
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        with self.transaction():
+            for node in nodes:
+                if isinstance(node, tuple):
+                    node_id, properties = node
+                else:
+                    node_id, properties = node, None
+                if not self.add_node(node_id, properties):
+                    return False
+        return True
+    
     def add_edge(
-        self, 
-        source_id: str, 
+        self,
+        source_id: str,
         target_id: str,
         edge_type: Optional[str] = None,
         properties: Optional[Dict[str, Any]] = None
@@ -122,46 +328,64 @@ class NetworkXGraphStorage(GraphStorage):
             target_id: ID of the target node.
             edge_type: Optional type of the edge.
             properties: Optional properties for the edge.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         try:
-            # Ensure nodes exist
-            if source_id not in self.graph:
-                self.add_node(source_id)
+            with self._lock:
+                # Ensure nodes exist
+                if source_id not in self.graph:
+                    self.add_node(source_id)
                 
-            if target_id not in self.graph:
-                self.add_node(target_id)
+                if target_id not in self.graph:
+                    self.add_node(target_id)
                 
-            # Prepare edge properties
-            edge_props = properties or {}
-            if edge_type:
-                edge_props['type'] = edge_type
+                # Prepare edge properties
+                edge_props = dict(properties or {})
+                if edge_type:
+                    edge_props['type'] = edge_type
                 
-            # Add edge
-            self.graph.add_edge(source_id, target_id, **edge_props)
+                # Add edge
+                entry = self._encode({"op": "add_edge", "source": source_id, "target": target_id, "properties": edge_props})
+                self.graph.add_edge(source_id, target_id, **edge_props)
+                self._record(entry)
             
-            # Save to disk if storage path is provided
-            if self.storage_path:
-                self.save()
-                
             return True
         except Exception:
             return False
     
+    def add_edges(
+        self,
+        edges: Iterable[Tuple[Any, ...]]
+    ) -> bool:
+        """Add several edges with a single flush.
+        
+        Args:
+            edges: ``(source_id, target_id)``, ``(source_id, target_id, edge_type)``
+                or ``(source_id, target_id, edge_type, properties)`` tuples.
+        
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        with self.transaction():
+            for edge in edges:
+                if not self.add_edge(*edge):
+                    return False
+        return True
+    
     def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
         """Get a node by ID.
         
         Args:
             node_id: ID of the node to get.
-            
+        
         Returns:
             Optional[Dict[str, Any]]: Node data if found, None otherwise.
         """
         if node_id not in self.graph:
             return None
-            
+        
         # Get node attributes
         attrs = dict(self.graph.nodes[node_id])
         
@@ -172,7 +396,7 @@ class NetworkXGraphStorage(GraphStorage):
         }
     
     def get_edges(
-        self, 
+        self,
         source_id: Optional[str] = None,
         target_id: Optional[str] = None,
         edge_type: Optional[str] = None
@@ -183,7 +407,7 @@ class NetworkXGraphStorage(GraphStorage):
             source_id: Optional ID of the source node.
             target_id: Optional ID of the target node.
             edge_type: Optional type of the edge.
-            
+        
         Returns:
             List[Dict[str, Any]]: List of matching edges.
         """
@@ -205,7 +429,7 @@ class NetworkXGraphStorage(GraphStorage):
         else:
             # Get all edges
             edges = [(source, target, attrs) for source, target, attrs in self.graph.edges(data=True)]
-            
+        
         # Filter by edge type if specified
         for source, target, attrs in edges:
             if edge_type is None or attrs.get('type') == edge_type:
@@ -214,7 +438,7 @@ class NetworkXGraphStorage(GraphStorage):
                     'target': target,
                     **attrs
                 })
-                
+        
         return results
     
     def delete_node(self, node_id: str) -> bool:
@@ -222,27 +446,26 @@ class NetworkXGraphStorage(GraphStorage):
         
         Args:
             node_id: ID of the node to delete.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         if node_id not in self.graph:
             return False
-            
+        
         try:
-            self.graph.remove_node(node_id)
+            with self._lock:
+                entry = self._encode({"op": "delete_node", "id": node_id})
+                self.graph.remove_node(node_id)
+                self._record(entry)
             
-            # Save to disk if storage path is provided
-            if self.storage_path:
-                self.save()
-                
             return True
         except Exception:
             return False
     
     def delete_edge(
-        self, 
-        source_id: str, 
+        self,
+        source_id: str,
         target_id: str,
         edge_type: Optional[str] = None
     ) -> bool:
@@ -252,26 +475,25 @@ class NetworkXGraphStorage(GraphStorage):
             source_id: ID of the source node.
             target_id: ID of the target node.
             edge_type: Optional type of the edge.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         if not self.graph.has_edge(source_id, target_id):
             return False
-            
+        
         # Check edge type if specified
         if edge_type is not None:
             edge_attrs = self.graph.edges[source_id, target_id]
             if edge_attrs.get('type') != edge_type:
                 return False
-                
+        
         try:
-            self.graph.remove_edge(source_id, target_id)
+            with self._lock:
+                entry = self._encode({"op": "delete_edge", "source": source_id, "target": target_id})
+                self.graph.remove_edge(source_id, target_id)
+                self._record(entry)
             
-            # Save to disk if storage path is provided
-            if self.storage_path:
-                self.save()
-                
             return True
         except Exception:
             return False
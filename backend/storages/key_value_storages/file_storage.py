@@ -1,73 +1,174 @@
 import os
+import copy
+import hashlib
 import json
 import pickle
-from typing import Any, Dict, List, Optional, Union
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
 
 from . import KeyValueStorage
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 class FileKeyValueStorage(KeyValueStorage):
     """Key-value storage implementation using files.
     
     This class implements the KeyValueStorage interface using files
     to store key-value pairs.
     
+    Files are spread over ``shard_depth`` levels of two-character
+    subdirectories taken from the SHA-1 of the key, so no directory grows
+    beyond a few thousand entries. Values are written to a temporary file and
+    renamed into place, so readers never see a partially written value.
+    
+    An append-only manifest (``.manifest`` in the storage directory) records
+    added and deleted keys. It is replayed into memory on start-up and
+    followed incrementally afterwards, which makes ``keys()`` and
+    ``exists()`` independent of the number of files. Recently read values are
+    kept in an LRU cache that is validated against the file's mtime, size and
+    inode, so changes made by other processes are picked up. Appends and
+    rewrites of the manifest hold an exclusive ``flock`` on
+    ``.manifest.lock``, so a record is never appended to a manifest another
+    process is replacing.
+    
     Args:
         storage_dir: Directory to store files in.
         format: Storage format ("json" or "pickle").
+        shard_depth: Number of hash-prefix directory levels.
+        cache_size: Maximum number of values kept in the read cache; 0 disables it.
+        fsync: Whether to fsync each file before renaming it into place.
     """
     
+    MANIFEST_NAME = ".manifest"
+    LOCK_NAME = ".manifest.lock"
+    # Longest encoded key used as a file name; longer keys use their hash
+    _MAX_NAME_LENGTH = 200
+    
     def __init__(
         self,
         storage_dir: str,
-        format: str = "json"
+        format: str = "json",
+        shard_depth: int = 2,
+        cache_size: int = 1024,
+        fsync: bool = False
     ):
         """Initialize a FileKeyValueStorage."""
         self.storage_dir = storage_dir
         self.format = format.lower()
+        self.shard_depth = max(1, shard_depth)
+        self.cache_size = cache_size
+        self.fsync = fsync
+        self.extension = ".json" if self.format == "json" else ".pkl"
+        
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int, int], Any]]" = OrderedDict()
+        self._keys: Set[str] = set()
+        self._manifest_path = os.path.join(storage_dir, self.MANIFEST_NAME)
+        self._lock_path = os.path.join(storage_dir, self.LOCK_NAME)
+        self._manifest_offset = 0
+        self._manifest_inode = None
+        self._manifest_records = 0
         
         # Create storage directory if it doesn't exist
         os.makedirs(storage_dir, exist_ok=True)
         
+        if os.path.exists(self._manifest_path):
+            self._refresh_manifest()
+        else:
+            self._migrate_flat_files()
+            self.rebuild_manifest()
+    
     def _get_path(self, key: str) -> str:
         """Get the file path for a key.
         
         Args:
             key: The key to get path for.
-            
+        
         Returns:
             str: The file path.
         """
-        # Sanitize key for use as filename
-        safe_key = key.replace('/', '_').replace('\\', '_')
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        shards = [digest[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        
+        # Percent-encode the key so the file name is reversible and filesystem safe
+        name = quote(key, safe='')
+        if len(name) > self._MAX_NAME_LENGTH or name.startswith('.'):
+            name = f"~{digest}"
         
+        return os.path.join(self.storage_dir, *shards, f"{name}{self.extension}")
+    
+    def _key_from_filename(self, filename: str) -> Optional[str]:
+        """Recover a key from its file name, or None for hashed names."""
+        if not filename.endswith(self.extension) or filename.startswith(('~', '.')):
+            return None
+        return unquote(filename[:-len(self.extension)])
+    
+    def _serialize(self, value: Any) -> bytes:
+        if self.format == "json":
+            return json.dumps(value).encode('utf-8')
+        else:
+            return pickle.dumps(value)
+    
+    def _deserialize(self, data: bytes) -> Any:
         if self.format == "json":
-            return os.path.join(self.storage_dir, f"{safe_key}.json")
+            return json.loads(data.decode('utf-8'))
         else:
-            return os.path.join(self.storage_dir, f"{safe_key}.pkl")
+            return pickle.loads(data)
+    
+    @staticmethod
+    def _signature(stat: os.stat_result) -> Tuple[int, int, int]:
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    def _cache_put(self, key: str, signature: Tuple[int, int, int], value: Any):
+        """Store a value in the read cache (caller holds the lock)."""
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = (signature, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
     
     def get(self, key: str) -> Any:
         """Get a value by key.
         
         Args:
             key: The key to retrieve.
-            
+        
         Returns:
             Any: The stored value, or None if key not found.
         """
         path = self._get_path(key)
         
-        if not os.path.exists(path):
+        try:
+            signature = self._signature(os.stat(path))
+        except OSError:
+            with self._lock:
+                self._cache.pop(key, None)
             return None
-            
+        
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(key)
+                return copy.deepcopy(cached[1])
+        
         try:
-            if self.format == "json":
-                with open(path, 'r') as f:
-                    return json.load(f)
-            else:
-                with open(path, 'rb') as f:
-                    return pickle.load(f)
+            with open(path, 'rb') as f:
+                signature = self._signature(os.fstat(f.fileno()))
+                value = self._deserialize(f.read())
         except Exception:
             return None
+        
+        with self._lock:
+            self._cache_put(key, signature, value)
+        return copy.deepcopy(value) if self.cache_size > 0 else value
     
     def set(self, key: str, value: Any) -> bool:
         """Set a value for a key.
@@ -75,19 +176,38 @@ class FileKeyValueStorage(KeyValueStorage):
         Args:
             key: The key to set.
             value: The value to store.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         path = self._get_path(key)
+        directory = os.path.dirname(path)
         
         try:
-            if self.format == "json":
-                with open(path, 'w') as f:
-                    json.dump(value, f)
-            else:
-                with open(path, 'wb') as f:
-                    pickle.dump(value, f)
+            data = self._serialize(value)
+            os.makedirs(directory, exist_ok=True)
+            
+            # Write to a temporary file in the same directory and rename it into place
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            
+            with self._lock:
+                self._cache_put(key, self._signature(os.stat(path)), copy.deepcopy(value))
+                self._refresh_manifest()
+                if key not in self._keys:
+                    self._append_manifest('+', key)
             return True
         except Exception:
             return False
@@ -97,32 +217,42 @@ class FileKeyValueStorage(KeyValueStorage):
         
         Args:
             key: The key to delete.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         path = self._get_path(key)
         
-        if not os.path.exists(path):
-            return False
+        with self._lock:
+            self._cache.pop(key, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Drop a manifest record left behind by an interrupted delete
+                self._refresh_manifest()
+                if key in self._keys:
+                    self._append_manifest('-', key)
+                return False
+            except Exception:
+                return False
             
-        try:
-            os.remove(path)
+            self._refresh_manifest()
+            if key in self._keys:
+                self._append_manifest('-', key)
             return True
-        except Exception:
-            return False
     
     def exists(self, key: str) -> bool:
         """Check if a key exists.
         
         Args:
             key: The key to check.
-            
+        
         Returns:
             bool: True if key exists, False otherwise.
         """
-        path = self._get_path(key)
-        return os.path.exists(path)
+        with self._lock:
+            self._refresh_manifest()
+            return key in self._keys
     
     def keys(self) -> List[str]:
         """Get all keys in the storage.
@@ -130,12 +260,137 @@ class FileKeyValueStorage(KeyValueStorage):
         Returns:
             List[str]: List of all keys.
         """
-        keys = []
+        with self._lock:
+            self._refresh_manifest()
+            return list(self._keys)
+    
+    @contextmanager
+    def _manifest_lock(self):
+        """Hold an exclusive lock on the manifest across processes (caller holds the lock)."""
+        lock_file = open(self._lock_path, 'a')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+    
+    def _append_manifest(self, op: str, key: str):
+        """Record an added ('+') or deleted ('-') key (caller holds the lock)."""
+        line = f"{op}{quote(key, safe='')}\n".encode('utf-8')
+        with self._manifest_lock():
+            # O_APPEND keeps concurrent single-line writes from interleaving; the
+            # file lock keeps them off a manifest that is being replaced
+            fd = os.open(self._manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                stat = os.fstat(fd)
+            finally:
+                os.close(fd)
+            
+            if op == '+':
+                self._keys.add(key)
+            else:
+                self._keys.discard(key)
+            self._manifest_records += 1
+            if self._manifest_inode == stat.st_ino and self._manifest_offset == stat.st_size - len(line):
+                self._manifest_offset = stat.st_size
+            else:
+                self._refresh_manifest()
         
+        # Rewrite the manifest once deleted and duplicate records dominate it
+        if self._manifest_records > 2 * len(self._keys) + 1000:
+            self._compact_manifest()
+    
+    def _refresh_manifest(self):
+        """Replay manifest records appended since the last read (caller holds the lock)."""
+        try:
+            stat = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return
+        
+        if stat.st_ino != self._manifest_inode or stat.st_size < self._manifest_offset:
+            # The manifest was replaced by a compaction: replay it from the start
+            self._keys = set()
+            self._manifest_offset = 0
+            self._manifest_records = 0
+            self._manifest_inode = stat.st_ino
+        if stat.st_size == self._manifest_offset:
+            return
+        
+        with open(self._manifest_path, 'rb') as f:
+            f.seek(self._manifest_offset)
+            data = f.read()
+        # Ignore a trailing partial line; it is read again once complete
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].decode('utf-8').splitlines():
+            if not line:
+                continue
+            key = unquote(line[1:])
+            if line[0] == '+':
+                self._keys.add(key)
+            elif line[0] == '-':
+                self._keys.discard(key)
+            self._manifest_records += 1
+        self._manifest_offset += end
+    
+    def _write_manifest(self, keys: Set[str]):
+        """Atomically replace the manifest with one record per key (caller holds both locks)."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.storage_dir, prefix=".tmp-manifest-")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(''.join(f"+{quote(key, safe='')}\n" for key in sorted(keys)).encode('utf-8'))
+        os.replace(tmp_path, self._manifest_path)
+        
+        stat = os.stat(self._manifest_path)
+        self._keys = set(keys)
+        self._manifest_inode = stat.st_ino
+        self._manifest_offset = stat.st_size
+        self._manifest_records = len(keys)
+    
+    def _compact_manifest(self):
+        """Drop deleted and duplicate records from the manifest."""
+        with self._lock, self._manifest_lock():
+            self._refresh_manifest()
+            self._write_manifest(self._keys)
+    
+    def rebuild_manifest(self) -> int:
+        """Rebuild the manifest by walking the shard directories.
+        
+        Use this after the storage directory was modified without going
+        through this class. Keys stored under a hashed file name (very long
+        keys) can only be recovered from the existing manifest.
+        
+        Returns:
+            int: Number of keys found.
+        """
+        with self._lock, self._manifest_lock():
+            self._refresh_manifest()
+            hashed = {key for key in self._keys if os.path.basename(self._get_path(key)).startswith('~')}
+            
+            keys = set()
+            for root, dirs, files in os.walk(self.storage_dir):
+                if root == self.storage_dir:
+                    continue
+                for filename in files:
+                    key = self._key_from_filename(filename)
+                    if key is not None:
+                        keys.add(key)
+            keys.update(key for key in hashed if os.path.exists(self._get_path(key)))
+            
+            self._write_manifest(keys)
+            self._cache.clear()
+            return len(keys)
+    
+    def _migrate_flat_files(self):
+        """Move files written by the unsharded layout into their shard directories."""
         for filename in os.listdir(self.storage_dir):
-            if self.format == "json" and filename.endswith(".json"):
-                keys.append(filename[:-5])  # Remove .json extension
-            elif self.format == "pickle" and filename.endswith(".pkl"):
-                keys.append(filename[:-4])  # Remove .pkl extension
-                
-        return keys
+            source = os.path.join(self.storage_dir, filename)
+            if filename.startswith('.') or not filename.endswith(self.extension) or not os.path.isfile(source):
+                continue
+            # The flat layout used the sanitized key as the file name
+            key = filename[:-len(self.extension)]
+            target = self._get_path(key)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
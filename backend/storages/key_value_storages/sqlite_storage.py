@@ -1,58 +1,173 @@
 import sqlite3
-from typing import Any, Dict, List, Optional, Union
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 import json
 import pickle
+import threading
+import time
+import weakref
 
 from . import KeyValueStorage
 
+
+def _close_quietly(conn: sqlite3.Connection):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class _ThreadConnection:
+    """Holds a connection in a thread-local; the connection closes when the holder is collected.
+    
+    Thread-local values are released when their thread exits, so connections
+    opened by short-lived threads are closed instead of accumulating.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.close = weakref.finalize(self, _close_quietly, conn)
+
+
 class SQLiteKeyValueStorage(KeyValueStorage):
     """Key-value storage implementation using SQLite.
     
     This class implements the KeyValueStorage interface using SQLite
     to store key-value pairs.
     
+    Each thread keeps its own persistent connection, opened in WAL mode so
+    readers do not block the writer, and closed when the thread exits. Batch operations run in a single
+    transaction. Keys can have a time-to-live: expired keys are hidden and
+    removed lazily on access, and a background thread purges them
+    periodically once a TTL has been used.
+    
     Args:
         db_path: Path to SQLite database file.
         table_name: Name of the table to use.
         format: Storage format for values ("json" or "pickle").
+        default_ttl: Default time-to-live in seconds for new keys; None keeps
+            keys until they are deleted.
+        cleanup_interval: Seconds between background purges of expired keys;
+            0 disables the background purge.
     """
     
+    # Maximum number of parameters per statement in batch lookups
+    _BATCH_SIZE = 500
+    
     def __init__(
         self,
         db_path: str,
         table_name: str = "key_value_store",
-        format: str = "json"
+        format: str = "json",
+        default_ttl: Optional[float] = None,
+        cleanup_interval: float = 60.0
     ):
         """Initialize a SQLiteKeyValueStorage."""
         self.db_path = db_path
         self.table_name = table_name
         self.format = format.lower()
+        self.default_ttl = default_ttl
+        self.cleanup_interval = cleanup_interval
+        
+        self._local = threading.local()
+        # Only weak references, so connections of finished threads can be closed
+        self._connections: "weakref.WeakSet[_ThreadConnection]" = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
+        # An in-memory database only exists on the connection that created it,
+        # so all threads share one connection guarded by a lock
+        self._shared_lock = threading.RLock() if db_path == ":memory:" else None
+        self._shared_conn: Optional[_ThreadConnection] = None
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self._cleanup_stop = threading.Event()
         
         # Initialize database
         self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with tuned pragmas."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            isolation_level=None,  # Autocommit; batches use explicit transactions
+            # Each connection is used by one thread at a time, but may be closed
+            # by close() or by the finalizer from another thread
+            check_same_thread=False
+        )
+        if self._shared_lock is None:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")  # 16 MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+    
+    def _open(self) -> _ThreadConnection:
+        holder = _ThreadConnection(self._connect())
+        with self._connections_lock:
+            self._connections.add(holder)
+        return holder
+    
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        """Yield the connection of the current thread."""
+        if self._shared_lock is not None:
+            with self._shared_lock:
+                if self._shared_conn is None:
+                    self._shared_conn = self._open()
+                yield self._shared_conn.conn
+            return
         
+        holder = getattr(self._local, "conn", None)
+        if holder is None:
+            holder = self._local.conn = self._open()
+        yield holder.conn
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a single write transaction."""
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
     def _init_db(self):
         """Initialize the database and create table if needed."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create table if it doesn't exist
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                key TEXT PRIMARY KEY,
-                value BLOB
+        with self._conn() as conn:
+            # Create table if it doesn't exist
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    key TEXT PRIMARY KEY,
+                    value BLOB,
+                    expires_at REAL
+                )
+            ''')
+            
+            # Tables created before TTL support lack the expiry column
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.table_name})")]
+            if "expires_at" not in columns:
+                conn.execute(f"ALTER TABLE {self.table_name} ADD COLUMN expires_at REAL")
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table_name}_expires_at "
+                f"ON {self.table_name} (expires_at) WHERE expires_at IS NOT NULL"
             )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        
+            
+            has_ttl = conn.execute(
+                f"SELECT 1 FROM {self.table_name} WHERE expires_at IS NOT NULL LIMIT 1"
+            ).fetchone() is not None
+        if has_ttl or self.default_ttl:
+            self._start_cleanup()
+    
     def _serialize(self, value: Any) -> bytes:
         """Serialize a value to bytes.
         
         Args:
             value: The value to serialize.
-            
+        
         Returns:
             bytes: The serialized value.
         """
@@ -60,13 +175,13 @@ class SQLiteKeyValueStorage(KeyValueStorage):
             return json.dumps(value).encode('utf-8')
         else:
             return pickle.dumps(value)
-            
+    
     def _deserialize(self, data: bytes) -> Any:
         """Deserialize bytes to a value.
         
         Args:
             data: The data to deserialize.
-            
+        
         Returns:
             Any: The deserialized value.
         """
@@ -75,57 +190,119 @@ class SQLiteKeyValueStorage(KeyValueStorage):
         else:
             return pickle.loads(data)
     
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        """Absolute expiry time for a TTL, falling back to the default TTL."""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl is None or ttl <= 0:
+            return None
+        self._start_cleanup()
+        return time.time() + ttl
+    
     def get(self, key: str) -> Any:
         """Get a value by key.
         
         Args:
             key: The key to retrieve.
-            
+        
         Returns:
-            Any: The stored value, or None if key not found.
+            Any: The stored value, or None if key not found or expired.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            f"SELECT value FROM {self.table_name} WHERE key = ?",
-            (key,)
-        )
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result is None:
-            return None
+        with self._conn() as conn:
+            result = conn.execute(
+                f"SELECT value, expires_at FROM {self.table_name} WHERE key = ?",
+                (key,)
+            ).fetchone()
+            
+            if result is None:
+                return None
             
+            if result[1] is not None and result[1] <= time.time():
+                # Expired: remove lazily
+                conn.execute(
+                    f"DELETE FROM {self.table_name} WHERE key = ? AND expires_at <= ?",
+                    (key, time.time())
+                )
+                return None
+        
         try:
             return self._deserialize(result[0])
         except Exception:
             return None
     
-    def set(self, key: str, value: Any) -> bool:
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several values in one read transaction.
+        
+        Args:
+            keys: The keys to retrieve.
+        
+        Returns:
+            Dict[str, Any]: Values of the keys that exist and have not expired.
+        """
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        values = {}
+        with self._conn() as conn:
+            conn.execute("BEGIN")
+            try:
+                for start in range(0, len(keys), self._BATCH_SIZE):
+                    batch = keys[start:start + self._BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT key, value FROM {self.table_name} "
+                        f"WHERE key IN ({placeholders}) AND (expires_at IS NULL OR expires_at > ?)",
+                        (*batch, now)
+                    )
+                    for key, data in rows:
+                        try:
+                            values[key] = self._deserialize(data)
+                        except Exception:
+                            continue
+            finally:
+                conn.execute("COMMIT")
+        return values
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
         """Set a value for a key.
         
         Args:
             key: The key to set.
             value: The value to store.
-            
+            ttl: Optional time-to-live in seconds, overriding ``default_ttl``.
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         try:
             serialized = self._serialize(value)
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                f"INSERT OR REPLACE INTO {self.table_name} (key, value) VALUES (?, ?)",
-                (key, serialized)
-            )
+            with self._conn() as conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table_name} (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, serialized, self._expires_at(ttl))
+                )
+            return True
+        except Exception:
+            return False
+    
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> bool:
+        """Set several values in a single transaction.
+        
+        Args:
+            items: Mapping of keys to values.
+            ttl: Optional time-to-live in seconds for all keys.
+        
+        Returns:
+            bool: True if all values were stored, False otherwise (nothing is stored).
+        """
+        try:
+            expires_at = self._expires_at(ttl)
+            rows = [(key, self._serialize(value), expires_at) for key, value in items.items()]
             
-            conn.commit()
-            conn.close()
+            with self._transaction() as conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table_name} (key, value, expires_at) VALUES (?, ?, ?)",
+                    rows
+                )
             return True
         except Exception:
             return False
@@ -135,45 +312,84 @@ class SQLiteKeyValueStorage(KeyValueStorage):
         
         Args:
             key: The key to delete.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            f"DELETE FROM {self.table_name} WHERE key = ?",
-            (key,)
-        )
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM {self.table_name} WHERE key = ?",
+                (key,)
+            )
+            return cursor.rowcount > 0
+    
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete several keys in a single transaction.
         
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        Args:
+            keys: The keys to delete.
         
-        return deleted
+        Returns:
+            int: Number of keys deleted.
+        """
+        with self._transaction() as conn:
+            cursor = conn.executemany(
+                f"DELETE FROM {self.table_name} WHERE key = ?",
+                ((key,) for key in keys)
+            )
+            return cursor.rowcount
     
     def exists(self, key: str) -> bool:
         """Check if a key exists.
         
         Args:
             key: The key to check.
-            
+        
         Returns:
-            bool: True if key exists, False otherwise.
+            bool: True if key exists and has not expired, False otherwise.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._conn() as conn:
+            return conn.execute(
+                f"SELECT 1 FROM {self.table_name} WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone() is not None
+    
+    def scan(self, prefix: str = "", batch_size: int = 1000) -> Iterator[str]:
+        """Iterate over keys starting with ``prefix`` in key order.
         
-        cursor.execute(
-            f"SELECT 1 FROM {self.table_name} WHERE key = ?",
-            (key,)
-        )
+        Keys are fetched in batches using the primary key index, so no
+        cursor is held open between batches and memory use stays bounded.
         
-        exists = cursor.fetchone() is not None
-        conn.close()
+        Args:
+            prefix: Only yield keys starting with this prefix.
+            batch_size: Number of keys fetched per query.
         
-        return exists
+        Yields:
+            str: Keys that have not expired.
+        """
+        last = None
+        while True:
+            with self._conn() as conn:
+                if last is None:
+                    rows = conn.execute(
+                        f"SELECT key FROM {self.table_name} WHERE key >= ? "
+                        f"AND (expires_at IS NULL OR expires_at > ?) ORDER BY key LIMIT ?",
+                        (prefix, time.time(), batch_size)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        f"SELECT key FROM {self.table_name} WHERE key > ? "
+                        f"AND (expires_at IS NULL OR expires_at > ?) ORDER BY key LIMIT ?",
+                        (last, time.time(), batch_size)
+                    ).fetchall()
+            
+            for (key,) in rows:
+                if not key.startswith(prefix):
+                    return
+                yield key
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
     
     def keys(self) -> List[str]:
         """Get all keys in the storage.
@@ -181,12 +397,56 @@ class SQLiteKeyValueStorage(KeyValueStorage):
         Returns:
             List[str]: List of all keys.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(f"SELECT key FROM {self.table_name}")
-        
-        keys = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        return list(self.scan())
+    
+    def purge_expired(self) -> int:
+        """Delete all expired keys.
         
-        return keys
+        Returns:
+            int: Number of keys deleted.
+        """
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM {self.table_name} WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),)
+            )
+            return cursor.rowcount
+    
+    def _start_cleanup(self):
+        """Start the background purge thread once a TTL is in use."""
+        if self._cleanup_thread is not None or self.cleanup_interval <= 0:
+            return
+        with self._connections_lock:
+            if self._cleanup_thread is not None:
+                return
+            # The thread only holds a weak reference so the storage can be garbage collected
+            self._cleanup_thread = threading.Thread(
+                target=self._cleanup_loop,
+                args=(weakref.ref(self), self._cleanup_stop, self.cleanup_interval),
+                name=f"sqlite-kv-cleanup-{self.table_name}",
+                daemon=True
+            )
+            self._cleanup_thread.start()
+    
+    @staticmethod
+    def _cleanup_loop(storage_ref, stop: threading.Event, interval: float):
+        while not stop.wait(interval):
+            storage = storage_ref()
+            if storage is None:
+                return
+            try:
+                storage.purge_expired()
+            except sqlite3.Error:
+                pass
+            finally:
+                del storage
+    
+    def close(self):
+        """Stop the background purge and close all connections."""
+        self._cleanup_stop.set()
+        with self._connections_lock:
+            holders, self._connections = list(self._connections), weakref.WeakSet()
+        for holder in holders:
+            holder.close()
+        self._local = threading.local()
+        self._shared_conn = None
@@ -1,6 +1,9 @@
 import os
-import shutil
-from typing import Any, Dict, List, Optional, Union, BinaryIO
+import hashlib
+import io
+import mmap
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Union, BinaryIO
 import json
 
 from . import ObjectStorage
@@ -11,38 +14,60 @@ class FileObjectStorage(ObjectStorage):
     This class implements the ObjectStorage interface using the local
     filesystem to store objects.
     
+    Objects are written in ``chunk_size`` pieces to a temporary file that is
+    renamed into place, so large objects never need to fit in memory and
+    readers never see a partial object. ``get_stream``/``iter_chunks`` read
+    objects incrementally and ``get_range`` returns a zero-copy view backed
+    by ``mmap``.
+    
+    With ``dedup`` enabled, object contents are stored once under
+    ``.blobs/`` by SHA-256 and each key is a hard link to its blob, so
+    identical objects share disk space. The link count of a blob is its
+    reference count: a blob is removed when its last key is deleted or
+    overwritten. Where hard links are not supported, objects are stored as
+    plain files.
+    
     Args:
         storage_dir: Directory to store objects in.
+        chunk_size: Size in bytes of the chunks used to copy and stream objects.
+        dedup: Whether to store identical objects once.
     """
     
-    def __init__(self, storage_dir: str):
+    TMP_PREFIX = ".tmp-"
+    
+    def __init__(self, storage_dir: str, chunk_size: int = 1024 * 1024, dedup: bool = False):
         """Initialize a FileObjectStorage."""
         self.storage_dir = storage_dir
         self.metadata_dir = os.path.join(storage_dir, ".metadata")
+        self.blob_dir = os.path.join(storage_dir, ".blobs")
+        self.chunk_size = chunk_size
+        self.dedup = dedup
         
         # Create storage directories if they don't exist
         os.makedirs(storage_dir, exist_ok=True)
         os.makedirs(self.metadata_dir, exist_ok=True)
-        
+        if dedup:
+            os.makedirs(self.blob_dir, exist_ok=True)
+    
     def _get_object_path(self, key: str) -> str:
         """Get the file path for an object.
         
         Args:
             key: The object key.
-            
+        
         Returns:
             str: The file path.
         """
         # Sanitize key for use as path
         safe_key = key.replace('..', '')
         return os.path.join(self.storage_dir, safe_key)
-        
+    
     def _get_metadata_path(self, key: str) -> str:
         """Get the file path for object metadata.
         
         Args:
             key: The object key.
-            
+        
         Returns:
             str: The metadata file path.
         """
@@ -50,9 +75,17 @@ class FileObjectStorage(ObjectStorage):
         safe_key = key.replace('..', '')
         return os.path.join(self.metadata_dir, f"{safe_key}.meta.json")
     
+    def _get_blob_ref_path(self, key: str) -> str:
+        """Get the file path recording which blob a deduplicated object links to."""
+        safe_key = key.replace('..', '')
+        return os.path.join(self.metadata_dir, f"{safe_key}.blob")
+    
+    def _get_blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+    
     def put(
-        self, 
-        key: str, 
+        self,
+        key: str,
         data: Union[bytes, BinaryIO, str],
         metadata: Optional[Dict[str, str]] = None
     ) -> bool:
@@ -62,7 +95,34 @@ class FileObjectStorage(ObjectStorage):
             key: Key to store the object under.
             data: Object data to store.
             metadata: Optional metadata for the object.
-            
+        
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            stream = io.BytesIO(data)
+        elif hasattr(data, 'read'):
+            stream = data
+        elif isinstance(data, str):
+            stream = io.BytesIO(data.encode('utf-8'))
+        else:
+            return False
+        
+        return self.put_stream(key, stream, metadata)
+    
+    def put_stream(
+        self,
+        key: str,
+        stream: BinaryIO,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """Store an object by reading a binary stream in chunks.
+        
+        Args:
+            key: Key to store the object under.
+            stream: Readable binary file-like object.
+            metadata: Optional metadata for the object.
+        
         Returns:
             bool: True if successful, False otherwise.
         """
@@ -73,40 +133,137 @@ class FileObjectStorage(ObjectStorage):
         os.makedirs(os.path.dirname(object_path), exist_ok=True)
         os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
         
+        tmp_dir = self.blob_dir if self.dedup else os.path.dirname(object_path)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix=self.TMP_PREFIX)
         try:
             # Write object data
-            if isinstance(data, bytes):
-                with open(object_path, 'wb') as f:
-                    f.write(data)
-            elif hasattr(data, 'read'):
-                with open(object_path, 'wb') as f:
-                    shutil.copyfileobj(data, f)
-            elif isinstance(data, str):
-                with open(object_path, 'w', encoding='utf-8') as f:
-                    f.write(data)
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    digest.update(chunk)
+                    f.write(chunk)
+            
+            if self.dedup:
+                self._link_blob(key, tmp_path, digest.hexdigest())
             else:
-                raise TypeError("Data must be bytes, file-like object, or string")
-                
+                os.replace(tmp_path, object_path)
+                self._release_blob(key)
+            
             # Write metadata if provided
             if metadata:
-                with open(metadata_path, 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f)
-                    
+                self._write_json(metadata_path, metadata)
+            
             return True
         except Exception:
             # Clean up if there was an error
-            if os.path.exists(object_path):
-                os.remove(object_path)
-            if os.path.exists(metadata_path):
-                os.remove(metadata_path)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return False
     
+    def _write_json(self, path: str, data: Any):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=self.TMP_PREFIX)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    def _link_blob(self, key: str, tmp_path: str, digest: str):
+        """Point a key at the blob holding its content, storing the blob if new."""
+        object_path = self._get_object_path(key)
+        blob_path = self._get_blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        
+        for _ in range(3):
+            try:
+                os.link(tmp_path, blob_path)
+            except FileExistsError:
+                # Identical content is already stored
+                pass
+            except OSError:
+                # Hard links are not supported here: store a plain copy
+                os.replace(tmp_path, object_path)
+                self._release_blob(key)
+                return
+            
+            link_path = os.path.join(
+                os.path.dirname(object_path), f"{self.TMP_PREFIX}{os.getpid()}-{digest[:16]}"
+            )
+            try:
+                if os.path.exists(link_path):
+                    os.remove(link_path)
+                os.link(blob_path, link_path)
+            except FileNotFoundError:
+                # The blob was released concurrently; store it again
+                continue
+            break
+        else:
+            raise OSError(f"Could not link blob {digest}")
+        
+        os.remove(tmp_path)
+        old_digest = self._read_blob_ref(key)
+        os.replace(link_path, object_path)
+        self._write_json(self._get_blob_ref_path(key), digest)
+        if old_digest and old_digest != digest:
+            self._collect_blob(old_digest)
+    
+    def _read_blob_ref(self, key: str) -> Optional[str]:
+        try:
+            with open(self._get_blob_ref_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def _release_blob(self, key: str):
+        """Drop the blob reference of a key and remove the blob if unused."""
+        digest = self._read_blob_ref(key)
+        if digest is None:
+            return
+        os.remove(self._get_blob_ref_path(key))
+        self._collect_blob(digest)
+    
+    def _collect_blob(self, digest: str) -> bool:
+        """Remove a blob that no object links to any more."""
+        blob_path = self._get_blob_path(digest)
+        try:
+            if os.stat(blob_path).st_nlink <= 1:
+                os.remove(blob_path)
+                return True
+        except FileNotFoundError:
+            pass
+        return False
+    
+    def collect_garbage(self) -> int:
+        """Remove unreferenced blobs and leftover temporary files.
+        
+        Deletes and overwrites release blobs immediately; this sweep cleans up
+        after interrupted writes.
+        
+        Returns:
+            int: Number of files removed.
+        """
+        removed = 0
+        if not os.path.isdir(self.blob_dir):
+            return removed
+        for root, _, files in os.walk(self.blob_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                if file.startswith(self.TMP_PREFIX):
+                    os.remove(path)
+                    removed += 1
+                elif self._collect_blob(file):
+                    removed += 1
+        return removed
+    
     def get(self, key: str) -> Optional[bytes]:
         """Get an object by key.
         
         Args:
             key: Key of the object to get.
-            
+        
         Returns:
             Optional[bytes]: Object data if found, None otherwise.
         """
@@ -114,19 +271,87 @@ class FileObjectStorage(ObjectStorage):
         
         if not os.path.exists(object_path):
             return None
-            
+        
         try:
             with open(object_path, 'rb') as f:
                 return f.read()
         except Exception:
             return None
     
+    def get_stream(self, key: str) -> Optional[BinaryIO]:
+        """Open an object for streaming reads.
+        
+        The caller is responsible for closing the returned file.
+        
+        Args:
+            key: Key of the object to open.
+        
+        Returns:
+            Optional[BinaryIO]: Readable binary file if found, None otherwise.
+        """
+        object_path = self._get_object_path(key)
+        
+        try:
+            return open(object_path, 'rb', buffering=self.chunk_size)
+        except Exception:
+            return None
+    
+    def iter_chunks(self, key: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """Iterate over an object in fixed-size chunks.
+        
+        Args:
+            key: Key of the object to read.
+            chunk_size: Chunk size in bytes; defaults to ``self.chunk_size``.
+        
+        Yields:
+            bytes: Consecutive chunks of the object; nothing if it does not exist.
+        """
+        stream = self.get_stream(key)
+        if stream is None:
+            return
+        with stream:
+            while True:
+                chunk = stream.read(chunk_size or self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def get_range(self, key: str, start: int = 0, length: Optional[int] = None) -> Optional[memoryview]:
+        """Get a byte range of an object without copying it.
+        
+        The returned view is backed by a read-only memory map of the file and
+        keeps it mapped until the view is released; use ``bytes(view)`` to
+        take a copy.
+        
+        Args:
+            key: Key of the object to read.
+            start: Offset of the first byte.
+            length: Number of bytes; None reads to the end of the object.
+        
+        Returns:
+            Optional[memoryview]: View of the requested bytes if found, None otherwise.
+        """
+        object_path = self._get_object_path(key)
+        
+        try:
+            with open(object_path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0 or start >= size:
+                    return memoryview(b'')
+                # The mapping stays valid after the file is closed
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            return None
+        
+        end = size if length is None else min(size, start + length)
+        return memoryview(mapped)[start:end]
+    
     def get_metadata(self, key: str) -> Optional[Dict[str, str]]:
         """Get object metadata by key.
         
         Args:
             key: Key of the object to get metadata for.
-            
+        
         Returns:
             Optional[Dict[str, str]]: Metadata if found, None otherwise.
         """
@@ -134,7 +359,7 @@ class FileObjectStorage(ObjectStorage):
         
         if not os.path.exists(metadata_path):
             return None
-            
+        
         try:
             with open(metadata_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -146,7 +371,7 @@ class FileObjectStorage(ObjectStorage):
         
         Args:
             key: Key of the object to delete.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
@@ -161,14 +386,21 @@ class FileObjectStorage(ObjectStorage):
                 os.remove(object_path)
             except Exception:
                 success = False
-                
+        
+        # Release the shared blob once no object links to it
+        if success:
+            try:
+                self._release_blob(key)
+            except Exception:
+                success = False
+        
         # Delete metadata file
         if os.path.exists(metadata_path):
             try:
                 os.remove(metadata_path)
             except Exception:
                 success = False
-                
+        
         return success
     
     def list(self, prefix: Optional[str] = None) -> List[str]:
@@ -176,18 +408,22 @@ class FileObjectStorage(ObjectStorage):
         
         Args:
             prefix: Optional prefix to filter by.
-            
+        
         Returns:
             List[str]: List of object keys.
         """
         result = []
         
         for root, _, files in os.walk(self.storage_dir):
-            # Skip metadata directory
-            if root.startswith(self.metadata_dir):
+            # Skip metadata and blob directories
+            if root.startswith(self.metadata_dir) or root.startswith(self.blob_dir):
                 continue
-                
+            
             for file in files:
+                # Skip objects that are still being written
+                if file.startswith(self.TMP_PREFIX):
+                    continue
+                
                 # Get relative path as key
                 path = os.path.join(root, file)
                 key = os.path.relpath(path, self.storage_dir)
@@ -198,5 +434,5 @@ class FileObjectStorage(ObjectStorage):
                 # Filter by prefix if provided
                 if prefix is None or key.startswith(prefix):
                     result.append(key)
-                    
+        
         return result
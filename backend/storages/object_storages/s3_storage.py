@@ -1,22 +1,78 @@
 import boto3
 import io
-from typing import Any, Dict, List, Optional, Union, BinaryIO
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, BinaryIO
 import json
 
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
 from . import ObjectStorage
 
+# S3 accepts at most this many keys per DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_s3_client(
+    aws_access_key_id: Optional[str] = None,
+    aws_secret_access_key: Optional[str] = None,
+    region_name: Optional[str] = None,
+    endpoint_url: Optional[str] = None,
+    max_pool_connections: int = 32
+):
+    """Get a process-wide S3 client for the given credentials and endpoint.
+    
+    boto3 clients are thread-safe, so storages sharing credentials also share
+    one client and its HTTP connection pool.
+    """
+    key = (aws_access_key_id, aws_secret_access_key, region_name, endpoint_url, max_pool_connections)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = boto3.client(
+                's3',
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={'max_attempts': 5, 'mode': 'adaptive'}
+                )
+            )
+        return client
+
+
 class S3ObjectStorage(ObjectStorage):
     """Object storage implementation using Amazon S3.
     
     This class implements the ObjectStorage interface using Amazon S3
     to store objects.
     
+    Objects larger than ``multipart_threshold`` are uploaded as multipart
+    uploads with parts sent in parallel. Large objects are downloaded with
+    parallel byte-range requests into a preallocated buffer. Deletes are
+    batched into ``DeleteObjects`` requests of up to 1000 keys, and listing
+    fans out over top-level prefixes. Storages with the same credentials
+    share one client and connection pool.
+    
     Args:
         bucket_name: Name of the S3 bucket.
         prefix: Optional prefix for all objects.
         aws_access_key_id: Optional AWS access key ID.
         aws_secret_access_key: Optional AWS secret access key.
         region_name: Optional AWS region name.
+        endpoint_url: Optional endpoint URL for S3-compatible services (MinIO, moto).
+        multipart_threshold: Object size in bytes above which uploads use multipart.
+        chunk_size: Size in bytes of upload parts and download ranges.
+        max_concurrency: Maximum number of parallel part or range requests.
+        client: Optional preconfigured S3 client to use instead of the shared one.
     """
     
     def __init__(
@@ -25,34 +81,48 @@ class S3ObjectStorage(ObjectStorage):
         prefix: str = "",
         aws_access_key_id: Optional[str] = None,
         aws_secret_access_key: Optional[str] = None,
-        region_name: Optional[str] = None
+        region_name: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        chunk_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 10,
+        client: Optional[Any] = None
     ):
         """Initialize an S3ObjectStorage."""
         self.bucket_name = bucket_name
         self.prefix = prefix.rstrip('/') + '/' if prefix else ""
+        self.chunk_size = chunk_size
+        self.max_concurrency = max(1, max_concurrency)
         
-        # Initialize S3 client
-        self.s3 = boto3.client(
-            's3',
+        # Initialize S3 client; the pool must fit every concurrent part or range request
+        self.s3 = client or get_s3_client(
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
-            region_name=region_name
+            region_name=region_name,
+            endpoint_url=endpoint_url,
+            max_pool_connections=max(32, self.max_concurrency * 2)
         )
-        
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=chunk_size,
+            max_concurrency=self.max_concurrency,
+            use_threads=self.max_concurrency > 1
+        )
+    
     def _get_full_key(self, key: str) -> str:
         """Get the full S3 key including prefix.
         
         Args:
             key: The object key.
-            
+        
         Returns:
             str: The full S3 key.
         """
         return f"{self.prefix}{key}"
     
     def put(
-        self, 
-        key: str, 
+        self,
+        key: str,
         data: Union[bytes, BinaryIO, str],
         metadata: Optional[Dict[str, str]] = None
     ) -> bool:
@@ -62,7 +132,7 @@ class S3ObjectStorage(ObjectStorage):
             key: Key to store the object under.
             data: Object data to store.
             metadata: Optional metadata for the object.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
@@ -72,18 +142,20 @@ class S3ObjectStorage(ObjectStorage):
             # Prepare data
             if isinstance(data, str):
                 data = data.encode('utf-8')
-                
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                data = io.BytesIO(data)
+            
             # Prepare metadata
             extra_args = {}
             if metadata:
                 extra_args['Metadata'] = metadata
-                
-            # Upload to S3
-            if hasattr(data, 'read'):
-                self.s3.upload_fileobj(data, self.bucket_name, full_key, ExtraArgs=extra_args)
-            else:
-                self.s3.put_object(Bucket=self.bucket_name, Key=full_key, Body=data, **extra_args)
-                
+            
+            # Upload to S3; the transfer manager switches to a parallel multipart
+            # upload above the threshold and uses a single PUT below it
+            self.s3.upload_fileobj(
+                data, self.bucket_name, full_key, ExtraArgs=extra_args, Config=self.transfer_config
+            )
+            
             return True
         except Exception:
             return False
@@ -91,16 +163,94 @@ class S3ObjectStorage(ObjectStorage):
     def get(self, key: str) -> Optional[bytes]:
         """Get an object from S3 by key.
         
+        The first ``chunk_size`` bytes are fetched with a ranged GET that also
+        reports the object size; the remaining ranges are fetched in parallel
+        into a preallocated buffer.
+        
         Args:
             key: Key of the object to get.
-            
+        
         Returns:
             Optional[bytes]: Object data if found, None otherwise.
         """
         full_key = self._get_full_key(key)
         
         try:
-            response = self.s3.get_object(Bucket=self.bucket_name, Key=full_key)
+            try:
+                response = self.s3.get_object(
+                    Bucket=self.bucket_name, Key=full_key, Range=f"bytes=0-{self.chunk_size - 1}"
+                )
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'InvalidRange':
+                    raise
+                # Ranges are not satisfiable on empty objects
+                response = self.s3.get_object(Bucket=self.bucket_name, Key=full_key)
+                return response['Body'].read()
+            
+            first = response['Body'].read()
+            total = self._total_size(response, len(first))
+            if total <= len(first):
+                return first
+            
+            buffer = bytearray(total)
+            view = memoryview(buffer)
+            view[:len(first)] = first
+            # Pin the remaining ranges to this version of the object
+            etag = response.get('ETag')
+            ranges = [
+                (start, min(start + self.chunk_size, total))
+                for start in range(len(first), total, self.chunk_size)
+            ]
+            
+            def fetch(byte_range):
+                start, end = byte_range
+                extra = {'IfMatch': etag} if etag else {}
+                part = self.s3.get_object(
+                    Bucket=self.bucket_name, Key=full_key, Range=f"bytes={start}-{end - 1}", **extra
+                )
+                body = part['Body']
+                offset = start
+                while offset < end:
+                    chunk = body.read(min(end - offset, 1024 * 1024))
+                    if not chunk:
+                        raise IOError(f"Short read for {full_key} at byte {offset}")
+                    view[offset:offset + len(chunk)] = chunk
+                    offset += len(chunk)
+            
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(ranges))) as executor:
+                list(executor.map(fetch, ranges))
+            
+            return bytes(buffer)
+        except Exception:
+            return None
+    
+    @staticmethod
+    def _total_size(response: Dict[str, Any], received: int) -> int:
+        """Total object size from the Content-Range header of a ranged GET."""
+        match = re.search(r'/(\d+)$', response.get('ContentRange') or '')
+        if match:
+            return int(match.group(1))
+        return received
+    
+    def get_range(self, key: str, start: int, length: Optional[int] = None) -> Optional[bytes]:
+        """Get a byte range of an object from S3.
+        
+        Args:
+            key: Key of the object to read.
+            start: Offset of the first byte.
+            length: Number of bytes; None reads to the end of the object.
+        
+        Returns:
+            Optional[bytes]: The requested bytes if found, None otherwise.
+        """
+        if length is not None and length <= 0:
+            # S3 ignores an empty range and would return the whole object
+            return b''
+        full_key = self._get_full_key(key)
+        byte_range = f"bytes={start}-" if length is None else f"bytes={start}-{start + length - 1}"
+        
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=full_key, Range=byte_range)
             return response['Body'].read()
         except Exception:
             return None
@@ -110,7 +260,7 @@ class S3ObjectStorage(ObjectStorage):
         
         Args:
             key: Key of the object to get metadata for.
-            
+        
         Returns:
             Optional[Dict[str, str]]: Metadata if found, None otherwise.
         """
@@ -127,7 +277,7 @@ class S3ObjectStorage(ObjectStorage):
         
         Args:
             key: Key of the object to delete.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
@@ -139,12 +289,59 @@ class S3ObjectStorage(ObjectStorage):
         except Exception:
             return False
     
+    def delete_many(self, keys: Iterable[str]) -> bool:
+        """Delete several objects with batched DeleteObjects requests.
+        
+        Args:
+            keys: Keys of the objects to delete.
+        
+        Returns:
+            bool: True if all objects were deleted, False otherwise.
+        """
+        full_keys = [self._get_full_key(key) for key in keys]
+        batches = [
+            full_keys[start:start + DELETE_BATCH_SIZE]
+            for start in range(0, len(full_keys), DELETE_BATCH_SIZE)
+        ]
+        
+        def delete_batch(batch):
+            response = self.s3.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            # Quiet mode only reports failures
+            return not response.get('Errors')
+        
+        try:
+            if len(batches) <= 1:
+                return all(delete_batch(batch) for batch in batches)
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                return all(list(executor.map(delete_batch, batches)))
+        except Exception:
+            return False
+    
+    def _list_keys(self, list_prefix: str, delimiter: Optional[str] = None) -> Tuple[List[str], List[str]]:
+        """List full keys and common prefixes under a prefix, following all pages."""
+        keys, prefixes = [], []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        params = {'Bucket': self.bucket_name, 'Prefix': list_prefix}
+        if delimiter:
+            params['Delimiter'] = delimiter
+        
+        for page in paginator.paginate(**params):
+            keys.extend(obj['Key'] for obj in page.get('Contents', []))
+            prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        return keys, prefixes
+    
     def list(self, prefix: Optional[str] = None) -> List[str]:
         """List objects in S3 with optional prefix.
         
+        Objects directly under the prefix are listed first with a '/'
+        delimiter; each sub-prefix is then paged through concurrently.
+        
         Args:
             prefix: Optional prefix to filter by.
-            
+        
         Returns:
             List[str]: List of object keys.
         """
@@ -152,20 +349,24 @@ class S3ObjectStorage(ObjectStorage):
         list_prefix = self.prefix
         if prefix:
             list_prefix += prefix
-            
+        
         try:
+            full_keys, sub_prefixes = self._list_keys(list_prefix, delimiter='/')
+            if len(sub_prefixes) == 1:
+                full_keys.extend(self._list_keys(sub_prefixes[0])[0])
+            elif sub_prefixes:
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(sub_prefixes))) as executor:
+                    for keys, _ in executor.map(self._list_keys, sub_prefixes):
+                        full_keys.extend(keys)
+            full_keys.sort()
+            
             result = []
-            paginator = self.s3.get_paginator('list_objects_v2')
+            for key in full_keys:
+                # Remove storage prefix to get original key
+                if key.startswith(self.prefix):
+                    key = key[len(self.prefix):]
+                result.append(key)
             
-            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=list_prefix):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        # Remove storage prefix to get original key
-                        key = obj['Key']
-                        if key.startswith(self.prefix):
-                            key = key[len(self.prefix):]
-                        result.append(key)
-                        
             return result
         except Exception:
             return []
@@ -89,10 +89,12 @@ class VectorStorage(ABC):
 
 # Import implementations after defining the base class to avoid circular imports
 from .simple_storage import SimpleVectorStorage
+from .ivf_storage import IVFVectorStorage
 from .chroma_storage import ChromaVectorStorage
 
 __all__ = [
     'VectorStorage',
     'SimpleVectorStorage',
+    'IVFVectorStorage',
     'ChromaVectorStorage',
 ]
@@ -0,0 +1,243 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from .simple_storage import SimpleVectorStorage
+
+class IVFVectorStorage(SimpleVectorStorage):
+    """Approximate nearest-neighbour vector storage using an IVF-flat index.
+    
+    Vectors are partitioned into ``n_lists`` clusters by spherical k-means.
+    A search only scans the clusters whose centroids are closest to the query,
+    so latency grows with ``nprobe / n_lists`` of the corpus instead of all of
+    it. ``nprobe`` is the recall/latency knob: ``nprobe == n_lists`` is an
+    exact search.
+    
+    Until ``train_size`` vectors have been added the storage falls back to an
+    exact scan. New vectors added after training are assigned to their nearest
+    centroid; the index is retrained automatically once the corpus has grown
+    by ``retrain_factor`` since the last training.
+    
+    Args:
+        dimension: Dimension of vectors to store.
+        n_lists: Number of clusters; defaults to ~sqrt(n) at training time.
+        nprobe: Number of clusters scanned per query.
+        train_size: Minimum number of vectors before the index is trained.
+        retrain_factor: Retrain when the corpus grows by this factor.
+        kmeans_iters: Number of k-means iterations.
+        max_train_samples: Cap on the number of vectors used for training.
+        seed: Random seed for k-means initialization.
+        **kwargs: Additional arguments passed to SimpleVectorStorage.
+    """
+    
+    def __init__(
+        self,
+        dimension: int = 768,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        train_size: int = 1024,
+        retrain_factor: float = 4.0,
+        kmeans_iters: int = 10,
+        max_train_samples: int = 65536,
+        seed: int = 0,
+        **kwargs
+    ):
+        """Initialize an IVFVectorStorage."""
+        super().__init__(dimension, **kwargs)
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.retrain_factor = retrain_factor
+        self.kmeans_iters = kmeans_iters
+        self.max_train_samples = max_train_samples
+        self._rng = np.random.default_rng(seed)
+        
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(self._size, dtype=np.int32)  # Row -> cluster
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}  # Cached np views of _lists
+        self._trained_count = 0
+        
+        # Centroids are not persisted; retrain after loading from persist_dir
+        if self.count() >= self.train_size:
+            self.train()
+    
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+    
+    def _kmeans(self, data: np.ndarray, k: int) -> np.ndarray:
+        """Spherical k-means on L2-normalized rows; returns normalized centroids."""
+        centroids = data[self._rng.choice(data.shape[0], k, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = self._nearest_centroids(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=k)
+            
+            # Reseed empty clusters with random points
+            empty = np.flatnonzero(counts == 0)
+            if empty.size:
+                sums[empty] = data[self._rng.choice(data.shape[0], empty.size, replace=False)]
+            
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms > 0, norms, 1.0)
+        return centroids.astype(np.float32)
+    
+    @staticmethod
+    def _nearest_centroids(data: np.ndarray, centroids: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+        """Assign each row to its most similar centroid, in batches to bound memory."""
+        assign = np.empty(data.shape[0], dtype=np.int32)
+        for start in range(0, data.shape[0], batch_size):
+            block = data[start:start + batch_size]
+            assign[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+        return assign
+    
+    def train(self) -> None:
+        """(Re)build the clusters from the vectors currently stored."""
+        live = np.flatnonzero(self._alive[:self._size])
+        if live.size == 0:
+            return
+        
+        k = self.n_lists or int(np.sqrt(live.size))
+        k = max(1, min(k, live.size))
+        
+        sample = live
+        if sample.size > self.max_train_samples:
+            sample = self._rng.choice(live, self.max_train_samples, replace=False)
+        self._centroids = self._kmeans(self._gather(np.sort(sample)), k)
+        
+        self._assign = np.concatenate([
+            self._nearest_centroids(block, self._centroids) for _, block in self._iter_blocks()
+        ]) if self._size else np.zeros(0, dtype=np.int32)
+        self._rebuild_lists()
+        self._trained_count = live.size
+    
+    def _reset_state(self) -> None:
+        super()._reset_state()
+        # Cluster assignments refer to row numbers and are rebuilt after a reload
+        self._centroids = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists = []
+        self._list_arrays = {}
+        self._trained_count = 0
+    
+    def _merge_from_disk(self) -> None:
+        super()._merge_from_disk()
+        if not self.is_trained:
+            if self.count() >= self.train_size:
+                self.train()
+            else:
+                self._assign = np.zeros(self._size, dtype=np.int32)
+    
+    def _rebuild_lists(self) -> None:
+        self._lists = [[] for _ in range(self._centroids.shape[0])]
+        for row in np.flatnonzero(self._alive[:self._size]):
+            self._lists[self._assign[row]].append(int(row))
+        self._list_arrays = {}
+    
+    def add(
+        self,
+        vectors: List[List[float]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """Add vectors to the storage and assign them to their nearest cluster.
+        
+        Args:
+            vectors: List of vector embeddings to add.
+            metadata: Optional metadata for each vector.
+            ids: Optional IDs for each vector.
+        
+        Returns:
+            List[str]: List of IDs for the added vectors.
+        """
+        start = self._size
+        ids = super().add(vectors, metadata, ids)
+        end = self._size
+        
+        if not self.is_trained:
+            if self.count() >= self.train_size:
+                self.train()
+            else:
+                self._assign = np.zeros(end, dtype=np.int32)
+            return ids
+        
+        if self.count() >= self._trained_count * self.retrain_factor:
+            self.train()
+            return ids
+        
+        assign = self._nearest_centroids(self._gather(np.arange(start, end)), self._centroids)
+        self._assign = np.concatenate([self._assign[:start], assign])
+        for offset, cluster in enumerate(assign):
+            self._lists[cluster].append(start + offset)
+            self._list_arrays.pop(int(cluster), None)
+        
+        return ids
+    
+    def _candidate_rows(self, query_np: np.ndarray, nprobe: int) -> np.ndarray:
+        """Rows of the ``nprobe`` clusters closest to the query, excluding tombstones."""
+        centroid_scores = self._centroids @ query_np
+        nprobe = min(max(nprobe, 1), centroid_scores.shape[0])
+        if nprobe < centroid_scores.shape[0]:
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(centroid_scores.shape[0])
+        
+        arrays = []
+        for cluster in probe:
+            cluster = int(cluster)
+            array = self._list_arrays.get(cluster)
+            if array is None:
+                array = self._list_arrays[cluster] = np.asarray(self._lists[cluster], dtype=np.int64)
+            arrays.append(array)
+        rows = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+        return rows[self._alive[rows]]
+    
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar vectors in the closest clusters.
+        
+        Args:
+            query_vector: Vector to search for.
+            top_k: Number of results to return.
+            filter: Optional filter for metadata.
+            nprobe: Number of clusters to scan; defaults to ``self.nprobe``.
+        
+        Returns:
+            List[Dict[str, Any]]: List of search results with scores.
+        """
+        if not self.is_trained:
+            return super().search(query_vector, top_k, filter)
+        
+        if not self._id_to_row or top_k <= 0:
+            return []
+        
+        # Validate query vector
+        if len(query_vector) != self.dimension:
+            raise ValueError(f"Query vector dimension mismatch: expected {self.dimension}, got {len(query_vector)}")
+        
+        query_np = self._normalize_query(query_vector)
+        rows = self._candidate_rows(query_np, nprobe or self.nprobe)
+        
+        if filter:
+            allowed = np.fromiter(self._filter_rows(filter), dtype=np.int64)
+            rows = rows[np.isin(rows, allowed)]
+        if rows.size == 0:
+            return []
+        
+        similarities = self._gather(rows) @ query_np
+        return self._top_k_results(similarities, rows, min(top_k, rows.size))
+    
+    def compact(self) -> None:
+        """Drop tombstoned rows and remap the cluster lists."""
+        live = np.flatnonzero(self._alive[:self._size])
+        assign = self._assign[live] if self._assign.size >= self._size else np.zeros(live.size, dtype=np.int32)
+        super().compact()
+        self._assign = assign
+        if self.is_trained:
+            self._rebuild_lists()
@@ -1,40 +1,234 @@
+import json
+import os
 import uuid
 import numpy as np
-from typing import Any, Dict, List, Optional, Union, Tuple
-from sklearn.metrics.pairwise import cosine_similarity
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Set, Union, Tuple
 
 from . import VectorStorage
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 class SimpleVectorStorage(VectorStorage):
     """Simple in-memory vector storage implementation.
     
-    This class implements the VectorStorage interface using in-memory
-    arrays for storing and searching vector embeddings.
+    This class implements the VectorStorage interface using a contiguous,
+    preallocated float32 matrix. Rows are L2-normalized on insert so a search
+    is a single matrix-vector product, and an id -> row map makes lookups O(1).
+    Metadata values are kept in an inverted index for exact-match filters.
+    Deleted rows are tombstoned and the matrix is compacted once the share of
+    dead rows exceeds ``compact_threshold``.
+    
+    With ``persist_dir`` set, ``save()`` writes the vectors as immutable
+    float32 ``.npy`` segments with a JSON sidecar for IDs and metadata. Each
+    save appends a new segment for the rows added since the previous one, and
+    deletions are appended to a tombstone file. Segments are opened with
+    ``np.load(mmap_mode='r')``, so loading is near-instant and processes that
+    open the same directory share the matrix through the page cache. Only rows
+    added since the last save are held in process memory.
+    
+    Several processes may write to the same directory. Saves are serialized
+    with an exclusive ``flock`` on a lock file and loads take a shared one.
+    If another process saved since this instance last loaded or saved, the
+    directory is reloaded first and the IDs this instance added or deleted
+    are applied on top, so each writer's changes are kept.
     
     Args:
         dimension: Dimension of vectors to store.
+        initial_capacity: Number of rows to preallocate.
+        compact_threshold: Fraction of tombstoned rows that triggers compaction.
+        persist_dir: Optional directory to load from and save to.
     """
     
-    def __init__(self, dimension: int = 768):
+    MANIFEST = "manifest.json"
+    LOCK_FILE = ".lock"
+    
+    def __init__(
+        self,
+        dimension: int = 768,
+        initial_capacity: int = 1024,
+        compact_threshold: float = 0.25,
+        persist_dir: Optional[str] = None
+    ):
         """Initialize a SimpleVectorStorage."""
         self.dimension = dimension
-        self.vectors = []
-        self.metadata = []
-        self.ids = []
+        self.compact_threshold = compact_threshold
+        self.persist_dir = persist_dir
+        capacity = max(int(initial_capacity), 1)
+        self._initial_capacity = capacity
+        self._reset_state()
+        
+        if persist_dir and os.path.exists(os.path.join(persist_dir, self.MANIFEST)):
+            self._load()
+    
+    def _reset_state(self) -> None:
+        """Empty the storage and forget the persisted state it was loaded from."""
+        # Rows [0, _base_rows) live in read-only memory-mapped segments,
+        # rows [_base_rows, _size) in the in-memory _matrix
+        self._segments: List[np.ndarray] = []
+        self._segment_offsets: List[int] = []
+        self._base_rows = 0
+        
+        capacity = self._initial_capacity
+        self._matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._size = 0  # Rows in use, including tombstones
+        
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._id_to_row: Dict[str, int] = {}
+        
+        # key -> value -> rows; unhashable values are matched by scanning
+        self._meta_index: Dict[str, Dict[Hashable, Set[int]]] = {}
+        self._unindexed: Dict[str, Set[int]] = {}
+        
+        # Persistence state
+        self._generation = 0
+        self._pending_tombstones: List[int] = []
+        self._needs_rewrite = False
+        # IDs added or deleted since the last save, re-applied if another process saved meanwhile
+        self._dirty_ids: Set[str] = set()
+        # (generation, segments, tombstone bytes) of the directory as last loaded or saved
+        self._disk_state: Optional[Tuple[int, int, int]] = None
+    
+    @staticmethod
+    def _grow(array: np.ndarray, used: int, needed: int) -> np.ndarray:
+        capacity = max(array.shape[0], 1)
+        if needed <= capacity:
+            return array
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:used] = array[:used]
+        return grown
+    
+    def _ensure_capacity(self, extra: int) -> None:
+        """Grow the preallocated arrays geometrically to fit ``extra`` more rows."""
+        self._matrix = self._grow(self._matrix, self._size - self._base_rows, self._size - self._base_rows + extra)
+        self._norms = self._grow(self._norms, self._size, self._size + extra)
+        self._alive = self._grow(self._alive, self._size, self._size + extra)
+    
+    def _iter_blocks(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield ``(first_row, rows)`` for every segment and the in-memory tail."""
+        for offset, segment in zip(self._segment_offsets, self._segments):
+            yield offset, segment
+        if self._size > self._base_rows:
+            yield self._base_rows, self._matrix[:self._size - self._base_rows]
+    
+    def _score_all(self, query_np: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query with every row, one block at a time."""
+        if not self._segments:
+            return self._matrix[:self._size] @ query_np
+        similarities = np.empty(self._size, dtype=np.float32)
+        for offset, block in self._iter_blocks():
+            similarities[offset:offset + block.shape[0]] = block @ query_np
+        return similarities
+    
+    def _gather(self, rows: np.ndarray) -> np.ndarray:
+        """Return the normalized vectors of the given rows."""
+        if not self._segments:
+            return self._matrix[rows]
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.empty((rows.size, self.dimension), dtype=np.float32)
+        tail = rows >= self._base_rows
+        out[tail] = self._matrix[rows[tail] - self._base_rows]
+        segment_of = np.searchsorted(self._segment_offsets, rows, side='right') - 1
+        for index, (offset, segment) in enumerate(zip(self._segment_offsets, self._segments)):
+            mask = ~tail & (segment_of == index)
+            if mask.any():
+                out[mask] = segment[rows[mask] - offset]
+        return out
+    
+    def _index_metadata(self, row: int, meta: Dict[str, Any]) -> None:
+        for key, value in meta.items():
+            try:
+                self._meta_index.setdefault(key, {}).setdefault(value, set()).add(row)
+            except TypeError:
+                self._unindexed.setdefault(key, set()).add(row)
+    
+    def _unindex_metadata(self, row: int, meta: Dict[str, Any]) -> None:
+        for key, value in meta.items():
+            try:
+                rows = self._meta_index.get(key, {}).get(value)
+            except TypeError:
+                rows = self._unindexed.get(key)
+            if rows is not None:
+                rows.discard(row)
+    
+    def _filter_rows(self, filter: Dict[str, Any]) -> Set[int]:
+        """Return the live rows whose metadata matches every key/value in ``filter``."""
+        candidates: Optional[Set[int]] = None
+        for key, value in filter.items():
+            try:
+                rows = set(self._meta_index.get(key, {}).get(value, ()))
+            except TypeError:
+                rows = set()
+            # Unhashable metadata values (lists, dicts) are compared directly
+            for row in self._unindexed.get(key, ()):
+                if self._metadata[row][key] == value:
+                    rows.add(row)
+            candidates = rows if candidates is None else candidates & rows
+            if not candidates:
+                return set()
+        return candidates if candidates is not None else set(self._id_to_row.values())
+    
+    def _row_vector(self, row: int) -> List[float]:
+        return (self._gather(np.array([row]))[0] * self._norms[row]).tolist()
+    
+    def _normalize_query(self, query_vector: List[float]) -> np.ndarray:
+        query_np = np.asarray(query_vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query_np)
+        if query_norm > 0:
+            query_np = query_np / query_norm
+        return query_np
+    
+    def _top_k_results(
+        self,
+        similarities: np.ndarray,
+        rows: Optional[np.ndarray],
+        k: int
+    ) -> List[Dict[str, Any]]:
+        """Format the ``k`` best scores; ``rows`` maps score positions to matrix rows (None = identity)."""
+        # Top-k without sorting the whole candidate set
+        if k <= 0:
+            return []
+        if k < similarities.shape[0]:
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(similarities.shape[0])
+        top = top[np.argsort(-similarities[top], kind='stable')][:k]
         
+        results = []
+        for i in top:
+            row = int(rows[i]) if rows is not None else int(i)
+            results.append({
+                "id": self._ids[row],
+                "vector": self._row_vector(row),
+                "metadata": self._metadata[row],
+                "score": float(similarities[i])
+            })
+        
+        return results
+    
     def add(
-        self, 
-        vectors: List[List[float]], 
+        self,
+        vectors: List[List[float]],
         metadata: Optional[List[Dict[str, Any]]] = None,
         ids: Optional[List[str]] = None
     ) -> List[str]:
         """Add vectors to the storage.
         
+        Adding a vector with an ID that already exists replaces the old vector.
+        
         Args:
             vectors: List of vector embeddings to add.
             metadata: Optional metadata for each vector.
             ids: Optional IDs for each vector.
-            
+        
         Returns:
             List[str]: List of IDs for the added vectors.
         """
@@ -42,29 +236,52 @@ class SimpleVectorStorage(VectorStorage):
         for vector in vectors:
             if len(vector) != self.dimension:
                 raise ValueError(f"Vector dimension mismatch: expected {self.dimension}, got {len(vector)}")
-                
+        
         # Generate IDs if not provided
         if ids is None:
             ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
         elif len(ids) != len(vectors):
             raise ValueError("Number of IDs must match number of vectors")
-            
+        
         # Use empty metadata if not provided
         if metadata is None:
             metadata = [{} for _ in range(len(vectors))]
         elif len(metadata) != len(vectors):
             raise ValueError("Number of metadata items must match number of vectors")
-            
-        # Add vectors, metadata, and IDs
-        self.vectors.extend(vectors)
-        self.metadata.extend(metadata)
-        self.ids.extend(ids)
+        
+        if len(vectors) == 0:
+            return ids
+        
+        # Replace existing IDs
+        self._tombstone([id for id in ids if id in self._id_to_row])
+        
+        block = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.dimension)
+        norms = np.linalg.norm(block, axis=1)
+        safe_norms = np.where(norms > 0, norms, 1.0).astype(np.float32)
+        
+        self._ensure_capacity(len(vectors))
+        start = self._size
+        end = start + len(vectors)
+        self._matrix[start - self._base_rows:end - self._base_rows] = block / safe_norms[:, None]
+        self._norms[start:end] = norms
+        self._alive[start:end] = True
+        self._size = end
+        
+        for offset, (id, meta) in enumerate(zip(ids, metadata)):
+            row = start + offset
+            self._ids.append(id)
+            self._metadata.append(meta)
+            self._id_to_row[id] = row
+            self._index_metadata(row, meta)
+        
+        if self.persist_dir:
+            self._dirty_ids.update(ids)
         
         return ids
     
     def search(
-        self, 
-        query_vector: List[float], 
+        self,
+        query_vector: List[float],
         top_k: int = 5,
         filter: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
@@ -74,97 +291,330 @@ class SimpleVectorStorage(VectorStorage):
             query_vector: Vector to search for.
             top_k: Number of results to return.
             filter: Optional filter for metadata.
-            
+        
         Returns:
             List[Dict[str, Any]]: List of search results with scores.
         """
-        if not self.vectors:
+        if not self._id_to_row or top_k <= 0:
             return []
-            
+        
         # Validate query vector
         if len(query_vector) != self.dimension:
             raise ValueError(f"Query vector dimension mismatch: expected {self.dimension}, got {len(query_vector)}")
-            
-        # Convert to numpy arrays
-        query_np = np.array(query_vector).reshape(1, -1)
-        vectors_np = np.array(self.vectors)
         
-        # Compute similarities
-        similarities = cosine_similarity(query_np, vectors_np)[0]
+        query_np = self._normalize_query(query_vector)
         
-        # Apply filter if provided
-        filtered_indices = []
         if filter:
-            for i, meta in enumerate(self.metadata):
-                match = True
-                for key, value in filter.items():
-                    if key not in meta or meta[key] != value:
-                        match = False
-                        break
-                if match:
-                    filtered_indices.append(i)
+            rows = np.fromiter(self._filter_rows(filter), dtype=np.int64)
+            if rows.size == 0:
+                return []
+            if rows.size * 4 < self._size:
+                # Small candidate sets: gather only the matching rows
+                similarities = self._gather(rows) @ query_np
+            else:
+                similarities = self._score_all(query_np)[rows]
         else:
-            filtered_indices = list(range(len(self.vectors)))
-            
-        # Sort by similarity
-        results = []
-        for i in sorted(filtered_indices, key=lambda i: similarities[i], reverse=True)[:top_k]:
-            results.append({
-                "id": self.ids[i],
-                "vector": self.vectors[i],
-                "metadata": self.metadata[i],
-                "score": float(similarities[i])
-            })
-            
-        return results
+            rows = None
+            similarities = self._score_all(query_np)
+            similarities[~self._alive[:self._size]] = -np.inf
+        
+        limit = similarities.shape[0] if rows is not None else len(self._id_to_row)
+        return self._top_k_results(similarities, rows, min(top_k, limit))
     
     def get(self, id: str) -> Optional[Dict[str, Any]]:
         """Get a vector by ID.
         
         Args:
             id: ID of the vector to get.
-            
+        
         Returns:
             Optional[Dict[str, Any]]: Vector data if found, None otherwise.
         """
-        try:
-            index = self.ids.index(id)
-            return {
-                "id": id,
-                "vector": self.vectors[index],
-                "metadata": self.metadata[index]
-            }
-        except ValueError:
+        row = self._id_to_row.get(id)
+        if row is None:
             return None
+        return {
+            "id": id,
+            "vector": self._row_vector(row),
+            "metadata": self._metadata[row]
+        }
+    
+    def _tombstone(self, ids: List[str]) -> bool:
+        """Mark rows as deleted; returns False if any ID was not found."""
+        success = True
+        for id in ids:
+            row = self._id_to_row.pop(id, None)
+            if row is None:
+                success = False
+                continue
+            self._alive[row] = False
+            if row < self._base_rows:
+                self._pending_tombstones.append(row)
+            if self.persist_dir:
+                self._dirty_ids.add(id)
+            self._unindex_metadata(row, self._metadata[row])
+            self._ids[row] = None
+            self._metadata[row] = None
+        return success
     
     def delete(self, ids: Union[str, List[str]]) -> bool:
         """Delete vectors by ID.
         
         Args:
             ids: ID or list of IDs to delete.
-            
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         if isinstance(ids, str):
             ids = [ids]
-            
-        success = True
-        for id in ids:
-            try:
-                index = self.ids.index(id)
-                self.ids.pop(index)
-                self.vectors.pop(index)
-                self.metadata.pop(index)
-            except ValueError:
-                success = False
-                
+        
+        success = self._tombstone(ids)
+        
+        dead = self._size - len(self._id_to_row)
+        if self._size and dead / self._size > self.compact_threshold:
+            self.compact()
+        
         return success
     
+    def compact(self) -> None:
+        """Drop tombstoned rows and rebuild the ID map and metadata index.
+        
+        Persisted storages are rewritten as a single new segment by the next
+        ``save()``.
+        """
+        live = np.flatnonzero(self._alive[:self._size])
+        count = live.size
+        
+        if self._segments:
+            # Copy live rows out of the read-only segments into memory
+            matrix = np.zeros((max(count, self._initial_capacity), self.dimension), dtype=np.float32)
+            matrix[:count] = self._gather(live)
+            self._matrix = matrix
+            self._segments = []
+            self._segment_offsets = []
+            self._base_rows = 0
+        else:
+            self._matrix[:count] = self._matrix[live]
+            self._matrix[count:self._size] = 0
+        self._norms[:count] = self._norms[live]
+        self._alive[:count] = True
+        self._alive[count:self._size] = False
+        self._norms[count:self._size] = 0
+        
+        self._ids = [self._ids[row] for row in live]
+        self._metadata = [self._metadata[row] for row in live]
+        self._size = count
+        
+        self._id_to_row = {id: row for row, id in enumerate(self._ids)}
+        self._meta_index = {}
+        self._unindexed = {}
+        for row, meta in enumerate(self._metadata):
+            self._index_metadata(row, meta)
+        
+        self._pending_tombstones = []
+        if self.persist_dir and self._generation:
+            # Row numbers no longer match the files on disk, the next save writes a new generation
+            self._needs_rewrite = True
+    
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+    
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Hold the directory's lock file: exclusive for writers, shared for readers."""
+        lock_file = open(self._path(self.LOCK_FILE), 'a')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+    
+    def _read_disk_state(self) -> Optional[Tuple[int, int, int]]:
+        """Identify the persisted state; changes whenever any process saves."""
+        if not os.path.exists(self._path(self.MANIFEST)):
+            return None
+        manifest = self._read_manifest()
+        tombstone_file = self._path(f"g{manifest['generation']}.tombstones")
+        tombstone_bytes = os.path.getsize(tombstone_file) if os.path.exists(tombstone_file) else 0
+        return manifest["generation"], len(manifest["segments"]), tombstone_bytes
+    
+    def _write_segment(self, name: str, start: int, end: int) -> None:
+        """Write rows [start, end) as ``<name>.vectors.npy``, ``<name>.norms.npy`` and ``<name>.meta.json``."""
+        vectors = self._gather(np.arange(start, end))
+        for suffix, array in (("vectors", vectors), ("norms", self._norms[start:end])):
+            tmp_path = self._path(f"{name}.{suffix}.tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, self._path(f"{name}.{suffix}.npy"))
+        
+        tmp_path = self._path(f"{name}.meta.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Tombstoned rows are written with a null ID
+            json.dump({"ids": self._ids[start:end], "metadata": self._metadata[start:end]}, f)
+        os.replace(tmp_path, self._path(f"{name}.meta.json"))
+    
+    def _write_manifest(self, segments: List[Dict[str, Any]]) -> None:
+        tmp_path = self._path(f"{self.MANIFEST}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dimension": self.dimension,
+                "generation": self._generation,
+                "segments": segments,
+            }, f, indent=2)
+        os.replace(tmp_path, self._path(self.MANIFEST))
+    
+    def _read_manifest(self) -> Dict[str, Any]:
+        with open(self._path(self.MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _map_segment(self, name: str, start: int) -> np.ndarray:
+        segment = np.load(self._path(f"{name}.vectors.npy"), mmap_mode='r')
+        self._segments.append(segment)
+        self._segment_offsets.append(start)
+        return segment
+    
+    def save(self) -> None:
+        """Persist the storage to ``persist_dir``.
+        
+        Rows added since the last save are appended as a new segment and then
+        memory-mapped; deletions are appended to the generation's tombstone
+        file. After a compaction the whole storage is rewritten as a new
+        generation and the previous generation's files are removed.
+        
+        If another process saved since this instance last loaded or saved,
+        its changes are merged in first.
+        """
+        if not self.persist_dir:
+            raise ValueError("persist_dir is not set")
+        os.makedirs(self.persist_dir, exist_ok=True)
+        
+        with self._locked(exclusive=True):
+            if self._read_disk_state() != self._disk_state:
+                self._merge_from_disk()
+            
+            if self._generation == 0 or self._needs_rewrite:
+                self._rewrite()
+            else:
+                self._append()
+            self._dirty_ids = set()
+            self._disk_state = self._read_disk_state()
+    
+    def _merge_from_disk(self) -> None:
+        """Reload the directory and re-apply this instance's unsaved changes by ID (caller holds the lock)."""
+        added = sorted(id for id in self._dirty_ids if id in self._id_to_row)
+        deleted = [id for id in self._dirty_ids if id not in self._id_to_row]
+        rows = np.array([self._id_to_row[id] for id in added], dtype=np.int64)
+        vectors = self._gather(rows) * self._norms[rows][:, None] if added else None
+        metadata = [self._metadata[row] for row in rows]
+        needs_rewrite = self._needs_rewrite
+        
+        self._reset_state()
+        if os.path.exists(self._path(self.MANIFEST)):
+            self._load_locked()
+        self._tombstone([id for id in deleted if id in self._id_to_row])
+        if added:
+            self.add(vectors.tolist(), metadata, added)
+        self._needs_rewrite = needs_rewrite
+    
+    def _append(self) -> None:
+        """Append pending tombstones and the in-memory tail to the current generation."""
+        manifest = self._read_manifest()
+        if self._pending_tombstones:
+            with open(self._path(f"g{self._generation}.tombstones"), 'a', encoding='utf-8') as f:
+                f.write("".join(f"{row}\n" for row in self._pending_tombstones))
+            self._pending_tombstones = []
+        
+        if self._size > self._base_rows:
+            name = f"g{self._generation}-s{len(manifest['segments'])}"
+            self._write_segment(name, self._base_rows, self._size)
+            manifest["segments"].append({"name": name, "rows": self._size - self._base_rows})
+            self._write_manifest(manifest["segments"])
+            self._release_tail(name)
+    
+    def _rewrite(self) -> None:
+        """Write every row as a single segment of a new generation."""
+        old_generation = self._generation
+        self._generation += 1
+        
+        name = f"g{self._generation}-s0"
+        self._write_segment(name, 0, self._size)
+        open(self._path(f"g{self._generation}.tombstones"), 'w').close()
+        self._write_manifest([{"name": name, "rows": self._size}])
+        
+        self._segments = []
+        self._segment_offsets = []
+        self._base_rows = 0
+        self._release_tail(name)
+        self._pending_tombstones = []
+        self._needs_rewrite = False
+        
+        # Processes that still map the old files keep them open until they reload
+        if old_generation:
+            prefix = f"g{old_generation}"
+            for file_name in os.listdir(self.persist_dir):
+                if file_name.startswith(prefix + "-") or file_name == f"{prefix}.tombstones":
+                    os.remove(self._path(file_name))
+    
+    def _release_tail(self, name: str) -> None:
+        """Replace the in-memory tail with the segment it was just saved to."""
+        if self._size > self._base_rows:
+            self._map_segment(name, self._base_rows)
+        self._base_rows = self._size
+        self._matrix = np.zeros((self._initial_capacity, self.dimension), dtype=np.float32)
+    
+    def _load(self) -> None:
+        """Memory-map the segments listed in the manifest."""
+        with self._locked(exclusive=False):
+            self._load_locked()
+    
+    def _load_locked(self) -> None:
+        manifest = self._read_manifest()
+        if manifest["dimension"] != self.dimension:
+            raise ValueError(f"Stored vector dimension mismatch: expected {self.dimension}, got {manifest['dimension']}")
+        self._generation = manifest["generation"]
+        
+        norms = []
+        start = 0
+        for segment in manifest["segments"]:
+            self._map_segment(segment["name"], start)
+            norms.append(np.load(self._path(f"{segment['name']}.norms.npy")))
+            with open(self._path(f"{segment['name']}.meta.json"), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self._ids.extend(meta["ids"])
+            self._metadata.extend(meta["metadata"])
+            start += segment["rows"]
+        
+        self._size = self._base_rows = start
+        self._norms = np.zeros(max(start, 1) + self._initial_capacity, dtype=np.float32)
+        if norms:
+            self._norms[:start] = np.concatenate(norms)
+        self._alive = np.zeros(self._norms.shape[0], dtype=bool)
+        self._alive[:start] = [id is not None for id in self._ids]
+        
+        tombstone_file = self._path(f"g{self._generation}.tombstones")
+        if os.path.exists(tombstone_file):
+            with open(tombstone_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        row = int(line)
+                        self._alive[row] = False
+                        self._ids[row] = None
+                        self._metadata[row] = None
+        
+        for row in np.flatnonzero(self._alive[:start]):
+            row = int(row)
+            self._id_to_row[self._ids[row]] = row
+            self._index_metadata(row, self._metadata[row])
+        
+        self._disk_state = self._read_disk_state()
+    
     def count(self) -> int:
         """Get the number of vectors in the storage.
         
         Returns:
             int: Number of vectors.
         """
-        return len(self.vectors)
+        return len(self._id_to_row)
@@ -1,12 +1,12 @@
 import os
 import json
 import logging
-import mysql.connector
 from typing import Dict, Any, Optional, List
 import subprocess
 import tempfile
-import pymysql
 import time
+from db.pool import get_pool
+from utils.terraform_plugin_cache import get_plugin_cache
 
 class TerraformExecutor:
     """Terraform执行器，用于在E2B沙箱中执行Terraform命令"""
@@ -32,8 +32,8 @@ class TerraformExecutor:
         self.logger.info(f"TerraformExecutor初始化完成，工作目录: {self.work_dir}")
     
     def _get_connection(self):
-        """创建并返回数据库连接"""
-        return mysql.connector.connect(**self.db_config)
+        """从共享连接池借出数据库连接，调用 close() 时归还"""
+        return get_pool(self.db_config, driver='mysql.connector').get_connection()
     
     def create_sandbox(self, config_file_path: str, deploy_id: str) -> Dict[str, Any]:
         """创建E2B沙箱并执行Terraform命令
@@ -508,12 +508,8 @@ cat output.json
         connection = None
         cursor = None
         try:
-            # 使用self.db_config
-            connection = pymysql.connect(
-                **self.db_config,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
-            )
+            # 使用self.db_config，从共享连接池借出字典游标连接
+            connection = get_pool(self.db_config).get_connection()
             cursor = connection.cursor()
             
             # 首先检查记录是否存在
@@ -612,21 +608,39 @@ cat output.json
             if connection:
                 connection.close()
 
-    def run_terraform(self, uid, project, cloud, region, terraform_content, deploy_id, ak=None, sk=None, skip_save=False):
+    def run_terraform(self, uid, project, cloud, region, terraform_content, deploy_id, ak=None, sk=None, skip_save=False,
+                      work_dir_name=None, timeout=None):
         """
         运行Terraform命令
+        
+        Args:
+            work_dir_name: 工作目录名，默认使用deploy_id；多区域并发查询时每个区域使用独立目录
+            timeout: 整个init/apply/output流程的超时秒数，默认只使用各阶段自身的超时
         """
+        run_key = work_dir_name or deploy_id
+        
         # 检查是否已经在运行
-        if deploy_id in self._running_queries:
-            self.logger.warning(f"部署ID {deploy_id} 已在运行中，跳过重复执行")
+        if run_key in self._running_queries:
+            self.logger.warning(f"部署ID {run_key} 已在运行中，跳过重复执行")
             return {"success": False, "message": "查询已在运行中"}
             
         # 添加到运行集合
-        self._running_queries.add(deploy_id)
+        self._running_queries.add(run_key)
+        
+        deadline = time.time() + timeout if timeout else None
+        
+        def phase_timeout(default):
+            """阶段超时取自身默认值与整体剩余时间中的较小值"""
+            if deadline is None:
+                return default
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(['terraform'], timeout)
+            return min(default, remaining)
         
         try:
             # 创建工作目录
-            work_dir = os.path.join(self.work_dir, deploy_id)
+            work_dir = os.path.join(self.work_dir, run_key)
             os.makedirs(work_dir, exist_ok=True)
             
             # 生成Terraform配置文件
@@ -705,8 +719,12 @@ cat output.json
                 env['AWS_DEFAULT_REGION'] = region
                 self.logger.info(f"🔑 设置AWS凭证环境变量 (AK: {ak[:8]}...)")
             
+            # 从共享插件缓存链接provider，避免每次init重新下载
+            plugin_cache = get_plugin_cache()
+            init_mode = plugin_cache.prepare_workdir(work_dir, terraform_content)
+            
             # 执行terraform init
-            self.logger.info("🚀 执行terraform init")
+            self.logger.info(f"🚀 执行terraform init (provider缓存: {init_mode})")
             self.logger.info(f"📂 工作目录: {work_dir}")
             
             init_start_time = time.time()
@@ -716,9 +734,10 @@ cat output.json
                 env=env,
                 capture_output=True, 
                 text=True, 
-                timeout=120
+                timeout=phase_timeout(120)
             )
             init_duration = time.time() - init_start_time
+            plugin_cache.record_init(init_mode, init_duration, init_process.returncode == 0)
             
             self.logger.info(f"⏱️ terraform init 执行时间: {init_duration:.2f}秒")
             self.logger.info(f"🔢 terraform init 退出码: {init_process.returncode}")
@@ -783,7 +802,7 @@ cat output.json
                 env=env,
                 capture_output=True, 
                 text=True, 
-                timeout=300
+                timeout=phase_timeout(300)
             )
             apply_duration = time.time() - apply_start_time
             
@@ -825,7 +844,7 @@ cat output.json
                 env=env,
                 capture_output=True, 
                 text=True, 
-                timeout=60
+                timeout=phase_timeout(60)
             )
             output_duration = time.time() - output_start_time
             
@@ -903,7 +922,7 @@ cat output.json
             return {"success": False, "message": f"执行Terraform时发生错误: {e}"}
         finally:
             # 从运行集合中移除
-            self._running_queries.discard(deploy_id) 
+            self._running_queries.discard(run_key) 
 
     def _parse_terraform_outputs(self, output_json):
         """
@@ -1,6 +1,6 @@
 import os
 import logging
-import mysql.connector
+from db.pool import get_pool
 from typing import Dict, Any, Optional, List
 
 class TerraformGenerator:
@@ -16,8 +16,8 @@ class TerraformGenerator:
         self.logger = logging.getLogger(__name__)
     
     def _get_connection(self):
-        """创建并返回数据库连接"""
-        return mysql.connector.connect(**self.db_config)
+        """从共享连接池借出数据库连接，调用 close() 时归还"""
+        return get_pool(self.db_config, driver='mysql.connector').get_connection()
     
     def get_deployment_info(self, deploy_id: str) -> Optional[Dict[str, Any]]:
         """从数据库获取指定部署ID的信息
@@ -0,0 +1,168 @@
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+# terraform 默认输出带颜色，推送给前端前去掉 ANSI 控制字符
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+
+class DeploymentEventChannel:
+    """单个部署的事件通道
+
+    保留最近 max_events 条事件，每条事件有递增的 id，订阅方通过 last_id
+    断点续读（对应 SSE 的 Last-Event-ID）。通道关闭后不再接收事件。
+    """
+
+    def __init__(self, deploy_id: str, max_events: int = 2000):
+        self.deploy_id = deploy_id
+        self._cond = threading.Condition()
+        self._events: deque = deque(maxlen=max_events)
+        self._next_id = 1
+        self.closed = False
+        self.closed_at = None
+
+    def publish(self, event_type: str, data: Optional[Dict[str, Any]] = None) -> int:
+        """发布事件，返回事件 id；通道已关闭时返回 0"""
+        with self._cond:
+            if self.closed:
+                return 0
+            event_id = self._next_id
+            self._next_id += 1
+            self._events.append({
+                'id': event_id,
+                'type': event_type,
+                'time': time.time(),
+                'data': data or {},
+            })
+            self._cond.notify_all()
+            return event_id
+
+    def close(self, data: Optional[Dict[str, Any]] = None):
+        """发布 done 事件并关闭通道"""
+        with self._cond:
+            if self.closed:
+                return
+        self.publish('done', data)
+        with self._cond:
+            self.closed = True
+            self.closed_at = time.time()
+            self._cond.notify_all()
+
+    def wait_events(self, last_id: int = 0, timeout: float = 15) -> Tuple[List[Dict[str, Any]], bool]:
+        """返回 id 大于 last_id 的事件，没有新事件时最多等待 timeout 秒
+
+        Returns:
+            (事件列表, 通道是否已关闭)
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                events = [event for event in self._events if event['id'] > last_id]
+                if events or self.closed:
+                    return events, self.closed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], False
+                self._cond.wait(remaining)
+
+
+class DeploymentEventBus:
+    """按 deploy_id 管理事件通道，已关闭的通道保留 retention 秒后清理"""
+
+    def __init__(self, retention: float = 600, max_events: int = 2000):
+        self.retention = retention
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._channels: Dict[str, DeploymentEventChannel] = {}
+
+    def _cleanup(self):
+        """清理过期的已关闭通道（调用方需持有锁）"""
+        now = time.time()
+        expired = [deploy_id for deploy_id, channel in self._channels.items()
+                   if channel.closed and now - channel.closed_at > self.retention]
+        for deploy_id in expired:
+            del self._channels[deploy_id]
+
+    def get_channel(self, deploy_id: str, create: bool = True) -> Optional[DeploymentEventChannel]:
+        """获取部署的事件通道；create 为 True 时不存在或已关闭则新建"""
+        with self._lock:
+            self._cleanup()
+            channel = self._channels.get(deploy_id)
+            if create and (channel is None or channel.closed):
+                channel = self._channels[deploy_id] = DeploymentEventChannel(deploy_id, self.max_events)
+            return channel
+
+    def publish(self, deploy_id: str, event_type: str, **data) -> int:
+        return self.get_channel(deploy_id).publish(event_type, data)
+
+    def close(self, deploy_id: str, **data):
+        channel = self.get_channel(deploy_id, create=False)
+        if channel is not None:
+            channel.close(data)
+
+
+_event_bus = DeploymentEventBus()
+
+
+def get_event_bus() -> DeploymentEventBus:
+    """获取进程内共享的部署事件总线"""
+    return _event_bus
+
+
+def stream_process_output(process: subprocess.Popen, deploy_id: Optional[str] = None, phase: str = ''):
+    """逐行读取子进程输出并发布到部署事件通道，替代 process.communicate()
+
+    stdout 在当前线程读取，stderr 在辅助线程读取，避免任一管道写满阻塞进程。
+    deploy_id 为空时使用当前部署任务的 id；都没有时退化为 communicate()。
+
+    Returns:
+        (stdout, stderr)，类型与进程的文本/二进制模式一致
+    """
+    if deploy_id is None:
+        from utils.terraform_job_runner import current_job
+        job = current_job()
+        deploy_id = job.job_id if job is not None else None
+    if deploy_id is None or process.stdout is None or process.stderr is None:
+        return process.communicate()
+
+    channel = get_event_bus().get_channel(deploy_id)
+    channel.publish('phase', {'phase': phase, 'state': 'started'})
+
+    def pump(pipe, parts, stream):
+        for line in pipe:
+            parts.append(line)
+            text = line.decode('utf-8', errors='replace') if isinstance(line, bytes) else line
+            channel.publish('log', {'phase': phase, 'stream': stream, 'line': _ANSI_RE.sub('', text.rstrip('\r\n'))})
+        pipe.close()
+
+    stdout_parts: list = []
+    stderr_parts: list = []
+    stderr_reader = threading.Thread(target=pump, args=(process.stderr, stderr_parts, 'stderr'),
+                                     name=f"{deploy_id}-{phase}-stderr", daemon=True)
+    stderr_reader.start()
+    pump(process.stdout, stdout_parts, 'stdout')
+    stderr_reader.join()
+    returncode = process.wait()
+
+    channel.publish('phase', {'phase': phase, 'state': 'finished', 'returncode': returncode})
+    empty = '' if getattr(process, 'text_mode', True) else b''
+    return empty.join(stdout_parts), empty.join(stderr_parts)
+
+
+def run_streaming(cmd, cwd=None, deploy_id: Optional[str] = None, phase: str = '', env=None) -> subprocess.CompletedProcess:
+    """以文本模式运行命令并实时发布输出，替代 subprocess.run(capture_output=True, text=True)"""
+    from utils.terraform_job_runner import track_process
+
+    process = track_process(subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    ))
+    stdout, stderr = stream_process_output(process, deploy_id, phase)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
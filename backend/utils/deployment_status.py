@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from flask import jsonify, make_response, request
+
+# 进程启动标识，写入 ETag，避免重启后版本号重复导致客户端误判未变化
+_BOOT_ID = format(int(time.time() * 1000), 'x')
+
+
+class StatusEntry:
+    """某个部署在某一版本的状态快照"""
+
+    __slots__ = ('deploy_id', 'version', 'data', 'updated_at')
+
+    def __init__(self, deploy_id: str, version: int, data: Dict[str, Any], updated_at: float):
+        self.deploy_id = deploy_id
+        self.version = version
+        self.data = data
+        self.updated_at = updated_at
+
+    @property
+    def etag(self) -> str:
+        return f"{_BOOT_ID}-{self.version}"
+
+
+class DeploymentStatusStore:
+    """进程内的部署状态注册表
+
+    部署线程写入状态时更新内存中的条目并递增版本号，查询接口直接读取内存，
+    支持按版本号长轮询等待变化。数据库写入通过 persist() 交给后台线程异步执行，
+    按提交顺序写入，不阻塞部署线程。
+    """
+
+    def __init__(self, name: str, max_entries: int = 2000):
+        self.name = name
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(f"{__name__}.{name}")
+        self._cond = threading.Condition()
+        self._entries: 'OrderedDict[str, StatusEntry]' = OrderedDict()
+        self._version = 0
+        self._writes: queue.Queue = queue.Queue()
+        self._writer = None
+        self._stats = {'hits': 0, 'loads': 0, 'updates': 0, 'persisted': 0, 'persist_errors': 0}
+
+    def _put(self, deploy_id: str, data: Dict[str, Any]) -> StatusEntry:
+        """写入新版本（调用方需持有锁）"""
+        self._version += 1
+        entry = StatusEntry(deploy_id, self._version, data, time.time())
+        self._entries[deploy_id] = entry
+        self._entries.move_to_end(deploy_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._cond.notify_all()
+        return entry
+
+    def update(self, deploy_id: str, data: Dict[str, Any], replace: bool = False) -> StatusEntry:
+        """更新部署状态，内容未变化时不递增版本
+
+        Args:
+            deploy_id: 部署ID
+            data: 状态字段
+            replace: 为 True 时整体替换，否则合并到现有状态
+        """
+        with self._cond:
+            current = self._entries.get(deploy_id)
+            if current is not None and not replace:
+                data = dict(current.data, **data)
+            else:
+                data = dict(data)
+            if current is not None and current.data == data:
+                return current
+            self._stats['updates'] += 1
+            return self._put(deploy_id, data)
+
+    def get(self, deploy_id: str) -> Optional[StatusEntry]:
+        with self._cond:
+            return self._entries.get(deploy_id)
+
+    def load(self, deploy_id: str, loader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[StatusEntry]:
+        """读取部署状态，内存中没有时调用 loader 从文件或数据库加载一次
+
+        loader 返回 None 表示部署不存在，此时不缓存。
+        """
+        entry = self.get(deploy_id)
+        if entry is not None:
+            with self._cond:
+                self._stats['hits'] += 1
+            return entry
+
+        data = loader()
+        if data is None:
+            return None
+        with self._cond:
+            self._stats['loads'] += 1
+            current = self._entries.get(deploy_id)
+            if current is not None:
+                # 加载期间部署线程已写入新状态，以内存中的状态为准
+                return current
+            return self._put(deploy_id, dict(data))
+
+    def wait(self, deploy_id: str, version: int, timeout: float) -> Optional[StatusEntry]:
+        """等待部署状态的版本号变化，超时返回当前条目"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                entry = self._entries.get(deploy_id)
+                if entry is None or entry.version != version:
+                    return entry
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return entry
+                self._cond.wait(remaining)
+
+    def write_file(self, deploy_id: str, status_file: str, data: Dict[str, Any], indent: Optional[int] = None):
+        """写入状态文件并更新内存状态，状态文件保留用于进程重启后恢复"""
+        with open(status_file, 'w') as f:
+            json.dump(data, f, indent=indent)
+        self.update(deploy_id, data, replace=True)
+
+    def persist(self, func: Callable, *args, **kwargs):
+        """异步执行数据库写入，后台线程按提交顺序依次执行"""
+        if self._writer is None:
+            with self._cond:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name=f"status-writer-{self.name}",
+                                                    daemon=True)
+                    self._writer.start()
+        self._writes.put((func, args, kwargs))
+
+    def _write_loop(self):
+        while True:
+            func, args, kwargs = self._writes.get()
+            try:
+                func(*args, **kwargs)
+                self._stats['persisted'] += 1
+            except Exception as e:
+                self._stats['persist_errors'] += 1
+                self.logger.error(f"写入部署状态到数据库失败 ({getattr(func, '__name__', func)}): {str(e)}")
+            finally:
+                self._writes.task_done()
+
+    def flush(self, timeout: float = 10) -> bool:
+        """等待已提交的数据库写入完成，返回是否在超时前完成"""
+        deadline = time.monotonic() + timeout
+        while self._writes.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self._stats, entries=len(self._entries), pending_writes=self._writes.unfinished_tasks)
+
+
+_stores: Dict[str, DeploymentStatusStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_status_store(name: str) -> DeploymentStatusStore:
+    """获取进程内共享的部署状态注册表，不同类型的部署使用各自的注册表"""
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = DeploymentStatusStore(name)
+        return store
+
+
+def read_status_file(status_file: str) -> Optional[Dict[str, Any]]:
+    """读取状态文件，不存在时返回 None"""
+    if not os.path.exists(status_file):
+        return None
+    with open(status_file, 'r') as f:
+        return json.load(f)
+
+
+def status_response(store: DeploymentStatusStore, deploy_id: str, loader: Callable[[], Optional[Dict[str, Any]]],
+                    render: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                    variant: Optional[Callable[[], str]] = None, max_wait: float = 30):
+    """按部署状态注册表生成查询响应，支持 ETag 条件请求和长轮询
+
+    请求头 If-None-Match 与当前状态的 ETag 一致时返回 304；同时带有 wait 参数（秒）时
+    先等待状态变化，超时仍未变化再返回 304。
+
+    Args:
+        loader: 注册表中没有该部署时加载状态，返回 None 表示部署不存在
+        render: 由状态生成响应内容，默认直接返回状态
+        variant: 状态之外影响响应内容的附加标识（如任务排队状态），参与 ETag 计算
+
+    Returns:
+        Flask 响应；部署不存在时返回 None，由调用方决定如何响应
+    """
+    entry = store.load(deploy_id, loader)
+    if entry is None:
+        return None
+
+    def etag_of(current):
+        return f"{current.etag}-{variant()}" if variant else current.etag
+
+    etag = etag_of(entry)
+    if request.if_none_match.contains(etag):
+        wait = min(max(request.args.get('wait', 0, type=float), 0), max_wait)
+        if wait > 0:
+            entry = store.wait(deploy_id, entry.version, wait) or entry
+            etag = etag_of(entry)
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+
+    response = jsonify(render(dict(entry.data)) if render else entry.data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class MCPDocCache:
+    """Terraform MCP 文档的两级缓存
+
+    - 内存层：LRU，按条目数和总字节数淘汰
+    - 磁盘层：每个条目一个 JSON 文件（原子写入），按总字节数淘汰最久未访问的条目
+    - 两层都有 TTL，过期条目在读取时删除
+    - 缓存键为 (provider, service_slug, doc_id, server_version)，MCP server 升级后自动失效
+    """
+
+    def __init__(self, cache_dir: Optional[str], server_version: str = "", ttl: float = 7 * 86400,
+                 max_entries: int = 512, max_memory_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        """初始化缓存
+
+        Args:
+            cache_dir: 磁盘缓存目录，为空时只使用内存层
+            server_version: MCP server 版本，参与缓存键
+            ttl: 条目有效期（秒）
+            max_entries: 内存层最大条目数
+            max_memory_bytes: 内存层最大字节数
+            max_disk_bytes: 磁盘层最大字节数
+        """
+        self.cache_dir = cache_dir
+        self.server_version = server_version
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, size)
+        self._memory: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+
+    def make_key(self, provider: str, service_slug: str, doc_id: str) -> str:
+        """生成缓存键"""
+        return json.dumps([provider or "", service_slug or "", doc_id or "", self.server_version],
+                          ensure_ascii=False)
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, provider: str, service_slug: str, doc_id: str) -> Optional[str]:
+        """读取缓存，未命中或已过期返回 None"""
+        key = self.make_key(provider, service_slug, doc_id)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                self._memory.pop(key)
+                self._memory_bytes -= size
+                self._stats["expired"] += 1
+
+        value, expires_at = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._put_memory(key, value, expires_at)
+        return value
+
+    def set(self, provider: str, service_slug: str, doc_id: str, value: str):
+        """写入缓存（内存层和磁盘层）"""
+        if not value:
+            return
+        key = self.make_key(provider, service_slug, doc_id)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._stats["sets"] += 1
+            self._put_memory(key, value, expires_at)
+        self._write_disk(key, value, expires_at)
+
+    def _put_memory(self, key: str, value: str, expires_at: float):
+        """写入内存层并按条目数/字节数淘汰（调用方需持有锁）"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[2]
+        self._memory[key] = (value, expires_at, size)
+        self._memory_bytes += size
+        while self._memory and (len(self._memory) > self.max_entries or
+                                self._memory_bytes > self.max_memory_bytes):
+            _, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._stats["memory_evictions"] += 1
+
+    def _read_disk(self, key: str, now: float):
+        if not self.cache_dir:
+            return None, 0
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None, 0
+        except Exception as e:
+            self.logger.warning(f"读取MCP文档磁盘缓存失败: {path}, {str(e)}")
+            return None, 0
+
+        if entry.get("key") != key:
+            return None, 0
+        if entry.get("expires_at", 0) <= now:
+            self._remove_disk(path)
+            with self._lock:
+                self._stats["expired"] += 1
+            return None, 0
+        try:
+            # 更新访问时间，磁盘层按访问时间淘汰
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("value"), entry["expires_at"]
+
+    def _write_disk(self, key: str, value: str, expires_at: float):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "value": value, "expires_at": expires_at}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            new_size = os.path.getsize(path)
+        except Exception as e:
+            self.logger.warning(f"写入MCP文档磁盘缓存失败: {path}, {str(e)}")
+            self._remove_disk(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += new_size - old_size
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _scan_disk(self):
+        """返回磁盘层条目列表 [(路径, 大小, 访问时间)]"""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for item in it:
+                    if item.name.endswith(".json"):
+                        try:
+                            stat = item.stat()
+                            entries.append((item.path, stat.st_size, stat.st_mtime))
+                        except OSError:
+                            continue
+        except OSError:
+            pass
+        return entries
+
+    def _evict_disk(self):
+        """淘汰最久未访问的磁盘条目，直到总大小降到上限的 90%"""
+        entries = sorted(self._scan_disk(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if self._remove_disk(path):
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._stats["disk_evictions"] += evicted
+
+    @staticmethod
+    def _remove_disk(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self):
+        """清空两级缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.cache_dir:
+            for path, _, _ in self._scan_disk():
+                self._remove_disk(path)
+            with self._lock:
+                self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中/未命中等统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            })
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_caches: Dict[Tuple[Optional[str], str], MCPDocCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_mcp_doc_cache(cache_dir: Optional[str], server_version: str = "", **kwargs) -> MCPDocCache:
+    """获取进程内共享的文档缓存，同一目录和 server 版本只创建一次（其余参数以首次创建时为准）"""
+    key = (os.path.abspath(cache_dir) if cache_dir else None, server_version)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = MCPDocCache(cache_dir, server_version=server_version, **kwargs)
+        return cache
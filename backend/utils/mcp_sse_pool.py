@@ -0,0 +1,300 @@
+import asyncio
+import concurrent.futures
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from mcp.client.session import ClientSession
+from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
+
+from utils.terraform_mcp_client import MCPCallTimeout, MCPSessionClosed
+
+
+class _SSESession:
+    """单个常驻的 MCP SSE 会话
+
+    sse_client 和 ClientSession 都是异步上下文管理器，必须在同一个任务里进入和退出，
+    因此每个会话由一个常驻任务持有：任务完成 initialize 后一直等待关闭信号。
+    """
+
+    def __init__(self, endpoint: str, name: str):
+        self.endpoint = endpoint
+        self.name = name
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.alive = False
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, timeout: float):
+        """建立 SSE 连接并完成 initialize 握手"""
+        self._task = asyncio.ensure_future(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise MCPCallTimeout(f"{self.name} 建立会话超时 ({timeout}秒)")
+        if not self.alive:
+            raise MCPSessionClosed(f"{self.name} 建立会话失败: {self.error}")
+
+    async def _run(self):
+        try:
+            async with sse_client(self.endpoint) as streams:
+                async with ClientSession(streams[0], streams[1]) as session:
+                    await session.initialize()
+                    self.session = session
+                    self.alive = True
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            # anyio 任务组会把连接错误包装成只有一个子异常的异常组，取出实际原因
+            while len(getattr(e, 'exceptions', ())) == 1:
+                e = e.exceptions[0]
+            self.error = e
+        finally:
+            self.alive = False
+            self._ready.set()
+
+    async def close(self):
+        """关闭会话，等待持有任务退出上下文"""
+        self.alive = False
+        self._closing.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
+                self._task.cancel()
+
+
+class MCPSSESessionPool:
+    """管理到 MCP SSE 服务（如 RAGFlow）的常驻会话池
+
+    - 后台线程运行一个事件循环，所有会话都属于这个循环，调用方无需每次新建事件循环
+    - 保持 pool_size 个完成 initialize 的会话，请求之间复用，避免每次重新连接和握手
+    - 每次调用选择在途请求最少的会话，同一会话内的并发请求由 MCP 按 id 多路复用
+    - 连接层出错时关闭该会话，下次调用自动重连，并在新会话上重试一次
+    """
+
+    def __init__(self, endpoint: str, pool_size: int = 2, call_timeout: float = 30,
+                 connect_timeout: float = 15, reconnect_interval: float = 2, name: str = "mcp-sse"):
+        """初始化会话池
+
+        Args:
+            endpoint: MCP SSE 服务地址，如 http://host:9382/sse
+            pool_size: 常驻会话数量
+            call_timeout: 默认的单次调用超时秒数
+            connect_timeout: 建立会话（连接 + initialize）的超时秒数
+            reconnect_interval: 会话建立失败后的重试间隔秒数
+            name: 会话名称前缀，用于日志和线程名
+        """
+        self.endpoint = endpoint
+        self.pool_size = max(1, int(pool_size))
+        self.call_timeout = call_timeout
+        self.connect_timeout = connect_timeout
+        self.reconnect_interval = reconnect_interval
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._sessions: List[Optional[_SSESession]] = [None] * self.pool_size
+        self._last_connect_failure = [0.0] * self.pool_size
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._closed = False
+        self._stats = {'calls': 0, 'connects': 0, 'connect_errors': 0, 'retries': 0, 'timeouts': 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """按需启动后台事件循环线程"""
+        with self._lock:
+            if self._closed:
+                raise MCPSessionClosed(f"{self.name} 会话池已关闭")
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, args=(loop,),
+                                                name=f"{self.name}-loop", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _ensure_session(self, index: int) -> Optional[_SSESession]:
+        """确保指定槽位的会话可用，必要时重连"""
+        session = self._sessions[index]
+        if session is not None and session.alive:
+            return session
+        if session is not None:
+            self._sessions[index] = None
+            await session.close()
+
+        # 连接失败后在 reconnect_interval 内不再重试，避免服务不可用时反复连接
+        if time.monotonic() - self._last_connect_failure[index] < self.reconnect_interval:
+            return None
+
+        session = _SSESession(self.endpoint, name=f"{self.name}-{index}")
+        try:
+            await session.start(self.connect_timeout)
+        except Exception as e:
+            self._stats['connect_errors'] += 1
+            self._last_connect_failure[index] = time.monotonic()
+            self.logger.warning(f"建立MCP SSE会话 {session.name} 失败: {str(e)}")
+            return None
+        self._stats['connects'] += 1
+        self._sessions[index] = session
+        self.logger.info(f"✅ {session.name} 已建立常驻SSE会话: {self.endpoint}")
+        return session
+
+    async def _acquire_session(self) -> _SSESession:
+        """选择在途请求最少的可用会话，缺失的会话并发重建"""
+        alive = [s for s in self._sessions if s is not None and s.alive]
+        if len(alive) < self.pool_size:
+            if self._connect_lock is None:
+                self._connect_lock = asyncio.Lock()
+            async with self._connect_lock:
+                await asyncio.gather(*(self._ensure_session(i) for i in range(self.pool_size)))
+            alive = [s for s in self._sessions if s is not None and s.alive]
+        if not alive:
+            raise MCPSessionClosed(f"没有可用的MCP SSE会话: {self.endpoint}")
+        return min(alive, key=lambda s: s.in_flight)
+
+    async def _call_tool(self, name: str, arguments: Dict[str, Any], timeout: float):
+        """在池中的会话上调用工具，连接层出错时在新会话上重试一次"""
+        self._stats['calls'] += 1
+        for attempt in range(2):
+            session = await self._acquire_session()
+            session.in_flight += 1
+            try:
+                return await asyncio.wait_for(session.session.call_tool(name, arguments=arguments), timeout)
+            except asyncio.TimeoutError:
+                self._stats['timeouts'] += 1
+                raise MCPCallTimeout(f"{session.name} 调用 {name} 超时 ({timeout}秒)")
+            except McpError:
+                # 服务端返回的 JSON-RPC 错误，会话本身仍然可用
+                raise
+            except Exception as e:
+                await session.close()
+                if attempt == 1:
+                    raise MCPSessionClosed(f"{session.name} 调用 {name} 失败: {str(e)}") from e
+                self._stats['retries'] += 1
+                self.logger.warning(f"MCP SSE会话 {session.name} 已断开，重连后重试: {str(e)}")
+            finally:
+                session.in_flight -= 1
+
+    def _submit(self, name: str, arguments: Dict[str, Any], timeout: Optional[float]):
+        timeout = self.call_timeout if timeout is None else timeout
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._call_tool(name, arguments, timeout), loop), timeout
+
+    def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None):
+        """同步调用 MCP 工具，返回 CallToolResult
+
+        超时包含等待会话建立的时间，连接超时再加上调用超时为总等待上限。
+        """
+        future, timeout = self._submit(name, arguments, timeout)
+        try:
+            return future.result(timeout + self.connect_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise MCPCallTimeout(f"{self.name} 调用 {name} 超时 ({timeout}秒)")
+
+    async def call_tool_async(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None):
+        """在调用方自己的事件循环中等待工具调用结果（调用仍在会话池的事件循环中执行）"""
+        future, _ = self._submit(name, arguments, timeout)
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> Dict[str, Any]:
+        alive = sum(1 for s in self._sessions if s is not None and s.alive)
+        return dict(self._stats, alive_sessions=alive, pool_size=self.pool_size)
+
+    def close(self):
+        """关闭所有会话并停止后台事件循环"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop = self._loop
+        if loop is None:
+            return
+
+        async def close_all():
+            await asyncio.gather(*(s.close() for s in self._sessions if s is not None))
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_all(), loop).result(10)
+        except Exception as e:
+            self.logger.warning(f"关闭MCP SSE会话时出错: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+
+
+class TTLCache:
+    """带过期时间的 LRU 缓存，读写都返回深拷贝，调用方修改结果不会影响缓存"""
+
+    def __init__(self, ttl: float = 300, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (value, expires_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+                self._stats['expired'] += 1
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+_pools: Dict[str, MCPSSESessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_mcp_sse_pool(endpoint: str, pool_size: int = 2, call_timeout: float = 30) -> MCPSSESessionPool:
+    """获取进程内共享的会话池，同一个 endpoint 只维护一个会话池（参数以首次创建时为准）"""
+    with _pools_lock:
+        pool = _pools.get(endpoint)
+        if pool is None:
+            pool = _pools[endpoint] = MCPSSESessionPool(endpoint, pool_size=pool_size, call_timeout=call_timeout)
+        return pool
@@ -0,0 +1,421 @@
+import heapq
+import itertools
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.deployment_events import get_event_bus
+
+
+class JobQueueFullError(Exception):
+    """排队中的任务数已达上限"""
+    pass
+
+
+class DuplicateJobError(Exception):
+    """相同ID的任务仍在排队或运行中"""
+    pass
+
+
+class JobState:
+    """任务状态机
+
+    queued -> running -> succeeded / failed / cancelled
+    queued -> cancelled
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    TRANSITIONS = {
+        QUEUED: {RUNNING, CANCELLED},
+        RUNNING: {SUCCEEDED, FAILED, CANCELLED},
+        SUCCEEDED: set(),
+        FAILED: set(),
+        CANCELLED: set(),
+    }
+    FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+# 优先级，数值越小越先执行
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+
+class TerraformJob:
+    """一个排队执行的 Terraform 部署任务"""
+
+    def __init__(self, job_id: str, func: Callable, args: tuple, kwargs: Dict[str, Any],
+                 user_id=None, kind: str = '', priority: int = PRIORITY_NORMAL):
+        self.job_id = job_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.user_id = user_id
+        self.kind = kind
+        self.priority = priority
+        self.state = JobState.QUEUED
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._processes: List[subprocess.Popen] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消，任务函数可在检查点调用"""
+        return self.cancel_event.is_set()
+
+    def attach_process(self, process: subprocess.Popen):
+        """登记任务启动的子进程，取消任务时终止这些进程"""
+        with self._lock:
+            self._processes = [p for p in self._processes if p.poll() is None]
+            self._processes.append(process)
+        # 取消请求可能在进程启动之前到达
+        if self.cancelled:
+            self._terminate(process)
+
+    def terminate_processes(self):
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            self._terminate(process)
+
+    @staticmethod
+    def _signal(process: subprocess.Popen, sig):
+        """向进程发信号；以新会话启动（start_new_session=True）的进程发给整个进程组，
+        这样 shell 命令启动的 terraform 子进程也会被终止"""
+        if hasattr(os, 'killpg'):
+            try:
+                if os.getpgid(process.pid) == process.pid:
+                    os.killpg(process.pid, sig)
+                    return
+            except ProcessLookupError:
+                return
+        process.send_signal(sig)
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen):
+        if process.poll() is not None:
+            return
+        try:
+            TerraformJob._signal(process, signal.SIGTERM)
+            process.wait(timeout=10)
+        except Exception:
+            try:
+                TerraformJob._signal(process, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except Exception:
+                pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'user_id': self.user_id,
+            'kind': self.kind,
+            'priority': self.priority,
+            'state': self.state,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'wait_seconds': round((self.started_at or self.finished_at or time.time()) - self.submitted_at, 3),
+            'run_seconds': round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+        }
+
+
+_current = threading.local()
+
+
+def current_job() -> Optional[TerraformJob]:
+    """返回当前工作线程正在执行的任务，不在任务中时返回 None"""
+    return getattr(_current, 'job', None)
+
+
+def track_process(process: subprocess.Popen) -> subprocess.Popen:
+    """把子进程登记到当前任务，使取消任务时能终止 terraform 进程"""
+    job = current_job()
+    if job is not None:
+        job.attach_process(process)
+    return process
+
+
+class TerraformJobRunner:
+    """统一的异步 Terraform 任务执行器
+
+    - 固定数量的工作线程，同时运行的 terraform 任务数不会超过 max_workers
+    - 排队任务按优先级、提交顺序执行；队列有上限，超出时拒绝提交
+    - 每个用户同时运行的任务数不超过 per_user_limit，超出的任务继续排队，
+      不阻塞其他用户的任务
+    - 任务状态按 JobState 状态机流转，排队中的任务可直接取消，运行中的任务
+      设置取消标记并终止已登记的子进程
+    """
+
+    def __init__(self, max_workers: int = 4, per_user_limit: int = 2, max_queue: int = 100,
+                 history_size: int = 500):
+        """初始化任务执行器
+
+        Args:
+            max_workers: 工作线程数（同时运行的任务上限）
+            per_user_limit: 单个用户同时运行的任务上限，<=0 表示不限制
+            max_queue: 排队任务上限
+            history_size: 保留的已结束任务数量，用于状态查询
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.per_user_limit = int(per_user_limit)
+        self.max_queue = max(1, int(max_queue))
+        self.history_size = history_size
+        self.logger = logging.getLogger(__name__)
+
+        self._cond = threading.Condition()
+        self._queue: list = []  # 堆: (priority, seq, job)
+        self._seq = itertools.count()
+        self._jobs: "OrderedDict[str, TerraformJob]" = OrderedDict()
+        self._running_by_user: Dict[Any, int] = {}
+        self._running = 0
+        self._queued = 0
+        self._workers: List[threading.Thread] = []
+        self._shutdown = False
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            JobState.SUCCEEDED: 0,
+            JobState.FAILED: 0,
+            JobState.CANCELLED: 0,
+        }
+
+    def _ensure_workers(self):
+        """按需启动工作线程（调用方需持有锁）"""
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < min(self.max_workers, self._queued + self._running):
+            worker = threading.Thread(target=self._worker_loop,
+                                      name=f"terraform-job-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def submit(self, job_id: str, func: Callable, *args, user_id=None, kind: str = '',
+               priority: int = PRIORITY_NORMAL, **kwargs) -> TerraformJob:
+        """提交任务
+
+        Args:
+            job_id: 任务ID，通常为 deploy_id
+            func: 任务函数，在工作线程中以 func(*args, **kwargs) 调用
+            user_id: 提交任务的用户，用于按用户限制并发
+            kind: 任务类型，仅用于展示和统计
+            priority: 优先级，数值越小越先执行
+
+        Returns:
+            TerraformJob
+
+        Raises:
+            DuplicateJobError: 相同ID的任务仍未结束
+            JobQueueFullError: 排队任务已达上限
+        """
+        job = TerraformJob(job_id, func, args, kwargs, user_id=user_id, kind=kind, priority=priority)
+        with self._cond:
+            if self._shutdown:
+                raise JobQueueFullError("任务执行器已关闭")
+            existing = self._jobs.get(job_id)
+            if existing is not None and existing.state not in JobState.FINISHED:
+                raise DuplicateJobError(f"任务 {job_id} 正在{'排队' if existing.state == JobState.QUEUED else '运行'}中")
+            if self._queued >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise JobQueueFullError(f"部署任务排队数已达上限 ({self.max_queue})，请稍后重试")
+
+            self._jobs.pop(job_id, None)
+            self._jobs[job_id] = job
+            heapq.heappush(self._queue, (priority, next(self._seq), job))
+            self._queued += 1
+            self._stats['submitted'] += 1
+            self._trim_history()
+            self._ensure_workers()
+            self._cond.notify_all()
+
+        # 重新提交时 get_channel 会替换已关闭的旧通道
+        get_event_bus().publish(job_id, 'job', state=JobState.QUEUED, kind=kind)
+        self.logger.info(f"提交Terraform任务 {job_id} (类型: {kind or '-'}, 用户: {user_id}, 优先级: {priority})，"
+                         f"排队: {self._queued}, 运行中: {self._running}")
+        return job
+
+    def _user_available(self, user_id) -> bool:
+        if self.per_user_limit <= 0:
+            return True
+        return self._running_by_user.get(user_id, 0) < self.per_user_limit
+
+    def _next_job(self) -> Optional[TerraformJob]:
+        """取出优先级最高、且所属用户未达并发上限的任务（调用方需持有锁）"""
+        skipped = []
+        job = None
+        while self._queue:
+            item = heapq.heappop(self._queue)
+            candidate = item[2]
+            if candidate.state != JobState.QUEUED:
+                # 已取消的任务直接丢弃
+                continue
+            if self._user_available(candidate.user_id):
+                job = candidate
+                break
+            skipped.append(item)
+        for item in skipped:
+            heapq.heappush(self._queue, item)
+        return job
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                self._queued -= 1
+                self._running += 1
+                self._running_by_user[job.user_id] = self._running_by_user.get(job.user_id, 0) + 1
+                self._transition(job, JobState.RUNNING)
+                job.started_at = time.time()
+
+            self._run(job)
+
+            with self._cond:
+                self._running -= 1
+                remaining = self._running_by_user.get(job.user_id, 1) - 1
+                if remaining > 0:
+                    self._running_by_user[job.user_id] = remaining
+                else:
+                    self._running_by_user.pop(job.user_id, None)
+                # 该用户排队中的任务可能因此可以执行
+                self._cond.notify_all()
+
+    def _run(self, job: TerraformJob):
+        _current.job = job
+        get_event_bus().publish(job.job_id, 'job', state=JobState.RUNNING, kind=job.kind)
+        final_state = JobState.SUCCEEDED
+        try:
+            self.logger.info(f"开始执行Terraform任务 {job.job_id}，排队等待 {job.started_at - job.submitted_at:.2f}秒")
+            job.func(*job.args, **job.kwargs)
+            if job.cancelled:
+                final_state = JobState.CANCELLED
+        except Exception as e:
+            final_state = JobState.CANCELLED if job.cancelled else JobState.FAILED
+            job.error = str(e)
+            self.logger.error(f"Terraform任务 {job.job_id} 执行出错: {str(e)}", exc_info=True)
+        finally:
+            _current.job = None
+
+        with self._cond:
+            job.finished_at = time.time()
+            self._transition(job, final_state)
+        get_event_bus().close(job.job_id, state=final_state, error=job.error)
+        self.logger.info(f"Terraform任务 {job.job_id} 结束: {final_state}，耗时 {job.finished_at - job.started_at:.2f}秒")
+
+    def _transition(self, job: TerraformJob, state: str):
+        """按状态机更新任务状态（调用方需持有锁）"""
+        if state not in JobState.TRANSITIONS[job.state]:
+            raise ValueError(f"任务 {job.job_id} 不能从 {job.state} 变为 {state}")
+        job.state = state
+        if state in self._stats:
+            self._stats[state] += 1
+
+    def _trim_history(self):
+        """只保留最近 history_size 个已结束的任务（调用方需持有锁）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in JobState.FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> bool:
+        """取消任务
+
+        排队中的任务立即变为 cancelled；运行中的任务设置取消标记并终止已登记的
+        terraform 进程，任务函数返回后变为 cancelled。
+
+        Returns:
+            任务存在且尚未结束时返回 True
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in JobState.FINISHED:
+                return False
+            job.cancel_event.set()
+            was_queued = job.state == JobState.QUEUED
+            if was_queued:
+                self._queued -= 1
+                job.finished_at = time.time()
+                self._transition(job, JobState.CANCELLED)
+        if was_queued:
+            get_event_bus().close(job_id, state=JobState.CANCELLED, error=None)
+            self.logger.info(f"已取消排队中的Terraform任务 {job_id}")
+            return True
+
+        self.logger.info(f"正在取消运行中的Terraform任务 {job_id}")
+        job.terminate_processes()
+        return True
+
+    def get_job(self, job_id: str) -> Optional[TerraformJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def is_cancelled(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        return job is not None and job.cancelled
+
+    def list_jobs(self, user_id=None) -> List[Dict[str, Any]]:
+        """返回任务列表，指定 user_id 时只返回该用户的任务"""
+        with self._cond:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in jobs if user_id is None or job.user_id == user_id]
+
+    def metrics(self) -> Dict[str, Any]:
+        """返回执行器指标"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'max_workers': self.max_workers,
+                'per_user_limit': self.per_user_limit,
+                'max_queue': self.max_queue,
+                'queued': self._queued,
+                'running': self._running,
+                'running_by_user': {str(k): v for k, v in self._running_by_user.items()},
+                'workers': len([w for w in self._workers if w.is_alive()]),
+            })
+        return stats
+
+    def shutdown(self, cancel_running: bool = True):
+        """关闭执行器：取消排队中的任务，可选地取消运行中的任务"""
+        with self._cond:
+            self._shutdown = True
+            jobs = [job for job in self._jobs.values() if job.state not in JobState.FINISHED]
+            self._cond.notify_all()
+        for job in jobs:
+            if job.state == JobState.QUEUED or cancel_running:
+                self.cancel(job.job_id)
+
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> TerraformJobRunner:
+    """获取进程内共享的任务执行器（配置来自 Config）"""
+    global _job_runner
+    if _job_runner is not None:
+        return _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            from config.config import Config
+            config = Config()
+            _job_runner = TerraformJobRunner(
+                max_workers=config.terraform_job_workers,
+                per_user_limit=config.terraform_job_per_user,
+                max_queue=config.terraform_job_queue_size
+            )
+    return _job_runner
@@ -0,0 +1,336 @@
+import itertools
+import json
+import logging
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+class MCPCallTimeout(Exception):
+    """JSON-RPC 调用在规定时间内没有收到响应"""
+    pass
+
+
+class MCPSessionClosed(Exception):
+    """stdio 会话已断开（进程退出或管道关闭）"""
+    pass
+
+
+class _PendingCall:
+    """等待中的 JSON-RPC 请求"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.raw = None
+        self.message = None
+        self.error = None
+
+
+class MCPStdioSession:
+    """到 terraform-mcp-server 的常驻 stdio 会话
+
+    进程启动后完成一次 MCP initialize 握手，之后所有请求复用同一个进程。
+    请求按 JSON-RPC id 多路复用：多个线程可以同时发起请求，后台读线程
+    根据响应中的 id 把结果分发给对应的调用方。
+    """
+
+    def __init__(self, command: List[str], name: str = "mcp-session", init_timeout: float = 15):
+        self.command = command
+        self.name = name
+        self.init_timeout = init_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._process = None
+        self._reader = None
+        self._stderr_reader = None
+        self._write_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: Dict[int, _PendingCall] = {}
+        self._ids = itertools.count(1)
+        self._alive = False
+
+    @property
+    def alive(self) -> bool:
+        return self._alive and self._process is not None and self._process.poll() is None
+
+    @property
+    def in_flight(self) -> int:
+        with self._pending_lock:
+            return len(self._pending)
+
+    def start(self):
+        """启动 MCP server 进程并完成 initialize 握手"""
+        self._process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self._alive = True
+        self._reader = threading.Thread(target=self._read_loop, name=f"{self.name}-reader", daemon=True)
+        self._reader.start()
+        self._stderr_reader = threading.Thread(target=self._drain_stderr, name=f"{self.name}-stderr", daemon=True)
+        self._stderr_reader.start()
+
+        init_response = self.request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {
+                "name": "mcdp-terraform-client",
+                "version": "1.0.0"
+            }
+        }, timeout=self.init_timeout)
+        if "error" in init_response["message"]:
+            # 部分旧版本 server 不要求握手，握手失败时仍然尝试直接调用工具
+            self.logger.warning(f"{self.name} initialize 返回错误: {init_response['message']['error']}")
+        else:
+            self.notify("notifications/initialized")
+        self.logger.info(f"✅ {self.name} 已建立常驻stdio会话 (pid={self._process.pid})")
+
+    def _read_loop(self):
+        """后台读线程：按行读取响应并分发给等待中的请求"""
+        process = self._process
+        try:
+            for line in process.stdout:
+                line = line.strip()
+                if not line.startswith("{"):
+                    continue
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"{self.name} 收到无法解析的响应: {line[:200]}")
+                    continue
+                call_id = message.get("id")
+                if call_id is None:
+                    # 服务端通知，忽略
+                    continue
+                with self._pending_lock:
+                    pending = self._pending.pop(call_id, None)
+                if pending is not None:
+                    pending.raw = line
+                    pending.message = message
+                    pending.event.set()
+        except Exception as e:
+            self.logger.warning(f"{self.name} 读取响应出错: {str(e)}")
+        finally:
+            self._mark_dead(f"{self.name} 进程已退出")
+
+    def _drain_stderr(self):
+        """持续读取 stderr，防止管道写满阻塞 server"""
+        try:
+            for line in self._process.stderr:
+                if line.strip():
+                    self.logger.debug(f"{self.name} stderr: {line.rstrip()}")
+        except Exception:
+            pass
+
+    def _mark_dead(self, reason: str):
+        self._alive = False
+        with self._pending_lock:
+            pending_calls = list(self._pending.values())
+            self._pending.clear()
+        for pending in pending_calls:
+            pending.error = MCPSessionClosed(reason)
+            pending.event.set()
+
+    def _write(self, payload: Dict[str, Any]):
+        data = json.dumps(payload) + "\n"
+        try:
+            with self._write_lock:
+                self._process.stdin.write(data)
+                self._process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            self._mark_dead(f"{self.name} 写入失败: {str(e)}")
+            raise MCPSessionClosed(str(e))
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """发送不需要响应的 JSON-RPC 通知"""
+        payload = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            payload["params"] = params
+        self._write(payload)
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> Dict[str, Any]:
+        """发送 JSON-RPC 请求并等待对应 id 的响应
+
+        Returns:
+            {"raw": 原始响应行, "message": 解析后的响应}
+        """
+        if not self.alive:
+            raise MCPSessionClosed(f"{self.name} 未连接")
+
+        call_id = next(self._ids)
+        pending = _PendingCall()
+        with self._pending_lock:
+            self._pending[call_id] = pending
+
+        payload = {"jsonrpc": "2.0", "id": call_id, "method": method}
+        if params is not None:
+            payload["params"] = params
+        try:
+            self._write(payload)
+        except MCPSessionClosed:
+            with self._pending_lock:
+                self._pending.pop(call_id, None)
+            raise
+
+        if not pending.event.wait(timeout):
+            with self._pending_lock:
+                self._pending.pop(call_id, None)
+            raise MCPCallTimeout(f"{self.name} 请求 {method} 超时 ({timeout}秒)")
+        if pending.error is not None:
+            raise pending.error
+        return {"raw": pending.raw, "message": pending.message}
+
+    def close(self):
+        """关闭会话并终止 server 进程"""
+        process = self._process
+        self._mark_dead(f"{self.name} 已关闭")
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        try:
+            process.terminate()
+            process.wait(timeout=5)
+        except Exception:
+            try:
+                process.kill()
+            except Exception:
+                pass
+
+
+class TerraformMCPClient:
+    """管理多个到 terraform-mcp-server 的常驻 stdio 会话
+
+    - 保持 pool_size 个会话常驻，避免每次调用都 docker exec 并重新握手
+    - 每次调用选择在途请求最少的会话，多个请求在同一会话内按 id 多路复用
+    - 会话断开时自动重连，调用失败时在新会话上重试一次
+    - 每次调用都有独立的超时
+    """
+
+    def __init__(self, command: List[str], pool_size: int = 2, call_timeout: float = 30,
+                 reconnect_interval: float = 2):
+        """初始化客户端
+
+        Args:
+            command: 启动 stdio 会话的命令，如 docker exec -i <容器> /bin/terraform-mcp-server stdio
+            pool_size: 常驻会话数量
+            call_timeout: 默认的单次调用超时秒数
+            reconnect_interval: 会话建立失败后的重试间隔秒数
+        """
+        self.command = command
+        self.pool_size = max(1, int(pool_size))
+        self.call_timeout = call_timeout
+        self.reconnect_interval = reconnect_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._sessions: List[Optional[MCPStdioSession]] = [None] * self.pool_size
+        self._last_connect_failure = [0.0] * self.pool_size
+        self._closed = False
+
+    def _ensure_session(self, index: int) -> Optional[MCPStdioSession]:
+        """确保指定槽位的会话可用，必要时重连（调用方需持有 self._lock）"""
+        session = self._sessions[index]
+        if session is not None and session.alive:
+            return session
+        if session is not None:
+            session.close()
+            self._sessions[index] = None
+
+        # 连接失败后在 reconnect_interval 内不再重试，避免 server 不可用时反复拉起进程
+        if time.monotonic() - self._last_connect_failure[index] < self.reconnect_interval:
+            return None
+
+        session = MCPStdioSession(self.command, name=f"terraform-mcp-{index}")
+        try:
+            session.start()
+        except Exception as e:
+            self.logger.warning(f"建立MCP stdio会话 {index} 失败: {str(e)}")
+            session.close()
+            self._last_connect_failure[index] = time.monotonic()
+            return None
+        self._sessions[index] = session
+        return session
+
+    def _acquire_session(self) -> MCPStdioSession:
+        """选择在途请求最少的可用会话"""
+        with self._lock:
+            if self._closed:
+                raise MCPSessionClosed("MCP客户端已关闭")
+            candidates = []
+            for index in range(self.pool_size):
+                session = self._ensure_session(index)
+                if session is not None:
+                    candidates.append(session)
+            if not candidates:
+                raise MCPSessionClosed("没有可用的MCP stdio会话")
+            return min(candidates, key=lambda s: s.in_flight)
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """发送 JSON-RPC 请求，会话断开时在新会话上重试一次
+
+        Returns:
+            {"raw": 原始响应行, "message": 解析后的响应}
+        """
+        timeout = self.call_timeout if timeout is None else timeout
+        for attempt in range(2):
+            session = self._acquire_session()
+            try:
+                return session.request(method, params, timeout=timeout)
+            except MCPSessionClosed as e:
+                if attempt == 1:
+                    raise
+                self.logger.warning(f"MCP会话 {session.name} 已断开，重连后重试: {str(e)}")
+
+    def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> str:
+        """调用 MCP 工具并返回原始 JSON-RPC 响应行
+
+        返回值与此前 docker exec 方式的 stdout 格式一致，现有解析逻辑可直接复用。
+        """
+        response = self.request("tools/call", {"name": name, "arguments": arguments}, timeout=timeout)
+        return response["raw"]
+
+    def close(self):
+        """关闭所有会话"""
+        with self._lock:
+            self._closed = True
+            sessions, self._sessions = self._sessions, [None] * self.pool_size
+        for session in sessions:
+            if session is not None:
+                session.close()
+
+
+_clients: Dict[tuple, TerraformMCPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_terraform_mcp_client(command: List[str], pool_size: int = 2, call_timeout: float = 30) -> TerraformMCPClient:
+    """获取进程内共享的MCP客户端，同一条启动命令只维护一组常驻会话（参数以首次创建时为准）"""
+    key = tuple(command)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or client._closed:
+            client = _clients[key] = TerraformMCPClient(command, pool_size=pool_size, call_timeout=call_timeout)
+        return client
+
+
+_doc_executor: Optional[ThreadPoolExecutor] = None
+_doc_executor_lock = threading.Lock()
+
+
+def get_mcp_doc_executor(max_workers: int = 6) -> ThreadPoolExecutor:
+    """获取进程内共享的MCP文档查询线程池，所有请求共用同一组工作线程（线程数以首次创建时为准）"""
+    global _doc_executor
+    with _doc_executor_lock:
+        if _doc_executor is None:
+            _doc_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-doc")
+        return _doc_executor
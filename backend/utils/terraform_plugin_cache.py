@@ -0,0 +1,350 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# required_providers 中的单个 provider 声明: aws = { source = "hashicorp/aws" version = "~> 5.84.0" }
+_PROVIDER_ENTRY_RE = re.compile(r'([A-Za-z0-9_-]+)\s*=\s*\{([^{}]*)\}', re.S)
+_SOURCE_RE = re.compile(r'source\s*=\s*"([^"]+)"')
+_VERSION_RE = re.compile(r'version\s*=\s*"([^"]+)"')
+_PROVIDER_BLOCK_RE = re.compile(r'^\s*provider\s+"([A-Za-z0-9_-]+)"', re.M)
+_RESOURCE_BLOCK_RE = re.compile(r'^\s*(?:resource|data)\s+"([A-Za-z0-9]+)(?:_|")', re.M)
+# 只去掉整行注释和块注释，避免误删字符串中的 "#"、"//"
+_LINE_COMMENT_RE = re.compile(r'^\s*(?:#|//).*$', re.M)
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+
+
+def _extract_block(content: str, keyword: str) -> List[str]:
+    """提取形如 keyword { ... } 的块内容（按花括号配对）"""
+    blocks = []
+    for match in re.finditer(r'\b%s\s*\{' % re.escape(keyword), content):
+        depth = 0
+        start = match.end() - 1
+        for index in range(start, len(content)):
+            if content[index] == '{':
+                depth += 1
+            elif content[index] == '}':
+                depth -= 1
+                if depth == 0:
+                    blocks.append(content[start + 1:index])
+                    break
+    return blocks
+
+
+def parse_provider_requirements(terraform_content: str) -> List[Tuple[str, str, str]]:
+    """解析Terraform配置中需要的provider集合
+
+    优先读取 required_providers 中的声明；未声明的 provider 块和资源类型前缀
+    按 Terraform 的隐式规则映射到 hashicorp/<name>，不带版本约束。
+
+    Returns:
+        按本地名排序的 [(本地名, source, 版本约束)]
+    """
+    content = _LINE_COMMENT_RE.sub('', _BLOCK_COMMENT_RE.sub('', terraform_content or ''))
+    providers: Dict[str, Tuple[str, str]] = {}
+
+    for block in _extract_block(content, 'required_providers'):
+        for name, body in _PROVIDER_ENTRY_RE.findall(block):
+            source = _SOURCE_RE.search(body)
+            version = _VERSION_RE.search(body)
+            providers[name] = (
+                source.group(1) if source else f"hashicorp/{name}",
+                version.group(1) if version else ""
+            )
+
+    implicit = set(_PROVIDER_BLOCK_RE.findall(content)) | set(_RESOURCE_BLOCK_RE.findall(content))
+    for name in implicit:
+        if name not in providers and name != 'terraform':
+            providers[name] = (f"hashicorp/{name}", "")
+
+    return sorted((name, source, version) for name, (source, version) in providers.items())
+
+
+class TerraformPluginCache:
+    """共享的 Terraform provider 插件缓存和预初始化工作目录模板
+
+    - 插件缓存目录（TF_PLUGIN_CACHE_DIR）：同一个 provider 版本只下载一次
+    - 模板目录：每个 provider 集合一个，包含最小化的 required_providers 配置、
+      .terraform.lock.hcl（锁文件登记）和已安装的 .terraform/providers
+    - 准备工作目录时把模板的锁文件和 providers 硬链接（跨文件系统时复制）到工作目录，
+      随后的 terraform init 直接复用已安装的 provider，不再访问 registry，
+      因此缓存预热后可以完全离线运行
+    - 记录冷启动和命中模板两种情况下 terraform init 的耗时
+    """
+
+    def __init__(self, cache_dir: str, enabled: bool = True, seed_timeout: float = 600):
+        """初始化插件缓存
+
+        Args:
+            cache_dir: 缓存根目录，包含 plugins/ 和 templates/ 两个子目录
+            enabled: 为 False 时 prepare_workdir 不做任何处理，init 保持原有行为
+            seed_timeout: 生成模板时 terraform init 的超时秒数
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.plugins_dir = os.path.join(self.cache_dir, 'plugins')
+        self.templates_dir = os.path.join(self.cache_dir, 'templates')
+        self.enabled = enabled
+        self.seed_timeout = seed_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        # 每个 provider 集合一把锁，同一集合的并发请求等待同一次模板生成
+        self._seed_locks: Dict[str, threading.Lock] = {}
+        self._stats = {
+            "template_hits": 0,
+            "template_misses": 0,
+            "seeds": 0,
+            "seed_failures": 0,
+            "seed_seconds_total": 0.0,
+            "link_failures": 0,
+        }
+        # 按模式统计 terraform init 耗时: cold=未使用缓存, template=已链接模板
+        self._init_stats: Dict[str, Dict[str, float]] = {}
+
+        if self.enabled:
+            os.makedirs(self.plugins_dir, exist_ok=True)
+            os.makedirs(self.templates_dir, exist_ok=True)
+
+    @staticmethod
+    def provider_set_key(requirements: List[Tuple[str, str, str]]) -> str:
+        """provider 集合的键，只与 source 和版本约束有关"""
+        normalized = sorted({(source.lower(), version.replace(' ', '')) for _, source, version in requirements})
+        return hashlib.sha1(json.dumps(normalized).encode('utf-8')).hexdigest()[:16]
+
+    def template_dir(self, key: str) -> str:
+        return os.path.join(self.templates_dir, key)
+
+    def is_seeded(self, key: str) -> bool:
+        """模板是否已生成（以锁文件存在为准）"""
+        return os.path.exists(os.path.join(self.template_dir(key), '.terraform.lock.hcl'))
+
+    @staticmethod
+    def read_workdir_content(work_dir: str) -> str:
+        """读取工作目录下所有 .tf 文件内容"""
+        parts = []
+        for path in sorted(glob.glob(os.path.join(work_dir, '*.tf'))):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    parts.append(f.read())
+            except OSError:
+                continue
+        return "\n".join(parts)
+
+    def seed_env(self, base_env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """生成模板时使用的环境变量：启用共享插件缓存"""
+        env = dict(os.environ if base_env is None else base_env)
+        env['TF_PLUGIN_CACHE_DIR'] = self.plugins_dir
+        env['TF_IN_AUTOMATION'] = '1'
+        return env
+
+    def _render_template_config(self, requirements: List[Tuple[str, str, str]]) -> str:
+        lines = ["terraform {", "  required_providers {"]
+        for name, source, version in requirements:
+            entry = f'    {name} = {{\n      source  = "{source}"\n'
+            if version:
+                entry += f'      version = "{version}"\n'
+            entry += "    }"
+            lines.append(entry)
+        lines.extend(["  }", "}", ""])
+        return "\n".join(lines)
+
+    def _seed_lock_for(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._seed_locks.get(key)
+            if lock is None:
+                lock = self._seed_locks[key] = threading.Lock()
+            return lock
+
+    def seed(self, requirements: List[Tuple[str, str, str]]) -> Optional[str]:
+        """为 provider 集合生成模板目录（已存在时直接返回）
+
+        模板先在临时目录中 init，成功后再重命名为正式目录，
+        并通过文件锁保证多个进程不会同时写插件缓存。
+
+        Returns:
+            模板键，失败时返回 None
+        """
+        if not requirements:
+            return None
+        key = self.provider_set_key(requirements)
+        if self.is_seeded(key):
+            return key
+
+        with self._seed_lock_for(key):
+            if self.is_seeded(key):
+                return key
+            lock_file = open(os.path.join(self.cache_dir, '.seed.lock'), 'w')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if self.is_seeded(key):
+                    return key
+                return key if self._seed_locked(key, requirements) else None
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _seed_locked(self, key: str, requirements: List[Tuple[str, str, str]]) -> bool:
+        final_dir = self.template_dir(key)
+        tmp_dir = f"{final_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        with open(os.path.join(tmp_dir, 'providers.tf'), 'w', encoding='utf-8') as f:
+            f.write(self._render_template_config(requirements))
+        with open(os.path.join(tmp_dir, 'providers.json'), 'w', encoding='utf-8') as f:
+            json.dump([{"name": n, "source": s, "version": v} for n, s, v in requirements], f, indent=2)
+
+        self.logger.info(f"生成Terraform provider模板 {key}: {[source for _, source, _ in requirements]}")
+        start = time.time()
+        try:
+            result = subprocess.run(
+                ['terraform', 'init', '-input=false', '-no-color'],
+                cwd=tmp_dir,
+                env=self.seed_env(),
+                capture_output=True,
+                text=True,
+                timeout=self.seed_timeout
+            )
+            succeeded = result.returncode == 0
+            if not succeeded:
+                self.logger.warning(f"生成provider模板 {key} 失败: {result.stderr.strip()[:500]}")
+        except (subprocess.TimeoutExpired, OSError) as e:
+            self.logger.warning(f"生成provider模板 {key} 失败: {str(e)}")
+            succeeded = False
+        duration = time.time() - start
+
+        with self._lock:
+            self._stats["seeds"] += 1
+            self._stats["seed_seconds_total"] += duration
+            if not succeeded:
+                self._stats["seed_failures"] += 1
+
+        if not succeeded:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+        self.logger.info(f"✅ provider模板 {key} 已生成，耗时 {duration:.2f}秒")
+        return True
+
+    @staticmethod
+    def _link_or_copy(src: str, dst: str):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def prepare_workdir(self, work_dir: str, terraform_content: Optional[str] = None) -> str:
+        """在 terraform init 之前把对应 provider 集合的模板链接到工作目录
+
+        模板不存在时先生成模板（同一集合只生成一次），生成失败时保持原有的冷启动 init。
+
+        Args:
+            work_dir: Terraform 工作目录
+            terraform_content: 配置内容，为空时读取工作目录下的 .tf 文件
+
+        Returns:
+            init 模式: "template"（已链接模板）或 "cold"（未使用缓存）
+        """
+        if not self.enabled:
+            return "cold"
+        try:
+            if terraform_content is None:
+                terraform_content = self.read_workdir_content(work_dir)
+            requirements = parse_provider_requirements(terraform_content)
+            if not requirements:
+                return "cold"
+
+            key = self.provider_set_key(requirements)
+            hit = self.is_seeded(key)
+            with self._lock:
+                self._stats["template_hits" if hit else "template_misses"] += 1
+            if not hit and self.seed(requirements) is None:
+                return "cold"
+
+            template_dir = self.template_dir(key)
+            shutil.copy2(os.path.join(template_dir, '.terraform.lock.hcl'),
+                         os.path.join(work_dir, '.terraform.lock.hcl'))
+            providers_dir = os.path.join(work_dir, '.terraform', 'providers')
+            shutil.rmtree(providers_dir, ignore_errors=True)
+            # 模板中的 provider 是指向插件缓存的符号链接，这里跟随链接并硬链接实际文件，
+            # 工作目录不依赖模板目录本身
+            shutil.copytree(os.path.join(template_dir, '.terraform', 'providers'), providers_dir,
+                            copy_function=self._link_or_copy)
+            return "template"
+        except Exception as e:
+            with self._lock:
+                self._stats["link_failures"] += 1
+            self.logger.warning(f"准备Terraform工作目录 {work_dir} 的provider缓存失败，使用冷启动init: {str(e)}")
+            return "cold"
+
+    def record_init(self, mode: str, duration: float, success: bool = True):
+        """记录一次 terraform init 的耗时"""
+        with self._lock:
+            stats = self._init_stats.setdefault(mode, {
+                "count": 0, "failures": 0, "seconds_total": 0.0, "seconds_max": 0.0
+            })
+            stats["count"] += 1
+            stats["seconds_total"] += duration
+            stats["seconds_max"] = max(stats["seconds_max"], duration)
+            if not success:
+                stats["failures"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """返回模板命中、生成次数以及各模式下的 init 耗时"""
+        with self._lock:
+            stats = dict(self._stats)
+            init_stats = {mode: dict(values) for mode, values in self._init_stats.items()}
+        for values in init_stats.values():
+            values["seconds_avg"] = round(values["seconds_total"] / values["count"], 3) if values["count"] else 0.0
+            values["seconds_total"] = round(values["seconds_total"], 3)
+            values["seconds_max"] = round(values["seconds_max"], 3)
+        stats["seed_seconds_total"] = round(stats["seed_seconds_total"], 3)
+        stats["init"] = init_stats
+        cold_avg = init_stats.get("cold", {}).get("seconds_avg")
+        warm_avg = init_stats.get("template", {}).get("seconds_avg")
+        if cold_avg and warm_avg:
+            stats["init_speedup"] = round(cold_avg / warm_avg, 2)
+        stats.update({
+            "enabled": self.enabled,
+            "cache_dir": self.cache_dir,
+            "templates": len([name for name in os.listdir(self.templates_dir)
+                              if not name.endswith('.tmp')]) if os.path.isdir(self.templates_dir) else 0,
+        })
+        return stats
+
+
+_plugin_cache = None
+_plugin_cache_lock = threading.Lock()
+
+
+def get_plugin_cache() -> TerraformPluginCache:
+    """获取进程内共享的插件缓存实例（配置来自 Config）"""
+    global _plugin_cache
+    if _plugin_cache is not None:
+        return _plugin_cache
+    with _plugin_cache_lock:
+        if _plugin_cache is None:
+            from config.config import Config
+            config = Config()
+            _plugin_cache = TerraformPluginCache(
+                config.terraform_plugin_cache_dir,
+                enabled=config.terraform_plugin_cache_enabled
+            )
+    return _plugin_cache
@@ -0,0 +1,257 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Sequence
+
+
+class WriteBehindWriter:
+    """把同一条 INSERT 语句的写入攒批后由后台线程异步执行
+
+    - submit() 只把参数放入内存队列，请求线程不再等待数据库往返
+    - 队列达到 batch_size 条，或最早一条等待超过 flush_interval 秒时，用 executemany 在一个事务中写入
+    - 写入失败按退避重试，超过 max_retries 次后丢弃该批并计入 failed
+    - 队列上限为 max_backlog，满时 submit 最多等待 block_timeout 秒，仍然满则丢弃并计入 dropped
+    - 进程退出时（atexit）把剩余数据写完
+    """
+
+    def __init__(self, name: str, sql: str, connection_factory: Optional[Callable[[], Any]] = None,
+                 batch_size: int = 100, flush_interval: float = 0.5, max_backlog: int = 10000,
+                 max_retries: int = 3, block_timeout: float = 1.0):
+        """初始化写入器
+
+        Args:
+            name: 名称，用于日志和线程名
+            sql: 参数化的 INSERT 语句，每次 submit 提供一组参数
+            connection_factory: 返回数据库连接的函数，连接 close() 时归还连接池；默认使用共享连接池
+            batch_size: 每批写入的最大行数，攒够即触发写入
+            flush_interval: 最早一条数据的最长等待秒数
+            max_backlog: 内存中等待写入的最大行数
+            max_retries: 每批写入失败后的重试次数
+            block_timeout: 队列满时 submit 等待空位的秒数
+        """
+        if connection_factory is None:
+            from utils.database import get_db_connection
+            connection_factory = get_db_connection
+        self.name = name
+        self.sql = sql
+        self.connection_factory = connection_factory
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_backlog = max(self.batch_size, int(max_backlog))
+        self.max_retries = max_retries
+        self.block_timeout = block_timeout
+        self.logger = logging.getLogger(f"{__name__}.{name}")
+
+        self._cond = threading.Condition()
+        self._pending: deque = deque()  # (参数, 提交时间)
+        self._in_flight = 0
+        self._in_flight_rows: list = []
+        self._flush_requested = False
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+        self._stats = {
+            'submitted': 0, 'written': 0, 'batches': 0, 'retries': 0,
+            'failed': 0, 'dropped': 0, 'last_error': None, 'last_flush_at': None,
+        }
+        atexit.register(self.close)
+
+    def _ensure_writer(self):
+        """按需启动后台写入线程（调用方需持有锁）"""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name=f"write-behind-{self.name}", daemon=True)
+            self._writer.start()
+
+    def submit(self, params: Sequence[Any]) -> bool:
+        """提交一行待写入的参数，返回是否进入队列"""
+        deadline = time.monotonic() + self.block_timeout
+        with self._cond:
+            if self._closed:
+                self._stats['dropped'] += 1
+                self.logger.error(f"写入器已关闭，丢弃数据: {self.name}")
+                return False
+            self._ensure_writer()
+            while len(self._pending) >= self.max_backlog:
+                # 队列已满：先让后台线程尽快写入，等待空位
+                self._flush_requested = True
+                self._cond.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['dropped'] += 1
+                    self.logger.error(f"写入队列已满 ({self.max_backlog} 行)，丢弃数据: {self.name}")
+                    return False
+                self._cond.wait(remaining)
+            self._pending.append((tuple(params), time.monotonic()))
+            self._stats['submitted'] += 1
+            # 第一条数据开始计时，攒够一批立即写入
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _next_batch(self):
+        """等待写入条件满足并取出一批数据，关闭且队列为空时返回 None"""
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._flush_requested = False
+                self._cond.wait()
+
+            # 攒批：数量达到 batch_size、最早一条等待超过 flush_interval、或请求了立即写入
+            deadline = self._pending[0][1] + self.flush_interval
+            while (len(self._pending) < self.batch_size and not self._flush_requested
+                   and not self._closed):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            count = min(self.batch_size, len(self._pending))
+            batch = [self._pending.popleft()[0] for _ in range(count)]
+            self._in_flight = count
+            self._in_flight_rows = batch
+            # 取出数据后队列有了空位
+            self._cond.notify_all()
+            return batch
+
+    def _write_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            written = self._write_batch(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._in_flight_rows = []
+                if written:
+                    self._stats['written'] += len(batch)
+                    self._stats['batches'] += 1
+                    self._stats['last_flush_at'] = time.time()
+                else:
+                    self._stats['failed'] += len(batch)
+                self._cond.notify_all()
+
+    def _write_batch(self, batch) -> bool:
+        """在一个事务中写入一批数据，失败时按退避重试"""
+        for attempt in range(self.max_retries + 1):
+            connection = None
+            try:
+                connection = self.connection_factory()
+                cursor = connection.cursor()
+                cursor.executemany(self.sql, batch)
+                connection.commit()
+                cursor.close()
+                return True
+            except Exception as e:
+                with self._cond:
+                    self._stats['last_error'] = str(e)
+                if connection is not None:
+                    try:
+                        connection.rollback()
+                    except Exception:
+                        pass
+                if attempt == self.max_retries:
+                    self.logger.error(f"批量写入失败，丢弃 {len(batch)} 行: {self.name}: {str(e)}")
+                    return False
+                with self._cond:
+                    self._stats['retries'] += 1
+                self.logger.warning(f"批量写入失败，{0.5 * 2 ** attempt:.1f}秒后重试: {self.name}: {str(e)}")
+                time.sleep(0.5 * 2 ** attempt)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+        return False
+
+    def has_pending(self, match: Callable[[tuple], bool]) -> bool:
+        """是否有尚未落库（排队中或正在写入）且满足 match 的行"""
+        with self._cond:
+            return any(match(params) for params, _ in self._pending) or \
+                any(match(params) for params in self._in_flight_rows)
+
+    def flush(self, timeout: float = 10) -> bool:
+        """立即写入队列中的数据并等待完成，返回是否在超时前写完"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                if self._writer is None or not self._writer.is_alive():
+                    self._ensure_writer()
+                self._flush_requested = True
+                self._cond.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10) -> bool:
+        """写完剩余数据并停止后台线程，返回是否在超时前写完"""
+        with self._cond:
+            if self._closed:
+                return not self._pending
+            self._closed = True
+            self._cond.notify_all()
+            writer = self._writer
+        if writer is None:
+            return True
+        writer.join(timeout)
+        with self._cond:
+            if self._pending:
+                self.logger.error(f"关闭时仍有 {len(self._pending)} 行未写入: {self.name}")
+            return not self._pending and not self._in_flight
+
+    def metrics(self) -> Dict[str, Any]:
+        """写入统计：pending/in_flight 为尚未落库的行数，oldest_pending_seconds 为其中最早一条的等待时间"""
+        with self._cond:
+            oldest = time.monotonic() - self._pending[0][1] if self._pending else 0.0
+            return dict(
+                self._stats,
+                pending=len(self._pending),
+                in_flight=self._in_flight,
+                oldest_pending_seconds=round(oldest, 3),
+                max_backlog=self.max_backlog,
+            )
+
+
+_writers: Dict[tuple, WriteBehindWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_write_behind_writer(name: str, sql: str, connection_factory: Optional[Callable[[], Any]] = None,
+                            **kwargs) -> WriteBehindWriter:
+    """获取进程内共享的写入器，相同名称、语句和连接来源只创建一个（其余参数以首次创建时为准）"""
+    key = (name, sql, connection_factory)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = WriteBehindWriter(name, sql, connection_factory=connection_factory, **kwargs)
+        return writer
+
+
+_CHAT_HISTORY_INSERT = """
+    INSERT INTO chat_history
+    (user_id, username, question, answer, message_type, session_id, metadata, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, CONVERT_TZ(%s, '+00:00', @@session.time_zone))
+"""
+
+
+def get_chat_history_writer() -> WriteBehindWriter:
+    """获取进程内共享的聊天记录写入器（配置来自 Config）
+
+    created_at 参数为提交时的 UTC 时间，写入时转换为数据库会话时区，与 NOW() 的取值一致。
+    """
+    writer = _writers.get(('chat-history', _CHAT_HISTORY_INSERT, None))
+    if writer is not None:
+        return writer
+    from config.config import Config
+    config = Config()
+    return get_write_behind_writer(
+        'chat-history',
+        _CHAT_HISTORY_INSERT,
+        batch_size=config.chat_write_batch_size,
+        flush_interval=config.chat_write_flush_interval,
+        max_backlog=config.chat_write_max_backlog
+    )